@@ -21,11 +21,78 @@ from Bio.Alphabet import IUPAC
 from Bio.Seq import Seq
 from Bio.SubsMat import FreqTable
 
+try:
+    import numpy
+except ImportError:
+    #NumPy is optional here, without it we count letters in pure Python
+    numpy = None
+
 # Expected random distributions for 20-letter protein, and
 # for 4-letter nucleotide alphabets
 Protein20Random = 0.05
 Nucleotide4Random = 0.25
 
+# Number of matrix cells counted in one go by _count_matrix_letters
+_COUNT_BLOCK_SIZE = 1 << 22
+
+
+def _count_matrix_letters(matrix, weights=None):
+    """Count the letters in each column of an alignment matrix (PRIVATE).
+
+    Takes a 2D uint8 NumPy array as built by MultipleSeqAlignment (one row
+    per record, one column per alignment column), and an optional list of
+    row weights. Returns a string of the distinct letters present, and a
+    list with one entry per alignment column, each a list of the (weighted)
+    counts of those letters.
+
+    The counting is done with numpy.bincount over blocks of rows, so that
+    the temporary index arrays stay a reasonable size for huge alignments.
+    """
+    rows, cols = matrix.shape
+    offsets = numpy.arange(cols) * 256
+    if weights is None:
+        counts = numpy.zeros(cols * 256, int)
+    else:
+        counts = numpy.zeros(cols * 256, float)
+        weights = numpy.asarray(weights, float)
+    step = max(1, _COUNT_BLOCK_SIZE // max(1, cols))
+    for start in range(0, rows, step):
+        block = matrix[start:start + step]
+        index = (block + offsets).ravel()
+        if weights is None:
+            counts += numpy.bincount(index, minlength=cols * 256)
+        else:
+            block_weights = numpy.repeat(weights[start:start + step], cols)
+            counts += numpy.bincount(index, block_weights,
+                                     minlength=cols * 256)
+    counts = counts.reshape(cols, 256)
+    present = numpy.flatnonzero(counts.any(axis=0))
+    letters = "".join(chr(code) for code in present)
+    return letters, counts[:, present].tolist()
+
+
+def _count_record_letters(records, weights=None):
+    """Count the letters in each column of a list of records (PRIVATE).
+
+    Pure Python equivalent of _count_matrix_letters, also used when the
+    records are not all the same length (e.g. with the old Alignment class).
+    """
+    length = max(len(record.seq) for record in records)
+    columns = [dict() for n in range(length)]
+    for index, record in enumerate(records):
+        if weights is None:
+            weight = 1
+        else:
+            weight = weights[index]
+        for column, letter in zip(columns, str(record.seq)):
+            column[letter] = column.get(letter, 0) + weight
+    letters = set()
+    for column in columns:
+        letters.update(column)
+    letters = "".join(sorted(letters))
+    return letters, [[column.get(letter, 0) for letter in letters]
+                     for column in columns]
+
 
 class SummaryInfo(object):
     """Calculate summary info about the alignment.
@@ -40,6 +107,91 @@ class SummaryInfo(object):
         """
         self.alignment = alignment
         self.ic_vector = {}
+        #Cached column letter counts, see _get_letter_counts
+        self._letter_counts = {}
+
+    def _get_letter_counts(self, weighted=False):
+        """Count the letters in every column of the alignment (PRIVATE).
+
+        Returns a string of the distinct letters in the alignment, and a list
+        with one entry per column, each a list of the number of times each of
+        those letters occurs in that column. If weighted is true, each record
+        contributes its 'weight' annotation (default 1.0) rather than one.
+
+        The alignment is scanned once (using NumPy if available), and the
+        result is cached so the consensus, PSSM and information content
+        methods can all share it. The cache is discarded if the rows (or
+        their weights) have changed since.
+        """
+        records = self.alignment._records
+        weights = None
+        if weighted:
+            weights = [record.annotations.get('weight', 1.0)
+                       for record in records]
+            if not [w for w in weights if w != 1.0]:
+                #Same as the unweighted counts, so share those
+                weights = None
+        seqs = [record.seq for record in records]
+        try:
+            old_seqs, old_weights, letters, table = \
+                      self._letter_counts[weights is not None]
+        except KeyError:
+            pass
+        else:
+            if old_weights == weights and len(old_seqs) == len(seqs) \
+            and not [s for s, t in zip(old_seqs, seqs) if s is not t]:
+                return letters, table
+
+        if not records:
+            letters, table = "", []
+        else:
+            try:
+                matrix = self.alignment._get_matrix()
+            except AttributeError:
+                #e.g. old style Bio.Align.Generic.Alignment object
+                matrix = None
+            if matrix is not None:
+                letters, table = _count_matrix_letters(matrix, weights)
+            else:
+                letters, table = _count_record_letters(records, weights)
+        self._letter_counts[weights is not None] = (seqs, weights,
+                                                    letters, table)
+        return letters, table
+
+    def _consensus(self, threshold, ambiguous, require_multiple,
+                   ignore_chars):
+        """Build a consensus string from the column counts (PRIVATE).
+
+        Helper for dumb_consensus and gap_consensus, which differ only in
+        the characters (gaps) left out of the counts.
+        """
+        letters, table = self._get_letter_counts()
+        wanted = [index for index, letter in enumerate(letters)
+                  if letter not in ignore_chars]
+        consensus = []
+        for counts in table:
+            max_atoms = []
+            max_size = 0
+            num_atoms = 0
+            for index in wanted:
+                count = counts[index]
+                if not count:
+                    continue
+                num_atoms += count
+                if count > max_size:
+                    max_atoms = [letters[index]]
+                    max_size = count
+                elif count == max_size:
+                    max_atoms.append(letters[index])
+
+            if require_multiple and num_atoms == 1:
+                consensus.append(ambiguous)
+            elif (len(max_atoms) == 1) and ((float(max_size)/float(num_atoms))
+                                         >= threshold):
+                consensus.append(max_atoms[0])
+            else:
+                consensus.append(ambiguous)
+        return "".join(consensus)
 
     def dumb_consensus(self, threshold = .7, ambiguous = "X",
                        consensus_alpha = None, require_multiple = 0):
@@ -48,9 +200,11 @@ class SummaryInfo(object):
         This doesn't do anything fancy at all. It will just go through the
         sequence residue by residue and count up the number of each type
         of residue (ie. A or G or T or C for DNA) in all sequences in the
-        alignment. If the percentage of the most common residue type is
-        greater then the passed threshold, then we will add that residue type,
-        otherwise an ambiguous character will be added.
+        alignment (these counts are shared with the other SummaryInfo
+        methods, so the alignment is only scanned once). If the percentage
+        of the most common residue type is greater then the passed
+        threshold, then we will add that residue type, otherwise an
+        ambiguous character will be added.
 
         This could be made a lot fancier (ie. to take a substitution matrix
         into account), but it just meant for a quick and dirty consensus.
@@ -67,46 +221,8 @@ class SummaryInfo(object):
         not just 1 sequence and gaps).
         """
         # Iddo Friedberg, 1-JUL-2004: changed ambiguous default to "X"
-        consensus = ''
-
-        # find the length of the consensus we are creating
-        con_len = self.alignment.get_alignment_length()
-
-        # go through each seq item
-        for n in range(con_len):
-            # keep track of the counts of the different atoms we get
-            atom_dict = {}
-            num_atoms = 0
-
-            for record in self.alignment._records:
-                # make sure we haven't run past the end of any sequences
-                # if they are of different lengths
-                if n < len(record.seq):
-                    if record.seq[n] != '-' and record.seq[n] != '.':
-                        if record.seq[n] not in atom_dict:
-                            atom_dict[record.seq[n]] = 1
-                        else:
-                            atom_dict[record.seq[n]] += 1
-
-                        num_atoms = num_atoms + 1
-
-            max_atoms = []
-            max_size = 0
-
-            for atom in atom_dict:
-                if atom_dict[atom] > max_size:
-                    max_atoms = [atom]
-                    max_size = atom_dict[atom]
-                elif atom_dict[atom] == max_size:
-                    max_atoms.append(atom)
-
-            if require_multiple and num_atoms == 1:
-                consensus += ambiguous
-            elif (len(max_atoms) == 1) and ((float(max_size)/float(num_atoms))
-                                         >= threshold):
-                consensus += max_atoms[0]
-            else:
-                consensus += ambiguous
+        consensus = self._consensus(threshold, ambiguous, require_multiple,
+                                    "-.")
 
         # we need to guess a consensus alphabet if one isn't specified
         if consensus_alpha is None:
@@ -123,45 +239,8 @@ class SummaryInfo(object):
         it takes the same is input.
         """
         # Iddo Friedberg, 1-JUL-2004: changed ambiguous default to "X"
-        consensus = ''
-
-        # find the length of the consensus we are creating
-        con_len = self.alignment.get_alignment_length()
-
-        # go through each seq item
-        for n in range(con_len):
-            # keep track of the counts of the different atoms we get
-            atom_dict = {}
-            num_atoms = 0
-
-            for record in self.alignment._records:
-                # make sure we haven't run past the end of any sequences
-                # if they are of different lengths
-                if n < len(record.seq):
-                    if record.seq[n] not in atom_dict:
-                        atom_dict[record.seq[n]] = 1
-                    else:
-                        atom_dict[record.seq[n]] += 1
-
-                    num_atoms += 1
-
-            max_atoms = []
-            max_size = 0
-
-            for atom in atom_dict:
-                if atom_dict[atom] > max_size:
-                    max_atoms = [atom]
-                    max_size = atom_dict[atom]
-                elif atom_dict[atom] == max_size:
-                    max_atoms.append(atom)
-
-            if require_multiple and num_atoms == 1:
-                consensus += ambiguous
-            elif (len(max_atoms) == 1) and ((float(max_size)/float(num_atoms))
-                                         >= threshold):
-                consensus += max_atoms[0]
-            else:
-                consensus += ambiguous
+        consensus = self._consensus(threshold, ambiguous, require_multiple,
+                                    "")
 
         # we need to guess a consensus alphabet if one isn't specified
         if consensus_alpha is None:
@@ -394,22 +473,20 @@ class SummaryInfo(object):
         else:
             left_seq = self.dumb_consensus()
 
+        letters, table = self._get_letter_counts(weighted=True)
         pssm_info = []
-        # now start looping through all of the sequences and getting info
+        # now loop through the column counts to get the info
         for residue_num in range(len(left_seq)):
             score_dict = self._get_base_letters(all_letters)
-            for record in self.alignment._records:
-                try:
-                    this_residue = record.seq[residue_num]
-                # if we hit an index error we've run out of sequence and
-                # should not add new residues
-                except IndexError:
-                    this_residue = None
-
-                if this_residue and this_residue not in chars_to_ignore:
-                    weight = record.annotations.get('weight', 1.0)
+            # columns past the end of the (old style) alignment count nothing
+            if residue_num < len(table):
+                counts = table[residue_num]
+            else:
+                counts = []
+            for this_residue, count in zip(letters, counts):
+                if count and this_residue not in chars_to_ignore:
                     try:
-                        score_dict[this_residue] += weight
+                        score_dict[this_residue] += float(count)
                     # if we get a KeyError then we have an alphabet problem
                     except KeyError:
                         raise ValueError("Residue %s not found in alphabet %s"
@@ -488,10 +565,10 @@ class SummaryInfo(object):
         for char in chars_to_ignore:
             all_letters = all_letters.replace(char, '')
 
+        letters, table = self._get_letter_counts(weighted=True)
         info_content = {}
         for residue_num in range(start, end):
-            freq_dict = self._get_letter_freqs(residue_num,
-                                               self.alignment._records,
+            freq_dict = self._get_column_freqs(letters, table[residue_num],
                                                all_letters, chars_to_ignore)
             # print freq_dict,
             column_score = self._get_column_info_content(freq_dict,
@@ -518,6 +595,35 @@ class SummaryInfo(object):
         for.
         o to_ignore - Letters we are specifically supposed to ignore.
 
+        This will calculate the frequencies of each of the specified letters
+        in the alignment at the given frequency, and return this as a
+        dictionary where the keys are the letters and the values are the
+        frequencies.
+        """
+        counts = {}
+        for record in all_records:
+            letter = record.seq[residue_num]
+            counts[letter] = counts.get(letter, 0) + \
+                record.annotations.get('weight', 1.0)
+        column_letters = list(counts)
+        return self._get_column_freqs(column_letters,
+                                      [counts[letter] for letter
+                                       in column_letters],
+                                      letters, to_ignore)
+
+    def _get_column_freqs(self, column_letters, column_counts, letters,
+                          to_ignore):
+        """Determine the frequency of specific letters in a counted column.
+
+        Arguments:
+        o column_letters - The letters counted in the alignment (as returned
+        by the _get_letter_counts method).
+        o column_counts - The (weighted) counts of those letters in the
+        column we are getting frequencies from.
+        o letters - The letters we are interested in getting the frequency
+        for.
+        o to_ignore - Letters we are specifically supposed to ignore.
+
         This will calculate the frequencies of each of the specified letters
         in the alignment at the given frequency, and return this as a
         dictionary where the keys are the letters and the values are the
@@ -525,19 +631,17 @@ class SummaryInfo(object):
         """
         freq_info = self._get_base_letters(letters)
 
-        total_count = 0
-        # collect the count info into the dictionary for all the records
-        for record in all_records:
-            try:
-                if record.seq[residue_num] not in to_ignore:
-                    weight = record.annotations.get('weight',1.0)
-                    freq_info[record.seq[residue_num]] += weight
-                    total_count += weight
-            # getting a key error means we've got a problem with the alphabet
-            except KeyError:
-                raise ValueError("Residue %s not found in alphabet %s"
-                                 % (record.seq[residue_num],
-                                    self.alignment._alphabet))
+        total_count = 0.0
+        # collect the count info into the dictionary for all the letters
+        for letter, count in zip(column_letters, column_counts):
+            if count and letter not in to_ignore:
+                try:
+                    freq_info[letter] += count
+                # getting a key error means we've got a problem with the alphabet
+                except KeyError:
+                    raise ValueError("Residue %s not found in alphabet %s"
+                                     % (letter, self.alignment._alphabet))
+                total_count += count
 
         if total_count == 0:
             # This column must be entirely ignored characters
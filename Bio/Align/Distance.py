@@ -0,0 +1,360 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Pairwise distances between the rows of a multiple sequence alignment.
+
+This module provides the DistanceCalculator class, which computes the
+distance between every pair of sequences in a MultipleSeqAlignment, and
+returns them as a DistanceMatrix object. For example,
+
+    >>> from Bio import AlignIO
+    >>> from Bio.Align.Distance import DistanceCalculator
+    >>> align = AlignIO.read("Clustalw/opuntia.aln", "clustal")
+    >>> calculator = DistanceCalculator("p-distance")
+    >>> dm = calculator.get_distance(align)
+    >>> len(dm)
+    7
+    >>> print("%0.4f" % dm[0, 1])
+    0.0068
+    >>> print("%0.4f" % dm["gi|6273285|gb|AF191659.1|AF191", "gi|6273284|gb|AF191658.1|AF191"])
+    0.0068
+
+The distances are held in condensed form, a one dimensional NumPy array
+of the upper triangle of the matrix (the same layout used by SciPy's
+scipy.spatial.distance functions):
+
+    >>> len(dm.distances)
+    21
+
+The calculation is done with NumPy operations over the alignment's
+character matrix, one row against all the rows after it at a time. For
+large alignments the rows can be split between several worker processes
+using the workers argument of get_distance.
+
+The available models are:
+
+ - identity     - Proportion of columns where the two sequences differ,
+                  comparing gaps like any other character.
+ - p-distance   - Proportion of differing sites, ignoring any column where
+                  either sequence has a gap.
+ - jukes-cantor - Jukes-Cantor corrected p-distance for nucleotides.
+ - kimura       - Kimura two parameter distance for nucleotides, treating
+                  transitions (A/G, C/T/U) and transversions separately.
+
+In addition any of the substitution matrices in Bio.SubsMat.MatrixInfo may
+be used (e.g. "blosum62"), in which case the distance between sequences a
+and b is 1 - S(a,b)/max(S(a,a), S(b,b)), where S is the total substitution
+score over the columns where neither has a gap.
+
+Where no sites can be compared, or a corrected distance is undefined
+because the sequences are too divergent, the distance is NaN or infinity.
+"""
+
+from __future__ import print_function
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.Align.Distance.")
+
+from Bio._py3k import _as_bytes
+from Bio.SubsMat import MatrixInfo
+
+# Number of matrix cells compared in one go by _row_distances
+_BLOCK_SIZE = 1 << 22
+
+_SIMPLE_MODELS = ["identity", "p-distance", "jukes-cantor", "kimura"]
+
+
+class DistanceMatrix(object):
+    """Condensed matrix of the pairwise distances between sequences.
+
+    Attributes:
+     - names     - List of the sequence identifiers, in alignment order.
+     - distances - One dimensional NumPy array of the distances between
+                   each pair (i, j) with i < j, in the order (0,1), (0,2),
+                   ..., (0,n-1), (1,2), ... (the SciPy condensed form).
+
+    Individual distances can be looked up using a pair of row indices or
+    identifiers, and the full square matrix is available via the to_square
+    method.
+    """
+
+    def __init__(self, names, distances):
+        n = len(names)
+        if len(distances) != n * (n - 1) // 2:
+            raise ValueError("Expected %i distances for %i names, not %i"
+                             % (n * (n - 1) // 2, n, len(distances)))
+        self.names = names
+        self.distances = distances
+
+    def __len__(self):
+        """Number of sequences."""
+        return len(self.names)
+
+    def __repr__(self):
+        return "DistanceMatrix(%i sequences)" % len(self.names)
+
+    def _index(self, key):
+        """Map a row index or identifier to a row index (PRIVATE)."""
+        if isinstance(key, int):
+            if key < 0:
+                key += len(self.names)
+            if not 0 <= key < len(self.names):
+                raise IndexError("Sequence index %i out of range" % key)
+            return key
+        try:
+            return self.names.index(key)
+        except ValueError:
+            raise KeyError(key)
+
+    def __getitem__(self, index):
+        """Distance between two sequences, given as a tuple of two keys.
+
+        Each key can be a row index or a sequence identifier.
+        """
+        try:
+            a, b = index
+        except (TypeError, ValueError):
+            raise TypeError("Expected a pair of sequence indices or names")
+        i = self._index(a)
+        j = self._index(b)
+        if i == j:
+            return 0.0
+        if i > j:
+            i, j = j, i
+        n = len(self.names)
+        return float(self.distances[i * (2 * n - i - 1) // 2 + j - i - 1])
+
+    def to_square(self):
+        """Returns the full symmetric matrix as a 2D NumPy array."""
+        n = len(self.names)
+        square = numpy.zeros((n, n), float)
+        rows, cols = numpy.triu_indices(n, 1)
+        square[rows, cols] = self.distances
+        square[cols, rows] = self.distances
+        return square
+
+
+def _encode(alignment):
+    """Returns the alignment as an upper case 2D uint8 array (PRIVATE)."""
+    try:
+        matrix = alignment._get_matrix()
+    except AttributeError:
+        matrix = None
+    if matrix is None:
+        seqs = [str(record.seq) for record in alignment]
+        if not seqs:
+            return numpy.zeros((0, 0), numpy.uint8)
+        data = _as_bytes("".join(seqs))
+        if len(data) != len(seqs) * len(seqs[0]):
+            raise ValueError("Sequences must all be the same length")
+        matrix = numpy.frombuffer(data, numpy.uint8).reshape(len(seqs), -1)
+    lower = (matrix >= ord("a")) & (matrix <= ord("z"))
+    return numpy.where(lower, matrix - 32, matrix).astype(numpy.uint8)
+
+
+def _score_table(name):
+    """Returns a 256 by 256 score array for a MatrixInfo matrix (PRIVATE).
+
+    Letters not in the substitution matrix score zero.
+    """
+    table = numpy.zeros((256, 256), float)
+    for (a, b), score in getattr(MatrixInfo, name).items():
+        for x in (a.upper(), a.lower()):
+            for y in (b.upper(), b.lower()):
+                table[ord(x), ord(y)] = score
+                table[ord(y), ord(x)] = score
+    return table
+
+
+def _row_distances(data, i):
+    """Distances from row i to each later row of the alignment (PRIVATE).
+
+    The data dictionary holds the encoded alignment and any precomputed
+    arrays for the model (see DistanceCalculator._prepare).
+    """
+    matrix = data["matrix"]
+    model = data["model"]
+    rows, cols = matrix.shape
+    row = matrix[i]
+    step = max(1, _BLOCK_SIZE // max(1, cols))
+    results = []
+    for start in range(i + 1, rows, step):
+        stop = min(rows, start + step)
+        block = matrix[start:stop]
+        differ = block != row
+        if model == "identity":
+            results.append(differ.sum(axis=1) / float(cols))
+            continue
+        valid = ~(data["gaps"][start:stop] | data["gaps"][i])
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            sites = valid.sum(axis=1).astype(float)
+            if model in ("p-distance", "jukes-cantor"):
+                p = (differ & valid).sum(axis=1) / sites
+                if model == "p-distance":
+                    results.append(p)
+                else:
+                    results.append(-0.75 * numpy.log(1 - p / 0.75))
+            elif model == "kimura":
+                purines = data["purines"]
+                pyrimidines = data["pyrimidines"]
+                same_kind = ((purines[start:stop] & purines[i]) |
+                             (pyrimidines[start:stop] & pyrimidines[i]))
+                changes = differ & valid
+                p = (changes & same_kind).sum(axis=1) / sites
+                q = changes.sum(axis=1) / sites - p
+                results.append(-0.5 * numpy.log(1 - 2 * p - q)
+                               - 0.25 * numpy.log(1 - 2 * q))
+            else:
+                scores = data["scores"]
+                self_scores = data["self_scores"]
+                pair = (scores[block, row] * valid).sum(axis=1)
+                self_a = (self_scores[i] * valid).sum(axis=1)
+                self_b = (self_scores[start:stop] * valid).sum(axis=1)
+                best = numpy.maximum(self_a, self_b)
+                results.append(numpy.where(best > 0, 1 - pair / best,
+                                           numpy.nan))
+    if not results:
+        return numpy.zeros(0, float)
+    return numpy.concatenate(results)
+
+
+# Data shared with the worker processes, see _init_worker
+_worker_data = None
+
+
+def _init_worker(data):
+    """Store the shared data in a worker process (PRIVATE)."""
+    global _worker_data
+    _worker_data = data
+
+
+def _worker_rows(rows):
+    """Compute the distances for a range of rows in a worker process (PRIVATE)."""
+    start, stop = rows
+    return [_row_distances(_worker_data, i) for i in range(start, stop)]
+
+
+class DistanceCalculator(object):
+    """Calculates the pairwise distances between aligned sequences.
+
+    Create a calculator with the name of the model (see the module
+    docstring for the list), then call its get_distance method with
+    a MultipleSeqAlignment:
+
+    >>> from Bio.Seq import Seq
+    >>> from Bio.SeqRecord import SeqRecord
+    >>> from Bio.Align import MultipleSeqAlignment
+    >>> from Bio.Align.Distance import DistanceCalculator
+    >>> align = MultipleSeqAlignment([SeqRecord(Seq("ACGTACGTAC"), id="a"),
+    ...                               SeqRecord(Seq("ACGTACGTAT"), id="b"),
+    ...                               SeqRecord(Seq("ACGAAC--AC"), id="c")])
+    >>> dm = DistanceCalculator("identity").get_distance(align)
+    >>> print("%0.2f %0.2f %0.2f" % (dm[0, 1], dm[0, 2], dm[1, 2]))
+    0.10 0.30 0.40
+    >>> dm = DistanceCalculator("p-distance").get_distance(align)
+    >>> print("%0.3f %0.3f %0.3f" % (dm[0, 1], dm[0, 2], dm[1, 2]))
+    0.100 0.125 0.250
+    """
+
+    models = _SIMPLE_MODELS + MatrixInfo.available_matrices
+
+    def __init__(self, model="identity", gap_chars="-."):
+        """Initialize the calculator.
+
+        Arguments:
+         - model     - Name of the distance model, or of a substitution
+                       matrix in Bio.SubsMat.MatrixInfo (e.g. "blosum62").
+         - gap_chars - Characters treated as gaps by all the models except
+                       identity.
+        """
+        if model not in self.models:
+            raise ValueError("Model %r not supported, try one of: %s"
+                             % (model, ", ".join(self.models)))
+        self.model = model
+        self.gap_chars = gap_chars
+
+    def _prepare(self, alignment):
+        """Encode the alignment and precompute arrays for the model (PRIVATE)."""
+        matrix = _encode(alignment)
+        data = {"matrix": matrix, "model": self.model}
+        if self.model == "identity":
+            return data
+        gaps = numpy.zeros(matrix.shape, bool)
+        for char in self.gap_chars:
+            gaps |= (matrix == ord(char))
+        data["gaps"] = gaps
+        if self.model == "kimura":
+            data["purines"] = (matrix == ord("A")) | (matrix == ord("G"))
+            data["pyrimidines"] = ((matrix == ord("C")) |
+                                   (matrix == ord("T")) |
+                                   (matrix == ord("U")))
+        elif self.model not in _SIMPLE_MODELS:
+            scores = _score_table(self.model)
+            data["scores"] = scores
+            data["self_scores"] = numpy.diag(scores)[matrix]
+        return data
+
+    def get_distance(self, alignment, workers=1):
+        """Returns a DistanceMatrix for the given alignment.
+
+        Arguments:
+         - alignment - A MultipleSeqAlignment (or a list of SeqRecord
+                       objects) whose sequences are all the same length.
+         - workers   - Number of processes to use (default one, meaning
+                       everything is done in this process). The rows are
+                       divided into blocks of roughly equal numbers of
+                       pairs, and shared out using the multiprocessing
+                       module.
+        """
+        names = [record.id for record in alignment]
+        data = self._prepare(alignment)
+        n = len(names)
+        if n < 2:
+            return DistanceMatrix(names, numpy.zeros(0, float))
+
+        if workers is None or workers <= 1:
+            rows = [_row_distances(data, i) for i in range(n - 1)]
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(workers, _init_worker, (data,))
+            try:
+                blocks = pool.map(_worker_rows,
+                                  _split_rows(n, 4 * workers))
+            finally:
+                pool.close()
+                pool.join()
+            rows = [row for block in blocks for row in block]
+        return DistanceMatrix(names, numpy.concatenate(rows))
+
+
+def _split_rows(n, count):
+    """Split rows 0 to n-2 into ranges holding similar numbers of pairs (PRIVATE).
+
+    Row i is compared with the n-i-1 rows after it, so the early rows have
+    more work. Returns a list of (start, stop) tuples.
+    """
+    total = n * (n - 1) // 2
+    target = max(1, int(math.ceil(total / float(count))))
+    ranges = []
+    start = 0
+    pairs = 0
+    for i in range(n - 1):
+        pairs += n - i - 1
+        if pairs >= target:
+            ranges.append((start, i + 1))
+            start = i + 1
+            pairs = 0
+    if start < n - 1:
+        ranges.append((start, n - 1))
+    return ranges
+
+
+if __name__ == "__main__":
+    from Bio._utils import run_doctest
+    run_doctest()
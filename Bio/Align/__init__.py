@@ -16,6 +16,13 @@ __docformat__ = "epytext en"  # Don't just use plain text in epydoc API pages!
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio import Alphabet
+from Bio._py3k import _as_bytes, _bytes_to_string
+
+try:
+    import numpy
+except ImportError:
+    #NumPy is optional here, without it we just use string operations
+    numpy = None
 
 #We only import this and subclass it for some limited backward compatibility.
 from Bio.Align.Generic import Alignment as _Alignment
@@ -172,6 +179,8 @@ class MultipleSeqAlignment(_Alignment):
             self._alphabet = Alphabet.single_letter_alphabet
 
         self._records = []
+        #Lazily built character matrix, see the _get_matrix method
+        self._matrix = None
         if records:
             self.extend(records)
             if alphabet is None:
@@ -313,6 +322,51 @@ class MultipleSeqAlignment(_Alignment):
         if not Alphabet._check_type_compatible([self._alphabet, record.seq.alphabet]):
             raise ValueError("New sequence's alphabet is incompatible")
         self._records.append(record)
+        #Any cached character matrix is now out of date
+        self._matrix = None
+
+    def _get_matrix(self):
+        """Returns the alignment letters as a 2D NumPy array (PRIVATE).
+
+        The array has one row per record and one column per alignment column,
+        holding the (unsigned 8-bit) ASCII code of each letter. It is built on
+        first use and then cached until rows are added (append, extend) or
+        reordered (sort), so giving an existing row a new seq afterwards is
+        not seen. The array is read only, and slicing it gives views rather
+        than copies.
+
+        Returns None if NumPy is not available, if the alignment is empty, or
+        if any row holds a MutableSeq (which could be edited in place behind
+        our back).
+        """
+        if self._matrix is None:
+            if numpy is None or not self._records:
+                return None
+            seqs = [rec.seq for rec in self._records]
+            for seq in seqs:
+                if not isinstance(seq, Seq):
+                    #Remember not to try again (until the rows change)
+                    self._matrix = False
+                    return None
+            length = len(seqs[0])
+            data = _as_bytes("".join(str(seq) for seq in seqs))
+            if len(data) != length * len(seqs):
+                #Should not happen, but the records might have been edited
+                self._matrix = False
+                return None
+            self._matrix = numpy.frombuffer(data, numpy.uint8).reshape(
+                len(seqs), length)
+        elif self._matrix is False:
+            return None
+        return self._matrix
+
+    def _set_matrix_view(self, matrix):
+        """Seeds the character matrix cache with a view of a parent's (PRIVATE).
+
+        Used when slicing an alignment whose matrix has already been built,
+        so that the new alignment need not encode its rows again.
+        """
+        self._matrix = matrix
 
     def __add__(self, other):
         """Combines to alignments with the same number of rows by adding them.
@@ -506,6 +560,13 @@ class MultipleSeqAlignment(_Alignment):
 
         This should all seem familiar to anyone who has used the NumPy
         array or matrix objects.
+
+        If NumPy is installed, column access is done using a character matrix
+        which is built the first time it is needed. Extracting many columns
+        from a large alignment is then much faster than going via the rows:
+
+        >>> "".join(align[:,col] for col in range(align.get_alignment_length()))
+        'AAAAAAAAAAAAAAAA-AA-CCGCGGGGGGTTTTT'
         """
         if isinstance(index, int):
             #e.g. result = align[x]
@@ -513,7 +574,12 @@ class MultipleSeqAlignment(_Alignment):
             return self._records[index]
         elif isinstance(index, slice):
             #e.g. sub_align = align[i:j:k]
-            return MultipleSeqAlignment(self._records[index], self._alphabet)
+            sub_align = MultipleSeqAlignment(self._records[index], self._alphabet)
+            if self._matrix is not None and sub_align._records:
+                matrix = self._get_matrix()
+                if matrix is not None:
+                    sub_align._set_matrix_view(matrix[index])
+            return sub_align
         elif len(index)!=2:
             raise TypeError("Invalid index type.")
 
@@ -524,11 +590,19 @@ class MultipleSeqAlignment(_Alignment):
             return self._records[row_index][col_index]
         elif isinstance(col_index, int):
             #e.g. col_or_part_col = align[1:5, 6], gives a string
-            return "".join(rec[col_index] for rec in self._records[row_index])
+            matrix = self._get_matrix()
+            if matrix is None:
+                return "".join(rec[col_index] for rec in self._records[row_index])
+            return _bytes_to_string(matrix[row_index, col_index].tostring())
         else:
             #e.g. sub_align = align[1:4, 5:7], gives another alignment
-            return MultipleSeqAlignment((rec[col_index] for rec in self._records[row_index]),
-                                        self._alphabet)
+            sub_align = MultipleSeqAlignment((rec[col_index] for rec in self._records[row_index]),
+                                             self._alphabet)
+            if self._matrix is not None and sub_align._records:
+                matrix = self._get_matrix()
+                if matrix is not None:
+                    sub_align._set_matrix_view(matrix[row_index, col_index])
+            return sub_align
 
     def sort(self, key=None, reverse=False):
         """Sort the rows (SeqRecord objects) of the alignment in place.
@@ -607,6 +681,8 @@ class MultipleSeqAlignment(_Alignment):
             self._records.sort(key = lambda r: r.id, reverse = reverse)
         else:
             self._records.sort(key = key, reverse = reverse)
+        #Any cached character matrix is now out of date
+        self._matrix = None
 
     def get_column(self, col):
         """Returns a string containing a given column (DEPRECATED).
@@ -619,7 +695,7 @@ class MultipleSeqAlignment(_Alignment):
         import warnings
         import Bio
         warnings.warn("This method is deprecated and is provided for backwards compatibility with the old Bio.Align.Generic.Alignment object. Please use the slice notation instead, as get_column is likely to be removed in a future release of Biopython.", Bio.BiopythonDeprecationWarning)
-        return _Alignment.get_column(self, col)
+        return self[:, col]
 
     def add_sequence(self, descriptor, sequence, start = None, end = None,
                      weight = 1.0):
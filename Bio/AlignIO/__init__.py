@@ -51,6 +51,17 @@ different multiple sequence alignments as possible.  One common example
 is the output of the tool seqboot in the PHLYIP suite.  Sometimes there
 can be a file header and footer, as seen in the EMBOSS alignment output.
 
+For a single alignment which is too large to hold in memory, use the function
+Bio.AlignIO.iter_columns(...) which returns an iterator giving
+MultipleSeqAlignment objects for consecutive windows of columns:
+
+    >>> from Bio import AlignIO
+    >>> for block in AlignIO.iter_columns("Phylip/interlaced.phy", "phylip", window=150):
+    ...     print("%i rows, %i columns" % (len(block), block.get_alignment_length()))
+    3 rows, 150 columns
+    3 rows, 150 columns
+    3 rows, 84 columns
+
 Output
 ======
 Use the function Bio.AlignIO.write(...), which takes a complete set of
@@ -150,6 +161,7 @@ import NexusIO
 import PhylipIO
 import EmbossIO
 import FastaIO
+import _columns
 
 #Convention for format names is "mainname-subtype" in lower case.
 #Please use the same names as BioPerl and EMBOSS where possible.
@@ -165,6 +177,15 @@ _FormatToIterator = {  # "fasta" is done via Bio.SeqIO
                      "stockholm": StockholmIO.StockholmIterator,
                      }
 
+#Formats supported by iter_columns, see the Bio.AlignIO._columns module
+_FormatToColumnIterator = {"clustal": _columns.ClustalColumnIterator,
+                           "fasta": _columns.FastaColumnIterator,
+                           "phylip": _columns.PhylipColumnIterator,
+                           "phylip-sequential": _columns.SequentialPhylipColumnIterator,
+                           "phylip-relaxed": _columns.RelaxedPhylipColumnIterator,
+                           "stockholm": _columns.StockholmColumnIterator,
+                           }
+
 _FormatToWriter = {  # "fasta" is done via Bio.SeqIO
                      # "emboss" : EmbossIO.EmbossWriter, (unfinished)
                    "nexus": NexusIO.NexusWriter,
@@ -436,6 +457,82 @@ def read(handle, format, seq_count=None, alphabet=None):
     return first
 
 
+def iter_columns(handle, format, window=10000, alphabet=None):
+    """Iterate over a single alignment file in windows of columns.
+
+    Arguments:
+     - handle    - handle to the file, or the filename as a string.
+     - format    - string describing the file format.
+     - window    - maximum number of columns in each window (integer).
+     - alphabet  - optional Alphabet object, useful when the sequence type
+                   cannot be automatically inferred from the file itself
+                   (e.g. fasta, phylip, clustal)
+
+    This is intended for alignments too large to load with Bio.AlignIO.read(),
+    such as whole genome alignments. Rather than one MultipleSeqAlignment,
+    you get a series of them, each with every row of the alignment but only
+    the next window of columns (the last will usually be shorter). Only one
+    window is held in memory at a time, so column-wise statistics can be run
+    over each window in turn:
+
+    >>> from Bio import AlignIO
+    >>> from Bio.Align.AlignInfo import SummaryInfo
+    >>> consensus = ""
+    >>> for block in AlignIO.iter_columns("Clustalw/opuntia.aln", "clustal", window=50):
+    ...     consensus += str(SummaryInfo(block).dumb_consensus())
+    >>> len(consensus)
+    156
+
+    This gives the same result as loading the whole alignment at once:
+
+    >>> full = AlignIO.read("Clustalw/opuntia.aln", "clustal")
+    >>> consensus == str(SummaryInfo(full).dumb_consensus())
+    True
+
+    For the sequential formats (fasta, phylip-sequential and stockholm)
+    the file is scanned once to find where each sequence starts, and each
+    window is then read by seeking to the current position in every row.
+    This means the handle must support seek and tell, and under Python 3
+    should be opened in binary mode (this is taken care of for you if you
+    give a filename). The interleaved formats (phylip, phylip-relaxed and
+    clustal) are simply read block by block.
+
+    As with Bio.AlignIO.read(), the file must contain exactly one alignment.
+    Only the sequences and their identifiers are loaded, any other
+    annotation in the file is ignored.
+    """
+    from Bio.Alphabet import single_letter_alphabet
+
+    #Try and give helpful error messages:
+    if not isinstance(format, basestring):
+        raise TypeError("Need a string for the file format (lower case)")
+    if not format:
+        raise ValueError("Format required (lower case string)")
+    if format != format.lower():
+        raise ValueError("Format string '%s' should be lower case" % format)
+    if alphabet is None:
+        alphabet = single_letter_alphabet
+    elif not (isinstance(alphabet, Alphabet) or
+              isinstance(alphabet, AlphabetEncoder)):
+        raise ValueError("Invalid alphabet, %s" % repr(alphabet))
+    if not isinstance(window, int):
+        raise TypeError("Need integer for window (number of columns)")
+    if window < 1:
+        raise ValueError("The window must be at least one column")
+
+    try:
+        iterator_generator = _FormatToColumnIterator[format]
+    except KeyError:
+        if format in _FormatToIterator:
+            raise ValueError("Column iteration is not supported for format "
+                             "'%s'" % format)
+        raise ValueError("Unknown format '%s'" % format)
+
+    with as_handle(handle, 'rb') as fp:
+        for alignment in iterator_generator(fp, window, alphabet):
+            yield alignment
+
+
 def convert(in_file, in_format, out_file, out_format, alphabet=None):
     """Convert between two alignment files, returns number of alignments.
 
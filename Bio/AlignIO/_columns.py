@@ -0,0 +1,429 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Windowed column iteration over alignment files (PRIVATE).
+
+You are not expected to access this module, or any of its code, directly. This
+is all handled internally by the Bio.AlignIO.iter_columns(...) function which
+is the public interface for this functionality.
+
+The idea is to read a single (possibly huge) alignment as a series of smaller
+MultipleSeqAlignment objects, each covering a window of consecutive columns,
+without ever holding the full alignment in memory.
+
+For sequential file formats (FASTA, sequential PHYLIP, and Stockholm where
+each sequence is usually on a single line) we first scan the file once,
+recording the file offsets of each row's sequence data. We then read each
+window by seeking to the current offset of each row in turn. This requires
+the handle to support seek and tell.
+
+For interleaved file formats (PHYLIP and Clustal) each block of the file
+holds a few columns of every row, so we simply read the blocks in order,
+keeping at most a window plus one block of letters for each row.
+"""
+
+from Bio._py3k import _as_string
+
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from Bio.Align import MultipleSeqAlignment
+
+#Needed to find the sequence data on sequential PHYLIP lines:
+from Bio.AlignIO.PhylipIO import _PHYLIP_ID_WIDTH
+
+_CLUSTAL_HEADERS = ['CLUSTAL', 'PROBCONS', 'MUSCLE', 'MSAPROBS']
+
+
+def _make_alignment(names, seqs, alphabet):
+    """Build a MultipleSeqAlignment for one window (PRIVATE).
+
+    The names are (id, name, description) tuples, one for each sequence.
+    """
+    records = []
+    for (id, name, description), seq in zip(names, seqs):
+        if name is None:
+            records.append(SeqRecord(Seq(seq, alphabet),
+                                     id=id, description=description))
+        else:
+            records.append(SeqRecord(Seq(seq, alphabet),
+                                     id=id, name=name,
+                                     description=description))
+    return MultipleSeqAlignment(records, alphabet)
+
+
+def _read_windows(handle, names, rows, length, window, alphabet,
+                  dots_to_gaps=False):
+    """Yield windows of columns, reading each row using its offsets (PRIVATE).
+
+    Arguments:
+     - handle - seekable handle to the file.
+     - names  - list of (id, name, description) tuples, one per row.
+     - rows   - list of lists of (start, end) file offsets, one list per row,
+                giving the location(s) of that row's sequence data (which
+                may contain white space, e.g. line breaks).
+     - length - the alignment length (already checked for every row).
+    """
+    #For each row, the index of the current range, its current offset,
+    #and any letters already read from the file but not yet used.
+    states = [[0, ranges[0][0], ""] for ranges in rows]
+    for start in range(0, length, window):
+        width = min(window, length - start)
+        seqs = []
+        for ranges, state in zip(rows, states):
+            index, offset, pending = state
+            while len(pending) < width:
+                end = ranges[index][1]
+                if offset >= end:
+                    index += 1
+                    offset = ranges[index][0]
+                    continue
+                #Read a little extra to allow for line breaks
+                wanted = width - len(pending)
+                handle.seek(offset)
+                data = handle.read(min(end - offset, wanted + wanted // 50 + 2))
+                offset += len(data)
+                pending += "".join(_as_string(data).split())
+            seq = pending[:width]
+            state[:] = [index, offset, pending[width:]]
+            if dots_to_gaps:
+                seq = seq.replace(".", "-")
+            seqs.append(seq)
+        yield _make_alignment(names, seqs, alphabet)
+
+
+def _stream_windows(names, blocks, window, alphabet):
+    """Yield windows of columns from blocks of an interleaved file (PRIVATE).
+
+    Arguments:
+     - names  - list of (id, name, description) tuples, one per row.
+     - blocks - iterator giving a list of strings for each block of the
+                file, one string (the sequence fragment) per row.
+    """
+    pending = [[] for n in names]
+    buffered = 0
+    for block in blocks:
+        if len(block) != len(names):
+            raise ValueError("Found %i sequences in a block, expected %i"
+                             % (len(block), len(names)))
+        width = len(block[0])
+        for fragments, seq in zip(pending, block):
+            if len(seq) != width:
+                raise ValueError("Sequences must all be the same length")
+            fragments.append(seq)
+        buffered += width
+        while buffered >= window:
+            seqs = []
+            for fragments in pending:
+                seq = "".join(fragments)
+                fragments[:] = [seq[window:]]
+                seqs.append(seq[:window])
+            buffered -= window
+            yield _make_alignment(names, seqs, alphabet)
+    if buffered:
+        yield _make_alignment(names, ["".join(f) for f in pending], alphabet)
+
+
+def _check_lengths(names, lengths):
+    """Check all the rows have the same length, and return it (PRIVATE)."""
+    if not names:
+        raise ValueError("No records found in handle")
+    for length in lengths:
+        if length != lengths[0]:
+            raise ValueError("Sequences must all be the same length")
+    return lengths[0]
+
+
+def _letter_count(data):
+    """Count the letters in a line of sequence, ignoring white space (PRIVATE)."""
+    return len("".join(_as_string(data).split()))
+
+
+def FastaColumnIterator(handle, window, alphabet):
+    """Iterate over a FASTA alignment in windows of columns.
+
+    Records are named as in Bio.SeqIO's FASTA parser, with the first word
+    of the title line as the id and name, and the full title line as the
+    description.
+    """
+    names = []
+    rows = []
+    lengths = []
+    offset = handle.tell()
+    while True:
+        line = handle.readline()
+        if not line:
+            break
+        offset += len(line)
+        if _as_string(line[:1]) == ">":
+            title = _as_string(line[1:]).rstrip()
+            try:
+                id = title.split(None, 1)[0]
+            except IndexError:
+                id = ""
+            names.append((id, id, title))
+            rows.append([(offset, offset)])
+            lengths.append(0)
+        elif rows:
+            rows[-1][0] = (rows[-1][0][0], offset)
+            lengths[-1] += _letter_count(line)
+    length = _check_lengths(names, lengths)
+    return _read_windows(handle, names, rows, length, window, alphabet)
+
+
+def _read_phylip_header(handle):
+    """Returns the number of sequences and columns from a PHYLIP header (PRIVATE)."""
+    parts = _as_string(handle.readline()).split()
+    if not parts:
+        raise ValueError("No records found in handle")
+    if len(parts) != 2:
+        raise ValueError("First line should have two integers")
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        raise ValueError("First line should have two integers")
+
+
+def SequentialPhylipColumnIterator(handle, window, alphabet):
+    """Iterate over a sequential PHYLIP alignment in windows of columns.
+
+    As in Bio.AlignIO.PhylipIO the identifiers are expected to be padded
+    (or truncated) to exactly ten characters.
+    """
+    number_of_seqs, length_of_seqs = _read_phylip_header(handle)
+    offset = handle.tell()
+    names = []
+    rows = []
+    lengths = []
+    for i in range(number_of_seqs):
+        line = handle.readline()
+        if not line:
+            raise ValueError("End of file, expected %i sequences"
+                             % number_of_seqs)
+        seq_id = _as_string(line[:_PHYLIP_ID_WIDTH]).strip()
+        start = offset + _PHYLIP_ID_WIDTH
+        offset += len(line)
+        count = _letter_count(line[_PHYLIP_ID_WIDTH:])
+        while count < length_of_seqs:
+            #The sequence may be split into multiple lines
+            line = handle.readline()
+            if not line:
+                break
+            offset += len(line)
+            count += _letter_count(line)
+        if count > length_of_seqs:
+            raise ValueError("Found a record of length %i, should be %i"
+                             % (count, length_of_seqs))
+        names.append((seq_id, seq_id, seq_id))
+        rows.append([(start, offset)])
+        lengths.append(count)
+    if _as_string(handle.read(1024)).strip():
+        raise ValueError("More than one record found in handle")
+    length = _check_lengths(names, lengths)
+    for alignment in _read_windows(handle, names, rows, length, window,
+                                   alphabet):
+        for record in alignment:
+            if "." in str(record.seq):
+                raise ValueError("PHYLIP format no longer allows dots in "
+                                 "sequence")
+        yield alignment
+
+
+def _stockholm_name(identifier):
+    """Returns the record name for a Stockholm identifier (PRIVATE).
+
+    As in StockholmIterator, any "/start-end" suffix is removed.
+    """
+    if '/' in identifier:
+        name, start_end = identifier.rsplit("/", 1)
+        if start_end.count("-") == 1:
+            try:
+                map(int, start_end.split("-"))
+                return name
+            except ValueError:
+                pass
+    return identifier
+
+
+def StockholmColumnIterator(handle, window, alphabet):
+    """Iterate over a Stockholm alignment in windows of columns.
+
+    The per-file, per-sequence and per-column annotation lines (#=GF, #=GS,
+    #=GR and #=GC) are ignored. Any dots in the sequences are turned into
+    dashes, as in the Bio.AlignIO.StockholmIO parser.
+
+    Each sequence line is recorded as one range of file offsets, so this
+    works best with the usual Stockholm layout of one line per sequence.
+    """
+    line = handle.readline()
+    if not line:
+        raise ValueError("No records found in handle")
+    if _as_string(line).strip() != "# STOCKHOLM 1.0":
+        raise ValueError("Did not find STOCKHOLM header")
+    offset = handle.tell()
+    names = []
+    rows = {}
+    lengths = {}
+    while True:
+        line = handle.readline()
+        if not line:
+            break
+        start = offset
+        offset += len(line)
+        text = _as_string(line).strip()
+        if text == "//":
+            break
+        elif not text or text[0] == "#":
+            #Blank line, or comment/meta-data
+            continue
+        parts = _as_string(line).split(" ", 1)
+        if len(parts) != 2 or not parts[1].strip():
+            raise ValueError("Could not split line into identifier "
+                             + "and sequence:\n" + text)
+        seq_id = parts[0].strip()
+        if seq_id not in rows:
+            names.append((seq_id, _stockholm_name(seq_id), seq_id))
+            rows[seq_id] = []
+            lengths[seq_id] = 0
+        rows[seq_id].append((start + len(line) - len(parts[1]), offset))
+        lengths[seq_id] += _letter_count(parts[1])
+    remainder = _as_string(handle.read(1024)).strip()
+    if remainder.startswith("# STOCKHOLM 1.0"):
+        raise ValueError("More than one record found in handle")
+    length = _check_lengths(names, [lengths[n[0]] for n in names])
+    rows = [rows[n[0]] for n in names]
+    return _read_windows(handle, names, rows, length, window, alphabet,
+                         dots_to_gaps=True)
+
+
+def _phylip_blocks(handle, number_of_seqs):
+    """Yields the sequence fragments in the later blocks of PHYLIP file (PRIVATE)."""
+    while True:
+        line = handle.readline()
+        if not line:
+            return
+        if not _as_string(line).strip():
+            #Skip any blank lines between blocks...
+            continue
+        block = []
+        for i in range(number_of_seqs):
+            if i:
+                line = handle.readline()
+                if not line:
+                    raise ValueError("End of file mid-block")
+            line = _as_string(line)
+            if len(line.split()) == 2 and not block:
+                try:
+                    int(line.split()[0])
+                    int(line.split()[1])
+                except ValueError:
+                    pass
+                else:
+                    #Looks like the start of a concatenated alignment
+                    raise ValueError("More than one record found in handle")
+            block.append(line.strip().replace(" ", ""))
+        yield block
+
+
+def _phylip_column_iterator(handle, window, alphabet, split_id):
+    """Iterate over an interleaved PHYLIP file in windows of columns (PRIVATE)."""
+    number_of_seqs, length_of_seqs = _read_phylip_header(handle)
+    names = []
+    first_block = []
+    for i in range(number_of_seqs):
+        line = _as_string(handle.readline()).rstrip()
+        if not line:
+            raise ValueError("End of file, expected %i sequences"
+                             % number_of_seqs)
+        seq_id, seq = split_id(line)
+        names.append((seq_id, seq_id, seq_id))
+        first_block.append(seq)
+
+    def blocks():
+        yield first_block
+        for block in _phylip_blocks(handle, number_of_seqs):
+            yield block
+
+    count = 0
+    for alignment in _stream_windows(names, blocks(), window, alphabet):
+        for record in alignment:
+            if "." in str(record.seq):
+                raise ValueError("PHYLIP format no longer allows dots in "
+                                 "sequence")
+        count += alignment.get_alignment_length()
+        yield alignment
+    if count != length_of_seqs:
+        raise ValueError("Found a record of length %i, should be %i"
+                         % (count, length_of_seqs))
+
+
+def PhylipColumnIterator(handle, window, alphabet):
+    """Iterate over an interleaved PHYLIP alignment in windows of columns."""
+    def split_id(line):
+        return (line[:_PHYLIP_ID_WIDTH].strip(),
+                line[_PHYLIP_ID_WIDTH:].strip().replace(" ", ""))
+    return _phylip_column_iterator(handle, window, alphabet, split_id)
+
+
+def RelaxedPhylipColumnIterator(handle, window, alphabet):
+    """Iterate over a relaxed PHYLIP alignment in windows of columns."""
+    def split_id(line):
+        seq_id, seq = line.split(None, 1)
+        return seq_id, seq.strip().replace(" ", "")
+    return _phylip_column_iterator(handle, window, alphabet, split_id)
+
+
+def _clustal_blocks(handle):
+    """Yields (identifiers, fragments) for each block of a Clustal file (PRIVATE).
+
+    Any consensus lines (which start with white space) are ignored.
+    """
+    ids = []
+    seqs = []
+    while True:
+        line = _as_string(handle.readline())
+        if line and line[0] != " " and line.strip():
+            fields = line.rstrip().split()
+            if fields[0] in _CLUSTAL_HEADERS:
+                raise ValueError("More than one record found in handle")
+            #We expect there to be two fields, there can be an optional
+            #"sequence number" field containing the letter count.
+            if len(fields) < 2 or len(fields) > 3:
+                raise ValueError("Could not parse line:\n%s" % line)
+            ids.append(fields[0])
+            seqs.append(fields[1])
+            continue
+        #Blank line, consensus line, or end of file
+        if ids:
+            yield ids, seqs
+            ids = []
+            seqs = []
+        if not line:
+            return
+
+
+def ClustalColumnIterator(handle, window, alphabet):
+    """Iterate over a Clustal alignment in windows of columns."""
+    line = _as_string(handle.readline())
+    if not line.strip():
+        raise ValueError("No records found in handle")
+    if line.strip().split()[0] not in _CLUSTAL_HEADERS:
+        raise ValueError("%s is not a known CLUSTAL header: %s" %
+                         (line.strip().split()[0],
+                          ", ".join(_CLUSTAL_HEADERS)))
+    blocks = _clustal_blocks(handle)
+    try:
+        ids, seqs = next(blocks)
+    except StopIteration:
+        raise ValueError("No records found in handle")
+    #As in ClustalIO, the name is left as the SeqRecord default
+    names = [(seq_id, None, seq_id) for seq_id in ids]
+
+    def fragments():
+        yield seqs
+        for block_ids, block_seqs in blocks:
+            if block_ids != ids:
+                raise ValueError("Identifiers out of order? Got %s but "
+                                 "expected %s" % (block_ids, ids))
+            yield block_seqs
+
+    return _stream_windows(names, fragments(), window, alphabet)
@@ -18,17 +18,27 @@ These modules provide wrapper classes for command line tools to help you
 construct command line strings by setting the values of each parameter.
 The finished command line strings are then normally invoked via the built-in
 Python module subprocess.
+
+To run many command lines (e.g. aligning thousands of gene families), see
+the run_batch function, which runs them concurrently with a limit on the
+number of tools running at once, optional timeouts and retries.
 """
 from __future__ import print_function
 
 import os
 import sys
+import errno
+import signal
 import subprocess
 import re
+import tempfile
+import threading
+import time
 
 from subprocess import CalledProcessError as _ProcessCalledError
 
 from Bio import File
+from Bio._py3k import _as_bytes, _bytes_to_string
 
 #Use this regular expression to test the property names are going to
 #be valid as Python properties or arguments
@@ -496,6 +506,322 @@ class AbstractCommandline(object):
         return stdout_str, stderr_str
 
 
+class ApplicationJob(object):
+    """A command line to be run as part of a batch by run_batch.
+
+    Arguments:
+     - cmd - The command line, usually a command line wrapper object such
+       as Bio.Align.Applications.MuscleCommandline (or a plain string).
+     - stdin - Optional string of data to pass to the tool as standard input.
+     - stdout - Where to send the tool's standard output. This can be None
+       (the default, discarded), a filename to write it to, or a function
+       (e.g. a parser) which is given a handle to the output as it is
+       produced. Any value returned by this function is kept as the output
+       attribute of the job's result.
+     - stderr - Where to send the tool's standard error. By default (True)
+       this is captured as a string (via a temporary file rather than held
+       in memory while the tool runs), or give a filename, or False to
+       discard it.
+     - cwd, env - Working directory and environment variables for the tool,
+       as for calling a command line wrapper directly.
+
+    Any other keyword arguments are stored as attributes on the job, which
+    can be useful to keep track of which input file a job was for:
+
+    >>> from Bio.Align.Applications import MuscleCommandline
+    >>> cline = MuscleCommandline(input="fam0001.fasta", out="fam0001.aln")
+    >>> job = ApplicationJob(cline, family="fam0001")
+    >>> print(job.cmd)
+    muscle -in fam0001.fasta -out fam0001.aln
+    >>> job.family
+    'fam0001'
+
+    """
+    def __init__(self, cmd, stdin=None, stdout=None, stderr=True,
+                 cwd=None, env=None, **kwargs):
+        self.cmd = cmd
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.cwd = cwd
+        self.env = env
+        self.__dict__.update(kwargs)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.cmd)
+
+
+class ApplicationResult(object):
+    """The outcome of running an ApplicationJob via run_batch.
+
+    Attributes:
+     - job - The ApplicationJob which was run.
+     - returncode - Exit status of the final attempt (negative if the tool
+       was killed by a signal, e.g. after a timeout).
+     - error - None if the tool ran successfully, otherwise an exception;
+       an ApplicationError for a non-zero exit status, or whatever the
+       stdout function raised.
+     - output - Return value of the stdout function, if one was used.
+     - stderr - Captured standard error of the final attempt (if requested).
+     - timed_out - Boolean, did the final attempt run out of time?
+     - attempts - How many times the tool was run (more than one if retried).
+     - wall_time - Elapsed seconds for the final attempt.
+     - max_rss - Peak resident memory of the final attempt in kilobytes,
+       or None where this is not available (e.g. on Windows).
+    """
+    def __init__(self, job):
+        self.job = job
+        self.returncode = None
+        self.error = None
+        self.output = None
+        self.stderr = None
+        self.timed_out = False
+        self.attempts = 0
+        self.wall_time = None
+        self.max_rss = None
+
+    def __repr__(self):
+        return "<%s for %r, returncode %r>" % (self.__class__.__name__,
+                                              self.job, self.returncode)
+
+
+def _open_output(filename):
+    """Open the file (or null device) for the tool's stdout or stderr (PRIVATE)."""
+    if filename:
+        return open(filename, "w")
+    return open(os.devnull, "w")
+
+
+def _wait_child(child_process):
+    """Wait for a child process, returning its peak RSS in kilobytes (PRIVATE).
+
+    Uses os.wait4 where available to collect the resource usage of this
+    particular child, otherwise just waits and returns None.
+    """
+    if not hasattr(os, "wait4"):
+        child_process.wait()
+        return None
+    while True:
+        try:
+            pid, status, usage = os.wait4(child_process.pid, 0)
+            break
+        except OSError as err:
+            if err.errno != errno.EINTR:
+                raise
+    if os.WIFSIGNALED(status):
+        child_process.returncode = -os.WTERMSIG(status)
+    else:
+        child_process.returncode = os.WEXITSTATUS(status)
+    if sys.platform == "darwin":
+        #Mac OS X reports this in bytes, rather than kilobytes
+        return usage.ru_maxrss // 1024
+    return usage.ru_maxrss
+
+
+def _find_setsid():
+    """Return the path of the setsid tool, or None if not found (PRIVATE)."""
+    if sys.platform == "win32":
+        return None
+    for folder in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        filename = os.path.join(folder, "setsid")
+        if os.path.isfile(filename) and os.access(filename, os.X_OK):
+            return filename
+    return None
+
+
+def _kill_child(child_process, group):
+    """Kill a child process, and its process group if it has one (PRIVATE)."""
+    try:
+        if group:
+            #The tool runs in its own process group under the shell
+            os.killpg(child_process.pid, signal.SIGKILL)
+        else:
+            child_process.kill()
+    except OSError:
+        #Already gone
+        pass
+
+
+def _run_job(job, result, timeout, setsid=None):
+    """Run a single attempt of a job, recording the outcome (PRIVATE).
+
+    If the path of the setsid tool is given, the shell is started through
+    it so that the tool runs in its own process group.
+    """
+    cmd = str(job.cmd)
+    if job.stdin is None:
+        stdin_arg = open(os.devnull, "r")
+    else:
+        stdin_arg = tempfile.TemporaryFile()
+        stdin_arg.write(_as_bytes(job.stdin))
+        stdin_arg.seek(0)
+    handles = [stdin_arg]
+    if job.stdout is None or isinstance(job.stdout, basestring):
+        stdout_arg = _open_output(job.stdout)
+        handles.append(stdout_arg)
+    else:
+        stdout_arg = subprocess.PIPE
+    if job.stderr is True:
+        stderr_arg = tempfile.TemporaryFile()
+        handles.append(stderr_arg)
+    elif job.stderr and job.stderr == job.stdout:
+        stderr_arg = subprocess.STDOUT
+    else:
+        stderr_arg = _open_output(job.stderr)
+        handles.append(stderr_arg)
+
+    if setsid:
+        #Run the tool in its own process group, so that on a timeout we
+        #can kill it as well as the shell. This is not done with a
+        #preexec_fn, which is unsafe when called from threads.
+        args = [setsid, "/bin/sh", "-c", cmd]
+    else:
+        #Without setsid only the shell itself can be killed on a timeout
+        args = cmd
+    lock = threading.Lock()
+    state = {"running": True, "timed_out": False}
+    result.stderr = None
+    result.timed_out = False
+    result.max_rss = None
+    start = time.time()
+    try:
+        try:
+            child_process = subprocess.Popen(args, stdin=stdin_arg,
+                                             stdout=stdout_arg,
+                                             stderr=stderr_arg,
+                                             universal_newlines=True,
+                                             cwd=job.cwd, env=job.env,
+                                             shell=(sys.platform != "win32"
+                                                    and not setsid))
+        except OSError as err:
+            result.error = err
+            return
+
+        def on_timeout():
+            with lock:
+                if state["running"]:
+                    state["timed_out"] = True
+                    _kill_child(child_process, setsid)
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, on_timeout)
+            timer.daemon = True
+            timer.start()
+        try:
+            if stdout_arg is subprocess.PIPE:
+                try:
+                    result.output = job.stdout(child_process.stdout)
+                except Exception as err:
+                    result.error = err
+                    _kill_child(child_process, setsid)
+                #Drain anything the function did not read, so the tool exits
+                while child_process.stdout.read(65536):
+                    pass
+                child_process.stdout.close()
+            result.max_rss = _wait_child(child_process)
+        finally:
+            with lock:
+                state["running"] = False
+            if timer is not None:
+                timer.cancel()
+                timer.join()
+            result.wall_time = time.time() - start
+
+        result.returncode = child_process.returncode
+        result.timed_out = state["timed_out"]
+        if job.stderr is True:
+            stderr_arg.seek(0)
+            result.stderr = _bytes_to_string(stderr_arg.read())
+        if result.error is None and result.returncode:
+            result.error = ApplicationError(result.returncode, cmd,
+                                            "", result.stderr or "")
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def run_batch(jobs, workers=2, timeout=None, retries=0):
+    """Run many command lines concurrently, returning a list of results.
+
+    Arguments:
+     - jobs - Iterable of ApplicationJob objects, or command line wrapper
+       objects (which are run with the ApplicationJob defaults).
+     - workers - Maximum number of tools to run at once (default 2).
+     - timeout - Optional time limit in seconds for each attempt; a tool
+       still running after this is killed.
+     - retries - How many more times to try a job which failed (non-zero
+       exit status, including being killed by the timeout).
+
+    Returns a list of ApplicationResult objects in the same order as the
+    jobs. Unlike calling a single command line wrapper, no exception is
+    raised when a tool fails; check the error attribute of each result.
+
+    Typical usage, aligning many gene families with MUSCLE, three at a time,
+    giving up on any alignment which takes more than an hour:
+
+    from Bio.Align.Applications import MuscleCommandline
+    jobs = [MuscleCommandline(input="%s.fasta" % f, out="%s.aln" % f)
+            for f in families]
+    for result in run_batch(jobs, workers=3, timeout=3600):
+        if result.error:
+            print("%s failed: %s" % (result.job.cmd, result.error))
+
+    The tool's output can also be given straight to a parser, here MAFFT
+    which writes the alignment to stdout:
+
+    from Bio import AlignIO
+    from Bio.Align.Applications import MafftCommandline
+    parse = lambda handle: AlignIO.read(handle, "fasta")
+    jobs = [ApplicationJob(MafftCommandline(input="%s.fasta" % f),
+                           stdout=parse) for f in families]
+    alignments = [r.output for r in run_batch(jobs, workers=4)]
+
+    The tools are run via the subprocess module from a pool of threads,
+    so the Python side uses little CPU while waiting. Each tool's wall time
+    and (on Unix) peak memory use are recorded on its result. Where the
+    setsid tool is available (as on Linux), each tool is run in its own
+    process group so that a timeout also kills any processes it started;
+    otherwise only the tool (or the shell running it) is killed.
+    """
+    if workers < 1:
+        raise ValueError("Need at least one worker, not %r" % workers)
+    if retries < 0:
+        raise ValueError("Number of retries must not be negative")
+    jobs = [job if isinstance(job, ApplicationJob) else ApplicationJob(job)
+            for job in jobs]
+    results = [ApplicationResult(job) for job in jobs]
+    setsid = _find_setsid()
+    pending = iter(zip(jobs, results))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                try:
+                    job, result = next(pending)
+                except StopIteration:
+                    return
+            while result.attempts <= retries:
+                result.attempts += 1
+                result.error = None
+                result.output = None
+                _run_job(job, result, timeout, setsid)
+                if not isinstance(result.error, ApplicationError):
+                    #Success, or could not run the tool or parse its
+                    #output (no point retrying)
+                    break
+
+    threads = [threading.Thread(target=worker)
+               for i in range(min(workers, len(jobs)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
 class _AbstractParameter:
     """A class to hold information about a parameter for a commandline.
 
@@ -39,6 +39,7 @@ _DatabaseReportConsumer  Consumes database report information.
 _ParametersConsumer      Consumes parameters information.
 
 Functions:
+index           Index a file of blast results for access by query ID.
 blastall        Execute blastall.
 blastpgp        Execute blastpgp.
 rpsblast        Execute rpsblast.
@@ -58,7 +59,9 @@ warnings.warn("This module has been deprecated. Consider Bio.SearchIO for "
 
 import os
 import re
+from bisect import bisect_right
 from Bio._py3k import StringIO
+from Bio._py3k import _as_bytes, _bytes_to_string
 
 from Bio import File
 from Bio.ParserSupport import *
@@ -1691,6 +1694,127 @@ class Iterator(object):
         return iter(self.next, None)
 
 
+class _TextIndexer(File._IndexedSeqFileProxy):
+    """Random access to the queries of a plain text BLAST file (PRIVATE).
+
+    This finds the start of each query in the same way as the Iterator,
+    either at a new report (a line starting with the BLAST program name),
+    or at a further "Query=" line within a report, as in the output of
+    newer BLAST for several queries. Such queries share the header at the
+    start of the report, which is added back when parsing them.
+    """
+
+    _query_mark = _as_bytes("Query=")
+    _blast_mark = _as_bytes("BLAST")
+
+    def __init__(self, filename, parser):
+        self._handle = File._open_for_random_access(filename)
+        self._parser = parser
+        #Start offsets of each report, and the ends of their headers
+        self._report_starts = []
+        self._header_ends = []
+
+    def _is_report_start(self, line):
+        return line.startswith(self._blast_mark) \
+            or line.startswith(self._blast_mark, 1)
+
+    def __iter__(self):
+        handle = self._handle
+        handle.seek(0)
+        query_mark = self._query_mark
+        self._report_starts = []
+        self._header_ends = []
+        start_offset = None
+        query_id = None
+        while True:
+            offset = handle.tell()
+            line = handle.readline()
+            if self._is_report_start(line) or not line:
+                if query_id is not None:
+                    yield query_id, start_offset, offset - start_offset
+                if not line:
+                    break
+                self._report_starts.append(offset)
+                self._header_ends.append(None)
+                start_offset = offset
+                query_id = None
+            elif line.startswith(query_mark):
+                if start_offset is None:
+                    raise ValueError("Expected a BLAST report header before "
+                                     "the first query")
+                if query_id is not None:
+                    #Another query sharing the header of this report
+                    yield query_id, start_offset, offset - start_offset
+                    start_offset = offset
+                else:
+                    self._header_ends[-1] = offset
+                query_id = _bytes_to_string(line[len(query_mark):]).strip()
+                query_id = query_id.split(None, 1)[0]
+
+    def get_raw(self, offset):
+        """Returns the text for the query at the offset as bytes.
+
+        For queries sharing the header of a report, this does not include
+        the header.
+        """
+        handle = self._handle
+        handle.seek(offset)
+        lines = [handle.readline()]
+        query_seen = lines[0].startswith(self._query_mark)
+        while True:
+            line = handle.readline()
+            if not line or self._is_report_start(line):
+                break
+            if line.startswith(self._query_mark):
+                if query_seen:
+                    break
+                query_seen = True
+            lines.append(line)
+        return _as_bytes("").join(lines)
+
+    def get(self, offset):
+        """Returns the parsed record for the query at the offset."""
+        handle = self._handle
+        report = bisect_right(self._report_starts, offset) - 1
+        lines = []
+        if offset != self._report_starts[report]:
+            #Add back the header shared with the earlier queries
+            handle.seek(self._report_starts[report])
+            while handle.tell() != self._header_ends[report]:
+                lines.append(handle.readline())
+        lines.append(self.get_raw(offset))
+        return self._parser.parse(StringIO(_bytes_to_string(
+            _as_bytes("").join(lines))))
+
+
+def index(filename, parser=None, key_function=None):
+    """Indexes a plain text BLAST file and returns a dictionary like object.
+
+    filename - string giving the name of the BLAST output file
+    parser - optional parser object used for the records, defaults to
+             BlastParser (use PSIBlastParser for PSI-BLAST output)
+    key_function - optional callback function which when given a query
+                   ID should return a unique key for the dictionary
+
+    The file is scanned once for the offset of each query, and the records
+    are then parsed on demand when looked up by query ID, the first word of
+    the "Query=" line. For example:
+
+        from Bio.Blast import NCBIStandalone
+        records = NCBIStandalone.index("my_blast.txt")
+        record = records["gi|16080617|ref|NP_391444.1|"]
+
+    BGZF compressed files are supported, and detected automatically.
+    """
+    from Bio.Blast.NCBIXML import _IndexedBlastDict
+    if parser is None:
+        parser = BlastParser()
+    repr = "NCBIStandalone.index(%r, key_function=%r)" \
+        % (filename, key_function)
+    return _IndexedBlastDict(_TextIndexer(filename, parser), key_function,
+                             repr, "Blast")
+
+
 def blastall(blastcmd, program, database, infile, align_view='7', **keywds):
     """Execute and retrieve data from standalone BLASTPALL as handles (DEPRECATED).
 
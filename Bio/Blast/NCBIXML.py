@@ -20,12 +20,22 @@ Functions:
 parse               Incremental parser, this is an iterator that returns
                     Blast records.  It uses the BlastParser internally.
 read                Returns a single Blast record. Uses the BlastParser internally.
+index               Returns a dictionary like object giving Blast records
+                    by query ID, parsing each one only when requested.
 """
 from __future__ import print_function
 
+import re
+from bisect import bisect_right
+
+from Bio._py3k import StringIO
+from Bio._py3k import _as_bytes, _bytes_to_string
 from Bio.Blast import Record
+from Bio.File import _IndexedSeqFileDict, _IndexedSeqFileProxy
+from Bio.File import _open_for_random_access
 import xml.sax
 from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import unescape
 
 
 class _XMLparser(ContentHandler):
@@ -689,6 +699,171 @@ def parse(handle, debug=0):
     assert pending==""
     assert len(blast_parser._records) == 0
 
+
+class _XmlIndexer(_IndexedSeqFileProxy):
+    """Random access to the queries of a BLAST XML file (PRIVATE).
+
+    Like Bio.SearchIO's BlastXmlIndexer, this scans the file line by line
+    for the <Iteration> blocks of each query. To parse one, the header of
+    its XML file (everything before the first <Iteration>) is combined with
+    the block, so older BLAST output with one XML file per query works too.
+    """
+
+    _doc_mark = _as_bytes("<?xml")
+    _start_mark = _as_bytes("<Iteration>")
+    _end_mark = _as_bytes("</Iteration>")
+    _footer = "</BlastOutput_iterations>\n</BlastOutput>\n"
+
+    def __init__(self, filename):
+        self._handle = _open_for_random_access(filename)
+        #Start offsets of each XML file, and the ends of their headers
+        self._doc_starts = []
+        self._header_ends = []
+
+    def __iter__(self):
+        handle = self._handle
+        handle.seek(0)
+        start_mark = self._start_mark
+        end_mark = self._end_mark
+        self._doc_starts = []
+        self._header_ends = []
+        header = None
+        header_ids = None
+        while True:
+            start_offset = handle.tell()
+            line = handle.readline()
+            if not line:
+                break
+            if line.startswith(self._doc_mark):
+                self._doc_starts.append(start_offset)
+                self._header_ends.append(None)
+                header = []
+                header_ids = None
+                continue
+            if start_mark not in line:
+                if header is not None and header_ids is None:
+                    header.append(line)
+                continue
+            if header is None:
+                raise ValueError("Expected the BLAST XML file to start with "
+                                 "<?xml, found <Iteration> at offset %i"
+                                 % start_offset)
+            if header_ids is None:
+                #Any query ID and description for the whole file, used by
+                #old BLAST which gives them only in the header
+                self._header_ends[-1] = start_offset
+                header_ids = self._query_ids(_as_bytes("").join(header),
+                                             "BlastOutput")
+            #Load the rest of this block up to and including </Iteration>
+            assert line.lstrip().startswith(start_mark), line
+            block = [line]
+            while end_mark not in line:
+                line = handle.readline()
+                if not line:
+                    raise ValueError("Incomplete <Iteration> block at "
+                                     "offset %i" % start_offset)
+                block.append(line)
+            block = _as_bytes("").join(block)
+            query_id, query_def = self._query_ids(block, "Iteration")
+            if query_id is None:
+                query_id = header_ids[0]
+            if query_def is None:
+                query_def = header_ids[1]
+            #BLAST+ and legacy BLAST give their own IDs, as in Bio.SearchIO
+            if query_def and (query_id is None
+                              or query_id.startswith("Query_")
+                              or query_id.startswith("lcl|")):
+                query_id = query_def.split(None, 1)[0]
+            if query_id is None:
+                raise ValueError("No query ID or description for the "
+                                 "<Iteration> at offset %i" % start_offset)
+            yield query_id, start_offset, len(block)
+
+    def _query_ids(self, text, prefix):
+        values = []
+        for tag in ("query-ID", "query-def"):
+            match = re.search(_as_bytes("<%s_%s>(.*?)</%s_%s>"
+                                        % (prefix, tag, prefix, tag)), text)
+            if match:
+                values.append(unescape(_bytes_to_string(match.group(1))))
+            else:
+                values.append(None)
+        return values
+
+    def get_raw(self, offset):
+        """Returns the <Iteration> block at the offset as bytes."""
+        handle = self._handle
+        handle.seek(offset)
+        lines = []
+        while True:
+            line = handle.readline()
+            lines.append(line)
+            if not line or self._end_mark in line:
+                break
+        return _as_bytes("").join(lines)
+
+    def get(self, offset):
+        """Returns the Blast record whose <Iteration> block is at the offset."""
+        handle = self._handle
+        #Find the header of the XML file holding this query
+        doc = bisect_right(self._doc_starts, offset) - 1
+        handle.seek(self._doc_starts[doc])
+        header = []
+        while handle.tell() != self._header_ends[doc]:
+            header.append(handle.readline())
+        text = _bytes_to_string(_as_bytes("").join(header)
+                                + self.get_raw(offset)) + self._footer
+        return read(StringIO(text))
+
+
+class _IndexedBlastDict(_IndexedSeqFileDict):
+    """Read only dictionary interface to the Blast records of a file (PRIVATE).
+
+    Blast records have no id attribute to check against the key, so unlike
+    the Bio.SeqIO and Bio.SearchIO dictionaries the looked up record is
+    returned as it is. Also used for the plain text output by the index
+    function in Bio.Blast.NCBIStandalone.
+    """
+
+    def __getitem__(self, key):
+        """x.__getitem__(y) <==> x[y]"""
+        return self._proxy.get(self._offsets[key])
+
+
+def index(filename, key_function=None):
+    """Indexes a BLAST XML file and returns a dictionary like object.
+
+    filename - string giving the name of the XML file
+    key_function - optional callback function which when given a query
+                   ID should return a unique key for the dictionary
+
+    The file is scanned once for the offset of each query, and Blast
+    records are then parsed on demand when looked up by query ID. This is
+    much faster than using the parse function when only some of the queries
+    in a large file are needed:
+
+    >>> from Bio.Blast import NCBIXML
+    >>> records = NCBIXML.index("Blast/wnts.xml")
+    >>> len(records)
+    5
+    >>> record = records["gi|195230749:301-1383"]
+    >>> print(record.query)
+    gi|195230749:301-1383 Homo sapiens wingless-type MMTV integration site family member 2 (WNT2), transcript variant 1, mRNA
+    >>> len(record.alignments)
+    5
+    >>> records.close()
+
+    The query ID is taken from the <Iteration_query-ID> tag (or for old
+    BLAST, the <BlastOutput_query-ID> tag), unless this is an ID made up by
+    BLAST such as "Query_1" or "lcl|1_", in which case the first word of the
+    query description is used, as in Bio.SearchIO. BGZF compressed files are
+    supported, and detected automatically.
+    """
+    repr = "NCBIXML.index(%r, key_function=%r)" % (filename, key_function)
+    return _IndexedBlastDict(_XmlIndexer(filename), key_function, repr,
+                             "Blast")
+
+
 if __name__ == '__main__':
     import sys
     handle = open(sys.argv[1])
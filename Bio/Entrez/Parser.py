@@ -155,6 +155,12 @@ class DataHandler(object):
     global_dtd_dir = os.path.join(str(Entrez.__path__[0]), "DTDs")
     del Entrez
 
+    # The element declarations and general entities of each DTD loaded so
+    # far, by URL, shared by all parsers in the process. The values are
+    # (list of (name, kind, multiple) as from classifyElement, entity
+    # declarations as text).
+    dtd_cache = {}
+
     def __init__(self, validate):
         self.stack = []
         self.errors = []
@@ -165,6 +171,7 @@ class DataHandler(object):
         self.structures = {}
         self.items = []
         self.dtd_urls = []
+        self.dtd_recorders = []
         self.validating = validate
         self.parser = expat.ParserCreate(namespace_separator=" ")
         self.parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_ALWAYS)
@@ -253,9 +260,20 @@ class DataHandler(object):
             records = self.stack[0]
             if not isinstance(records, list):
                 raise ValueError("The XML file does not represent a list. Please use Entrez.read instead of Entrez.parse")
-            while len(records) > 1: # Then the top record is finished
-                record = records.pop(0)
-                yield record
+            # The records are finished, except for the last one if some
+            # element inside it is still open. Remove them from the list
+            # before yielding them, so that they are not kept in memory.
+            if len(self.stack) == 1:
+                finished = len(records)
+            else:
+                finished = len(records) - 1
+            if finished > 0:
+                done = records[:finished]
+                del records[:finished]
+                self.object = None
+                for record in done:
+                    yield record
+                del done
 
     def xmlDeclHandler(self, version, encoding, standalone):
         # XML declaration found; set the handlers
@@ -291,7 +309,8 @@ class DataHandler(object):
                 object = StringElement()
             object.itemname = name
             object.itemtype = itemtype
-        elif name in self.strings + self.errors + self.integers:
+        elif name in self.strings or name in self.errors \
+                or name in self.integers:
             self.attributes = attrs
             return
         else:
@@ -364,9 +383,24 @@ class DataHandler(object):
         encountered in a DTD. The purpose of this function is to determine
         whether this element should be regarded as a string, integer, list
         dictionary, structure, or error."""
+        kind, multiple = self.classifyElement(name, model)
+        self.declareElement(name, kind, multiple)
+
+    def declareElement(self, name, kind, multiple=None):
+        """Adds an element to the given kind of elements."""
+        if kind == "structures":
+            self.structures.update({name: multiple})
+        else:
+            getattr(self, kind).append(name)
+
+    def classifyElement(self, name, model):
+        """Returns the kind of an element declaration.
+
+        This is the name of the attribute holding that kind of elements,
+        and for structures the list of keys which can occur multiple times.
+        """
         if name.upper()=="ERROR":
-            self.errors.append(name)
-            return
+            return "errors", None
         if name=='Item' and model==(expat.model.XML_CTYPE_MIXED,
                                     expat.model.XML_CQUANT_REP,
                                     None, ((expat.model.XML_CTYPE_NAME,
@@ -378,8 +412,7 @@ class DataHandler(object):
                                    ):
             # Special case. As far as I can tell, this only occurs in the
             # eSummary DTD.
-            self.items.append(name)
-            return
+            return "items", None
         # First, remove ignorable parentheses around declarations
         while (model[0] in (expat.model.XML_CTYPE_SEQ,
                             expat.model.XML_CTYPE_CHOICE)
@@ -390,15 +423,13 @@ class DataHandler(object):
         # PCDATA declarations correspond to strings
         if model[0] in (expat.model.XML_CTYPE_MIXED,
                         expat.model.XML_CTYPE_EMPTY):
-            self.strings.append(name)
-            return
+            return "strings", None
         # List-type elements
         if (model[0] in (expat.model.XML_CTYPE_CHOICE,
                          expat.model.XML_CTYPE_SEQ) and
             model[1] in (expat.model.XML_CQUANT_PLUS,
                          expat.model.XML_CQUANT_REP)):
-            self.lists.append(name)
-            return
+            return "lists", None
         # This is the tricky case. Check which keys can occur multiple
         # times. If only one key is possible, and it can occur multiple
         # times, then this is a list. If more than one key is possible,
@@ -431,11 +462,49 @@ class DataHandler(object):
                     multiple.append(name)
         count(model)
         if len(single)==0 and len(multiple)==1:
-            self.lists.append(name)
+            return "lists", None
         elif len(multiple)==0:
-            self.dictionaries.append(name)
+            return "dictionaries", None
         else:
-            self.structures.update({name: multiple})
+            return "structures", multiple
+
+    def dtdElementDecl(self, name, model):
+        """Handles an element declaration while loading a DTD."""
+        kind, multiple = self.classifyElement(name, model)
+        for declarations, entities, cacheable in self.dtd_recorders:
+            declarations.append((name, kind, multiple))
+        self.declareElement(name, kind, multiple)
+
+    def dtdEntityDecl(self, name, is_parameter_entity, value, base,
+                      systemId, publicId, notationName):
+        """Records the entities declared while loading a DTD.
+
+        These are kept in the DTD cache as declarations which expat can
+        parse again, so that the entities can be used in later XML files
+        and DTDs without loading the whole DTD. External parameter entities
+        are recorded with their full URL. DTDs with external general
+        entities are not cached.
+        """
+        if is_parameter_entity:
+            name = "% " + name
+        if value is not None:
+            value = value.replace("&", "&#38;").replace("%", "&#37;")
+            value = '"%s"' % value.replace('"', "&#34;")
+        elif is_parameter_entity and systemId is not None:
+            value = 'SYSTEM "%s"' % self.dtdUrl(systemId)
+        else:
+            for declarations, entities, cacheable in self.dtd_recorders:
+                cacheable[0] = False
+            return
+        text = "<!ENTITY %s %s>\n" % (name, value)
+        for declarations, entities, cacheable in self.dtd_recorders:
+            entities.append(text)
+
+    def recordDeclarations(self, declarations, entities):
+        """Adds the declarations of a cached DTD to the DTDs being loaded."""
+        for recorded, recorded_entities, cacheable in self.dtd_recorders:
+            recorded.extend(declarations)
+            recorded_entities.append(entities)
 
     def open_dtd_file(self, filename):
         path = os.path.join(DataHandler.local_dtd_dir, filename)
@@ -454,12 +523,8 @@ class DataHandler(object):
             return handle
         return None
 
-    def externalEntityRefHandler(self, context, base, systemId, publicId):
-        """The purpose of this function is to load the DTD locally, instead
-        of downloading it from the URL specified in the XML. Using the local
-        DTD results in much faster parsing. If the DTD is not found locally,
-        we try to download it. If new DTDs become available from NCBI,
-        putting them in Bio/Entrez/DTDs will allow the parser to see them."""
+    def dtdUrl(self, systemId):
+        """Returns the full URL of a DTD, relative to the DTD being loaded."""
         urlinfo = urlparse.urlparse(systemId)
         #Following attribute requires Python 2.5+
         #if urlinfo.scheme=='http':
@@ -479,7 +544,31 @@ class DataHandler(object):
                 source = os.path.dirname(url)
             # urls always have a forward slash, don't use os.path.join
             url = source.rstrip("/") + "/" + systemId
+        return url
+
+    def externalEntityRefHandler(self, context, base, systemId, publicId):
+        """The purpose of this function is to load the DTD locally, instead
+        of downloading it from the URL specified in the XML. Using the local
+        DTD results in much faster parsing. If the DTD is not found locally,
+        we try to download it. If new DTDs become available from NCBI,
+        putting them in Bio/Entrez/DTDs will allow the parser to see them."""
+        url = self.dtdUrl(systemId)
+        try:
+            declarations, entities = DataHandler.dtd_cache[url]
+        except KeyError:
+            pass
+        else:
+            # This DTD was loaded before, by this or another parser
+            for name, kind, multiple in declarations:
+                self.declareElement(name, kind, multiple)
+            self.recordDeclarations(declarations, entities)
+            if entities:
+                parser = self.parser.ExternalEntityParserCreate(context)
+                parser.Parse(entities.encode("utf-8"), True)
+            return 1
         self.dtd_urls.append(url)
+        # Collect the declarations of this DTD, and of any DTDs it includes
+        self.dtd_recorders.append(([], [], [True]))
         # First, try to load the local version of the DTD file
         location, filename = os.path.split(systemId)
         handle = self.open_dtd_file(filename)
@@ -526,8 +615,12 @@ Proceeding to access the DTD file through the internet...
                 raise RuntimeException("Failed to access %s at %s" % (filename, url))
 
         parser = self.parser.ExternalEntityParserCreate(context)
-        parser.ElementDeclHandler = self.elementDecl
+        parser.ElementDeclHandler = self.dtdElementDecl
+        parser.EntityDeclHandler = self.dtdEntityDecl
         parser.ParseFile(handle)
         handle.close()
         self.dtd_urls.pop()
+        declarations, entities, cacheable = self.dtd_recorders.pop()
+        if cacheable[0]:
+            DataHandler.dtd_cache[url] = (declarations, "".join(entities))
         return 1
@@ -65,11 +65,15 @@ parse        Parses the XML results returned by those of the above functions
              This function is appropriate only if the XML file contains
              multiple records, and is particular useful for large files.
 
+Client       Class keeping a pool of open connections to the NCBI, which
+             can also fetch long lists of IDs in concurrent batches.
+
 _open        Internally used function.
 
 """
 from __future__ import print_function
 
+import re
 import urllib
 import urllib2
 import time
@@ -77,6 +81,8 @@ import warnings
 import os.path
 
 from Bio._py3k import _binary_to_string_handle, _as_bytes
+from Bio import webcache
+from Bio.Entrez._client import Client, RateLimiter
 
 email = None
 tool = "biopython"
@@ -412,16 +418,62 @@ def _open(cgi, params={}, post=False):
     This function also enforces the "up to three queries per second rule"
     to avoid abusing the NCBI servers.
     """
+    _construct_params(params)
+    # Open a handle to Entrez.
+    options = urllib.urlencode(params, doseq=True)
+    #print cgi + "?" + options
     # NCBI requirement: At most three queries per second.
-    # Equivalently, at least a third of second between queries
-    delay = 0.333333334
-    current = time.time()
-    wait = _open.previous + delay - current
-    if wait > 0:
-        time.sleep(wait)
-        _open.previous = current + wait
-    else:
-        _open.previous = current
+    # The limiter is shared with any Bio.Entrez.Client objects, and is
+    # not needed for responses saved by Bio.webcache.
+    cacheable = _cacheable(cgi, params)
+    try:
+        if post:
+            #HTTP POST
+            handle = webcache._urlopen(cgi, _as_bytes(options),
+                                       _limiter.acquire, cacheable=cacheable,
+                                       valid=_not_error)
+        else:
+            #HTTP GET
+            cgi += "?" + options
+            handle = webcache._urlopen(cgi, wait=_limiter.acquire,
+                                       cacheable=cacheable, valid=_not_error)
+    except urllib2.HTTPError as exception:
+        raise exception
+
+    return _binary_to_string_handle(handle)
+
+
+# At most three queries per second, shared by all threads
+_limiter = RateLimiter(3)
+
+# Start of an error message from the Entrez utilities
+_ERROR_ELEMENT = re.compile(_as_bytes("<ERROR[ >]"))
+
+
+def _cacheable(cgi, params):
+    """Returns whether a request may use the Bio.webcache cache (PRIVATE).
+
+    Requests involving the history server are not cached, as the WebEnv
+    and query_key they give or use expire on the server.
+    """
+    if cgi.endswith("epost.fcgi"):
+        return False
+    for key in params:
+        if key.lower() in ("usehistory", "webenv"):
+            return False
+    return True
+
+
+def _not_error(body):
+    """Returns whether a response body holds no ERROR element (PRIVATE)."""
+    return _ERROR_ELEMENT.search(body) is None
+
+
+def _construct_params(params):
+    """Removes None values and adds the tool and email (PRIVATE).
+
+    The params dictionary is modified in place, and also returned.
+    """
     # Remove None values from the parameters
     for key, value in params.items():
         if value is None:
@@ -447,23 +499,7 @@ can specify it as follows:
 In case of excessive usage of the E-utilities, NCBI will attempt to contact
 a user at the email address provided before blocking access to the
 E-utilities.""", UserWarning)
-    # Open a handle to Entrez.
-    options = urllib.urlencode(params, doseq=True)
-    #print cgi + "?" + options
-    try:
-        if post:
-            #HTTP POST
-            handle = urllib2.urlopen(cgi, data=_as_bytes(options))
-        else:
-            #HTTP GET
-            cgi += "?" + options
-            handle = urllib2.urlopen(cgi)
-    except urllib2.HTTPError as exception:
-        raise exception
-
-    return _binary_to_string_handle(handle)
-
-_open.previous = 0
+    return params
 
 
 def _test():
@@ -0,0 +1,466 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Pooled and rate limited access to the NCBI Entrez utilities (PRIVATE).
+
+This provides the Client class, available as Bio.Entrez.Client, and the
+RateLimiter used by both the Client and the Bio.Entrez module functions.
+"""
+
+import httplib
+import socket
+import threading
+import time
+import urllib
+import urllib2
+import urlparse
+import Queue
+from collections import deque
+
+from Bio._py3k import StringIO, _as_bytes, _as_string
+from Bio import webcache
+
+
+# Default location of the Entrez utilities
+_BASE_URL = "http://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+# Number of IDs given to epost at once when fetching in batches
+_POST_SIZE = 10000
+
+# NCBI prefers an HTTP POST instead of an HTTP GET if there are more
+# than about 200 IDs
+_POST_IDS = 200
+
+
+class RateLimiter(object):
+    """Token bucket limiting the number of requests per second.
+
+    The limiter is safe to share between threads. Each call of the acquire
+    method takes one token, waiting until one becomes available. Tokens
+    are added at the given rate, and up to burst tokens can be saved up
+    while no requests are made:
+
+    >>> limiter = RateLimiter(rate=3, burst=1)
+    >>> limiter.acquire()
+    >>> limiter.acquire()  # waits for about a third of a second
+
+    The default burst of one spaces the requests evenly, as the NCBI asks.
+    """
+
+    def __init__(self, rate=3, burst=1):
+        if rate <= 0:
+            raise ValueError("The rate must be positive, not %r" % rate)
+        if burst < 1:
+            raise ValueError("The burst must be at least one, not %r"
+                             % burst)
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Waits until another request may be sent."""
+        # Sleeping with the lock held queues up the other threads
+        with self._lock:
+            now = time.time()
+            tokens = self._tokens + (now - self._updated) * self.rate
+            tokens = min(tokens, self.burst)
+            if tokens < 1:
+                wait = (1 - tokens) / self.rate
+                time.sleep(wait)
+                now += wait
+                tokens = 1
+            self._tokens = tokens - 1
+            self._updated = now
+
+
+class _ConnectionPool(object):
+    """Keep-alive HTTP connections to a single host (PRIVATE).
+
+    At most size requests are made at once, each on its own connection,
+    and connections are reused for later requests unless the server asks
+    for them to be closed.
+    """
+
+    def __init__(self, host, port, size, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(size)
+
+    def _connect(self):
+        if self.timeout is None:
+            return httplib.HTTPConnection(self.host, self.port)
+        return httplib.HTTPConnection(self.host, self.port,
+                                      timeout=self.timeout)
+
+    def _send(self, connection, method, path, body, headers):
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        data = response.read()
+        return response, data
+
+    def request(self, method, path, body=None, headers={}):
+        """Sends a request, returning the response and its whole body."""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                connection = self._idle and self._idle.pop() or None
+            if connection is None:
+                connection = self._connect()
+                response, data = self._send(connection, method, path,
+                                            body, headers)
+            else:
+                try:
+                    response, data = self._send(connection, method, path,
+                                                body, headers)
+                except (httplib.HTTPException, socket.error):
+                    # The server may have dropped the idle connection
+                    connection.close()
+                    connection = self._connect()
+                    response, data = self._send(connection, method, path,
+                                                body, headers)
+            if response.will_close:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+            return response, data
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class _Job(object):
+    """Function call run by a worker thread of _ordered_map (PRIVATE)."""
+
+    def __init__(self, function, item):
+        self.function = function
+        self.item = item
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def run(self):
+        if not self.cancelled:
+            try:
+                self.result = self.function(self.item)
+            except Exception as exception:
+                self.error = exception
+        self.done.set()
+
+    def get(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _ordered_map(function, items, workers):
+    """Applies function to the items in threads, yielding results in order (PRIVATE).
+
+    Only a few more items than there are workers are taken from the items
+    iterator ahead of the result being yielded.
+    """
+    jobs = Queue.Queue()
+
+    def work():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            job.run()
+
+    threads = [threading.Thread(target=work) for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    pending = deque()
+    try:
+        for item in items:
+            job = _Job(function, item)
+            jobs.put(job)
+            pending.append(job)
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        for job in pending:
+            job.cancelled = True
+        for thread in threads:
+            jobs.put(None)
+
+
+class Client(object):
+    """Persistent connection to the NCBI Entrez utilities.
+
+    A Client keeps a pool of keep-alive HTTP connections, so that a series
+    of requests does not have to open a new connection each time, and can
+    be shared between threads. All requests wait for a RateLimiter, which
+    by default is the one used by the Bio.Entrez functions, so the NCBI's
+    limit of three requests per second is kept for the whole program.
+
+    The efetch, esearch and similar methods take the same arguments as the
+    Bio.Entrez functions, and return handles which can be given to
+    Bio.Entrez.read and Bio.Entrez.parse:
+
+    >>> from Bio import Entrez
+    >>> client = Entrez.Client(email="Your.Name.Here@example.org")
+    >>> handle = client.esearch(db="nucleotide", term="Cypripedioideae")
+    >>> record = Entrez.read(handle)
+    >>> handle.close()
+
+    Long lists of IDs can be fetched with the fetch_batches method, which
+    posts them to the NCBI history server with epost, and downloads the
+    pages of records from several connections at once:
+
+    >>> for handle in client.fetch_batches("nucleotide", record["IdList"],
+    ...                                    rettype="gb", retmode="text"):
+    ...     text = handle.read()
+    >>> client.close()
+
+    Arguments:
+     - email - Email address sent with each request, by default the
+       value of Bio.Entrez.email at the time of the request.
+     - tool - Tool name sent with each request, by default the value of
+       Bio.Entrez.tool at the time of the request.
+     - connections - Maximum number of connections, which is also the
+       number of pages fetched at once by fetch_batches.
+     - batch_size - Number of records per page in fetch_batches.
+     - limiter - RateLimiter to use, by default the one shared with the
+       Bio.Entrez functions.
+     - base_url - Location of the Entrez utilities, which is useful for
+       testing against a local server.
+     - timeout - Socket timeout in seconds for the connections.
+    """
+
+    def __init__(self, email=None, tool=None, connections=3, batch_size=500,
+                 limiter=None, base_url=_BASE_URL, timeout=None):
+        if connections < 1:
+            raise ValueError("At least one connection is needed, not %r"
+                             % connections)
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive, not %r"
+                             % batch_size)
+        url = urlparse.urlsplit(base_url)
+        if url.scheme != "http":
+            raise ValueError("Only http URLs are supported, not %r"
+                             % base_url)
+        if limiter is None:
+            from Bio import Entrez
+            limiter = Entrez._limiter
+        self.email = email
+        self.tool = tool
+        self.connections = connections
+        self.batch_size = batch_size
+        self.limiter = limiter
+        self.base_url = base_url
+        self._path = url.path.rstrip("/") + "/"
+        self._pool = _ConnectionPool(url.hostname, url.port or 80,
+                                     connections, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the idle connections of the pool."""
+        self._pool.close()
+
+    def request(self, utility, params, post=False):
+        """Sends a request to an Entrez utility, returning a handle.
+
+        Arguments:
+         - utility - Name of the utility, e.g. "efetch".
+         - params - Dictionary of the request parameters; None values are
+           removed and the email and tool are added.
+         - post - Whether to use an HTTP POST instead of a GET.
+
+        The whole response is read before it is returned as a handle, and
+        is saved to (or taken from) the Bio.webcache cache if one is set. Raises
+        urllib2.HTTPError (a subclass of IOError) if the server returns an
+        error status.
+        """
+        from Bio import Entrez
+        params = dict(params)
+        if self.tool is not None:
+            params.setdefault("tool", self.tool)
+        if self.email is not None:
+            params.setdefault("email", self.email)
+        Entrez._construct_params(params)
+        options = urllib.urlencode(params, doseq=True)
+        url = self.base_url + utility + ".fcgi"
+        cache = webcache.cache
+        if not Entrez._cacheable(url, params):
+            cache = None
+        if cache is not None:
+            data = cache.get(url, options)
+            if data is not None:
+                return StringIO(_as_string(data))
+        path = self._path + utility + ".fcgi"
+        self.limiter.acquire()
+        if post:
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+            response, data = self._pool.request("POST", path,
+                                                _as_bytes(options), headers)
+        else:
+            path += "?" + options
+            response, data = self._pool.request("GET", path)
+        if response.status >= 400:
+            raise urllib2.HTTPError(url, response.status, response.reason,
+                                    response.msg, StringIO(_as_string(data)))
+        if cache is not None and response.status == 200 \
+                and Entrez._not_error(data):
+            cache.put(url, options, data)
+        return StringIO(_as_string(data))
+
+    def efetch(self, db, **keywds):
+        """Fetches Entrez results which are returned as a handle.
+
+        See Bio.Entrez.efetch for the arguments.
+        """
+        variables = {"db": db}
+        variables.update(keywds)
+        post = False
+        ids = variables.get("id")
+        if isinstance(ids, list):
+            ids = ",".join(ids)
+            variables["id"] = ids
+        if ids is not None and ids.count(",") >= _POST_IDS:
+            post = True
+        return self.request("efetch", variables, post)
+
+    def epost(self, db, **keywds):
+        """Posts a list of IDs to the history server, returning a handle.
+
+        See Bio.Entrez.epost for the arguments.
+        """
+        variables = {"db": db}
+        variables.update(keywds)
+        return self.request("epost", variables, post=True)
+
+    def esearch(self, db, term, **keywds):
+        """Searches a database, returning a handle to the XML results.
+
+        See Bio.Entrez.esearch for the arguments.
+        """
+        variables = {"db": db, "term": term}
+        variables.update(keywds)
+        return self.request("esearch", variables)
+
+    def elink(self, **keywds):
+        """Checks for links to or from the given IDs, returning a handle.
+
+        See Bio.Entrez.elink for the arguments.
+        """
+        variables = {"cmd": "neighbor"}
+        variables.update(keywds)
+        return self.request("elink", variables)
+
+    def einfo(self, **keywds):
+        """Returns a handle to summaries of the Entrez databases.
+
+        See Bio.Entrez.einfo for the arguments.
+        """
+        return self.request("einfo", keywds)
+
+    def esummary(self, **keywds):
+        """Retrieves document summaries as a results handle.
+
+        See Bio.Entrez.esummary for the arguments.
+        """
+        return self.request("esummary", keywds)
+
+    def egquery(self, **keywds):
+        """Returns a handle to the counts of a global query.
+
+        See Bio.Entrez.egquery for the arguments.
+        """
+        variables = {"cmd": "get"}
+        variables.update(keywds)
+        return self.request("egquery", variables)
+
+    def espell(self, **keywds):
+        """Returns a handle to spelling suggestions for a query.
+
+        See Bio.Entrez.espell for the arguments.
+        """
+        return self.request("espell", keywds)
+
+    def _post_batches(self, db, ids, utility, batch_size, keywds):
+        """Posts the IDs and yields the parameters of each page (PRIVATE)."""
+        from Bio import Entrez
+        webenv = None
+        for start in range(0, len(ids), _POST_SIZE):
+            chunk = ids[start:start + _POST_SIZE]
+            params = {"db": db, "id": ",".join(chunk)}
+            if webenv is not None:
+                params["WebEnv"] = webenv
+            handle = self.epost(**params)
+            record = Entrez.read(handle)
+            handle.close()
+            webenv = record["WebEnv"]
+            for retstart in range(0, len(chunk), batch_size):
+                params = {"db": db, "WebEnv": webenv,
+                          "query_key": record["QueryKey"],
+                          "retstart": retstart, "retmax": batch_size}
+                params.update(keywds)
+                yield utility, params
+
+    def fetch_batches(self, db, ids, utility="efetch", batch_size=None,
+                      **keywds):
+        """Fetches the records for a list of IDs, yielding handles to pages.
+
+        Arguments:
+         - db - Entrez database name.
+         - ids - List of the IDs to fetch.
+         - utility - Entrez utility used to fetch the pages, "efetch" (the
+           default) or "esummary".
+         - batch_size - Number of records per page, by default the
+           batch_size of the client.
+
+        Any other keyword arguments, such as rettype and retmode, are sent
+        with each page request.
+
+        A list of up to batch_size IDs is fetched with a single request.
+        Longer lists are posted to the history server with epost, in chunks
+        of up to 10000 IDs sharing a single WebEnv, and then the pages are
+        fetched with the WebEnv, query_key, retstart and retmax parameters.
+        Up to one page per connection is fetched at once, subject to the
+        rate limit, but the handles are always yielded in the order of the
+        IDs.
+        """
+        if utility not in ("efetch", "esummary"):
+            raise ValueError("Batches can be fetched with efetch or "
+                             "esummary, not %r" % utility)
+        if batch_size is None:
+            batch_size = self.batch_size
+        elif batch_size < 1:
+            raise ValueError("The batch size must be positive, not %r"
+                             % batch_size)
+        ids = [str(identifier) for identifier in ids]
+        if not ids:
+            return
+        if len(ids) <= batch_size:
+            params = {"db": db, "id": ",".join(ids)}
+            params.update(keywds)
+            yield self.request(utility, params, len(ids) > _POST_IDS)
+            return
+        pages = self._post_batches(db, ids, utility, batch_size, keywds)
+        for handle in _ordered_map(lambda page: self.request(*page), pages,
+                                   self.connections):
+            yield handle
@@ -19,6 +19,8 @@ sprot_search_de   Interface to the sprot-search-de CGI script.
 
 import urllib
 
+from Bio import webcache
+
 
 def get_prodoc_entry(id, cgi='http://www.expasy.ch/cgi-bin/get-prodoc-entry'):
     """get_prodoc_entry(id,
@@ -31,7 +33,8 @@ def get_prodoc_entry(id, cgi='http://www.expasy.ch/cgi-bin/get-prodoc-entry'):
     'There is no PROSITE documentation entry XXX. Please try again.'
     """
     # Open a handle to ExPASy.
-    handle = urllib.urlopen("%s?%s" % (cgi, id))
+    handle = webcache._urlopen("%s?%s" % (cgi, id),
+                               opener=urllib.urlopen)
     return handle
 
 
@@ -46,7 +49,8 @@ def get_prosite_entry(id,
     containing this line:
     'There is currently no PROSITE entry for XXX. Please try again.'
     """
-    handle = urllib.urlopen("%s?%s" % (cgi, id))
+    handle = webcache._urlopen("%s?%s" % (cgi, id),
+                               opener=urllib.urlopen)
     return handle
 
 
@@ -59,7 +63,8 @@ def get_prosite_raw(id, cgi='http://www.expasy.ch/cgi-bin/get-prosite-raw.pl'):
 
     For a non-existing key, ExPASy returns nothing.
     """
-    handle = urllib.urlopen("%s?%s" % (cgi, id))
+    handle = webcache._urlopen("%s?%s" % (cgi, id),
+                               opener=urllib.urlopen)
     return handle
 
 
@@ -69,7 +74,8 @@ def get_sprot_raw(id):
     For an ID of XXX, fetches http://www.uniprot.org/uniprot/XXX.txt
     (as per the http://www.expasy.ch/expasy_urls.html documentation).
     """
-    return urllib.urlopen("http://www.uniprot.org/uniprot/%s.txt" % id)
+    return webcache._urlopen("http://www.uniprot.org/uniprot/%s.txt" % id,
+                             opener=urllib.urlopen)
 
 
 def sprot_search_ful(text, make_wild=None, swissprot=1, trembl=None,
@@ -89,7 +95,7 @@ def sprot_search_ful(text, make_wild=None, swissprot=1, trembl=None,
         variables['T'] = 'on'
     options = urllib.urlencode(variables)
     fullcgi = "%s?%s" % (cgi, options)
-    handle = urllib.urlopen(fullcgi)
+    handle = webcache._urlopen(fullcgi, opener=urllib.urlopen)
     return handle
 
 
@@ -109,5 +115,5 @@ def sprot_search_de(text, swissprot=1, trembl=None,
         variables['T'] = 'on'
     options = urllib.urlencode(variables)
     fullcgi = "%s?%s" % (cgi, options)
-    handle = urllib.urlopen(fullcgi)
+    handle = webcache._urlopen(fullcgi, opener=urllib.urlopen)
     return handle
@@ -8,12 +8,17 @@
 import numpy
 import warnings
 import copy
+import numbers
 
 from Bio.PDB.Entity import DisorderedEntityWrapper
 from Bio.PDB.PDBExceptions import PDBConstructionWarning
 from Bio.PDB.Vector import Vector
 from Bio.Data import IUPACData
 
+# The atomic weights by element as given in PDB files (in upper case)
+_ELEMENT_MASSES=dict((element.upper(), (element.upper(), weight))
+                     for element, weight in IUPACData.atom_weights.items())
+
 
 class Atom(object):
     def __init__(self, name, coord, bfactor, occupancy, altloc, fullname, serial_number,
@@ -49,14 +54,17 @@ class Atom(object):
         @type fullname: uppercase string (or None if unknown)
         """
         self.level="A"
+        # AtomArray holding the atomic data once packed, and the row in it
+        self._store=None
+        self._index=None
         # Reference to the residue
         self.parent=None
         # the atomic data
         self.name=name      # eg. CA, spaces are removed from atom name
         self.fullname=fullname  # e.g. " CA ", spaces included
-        self.coord=coord
-        self.bfactor=bfactor
-        self.occupancy=occupancy
+        self._coord=coord
+        self._bfactor=bfactor
+        self._occupancy=occupancy
         self.altloc=altloc
         self.full_id=None   # (structure id, model id, chain id, residue id, atom id)
         self.id=name        # id of atom is the atom name (e.g. "CA")
@@ -67,9 +75,13 @@ class Atom(object):
         self.serial_number=serial_number
         # Dictionary that keeps additional properties
         self.xtra={}
-        assert not element or element == element.upper(), element
-        self.element = self._assign_element(element)
-        self.mass = self._assign_atom_mass()
+        try:
+            # Most atoms have a known element
+            self._element, self.mass = _ELEMENT_MASSES[element]
+        except KeyError:
+            assert not element or element == element.upper(), element
+            self._element = self._assign_element(element)
+            self.mass = self._assign_atom_mass()
 
     def _assign_element(self, element):
         """Tries to guess element from atom name if not recognised."""
@@ -102,11 +114,103 @@ class Atom(object):
 
     def _assign_atom_mass(self):
         # Needed for Bio/Struct/Geometry.py C.O.M. function
-        if self.element:
-            return IUPACData.atom_weights[self.element.capitalize()]
+        if self._store is None:
+            # Not packed yet (as when called from __init__)
+            element=self._element
+        else:
+            element=self.element
+        if element:
+            return IUPACData.atom_weights[element.capitalize()]
         else:
             return float('NaN')
 
+    # Atomic data, kept in the AtomArray of the structure once packed
+
+    def _get_data(name):
+        private="_"+name
+
+        def getter(self):
+            if self._store is None:
+                return getattr(self, private)
+            return getattr(self._store, name)[self._index]
+
+        def setter(self, value):
+            if self._store is not None:
+                try:
+                    getattr(self._store, name)[self._index]=value
+                    return
+                except (TypeError, ValueError):
+                    # Does not fit into the array, keep it separately
+                    self._detach()
+            setattr(self, private, value)
+
+        return getter, setter
+
+    def _get_number(name):
+        private="_"+name
+
+        def getter(self):
+            if self._store is None:
+                return getattr(self, private)
+            value=getattr(self._store, name)[self._index]
+            if numpy.isnan(value):
+                # Unknown, e.g. missing occupancy
+                return None
+            return float(value)
+
+        def setter(self, value):
+            if self._store is not None:
+                if value is None:
+                    getattr(self._store, name)[self._index]=numpy.nan
+                    return
+                if isinstance(value, numbers.Real):
+                    getattr(self._store, name)[self._index]=value
+                    return
+                self._detach()
+            setattr(self, private, value)
+
+        return getter, setter
+
+    def _get_coord(self):
+        if self._store is None:
+            return self._coord
+        # A view of the row, so that changing it in place changes the atom
+        return self._store.coord[self._index]
+
+    def _set_coord(self, coord):
+        store=self._store
+        if store is not None:
+            try:
+                store._widen(coord)
+                store.coord[self._index]=coord
+                return
+            except (TypeError, ValueError):
+                # Does not fit into the array, keep it separately
+                self._detach()
+        self._coord=coord
+
+    coord=property(_get_coord, _set_coord)
+    element=property(*_get_data("element"))
+    bfactor=property(*_get_number("bfactor"))
+    occupancy=property(*_get_number("occupancy"))
+    del _get_data, _get_number, _get_coord, _set_coord
+
+    def _detach(self):
+        """Take the atomic data out of the AtomArray (PRIVATE)."""
+        store=self._store
+        if store is None:
+            return
+        coord=self.coord.copy()
+        bfactor=self.bfactor
+        occupancy=self.occupancy
+        element=self.element
+        self._store=None
+        self._index=None
+        self._coord=coord
+        self._bfactor=bfactor
+        self._occupancy=occupancy
+        self._element=element
+
     # Special methods
 
     def __repr__(self):
@@ -291,6 +395,8 @@ class Atom(object):
         """
         # Do a shallow copy then explicitly copy what needs to be deeper.
         shallow = copy.copy(self)
+        # The copy does not share the AtomArray of the structure
+        shallow._detach()
         shallow.detach_parent()
         shallow.set_coord(copy.copy(self.get_coord()))
         shallow.xtra = self.xtra.copy()
@@ -0,0 +1,204 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Contiguous arrays holding the atomic data of a whole structure.
+
+The parsers pack the coordinates, B factors, occupancies and elements of
+all the atoms of a structure into one AtomArray (available as the
+atom_array attribute of the Structure). Each Atom then keeps only its
+row in these arrays, and e.g. atom.coord returns its row of the N x 3
+coordinate array:
+
+>>> from Bio.PDB import PDBParser
+>>> structure = PDBParser().get_structure("2BEG", "PDB/2BEG.pdb")
+>>> atom_array = structure.atom_array
+>>> atom_array.coord.shape
+(1855, 3)
+>>> atom = atom_array.atoms[0]
+>>> print(atom.get_name())
+N
+>>> (atom.coord == atom_array.coord[0]).all()
+True
+>>> atom.coord.dtype == atom_array.coord.dtype == "f"
+True
+>>> atom.coord[0] = 1.5
+>>> print(atom_array.coord[0, 0])
+1.5
+
+As the coordinates of an atom are a view of the array, changing them in
+place changes the atom, and they follow the atom when it is moved; take
+a copy to keep the old position.
+
+Operations on many atoms of a structure, like Entity.transform or the
+setup of NeighborSearch and Superimposer, work on these arrays in one
+step instead of going through the atoms one at a time.
+
+Atoms which are not packed (e.g. made by hand, or copied from a packed
+structure) keep their own coordinate arrays as before, and the functions
+here fall back to handling them one at a time.
+"""
+
+from operator import attrgetter
+
+import numpy
+
+
+class AtomArray(object):
+    """The atomic data of a list of atoms as contiguous arrays.
+
+    Attributes:
+     - atoms - The list of atoms, in the order of the rows.
+     - coord - N x 3 array of the coordinates. As for unpacked atoms,
+       these are single precision as read from the file, and switch to
+       double precision when atoms are moved (e.g. by Entity.transform).
+     - bfactor - Array of the B factors.
+     - occupancy - Array of the occupancies (NaN if unknown).
+     - element - Array of the element strings.
+
+    Creating an AtomArray attaches the atoms to it: from then on changing
+    an atom changes the arrays, and the other way round.
+
+    The data is taken from the atoms, unless the arrays are given (e.g.
+    memory mapped from a file by Bio.PDB.StructureCache), in which case
+    they are used as they are.
+    """
+
+    def __init__(self, atoms, coord=None, bfactor=None, occupancy=None,
+                 element=None):
+        self.atoms = list(atoms)
+        count = len(self.atoms)
+        # The values of atoms not yet packed are taken directly, rather
+        # than through the properties of the Atom class
+        if set(map(attrgetter("_store"), self.atoms)) - set([None]):
+            prefix = ""
+        else:
+            prefix = "_"
+
+        def values(name):
+            return list(map(attrgetter(prefix + name), self.atoms))
+
+        if coord is None:
+            coord = numpy.array(values("coord"))
+            if not count:
+                coord = numpy.zeros((0, 3), "f")
+            elif coord.dtype.kind != "f":
+                coord = coord.astype("d")
+        if coord.shape != (count, 3):
+            raise ValueError("Atoms need 3 coordinates to be packed")
+        # None (e.g. a missing occupancy) becomes NaN
+        if bfactor is None:
+            bfactor = numpy.array(values("bfactor"), "d")
+        if occupancy is None:
+            occupancy = numpy.array(values("occupancy"), "d")
+        if element is None:
+            element = values("element")
+        if len(bfactor) != count or len(occupancy) != count \
+                or len(element) != count:
+            raise ValueError("Need one value per atom")
+        self.coord = coord
+        self.bfactor = bfactor
+        self.occupancy = occupancy
+        self.element = numpy.empty(count, object)
+        self.element[:] = list(element)
+        for index, atom in enumerate(self.atoms):
+            _attach(atom, self, index)
+
+    def __len__(self):
+        return len(self.atoms)
+
+    def __repr__(self):
+        return "<AtomArray of %i atoms>" % len(self)
+
+    def _widen(self, coord=None):
+        """Switch to writable double precision coordinates if needed (PRIVATE).
+
+        Called before moving atoms, or before setting the coordinates of
+        an atom to the given ones unless they are single precision too.
+        """
+        if self.coord.dtype == numpy.float64 and self.coord.flags.writeable:
+            return
+        if coord is not None and getattr(coord, "dtype", None) == \
+                self.coord.dtype and self.coord.flags.writeable:
+            return
+        self.coord = self.coord.astype("d")
+
+
+def _attach(atom, store, index):
+    """Makes an atom keep its data in row index of the store (PRIVATE).
+
+    The values the atom held itself are dropped, so that packed atoms do
+    not keep e.g. a coordinate array each.
+    """
+    atom._store = store
+    atom._index = index
+    for name in ("_coord", "_bfactor", "_occupancy", "_element"):
+        atom.__dict__.pop(name, None)
+
+
+def _gather(atoms):
+    """Returns the AtomArray and row numbers of a list of atoms (PRIVATE).
+
+    For disordered atoms the selected atom is used. If the atoms are not
+    all packed into the same AtomArray, (None, None) is returned.
+    """
+    store = None
+    index = []
+    for atom in atoms:
+        # resolve a DisorderedAtom to its selected Atom
+        atom = getattr(atom, "selected_child", atom)
+        current = getattr(atom, "_store", None)
+        if current is None or (store is not None and current is not store):
+            return None, None
+        store = current
+        index.append(atom._index)
+    if store is None:
+        return None, None
+    return store, numpy.array(index, int)
+
+
+def atom_coords(atoms):
+    """Returns the coordinates of a list of atoms as an N x 3 array.
+
+    The array is a copy, so changing it does not move the atoms.
+    """
+    atoms = list(atoms)
+    store, index = _gather(atoms)
+    if store is not None:
+        return store.coord[index]
+    if not atoms:
+        return numpy.zeros((0, 3), "f")
+    return numpy.array([atom.get_coord() for atom in atoms])
+
+
+def transform_atoms(atoms, rot, tran):
+    """Applies a rotation and translation to a list of atoms.
+
+    This is the same as calling atom.transform(rot, tran) for each atom,
+    but a single array operation when they are packed together.
+    """
+    atoms = list(atoms)
+    store, index = _gather(atoms)
+    if store is None or len(numpy.unique(index)) != len(index):
+        for atom in atoms:
+            atom.transform(rot, tran)
+        return
+    store._widen()
+    store.coord[index] = numpy.dot(store.coord[index], rot) + tran
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import os
+    import doctest
+    from Bio._utils import find_test_dir
+    cur_dir = os.path.abspath(os.curdir)
+    os.chdir(find_test_dir(os.curdir))
+    print("Running doctests...")
+    doctest.testmod()
+    os.chdir(cur_dir)
+    print("Done")
+
+
+if __name__ == "__main__":
+    _test()
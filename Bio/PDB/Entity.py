@@ -166,8 +166,22 @@ class Entity(object):
         @param tran: the translation vector
         @type tran: size 3 Numeric array
         """
-        for o in self.get_list():
-            o.transform(rot, tran)
+        # Imported here, as AtomArray is not needed by the other entities
+        from Bio.PDB.AtomArray import transform_atoms
+        transform_atoms(self._get_selected_atoms(), rot, tran)
+
+    def _get_selected_atoms(self):
+        """Return the atoms of the selected altlocs and residues (PRIVATE).
+
+        These are the atoms moved by the transform method.
+        """
+        atoms=[]
+        for child in self.get_list():
+            if child.get_level()=="A":
+                atoms.append(child)
+            else:
+                atoms.extend(child._get_selected_atoms())
+        return atoms
 
     def copy(self):
         shallow = copy(self)
@@ -10,12 +10,50 @@ from __future__ import print_function
 import warnings
 from math import pi
 
+import numpy
+
 from Bio.PDB.AbstractPropertyMap import AbstractPropertyMap
+from Bio.PDB.AtomArray import atom_coords
 from Bio.PDB.PDBParser import PDBParser
 from Bio.PDB.Polypeptide import CaPPBuilder, is_aa
 from Bio.PDB.Vector import rotaxis
 
 
+def _get_ca_table(ppl):
+    """Return the CA coordinates of the amino acids in the polypeptides (PRIVATE).
+
+    Returns an Nx3 coordinate array, and arrays with the number of the
+    polypeptide and the position in it of each CA atom.
+    """
+    ca_list=[]
+    pp_numbers=[]
+    positions=[]
+    for n, pp in enumerate(ppl):
+        for j in range(0, len(pp)):
+            residue=pp[j]
+            if not is_aa(residue) or not residue.has_id('CA'):
+                continue
+            ca_list.append(residue['CA'])
+            pp_numbers.append(n)
+            positions.append(j)
+    return (atom_coords(ca_list), numpy.array(pp_numbers, int),
+            numpy.array(positions, int))
+
+
+def _get_neighbors(ca_table, n, i, coord, radius, offset):
+    """Return the distance vectors to the CA atoms around coord (PRIVATE).
+
+    The CA atoms of residue i of polypeptide n and the residues at most
+    offset positions away from it in the same polypeptide are ignored.
+    """
+    ca_coords, pp_numbers, positions=ca_table
+    d=ca_coords-coord
+    near=numpy.sqrt(numpy.sum(d*d, 1))<radius
+    # neighboring residues in the chain are ignored
+    near&=~((pp_numbers==n) & (abs(positions-i)<=offset))
+    return d[near]
+
+
 class _AbstractHSExposure(AbstractPropertyMap):
     """
     Abstract class to calculate Half-Sphere Exposure (HSE).
@@ -55,7 +93,10 @@ class _AbstractHSExposure(AbstractPropertyMap):
         hse_map={}
         hse_list=[]
         hse_keys=[]
-        for pp1 in ppl:
+        ca_coords, pp_numbers, positions=_get_ca_table(ppl)
+        # the pseudo CB vectors are in double precision
+        ca_table=(ca_coords.astype('d'), pp_numbers, positions)
+        for n, pp1 in enumerate(ppl):
             for i in range(0, len(pp1)):
                 if i==0:
                     r1=None
@@ -72,24 +113,11 @@ class _AbstractHSExposure(AbstractPropertyMap):
                     # Missing atoms, or i==0, or i==len(pp1)-1
                     continue
                 pcb, angle=result
-                hse_u=0
-                hse_d=0
-                ca2=r2['CA'].get_vector()
-                for pp2 in ppl:
-                    for j in range(0, len(pp2)):
-                        if pp1 is pp2 and abs(i-j)<=offset:
-                            # neighboring residues in the chain are ignored
-                            continue
-                        ro=pp2[j]
-                        if not is_aa(ro) or not ro.has_id('CA'):
-                            continue
-                        cao=ro['CA'].get_vector()
-                        d=(cao-ca2)
-                        if d.norm()<radius:
-                            if d.angle(pcb)<(pi/2):
-                                hse_u+=1
-                            else:
-                                hse_d+=1
+                ca2=r2['CA'].get_vector().get_array()
+                d=_get_neighbors(ca_table, n, i, ca2, radius, offset)
+                # the angle with pcb is below pi/2 for a positive dot product
+                hse_u=int(numpy.sum(numpy.dot(d, pcb.get_array())>0))
+                hse_d=len(d)-hse_u
                 res_id=r2.get_id()
                 chain_id=r2.get_parent().get_id()
                 # Fill the 3 data structures
@@ -283,24 +311,14 @@ class ExposureCN(AbstractPropertyMap):
         fs_map={}
         fs_list=[]
         fs_keys=[]
-        for pp1 in ppl:
+        ca_table=_get_ca_table(ppl)
+        for n, pp1 in enumerate(ppl):
             for i in range(0, len(pp1)):
-                fs=0
                 r1=pp1[i]
                 if not is_aa(r1) or not r1.has_id('CA'):
                     continue
-                ca1=r1['CA']
-                for pp2 in ppl:
-                    for j in range(0, len(pp2)):
-                        if pp1 is pp2 and abs(i-j)<=offset:
-                            continue
-                        r2=pp2[j]
-                        if not is_aa(r2) or not r2.has_id('CA'):
-                            continue
-                        ca2=r2['CA']
-                        d=(ca2-ca1)
-                        if d<radius:
-                            fs+=1
+                ca1=r1['CA'].get_coord()
+                fs=len(_get_neighbors(ca_table, n, i, ca1, radius, offset))
                 res_id=r1.get_id()
                 chain_id=r1.get_parent().get_id()
                 # Fill the 3 data structures
@@ -7,60 +7,99 @@
 
 from __future__ import print_function
 
-import shlex
+import bisect
+import re
+
+# The tokens between semicolon text fields: a quoted string ends at a
+# matching quote followed by white space, a comment at the end of the line.
+_token_re = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(#.*)|(\S+)""",
+                       re.M)
+
 
 class MMCIF2Dict(dict):
 
     def __init__(self, filename):
-        handle = open(filename)
-        loop_flag = False
-        key = None
-        tokens = self._tokenize(handle)
-        token = tokens.next()
+        with open(filename) as handle:
+            tokens = self._tokenize(handle)
+        token = tokens[0]
         self[token[0:5]]=token[5:]
-        for token in tokens:
+        n = len(tokens)
+        # The positions of the data names and loop_ keywords, where the
+        # values of a loop end
+        ends = [i for i, token in enumerate(tokens)
+                if token[:1]=="_" or token=="loop_"]
+        ends.append(n)
+        key = None
+        i = 1
+        while i < n:
+            token = tokens[i]
+            i += 1
             if token=="loop_":
-                loop_flag = True
                 keys = []
-                i = 0
-                n = 0
+                while i < n and tokens[i].startswith("_"):
+                    keys.append(tokens[i])
+                    i += 1
+                start = i
+                i = ends[bisect.bisect_left(ends, i)]
+                # The values go round the columns, so each column is
+                # a slice of them
+                values = tokens[start:i]
+                for k, loop_key in enumerate(keys):
+                    self[loop_key] = values[k::len(keys)]
                 continue
-            elif loop_flag:
-                if token.startswith("_"):
-                    if i > 0:
-                        loop_flag = False
-                    else:
-                        self[token] = []
-                        keys.append(token)
-                        n += 1
-                        continue
-                else:
-                    self[keys[i%n]].append(token)
-                    i+=1
-                    continue
             if key is None:
                 key = token
             else:
                 self[key] = token
                 key = None
-        handle.close()
 
     def _tokenize(self, handle):
+        """Returns the list of tokens in the file (PRIVATE).
+
+        Most lines are split on white space, and only those with quotes or
+        comments are split with a regular expression, which is much faster
+        than going through the characters one at a time.
+        """
+        tokens = []
+        lines = []
         for line in handle:
-            if line.startswith("#"):
-                continue
-            elif line.startswith(";"):
+            if line.startswith(";"):
+                self._split(lines, tokens)
+                lines = []
                 token = line[1:].strip()
                 for line in handle:
                     line = line.strip()
                     if line==';':
                         break
                     token += line
-                yield token
+                tokens.append(token)
             else:
-                tokens = shlex.split(line)
-                for token in tokens:
-                    yield token
+                lines.append(line)
+        self._split(lines, tokens)
+        return tokens
+
+    def _split(self, lines, tokens):
+        """Adds the tokens of some lines to the list (PRIVATE)."""
+        special = []
+        for line in lines:
+            if "'" in line or '"' in line or "#" in line:
+                special.append(line)
+                continue
+            if special:
+                self._split_special(special, tokens)
+                special = []
+            tokens.extend(line.split())
+        if special:
+            self._split_special(special, tokens)
+
+    def _split_special(self, lines, tokens):
+        """Adds the tokens of lines with quotes or comments (PRIVATE)."""
+        for single, double, comment, bare in _token_re.findall("".join(lines)):
+            if bare:
+                tokens.append(bare)
+            elif not comment:
+                # a quoted string, possibly empty
+                tokens.append(single or double)
 
 
 if __name__=="__main__":
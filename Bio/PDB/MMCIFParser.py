@@ -12,11 +12,40 @@ from string import ascii_letters
 import numpy
 
 from Bio.PDB.MMCIF2Dict import MMCIF2Dict
+from Bio.PDB.PDBParser import _make_atom_filter
 from Bio.PDB.StructureBuilder import StructureBuilder
 from Bio.PDB.PDBExceptions import PDBConstructionException
 
 
 class MMCIFParser(object):
+    def __init__(self, models=None, chains=None, atom_names=None,
+                 hetatm=True, water=True):
+        """
+        Create an mmCIF parser.
+
+        The arguments restrict the atoms which are parsed, as for the
+        PDBParser; by default all atoms are parsed. Atoms left out are
+        skipped while building the structure, so no objects are made for
+        them.
+
+        o models - list of the ids of the models to parse, counting from 0
+        as in structure[0]. The models keep their ids.
+
+        o chains - list of the ids of the chains to parse, e.g. ["A"]
+
+        o atom_names - list of the names of the atoms to parse, e.g. ["CA"]
+
+        o hetatm - Evaluated as a Boolean. If false, HETATM records (other
+        than waters) are skipped.
+
+        o water - Evaluated as a Boolean. If false, waters are skipped.
+        """
+        if models is not None:
+            models=frozenset(models)
+        self.models=models
+        self._atom_filter=_make_atom_filter(chains, atom_names,
+                                            bool(hetatm), bool(water))
+
     def get_structure(self, structure_id, filename):
         self._mmcif_dict=MMCIF2Dict(filename)
         self._structure_builder=StructureBuilder()
@@ -33,9 +62,9 @@ class MMCIFParser(object):
             element_list = None
         seq_id_list=mmcif_dict["_atom_site.label_seq_id"]
         chain_id_list=mmcif_dict["_atom_site.label_asym_id"]
-        x_list=map(float, mmcif_dict["_atom_site.Cartn_x"])
-        y_list=map(float, mmcif_dict["_atom_site.Cartn_y"])
-        z_list=map(float, mmcif_dict["_atom_site.Cartn_z"])
+        x_list=mmcif_dict["_atom_site.Cartn_x"]
+        y_list=mmcif_dict["_atom_site.Cartn_y"]
+        z_list=mmcif_dict["_atom_site.Cartn_z"]
         alt_list=mmcif_dict["_atom_site.label_alt_id"]
         b_factor_list=mmcif_dict["_atom_site.B_iso_or_equiv"]
         occupancy_list=mmcif_dict["_atom_site.occupancy"]
@@ -49,90 +78,104 @@ class MMCIFParser(object):
             # Invalid model number (malformed file)
             raise PDBConstructionException("Invalid model number")
         try:
-            aniso_u11=mmcif_dict["_atom_site.aniso_U[1][1]"]
-            aniso_u12=mmcif_dict["_atom_site.aniso_U[1][2]"]
-            aniso_u13=mmcif_dict["_atom_site.aniso_U[1][3]"]
-            aniso_u22=mmcif_dict["_atom_site.aniso_U[2][2]"]
-            aniso_u23=mmcif_dict["_atom_site.aniso_U[2][3]"]
-            aniso_u33=mmcif_dict["_atom_site.aniso_U[3][3]"]
-            aniso_flag=1
+            aniso_lists=[mmcif_dict["_atom_site.aniso_U[%s]" % ij]
+                         for ij in ("1][1", "1][2", "1][3", "2][2", "2][3",
+                                    "3][3")]
         except KeyError:
             # no anisotropic B factors
-            aniso_flag=0
+            aniso_lists=None
         # if auth_seq_id is present, we use this.
         # Otherwise label_seq_id is used.
         if "_atom_site.auth_seq_id" in mmcif_dict:
             seq_id_list=mmcif_dict["_atom_site.auth_seq_id"]
         else:
             seq_id_list=mmcif_dict["_atom_site.label_seq_id"]
-        # Now loop over atoms and build the structure
-        current_chain_id=None
-        current_residue_id=None
         structure_builder=self._structure_builder
         structure_builder.init_structure(structure_id)
         structure_builder.init_seg(" ")
         # Historically, Biopython PDB parser uses model_id to mean array index
-        # so serial_id means the Model ID specified in the file
-        current_model_id = 0
-        current_serial_id = 0
-        for i in xrange(0, len(atom_id_list)):
-            x=x_list[i]
-            y=y_list[i]
-            z=z_list[i]
-            resname=residue_id_list[i]
-            chainid=chain_id_list[i]
-            altloc=alt_list[i]
-            if altloc==".":
-                altloc=" "
-            resseq=seq_id_list[i]
-            name=atom_id_list[i]
-            # occupancy & B factor
-            try:
-                tempfactor=float(b_factor_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing B factor")
-            try:
-                occupancy=float(occupancy_list[i])
-            except ValueError:
-                raise PDBConstructionException("Invalid or missing occupancy")
-            fieldname=fieldname_list[i]
-            if fieldname=="HETATM":
-                hetatm_flag="H"
+        # so serial_id means the Model ID specified in the file.
+        # A new model starts wherever the model number changes.
+        count=len(atom_id_list)
+        if serial_list is None:
+            model_starts=[(0, None)]
+        else:
+            model_starts=[(i, serial_list[i]) for i in xrange(count)
+                          if i==0 or serial_list[i]!=serial_list[i-1]]
+        model_starts.append((count, None))
+        # Pick the rows of the atoms to parse, before converting anything
+        models=self.models
+        atom_filter=self._atom_filter
+        model_rows=[]
+        for model_id in xrange(len(model_starts)-1):
+            if models is not None and model_id not in models:
+                continue
+            start, serial_id=model_starts[model_id]
+            end=model_starts[model_id+1][0]
+            if atom_filter is None:
+                rows=xrange(start, end)
             else:
-                hetatm_flag=" "
-            if serial_list is not None:
-                # model column exists; use it
-                serial_id = serial_list[i]
-                if current_serial_id != serial_id:
-                    # if serial changes, update it and start new model
-                    current_serial_id = serial_id
-                    structure_builder.init_model(current_model_id, current_serial_id)
-                    current_model_id += 1
+                rows=[i for i in xrange(start, end)
+                      if atom_filter(chain_id_list[i], atom_id_list[i],
+                                     self._hetero_flag(fieldname_list[i],
+                                                       residue_id_list[i]))]
+            model_rows.append((model_id, serial_id, rows))
+        all_rows=[i for model_id, serial_id, rows in model_rows for i in rows]
+        # Convert the numbers of these atoms a column at a time
+        coords=numpy.empty((len(all_rows), 3), "f")
+        coords[:, 0]=_floats(x_list, all_rows, count, "coordinate(s)")
+        coords[:, 1]=_floats(y_list, all_rows, count, "coordinate(s)")
+        coords[:, 2]=_floats(z_list, all_rows, count, "coordinate(s)")
+        b_factors=_floats(b_factor_list, all_rows, count, "B factor")
+        occupancies=_floats(occupancy_list, all_rows, count, "occupancy")
+        anisous=None
+        if aniso_lists is not None:
+            anisous=numpy.empty((len(all_rows), 6), "f")
+            for k, aniso_list in enumerate(aniso_lists):
+                anisous[:, k]=_floats(aniso_list, all_rows, count,
+                                      "anisotropic B factor")
+        # Now build the structure, adding the atoms a residue at a time
+        k=0
+        for model_id, serial_id, rows in model_rows:
+            if serial_id is None:
+                structure_builder.init_model(model_id)
             else:
-                # no explicit model column; initialize single model
-                structure_builder.init_model(current_model_id)
-            if current_chain_id!=chainid:
-                current_chain_id=chainid
-                structure_builder.init_chain(current_chain_id)
-                current_residue_id=resseq
-                icode, int_resseq=self._get_icode(resseq)
-                structure_builder.init_residue(resname, hetatm_flag, int_resseq,
-                    icode)
-            elif current_residue_id!=resseq:
-                current_residue_id=resseq
-                icode, int_resseq=self._get_icode(resseq)
-                structure_builder.init_residue(resname, hetatm_flag, int_resseq,
-                    icode)
-            coord=numpy.array((x, y, z), 'f')
-            element = element_list[i] if element_list else None
-            structure_builder.init_atom(name, coord, tempfactor, occupancy, altloc,
-                name, element=element)
-            if aniso_flag==1:
-                u=(aniso_u11[i], aniso_u12[i], aniso_u13[i],
-                    aniso_u22[i], aniso_u23[i], aniso_u33[i])
-                mapped_anisou=map(float, u)
-                anisou_array=numpy.array(mapped_anisou, 'f')
-                structure_builder.set_anisou(anisou_array)
+                structure_builder.init_model(model_id, serial_id)
+            current_chain_id=None
+            current_residue_id=None
+            atoms=[]
+            for i in rows:
+                chainid=chain_id_list[i]
+                resseq=seq_id_list[i]
+                if current_chain_id!=chainid or current_residue_id!=resseq:
+                    self._add_atoms(atoms, anisous, k)
+                    k+=len(atoms)
+                    atoms=[]
+                    if current_chain_id!=chainid:
+                        current_chain_id=chainid
+                        structure_builder.init_chain(current_chain_id)
+                    current_residue_id=resseq
+                    resname=residue_id_list[i]
+                    if fieldname_list[i]=="HETATM":
+                        hetatm_flag="H"
+                    else:
+                        hetatm_flag=" "
+                    icode, int_resseq=self._get_icode(resseq)
+                    structure_builder.init_residue(resname, hetatm_flag,
+                                                   int_resseq, icode)
+                name=atom_id_list[i]
+                altloc=alt_list[i]
+                if altloc==".":
+                    altloc=" "
+                if element_list:
+                    element=element_list[i]
+                else:
+                    element=None
+                j=k+len(atoms)
+                atoms.append((name, coords[j], b_factors[j], occupancies[j],
+                              altloc, name, None, element))
+            self._add_atoms(atoms, anisous, k)
+            k+=len(atoms)
         # Now try to set the cell
         try:
             a=float(mmcif_dict["_cell.length_a"])
@@ -150,6 +193,35 @@ class MMCIFParser(object):
         except:
             pass    # no cell found, so just ignore
 
+    def _hetero_flag(self, fieldname, resname):
+        """Returns the hetero flag used by the atom filter (PRIVATE)."""
+        if fieldname!="HETATM":
+            return " "
+        if resname in ("HOH", "WAT"):
+            return "W"
+        return "H"
+
+    def _add_atoms(self, atoms, anisous, k):
+        """Adds the atoms of the current residue (PRIVATE).
+
+        Arguments:
+        o atoms - list of tuples with the arguments of init_atom
+        o anisous - array of the anisotropic B factors, or None
+        o k - the row of the first atom in anisous
+        """
+        if not atoms:
+            return
+        structure_builder=self._structure_builder
+        new_atoms=structure_builder.init_atoms(atoms)
+        if new_atoms is None:
+            for j, atom in enumerate(atoms):
+                structure_builder.init_atom(*atom)
+                if anisous is not None:
+                    structure_builder.set_anisou(anisous[k+j])
+        elif anisous is not None:
+            for j, atom in enumerate(new_atoms):
+                atom.set_anisou(anisous[k+j])
+
     def _get_icode(self, resseq):
         """Tries to return the icode. In MMCIF files this is just part of
         resseq! In PDB files, it's a separate field."""
@@ -163,6 +235,23 @@ class MMCIFParser(object):
         return icode, int_resseq
 
 
+def _floats(values, rows, count, name):
+    """Returns the values of some rows of a column as floats (PRIVATE).
+
+    Arguments:
+    o values - list of strings, a column of the table
+    o rows - list of the rows to convert
+    o count - the number of rows in the table
+    o name - the name of the values, for the error message
+    """
+    if len(rows)!=count:
+        values=[values[i] for i in rows]
+    try:
+        return map(float, values)
+    except ValueError:
+        raise PDBConstructionException("Invalid or missing %s" % name)
+
+
 if __name__=="__main__":
     import sys
 
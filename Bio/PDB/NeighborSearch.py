@@ -3,16 +3,27 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 
-"""Fast atom neighbor lookup using a KD tree (implemented in C++)."""
+"""Fast atom neighbor lookup using a KD tree (implemented in C++).
+
+For systems of roughly uniform density (e.g. a solvated simulation box) a
+grid of cubic cells can be used instead of the KD tree, see NeighborSearch.
+The search_many and search_all_indices methods answer many queries in one
+call, returning arrays of atom indices rather than lists of atoms, and the
+neighbor_search function keeps the NeighborSearch of a structure for reuse.
+"""
 
 from __future__ import print_function
 
+import weakref
+from copy import copy
+
 import numpy
 
 from Bio.KDTree import KDTree
 
+from Bio.PDB.AtomArray import atom_coords
 from Bio.PDB.PDBExceptions import PDBException
-from Bio.PDB.Selection import unfold_entities, entity_levels, uniqueify
+from Bio.PDB.Selection import unfold_entities, entity_levels
 
 
 class NeighborSearch(object):
@@ -27,42 +38,73 @@ class NeighborSearch(object):
 
     NeighborSearch makes use of the Bio.KDTree C++ module, so it's fast.
     """
-    def __init__(self, atom_list, bucket_size=10):
+    def __init__(self, atom_list, bucket_size=10, cell_size=None):
         """
         o atom_list - list of atoms. This list is used in the queries.
         It can contain atoms from different structures.
         o bucket_size - bucket size of KD tree. You can play around
         with this to optimize speed if you feel like it.
+        o cell_size - float. If given, the atoms are sorted into a grid
+        of cubic cells of this size (in Angstrom) instead of a KD tree.
+        This is faster for systems of roughly uniform density, when
+        searching with radii up to about the cell size.
         """
         self.atom_list=atom_list
-        # get the coordinates
-        coord_list = [a.get_coord() for a in atom_list]
-        # to Nx3 array of type float
-        self.coords=numpy.array(coord_list).astype("f")
+        # get the coordinates as Nx3 array of type float
+        self.coords=atom_coords(atom_list).astype("f")
         assert(bucket_size>1)
         assert(self.coords.shape[1]==3)
-        self.kdt=KDTree(3, bucket_size)
-        self.kdt.set_coords(self.coords)
+        # the parents of the atoms at each level, see _get_parent_index
+        self._parents={}
+        if cell_size is None:
+            self.kdt=KDTree(3, bucket_size)
+            self.kdt.set_coords(self.coords)
+            self.cells=None
+        else:
+            self.kdt=None
+            self.cells=_CellGrid(self.coords, cell_size)
 
     # Private
 
-    def _get_unique_parent_pairs(self, pair_list):
-        # translate a list of (entity, entity) tuples to
-        # a list of (parent entity, parent entity) tuples,
-        # thereby removing duplicate (parent entity, parent entity)
-        # pairs.
-        # o pair_list - a list of (entity, entity) tuples
-        parent_pair_list=[]
-        for (e1, e2) in pair_list:
-            p1=e1.get_parent()
-            p2=e2.get_parent()
-            if p1==p2:
-                continue
-            elif p1<p2:
-                parent_pair_list.append((p1, p2))
-            else:
-                parent_pair_list.append((p2, p1))
-        return uniqueify(parent_pair_list)
+    def _get_parent_index(self, level):
+        # Returns the list of the entities of the given level containing
+        # the atoms, and an array with the position of each atom's
+        # entity in that list.
+        if level not in self._parents:
+            parents=[]
+            positions={}
+            index=numpy.empty(len(self.atom_list), int)
+            steps=entity_levels.index(level)-entity_levels.index("A")
+            for i, entity in enumerate(self.atom_list):
+                for step in range(steps):
+                    entity=entity.get_parent()
+                key=id(entity)
+                if key not in positions:
+                    positions[key]=len(parents)
+                    parents.append(entity)
+                index[i]=positions[key]
+            self._parents[level]=(parents, index)
+        return self._parents[level]
+
+    def _get_unique_parent_pairs(self, pairs, level):
+        # translate an Nx2 array of atom index pairs to a list of
+        # (entity, entity) tuples of the given level, thereby removing
+        # pairs within the same entity and duplicate pairs.
+        parents, index=self._get_parent_index(level)
+        parent_pairs=index[pairs]
+        parent_pairs=parent_pairs[parent_pairs[:, 0]!=parent_pairs[:, 1]]
+        parent_pairs.sort(axis=1)
+        keys=numpy.unique(parent_pairs[:, 0]*len(parents)+parent_pairs[:, 1])
+        return [(parents[i], parents[j])
+                for i, j in zip(keys//len(parents), keys%len(parents))]
+
+    def _with_atoms(self, atom_list):
+        # Returns a copy of the search for another list of atoms at the
+        # same positions, sharing the KD tree or grid.
+        search=copy(self)
+        search.atom_list=atom_list
+        search._parents={}
+        return search
 
     # Public
 
@@ -81,18 +123,64 @@ class NeighborSearch(object):
         """
         if not level in entity_levels:
             raise PDBException("%s: Unknown level" % level)
-        self.kdt.search(center, radius)
-        indices=self.kdt.get_indices()
-        n_atom_list=[]
+        if self.cells is None:
+            self.kdt.search(center, radius)
+            indices=self.kdt.get_indices()
+        else:
+            offsets, indices=self.cells.search(center, radius)
         atom_list=self.atom_list
-        for i in indices:
-            a=atom_list[i]
-            n_atom_list.append(a)
+        n_atom_list=[atom_list[i] for i in indices]
         if level=="A":
             return n_atom_list
         else:
             return unfold_entities(n_atom_list, level)
 
+    def search_many(self, centers, radius):
+        """Neighbor search for many positions at once.
+
+        Returns two integer arrays, offsets and indices. The atoms within
+        radius of centers[k] are those at positions
+        indices[offsets[k]:offsets[k+1]] in the atom list, in increasing
+        order.
+
+        Only the grid of cells (see cell_size) answers all the positions
+        together with array operations. With the KD tree, which can only
+        search around one position at a time, this is a Python loop over
+        the positions, so it saves little over calling search for each.
+
+        o centers - Nx3 array
+        o radius - float
+        """
+        centers=numpy.asarray(centers, "f").reshape((-1, 3))
+        if self.cells is not None:
+            return self.cells.search(centers, radius)
+        offsets=numpy.zeros(len(centers)+1, int)
+        found=[]
+        for k, center in enumerate(centers):
+            self.kdt.search(center, radius)
+            indices=numpy.sort(self.kdt.get_indices())
+            found.append(indices)
+            offsets[k+1]=offsets[k]+len(indices)
+        if not found:
+            return offsets, numpy.zeros(0, int)
+        return offsets, numpy.concatenate(found).astype(int)
+
+    def search_all_indices(self, radius):
+        """All neighbor search, returning the positions of the atoms.
+
+        Returns an Nx2 integer array with the positions in the atom list
+        of the atom pairs within radius of each other. The first position
+        of a pair is the smaller.
+
+        o radius - float
+        """
+        if self.cells is not None:
+            return self.cells.search_all(radius)
+        self.kdt.all_search(radius)
+        pairs=numpy.asarray(self.kdt.all_get_indices(), int).reshape((-1, 2))
+        pairs.sort(axis=1)
+        return pairs
+
     def search_all(self, radius, level="A"):
         """All neighbor search.
 
@@ -104,22 +192,146 @@ class NeighborSearch(object):
         """
         if not level in entity_levels:
             raise PDBException("%s: Unknown level" % level)
-        self.kdt.all_search(radius)
-        indices=self.kdt.all_get_indices()
-        atom_list=self.atom_list
-        atom_pair_list=[]
-        for i1, i2 in indices:
-            a1=atom_list[i1]
-            a2=atom_list[i2]
-            atom_pair_list.append((a1, a2))
+        pairs=self.search_all_indices(radius)
         if level=="A":
             # return atoms
-            return atom_pair_list
-        next_level_pair_list=atom_pair_list
-        for l in ["R", "C", "M", "S"]:
-            next_level_pair_list=self._get_unique_parent_pairs(next_level_pair_list)
-            if level==l:
-                return next_level_pair_list
+            atom_list=self.atom_list
+            return [(atom_list[i1], atom_list[i2]) for i1, i2 in pairs]
+        return self._get_unique_parent_pairs(pairs, level)
+
+
+class _CellGrid(object):
+    """The atoms sorted into a grid of cubic cells (PRIVATE).
+
+    Searching within a radius only needs to look at the atoms in the
+    cells near each query position, which is done for all the positions
+    at once with array operations.
+    """
+    def __init__(self, coords, cell_size):
+        if cell_size<=0:
+            raise ValueError("The cell size should be positive")
+        self.coords=numpy.asarray(coords, "d")
+        self.cell_size=float(cell_size)
+        if len(self.coords):
+            self.origin=self.coords.min(axis=0)
+        else:
+            self.origin=numpy.zeros(3)
+        cells=self._get_cells(self.coords)
+        if len(cells):
+            self.shape=cells.max(axis=0)+1
+        else:
+            self.shape=numpy.ones(3, int)
+        keys=self._get_keys(cells)
+        # the atoms ordered by cell, and where each cell starts and ends
+        self.order=numpy.argsort(keys, kind="mergesort")
+        self.keys, self.starts=numpy.unique(keys[self.order],
+                                            return_index=True)
+        self.ends=numpy.append(self.starts[1:], len(keys))
+
+    def _get_cells(self, coords):
+        return numpy.floor((coords-self.origin)/self.cell_size).astype(int)
+
+    def _get_keys(self, cells):
+        return (cells[:, 0]*self.shape[1]+cells[:, 1])*self.shape[2]+cells[:, 2]
+
+    def _get_steps(self, radius):
+        # the steps from a cell to the cells within reach of it
+        reach=int(numpy.ceil(radius/self.cell_size))
+        steps=range(-reach, reach+1)
+        return [(x, y, z) for x in steps for y in steps for z in steps]
+
+    def _get_candidates(self, centers, steps):
+        # the pairs of a position and an atom in one of the given cells
+        # from the position's cell
+        if not len(self.keys):
+            # no atoms, so no cells to look in
+            return numpy.zeros(0, int), numpy.zeros(0, int)
+        cells=self._get_cells(centers)
+        query_index=[]
+        atom_index=[]
+        for step in steps:
+            near=cells+step
+            inside=((near>=0) & (near<self.shape)).all(axis=1)
+            queries=numpy.flatnonzero(inside)
+            keys=self._get_keys(near[queries])
+            positions=numpy.searchsorted(self.keys, keys)
+            positions[positions==len(self.keys)]=0
+            filled=self.keys[positions]==keys
+            queries=queries[filled]
+            positions=positions[filled]
+            counts=self.ends[positions]-self.starts[positions]
+            # all atoms in the cells: each query repeated once for each atom
+            # in its cell, and the atoms counting up from each cell start
+            first=numpy.repeat(numpy.cumsum(counts)-counts, counts)
+            query_index.append(numpy.repeat(queries, counts))
+            atom_index.append(numpy.arange(counts.sum())-first
+                              +numpy.repeat(self.starts[positions], counts))
+        query_index=numpy.concatenate(query_index)
+        atom_index=self.order[numpy.concatenate(atom_index)]
+        return query_index, atom_index
+
+    def _get_close(self, centers, query_index, atom_index, radius):
+        distances=self.coords[atom_index]-centers[query_index]
+        close=(distances*distances).sum(axis=1)<=radius*radius
+        return query_index[close], atom_index[close]
+
+    def search(self, centers, radius):
+        """Returns offsets and indices of the atoms near each position."""
+        centers=numpy.asarray(centers, "d").reshape((-1, 3))
+        query_index, atom_index=self._get_candidates(centers,
+                                                     self._get_steps(radius))
+        query_index, atom_index=self._get_close(centers, query_index,
+                                                atom_index, radius)
+        order=numpy.lexsort((atom_index, query_index))
+        counts=numpy.bincount(query_index, minlength=len(centers))
+        offsets=numpy.zeros(len(centers)+1, int)
+        offsets[1:]=numpy.cumsum(counts)
+        return offsets, atom_index[order]
+
+    def search_all(self, radius):
+        """Returns an Nx2 array of the atom pairs within radius."""
+        # Only look in half of the cells around each atom, so that each
+        # pair of cells is looked at once
+        steps=[step for step in self._get_steps(radius) if step>(0, 0, 0)]
+        first, second=self._get_candidates(self.coords, steps)
+        same_first, same_second=self._get_candidates(self.coords, [(0, 0, 0)])
+        in_order=same_first<same_second
+        first=numpy.append(first, same_first[in_order])
+        second=numpy.append(second, same_second[in_order])
+        first, second=self._get_close(self.coords, first, second, radius)
+        pairs=numpy.column_stack((first, second))
+        pairs.sort(axis=1)
+        return pairs
+
+
+# The searches kept for neighbor_search, without their atoms: the atoms
+# refer to the entity through their parents, so would keep it alive
+_searches=weakref.WeakKeyDictionary()
+
+
+def neighbor_search(entity, bucket_size=10, cell_size=None):
+    """Returns a NeighborSearch of all atoms of an entity.
+
+    Making the NeighborSearch (e.g. building the KD tree) is the slow
+    part of a single search, so the KD tree (or grid) is kept with the
+    entity and used again by later calls for the same entity, for as long
+    as its atoms have not moved. This saves the work when several analyses
+    each look for neighbors in the same structure. Nothing is kept once
+    the entity itself is gone.
+
+    o entity - Structure, Model, Chain or Residue
+    o bucket_size, cell_size - as for NeighborSearch
+    """
+    atom_list=unfold_entities(entity, "A")
+    searches=_searches.setdefault(entity, {})
+    search=searches.get((bucket_size, cell_size))
+    if search is not None and numpy.array_equal(
+            search.coords, atom_coords(atom_list).astype("f")):
+        return search._with_atoms(atom_list)
+    search=NeighborSearch(atom_list, bucket_size, cell_size)
+    searches[(bucket_size, cell_size)]=search._with_atoms(None)
+    return search
+
 
 if __name__=="__main__":
 
@@ -18,7 +18,27 @@
 # Any maintainer of the Biopython code may change this notice
 # when appropriate.
 
-""" Access the PDB over the internet (e.g. to download structures). """
+""" Access the PDB over the internet (e.g. to download structures).
+
+Several entries are downloaded at once by a small pool of threads (see
+the workers argument of PDBList), so that keeping a local mirror up to
+date is not limited by the round trips to the server. Each file is first
+downloaded to a .part file next to its final location. An interrupted
+download is resumed from where it stopped if the server supports ranged
+requests (HTTP servers usually do, for FTP the file is fetched again),
+and only if the file has not changed on the server in the meantime.
+The size of the download is checked against the size given by the server,
+and the gzip checksum when the file is uncompressed, so that truncated or
+corrupt files do not end up in the local copy.
+
+The entries downloaded into the local PDB tree by the methods fetching
+many entries (including update_pdb) are recorded in a manifest file in
+the local PDB directory, with their size, the modification date given by
+the server and the weekly release they were last checked against. This
+lets update_pdb skip the entries it already brought up to date, and ask an
+HTTP server for a modified entry only if it changed since it was
+downloaded. retrieve_pdb_file does not use the manifest.
+"""
 
 from __future__ import print_function
 
@@ -26,10 +46,238 @@ import contextlib
 import gzip
 import os
 import shutil
+import tempfile
+import threading
 import urllib
+import urllib2
+import zlib
+import Queue
+from email.utils import formatdate
 from urllib2 import urlopen as _urlopen  # urllib made too many FTP conn's
 
 
+# Name of the manifest file in the local PDB directory
+MANIFEST_NAME = "pdblist_manifest.tsv"
+
+# Number of bytes read from the server at a time
+_CHUNK_SIZE = 64 * 1024
+
+# Number of downloaded entries after which the manifest is saved, so that
+# little is lost if a long download is killed
+_SAVE_INTERVAL = 100
+
+
+class _Manifest(object):
+    """Record of the entries downloaded to a local PDB copy (PRIVATE).
+
+    The file has one tab separated line per entry, giving the PDB code,
+    whether it is obsolete (0 or 1), the local file name and its size, the
+    Last-Modified date of the download from the server (or an empty
+    string), and the weekly release it was last checked against (or an
+    empty string). Changes are kept in memory until saved.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._entries = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+        if os.path.exists(filename):
+            with open(filename) as handle:
+                for line in handle:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) != 6:
+                        continue
+                    code, obsolete, path, size, modified, release = fields
+                    self._entries[code, obsolete == "1"] = \
+                        (path, int(size), modified, release)
+
+    def get(self, code, obsolete):
+        """Returns (file name, size, modified, release) or None."""
+        with self._lock:
+            return self._entries.get((code, bool(obsolete)))
+
+    def set(self, code, obsolete, path, size, modified, release):
+        with self._lock:
+            self._entries[code, bool(obsolete)] = \
+                (path, size, modified or "", release or "")
+            self._changes += 1
+
+    def save(self, min_changes=1):
+        """Writes the manifest, replacing the file in one step.
+
+        The file is only written if at least min_changes entries changed
+        since it was last saved.
+        """
+        with self._lock:
+            if not self._changes or self._changes < min_changes:
+                return
+            lines = ["%s\t%i\t%s\t%i\t%s\t%s\n"
+                     % (code, obsolete, path, size, modified, release)
+                     for (code, obsolete), (path, size, modified, release)
+                     in sorted(self._entries.items())]
+            folder = os.path.dirname(os.path.abspath(self.filename))
+            descriptor, temp_path = tempfile.mkstemp(dir=folder,
+                                                     prefix=".tmp")
+            try:
+                with os.fdopen(descriptor, "w") as handle:
+                    handle.writelines(lines)
+                if os.name == "nt" and os.path.exists(self.filename):
+                    # rename does not replace files on Windows
+                    os.remove(self.filename)
+                os.rename(temp_path, self.filename)
+            except (IOError, OSError):
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._changes = 0
+
+
+def _thread_map(function, items, workers):
+    """Returns [function(item) for item in items], using threads (PRIVATE).
+
+    At most workers calls are made at the same time.
+    """
+    results = [None] * len(items)
+    if workers is None or workers <= 1 or len(items) <= 1:
+        for i, item in enumerate(items):
+            results[i] = function(item)
+        return results
+    queue = Queue.Queue()
+    for i in range(len(items)):
+        queue.put(i)
+    errors = []
+
+    def work():
+        while not errors:
+            try:
+                i = queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[i] = function(items[i])
+            except BaseException as error:
+                # e.g. KeyboardInterrupt; stop the other threads too
+                errors.append(error)
+
+    threads = [threading.Thread(target=work)
+               for i in range(min(workers, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        # a timeout keeps the main thread responsive to Ctrl-C
+        while thread.is_alive():
+            thread.join(0.1)
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _download(url, filename, modified_since=None):
+    """Downloads a URL to filename + ".part" (PRIVATE).
+
+    An existing .part file is taken to be the start of the file, and only
+    the rest is requested, provided the Last-Modified date the server gave
+    for it was saved (in a .part.modified file). This date is sent as an
+    If-Range condition, so that a file changed since is sent in full. If
+    modified_since (a date as used in HTTP headers) is given and the server
+    says the file has not changed since then, None is returned. Otherwise
+    the size and the Last-Modified date (or None) of the file are returned.
+
+    Raises an IOError if fewer bytes were received than the server said
+    it would send. The .part file is kept, so that the download can be
+    resumed.
+    """
+    part = filename + ".part"
+    validator = part + ".modified"
+    last_modified = None
+    if os.path.exists(validator):
+        with open(validator) as handle:
+            last_modified = handle.read().strip()
+    offset = 0
+    if last_modified and os.path.exists(part):
+        offset = os.path.getsize(part)
+    request = urllib2.Request(url)
+    if offset:
+        request.add_header("Range", "bytes=%i-" % offset)
+        request.add_header("If-Range", last_modified)
+    if modified_since:
+        request.add_header("If-Modified-Since", modified_since)
+    try:
+        handle = _urlopen(request)
+    except urllib2.HTTPError as error:
+        if error.code == 304:
+            # Not modified
+            return None
+        if error.code == 416 and offset:
+            # The range does not fit the file, so start again
+            os.remove(part)
+            os.remove(validator)
+            return _download(url, filename, modified_since)
+        raise
+    with contextlib.closing(handle):
+        if offset and handle.getcode() != 206:
+            # The server ignored the range, or the file has changed, and
+            # sends the whole file
+            offset = 0
+        info = handle.info()
+        if not offset:
+            # Remember which version of the file this is, so that the
+            # download is only resumed if the file does not change
+            if info.get("Last-Modified"):
+                with open(validator, "w") as out:
+                    out.write(info.get("Last-Modified"))
+            elif os.path.exists(validator):
+                os.remove(validator)
+        length = info.get("Content-Length")
+        with open(part, "ab" if offset else "wb") as out:
+            while True:
+                data = handle.read(_CHUNK_SIZE)
+                if not data:
+                    break
+                out.write(data)
+        size = os.path.getsize(part)
+        if length is not None and size != offset + int(length):
+            raise IOError("Incomplete download of %s: %i of %i bytes"
+                          % (url, size, offset + int(length)))
+        if os.path.exists(validator):
+            os.remove(validator)
+        return size, info.get("Last-Modified")
+
+
+def _uncompress(archive, filename):
+    """Uncompresses a gzip file, checking its checksum (PRIVATE).
+
+    The file is written under a temporary name and renamed when complete.
+    On a checksum error the archive is removed, as it cannot be resumed.
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    descriptor, temp_path = tempfile.mkstemp(dir=folder, prefix=".tmp")
+    try:
+        #Can't use context manager with gzip.open until Python 2.7
+        gz = gzip.open(archive, 'rb')
+        try:
+            with os.fdopen(descriptor, 'wb') as out:
+                shutil.copyfileobj(gz, out)
+        finally:
+            gz.close()
+        if os.name == "nt" and os.path.exists(filename):
+            # rename does not replace files on Windows
+            os.remove(filename)
+        os.rename(temp_path, filename)
+    except (IOError, EOFError, zlib.error) as error:
+        os.remove(archive)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise IOError("Corrupt download %s: %s" % (archive, error))
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.remove(archive)
+
+
 class PDBList(object):
     """
     This class provides quick access to the structure lists on the
@@ -46,6 +294,10 @@ class PDBList(object):
     the proxy variable to your environment, e.g. in Unix:
     export HTTP_PROXY='http://realproxy.charite.de:888'
     (This can also be added to ~/.bashrc)
+
+    The methods fetching many entries download up to workers files
+    at the same time (default 4), and record the entries downloaded into
+    the local pdb tree in a manifest file (see MANIFEST_NAME) there.
     """
 
     PDB_REF = """
@@ -59,10 +311,12 @@ class PDBList(object):
     # just append PDB code to this, and then it works.
 
     def __init__(self, server='ftp://ftp.wwpdb.org', pdb=os.getcwd(),
-                 obsolete_pdb=None):
+                 obsolete_pdb=None, workers=4):
         """Initialize the class with the default server or a custom one."""
         self.pdb_server = server  # remote pdb server
         self.local_pdb = pdb  # local pdb file tree
+        self.workers = workers  # number of simultaneous downloads
+        self._manifest = None
 
         # local file tree for obsolete pdb files
         if obsolete_pdb:
@@ -105,12 +359,19 @@ class PDBList(object):
         drwxrwxr-x   2 1002     sysadmin     512 Oct 14 02:14 20031013
         -rw-r--r--   1 1002     sysadmin    1327 Mar 12  2001 README
         """
+        return self._get_status_lists(self._get_recent_release())
+
+    def _get_recent_release(self):
+        """Returns the name of the most recent weekly status directory (PRIVATE)."""
         url = self.pdb_server + '/pub/pdb/data/status/'
         with contextlib.closing(_urlopen(url)) as handle:
             recent = filter(str.isdigit,
                             (x.split()[-1] for x in handle.readlines())
                             )[-1]
+        return recent
 
+    def _get_status_lists(self, recent):
+        """Returns the added, modified and obsolete lists of a week (PRIVATE)."""
         path = self.pdb_server + '/pub/pdb/data/status/%s/' % (recent)
 
         # Retrieve the lists
@@ -180,6 +441,65 @@ class PDBList(object):
         @return: filename
         @rtype: string
         """
+        return self._retrieve(pdb_code, obsolete, pdir)
+
+    def download_pdb_files(self, pdb_codes, obsolete=False, pdir=None):
+        """Retrieves several PDB structure files at once.
+
+        The files are downloaded as with retrieve_pdb_file, using up to
+        workers simultaneous downloads. Returns the list of the file
+        names, with None for the entries which could not be downloaded.
+        """
+        return self._retrieve_all(pdb_codes, obsolete, pdir)
+
+    def _get_manifest(self):
+        """Returns the manifest of the downloaded entries (PRIVATE)."""
+        if self._manifest is None:
+            self._manifest = _Manifest(os.path.join(self.local_pdb,
+                                                    MANIFEST_NAME))
+        return self._manifest
+
+    def _retrieve_all(self, pdb_codes, obsolete=False, pdir=None,
+                      release=None):
+        """Retrieves PDB files in threads, printing the errors (PRIVATE).
+
+        Files put in the local PDB tree (i.e. without pdir) are recorded
+        in the manifest, which is saved every _SAVE_INTERVAL entries and
+        at the end.
+        """
+        manifest = None
+        if pdir is None:
+            manifest = self._get_manifest()
+
+        def retrieve(pdb_code):
+            try:
+                return self._retrieve(pdb_code, obsolete, pdir, release,
+                                      manifest)
+            except Exception:
+                print('error %s\n' % pdb_code)
+                # you can insert here some more log notes that
+                # something has gone wrong.
+                return None
+            finally:
+                if manifest is not None:
+                    manifest.save(_SAVE_INTERVAL)
+
+        try:
+            return _thread_map(retrieve, list(pdb_codes), self.workers)
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+    def _retrieve(self, pdb_code, obsolete=False, pdir=None, release=None,
+                  manifest=None):
+        """Retrieves a PDB file, see retrieve_pdb_file (PRIVATE).
+
+        If a manifest is given, the download is recorded in it. If a
+        release is given too, an existing file is kept only if the
+        manifest says it was checked against this release or a later one.
+        Otherwise it is downloaded again, unless the server says it was
+        not modified since it was downloaded.
+        """
         # Get the compressed PDB structure
         code = pdb_code.lower()
         archive_fn = "pdb%s.ent.gz" % code
@@ -196,29 +516,46 @@ class PDBList(object):
         else:  # Put in specified directory
             path = pdir
         if not os.access(path, os.F_OK):
-            os.makedirs(path)
+            try:
+                os.makedirs(path)
+            except OSError:
+                # another thread may have created it
+                if not os.path.isdir(path):
+                    raise
 
         filename = os.path.join(path, archive_fn)
         final_file = os.path.join(path, "pdb%s.ent" % code)  # (decompressed)
 
+        entry = None
+        if manifest is not None:
+            entry = manifest.get(code, obsolete)
+        modified_since = None
         # Skip download if the file already exists
-        if not self.overwrite:
-            if os.path.exists(final_file):
+        if not self.overwrite and os.path.exists(final_file):
+            if release is None or (entry is not None and entry[0] == final_file
+                                   and entry[3] >= release):
                 print("Structure exists: '%s' " % final_file)
                 return final_file
+            # Ask for the file only if it changed since it was downloaded
+            if entry is not None and entry[0] == final_file and entry[2]:
+                modified_since = entry[2]
+            else:
+                modified_since = formatdate(os.path.getmtime(final_file),
+                                            usegmt=True)
 
         # Retrieve the file
         print("Downloading PDB structure '%s'..." % pdb_code)
-        urllib.urlretrieve(url, filename)
-
-        # Uncompress the archive, delete when done
-        #Can't use context manager with gzip.open until Python 2.7
-        gz = gzip.open(filename, 'rb')
-        with open(final_file, 'wb') as out:
-            out.writelines(gz)
-        gz.close()
-        os.remove(filename)
-
+        result = _download(url, filename, modified_since)
+        if result is None:
+            print("Structure not modified: '%s' " % final_file)
+            modified = modified_since
+        else:
+            # Uncompress the archive, delete when done
+            _uncompress(filename + ".part", final_file)
+            modified = result[1]
+        if manifest is not None:
+            manifest.set(code, obsolete, final_file,
+                         os.path.getsize(final_file), modified, release)
         return final_file
 
     def update_pdb(self):
@@ -227,19 +564,19 @@ class PDBList(object):
         It gets the weekly lists of new and modified pdb entries and
         automatically downloads the according PDB files.
         You can call this module as a weekly cronjob.
+
+        Entries already in the local copy are downloaded again only if
+        they have not been checked against this week's lists before, and
+        (from an HTTP server) if they changed since they were downloaded.
         """
         assert os.path.isdir(self.local_pdb)
         assert os.path.isdir(self.obsolete_pdb)
 
-        new, modified, obsolete = self.get_recent_changes()
+        release = self._get_recent_release()
+        new, modified, obsolete = self._get_status_lists(release)
 
-        for pdb_code in new + modified:
-            try:
-                self.retrieve_pdb_file(pdb_code)
-            except Exception:
-                print('error %s\n' % pdb_code)
-                # you can insert here some more log notes that
-                # something has gone wrong.
+        # Entries already brought up to date for this release are skipped
+        self._retrieve_all(new + modified, release=release)
 
         # Move the obsolete files to a special folder
         for pdb_code in obsolete:
@@ -271,8 +608,7 @@ class PDBList(object):
         given).
         """
         entries = self.get_all_entries()
-        for pdb_code in entries:
-            self.retrieve_pdb_file(pdb_code)
+        self._retrieve_all(entries)
         # Write the list
         if listfile:
             with open(listfile, 'w') as outfile:
@@ -286,8 +622,7 @@ class PDBList(object):
         given).
         """
         entries = self.get_all_obsolete()
-        for pdb_code in entries:
-            self.retrieve_pdb_file(pdb_code, obsolete=1)
+        self._retrieve_all(entries, obsolete=True)
 
         # Write the list
         if listfile:
@@ -28,13 +28,111 @@ from Bio.PDB.parse_pdb_header import _parse_pdb_header_list
 # If PDB spec says "COLUMNS 18-20" this means line[17:20]
 
 
+def _decode_column(lines, start, end, kind):
+    """Decode the numbers in columns start to end of all lines (PRIVATE).
+
+    Returns a list of the numbers of type kind (float or int), and either
+    None if all could be decoded, or a list of flags marking the lines with
+    an invalid or missing number (set to zero in the list).
+    """
+    fields = [line[start:end] for line in lines]
+    try:
+        return list(map(kind, fields)), None
+    except ValueError:
+        pass
+    # Find the offending lines one at a time
+    values = []
+    bad = []
+    for field in fields:
+        try:
+            values.append(kind(field))
+            bad.append(False)
+        except ValueError:
+            values.append(0)
+            bad.append(True)
+    return values, bad
+
+
+def _decode_coordinates(lines):
+    """Decode the coordinates of all ATOM and HETATM lines (PRIVATE).
+
+    Returns an N x 3 array of single precision floats, and None or a list
+    of flags marking the lines with invalid or missing coordinates.
+    """
+    try:
+        # Split the three 8 character columns as a fixed width array
+        fields = numpy.array([line[30:54] for line in lines], "S24")
+        values = list(map(float, fields.view("S8").tolist()))
+        return numpy.array(values, "f").reshape(len(lines), 3), None
+    except (ValueError, UnicodeError):
+        pass
+    coords = numpy.zeros((len(lines), 3), "f")
+    bad = []
+    for i, line in enumerate(lines):
+        try:
+            coords[i] = (float(line[30:38]), float(line[38:46]),
+                         float(line[46:54]))
+            bad.append(False)
+        except ValueError:
+            bad.append(True)
+    return coords, bad
+
+
+def _decode_anisou(lines):
+    """Decode the anisotropic B factors of all ANISOU lines (PRIVATE).
+
+    Returns an N x 6 array of single precision floats, or None if any of
+    the lines could not be decoded (these are then decoded one at a time).
+    """
+    try:
+        # Line up the six columns (the third is one character narrower)
+        # as fixed width 7 character fields
+        fields = numpy.array([line[28:42] + " " + line[43:70]
+                              for line in lines], "S42")
+        values = list(map(float, fields.view("S7").tolist()))
+    except (ValueError, UnicodeError):
+        return None
+    # U's are scaled by 10^4
+    anisou = numpy.array(values, "f").reshape(len(lines), 6) / 10000.0
+    return anisou.astype("f")
+
+
+def _make_atom_filter(chains=None, atom_names=None, hetatm=True, water=True):
+    """Return a function deciding which atoms to parse, or None for all (PRIVATE).
+
+    The function is called with the chain id, atom name (without spaces) and
+    hetero flag (" ", "H" or "W") of an atom. Used by the PDB and mmCIF
+    parsers, see the PDBParser for the meaning of the arguments.
+    """
+    if chains is None and atom_names is None and hetatm and water:
+        return None
+    if chains is not None:
+        chains = frozenset(chains)
+    if atom_names is not None:
+        atom_names = frozenset(atom_names)
+
+    def keep_atom(chain_id, name, hetero_flag):
+        if chains is not None and chain_id not in chains:
+            return False
+        if atom_names is not None and name not in atom_names:
+            return False
+        if hetero_flag == "H":
+            return hetatm
+        if hetero_flag == "W":
+            return water
+        return True
+
+    return keep_atom
+
+
 class PDBParser(object):
     """
     Parse a PDB file and return a Structure object.
     """
 
     def __init__(self, PERMISSIVE=True, get_header=False,
-                 structure_builder=None, QUIET=False):
+                 structure_builder=None, QUIET=False, models=None,
+                 chains=None, atom_names=None, hetatm=True, water=True):
         """
         The PDB parser call a number of standard methods in an aggregated
         StructureBuilder object. Normally this object is instanciated by the
@@ -53,6 +151,25 @@ class PDBParser(object):
         o QUIET - Evaluated as a Boolean. If true, warnings issued in constructing
         the SMCRA data will be suppressed. If false (DEFAULT), they will be shown.
         These warnings might be indicative of problems in the PDB file!
+
+        The remaining arguments restrict the atoms which are parsed. Atoms
+        left out are skipped while reading the file, so no objects are made
+        for them (nor for residues or chains without any atoms left).
+        By default all atoms are parsed.
+
+        o models - list of the ids of the models to parse, counting from 0
+        as in structure[0]. The models keep their ids.
+
+        o chains - list of the ids of the chains to parse, e.g. ["A"]
+
+        o atom_names - list of the names of the atoms to parse, e.g. ["CA"]
+        for a CA trace. Spaces are stripped from the names, as for the ids of
+        the atoms.
+
+        o hetatm - Evaluated as a Boolean. If false, HETATM records (other
+        than waters) are skipped.
+
+        o water - Evaluated as a Boolean. If false, waters are skipped.
         """
         if structure_builder is not None:
             self.structure_builder = structure_builder
@@ -63,6 +180,11 @@ class PDBParser(object):
         self.line_counter = 0
         self.PERMISSIVE = bool(PERMISSIVE)
         self.QUIET = bool(QUIET)
+        if models is not None:
+            models = frozenset(models)
+        self.models = models
+        self._atom_filter = _make_atom_filter(chains, atom_names,
+                                              bool(hetatm), bool(water))
 
     # Public methods
 
@@ -131,6 +253,42 @@ class PDBParser(object):
 
     def _parse_coordinates(self, coords_trailer):
         "Parse the atomic data in the PDB file."
+        # The atomic data ends with an END or CONECT record
+        end = len(coords_trailer)
+        atom_lines = []
+        anisou_lines = []
+        keep = None
+        if self.models is not None or self._atom_filter is not None:
+            # Only the atoms passing the filters are decoded and parsed
+            keep = self._filter_lines(coords_trailer)
+        for i in range(0, len(coords_trailer)):
+            line = coords_trailer[i]
+            record_type = line[0:6]
+            if record_type == "ATOM  " or record_type == "HETATM":
+                if keep is None or keep[i]:
+                    atom_lines.append(line)
+            elif record_type == "ANISOU":
+                if keep is None or keep[i]:
+                    anisou_lines.append(line)
+            elif record_type == "END   " or record_type == "CONECT":
+                end = i
+                break
+        # Decode the numbers of all atoms at once
+        coords, bad_coords = _decode_coordinates(atom_lines)
+        occupancies, bad_occupancies = _decode_column(atom_lines, 54, 60, float)
+        bfactors, bad_bfactors = _decode_column(atom_lines, 60, 66, float)
+        serial_numbers, bad_serial_numbers = _decode_column(atom_lines, 6, 11, int)
+        resseqs, bad_resseqs = _decode_column(atom_lines, 22, 26, int)
+        coords = list(coords)
+        anisous = _decode_anisou(anisou_lines)
+        if anisous is not None:
+            anisous = list(anisous)
+        atom_index = 0
+        anisou_index = 0
+        # Atoms of the current residue, added in one go: the arguments of
+        # init_atom, their line numbers, and any ANISOU, SIGUIJ and SIGATM
+        # records following them
+        pending = ([], [], [])
         local_line_counter = 0
         structure_builder = self.structure_builder
         current_model_id = 0
@@ -140,14 +298,28 @@ class PDBParser(object):
         current_segid = None
         current_residue_id = None
         current_resname = None
-        for i in range(0, len(coords_trailer)):
+        for i in range(0, end):
             line = coords_trailer[i]
             record_type = line[0:6]
             global_line_counter = self.line_counter + local_line_counter + 1
-            structure_builder.set_line_counter(global_line_counter)
+            if keep is not None and not keep[i]:
+                # An atom left out (along with its ANISOU etc records),
+                # which may still open a model
+                if (record_type == "ATOM  " or record_type == "HETATM") \
+                        and not model_open:
+                    if self.models is None or current_model_id in self.models:
+                        structure_builder.set_line_counter(global_line_counter)
+                        structure_builder.init_model(current_model_id)
+                    current_model_id += 1
+                    model_open = 1
+                local_line_counter += 1
+                continue
             if record_type == "ATOM  " or record_type == "HETATM":
+                k = atom_index
+                atom_index += 1
                 # Initialize the Model - there was no explicit MODEL record
                 if not model_open:
+                    structure_builder.set_line_counter(global_line_counter)
                     structure_builder.init_model(current_model_id)
                     current_model_id += 1
                     model_open = 1
@@ -164,11 +336,14 @@ class PDBParser(object):
                 altloc = line[16]
                 resname = line[17:20]
                 chainid = line[21]
-                try:
-                    serial_number = int(line[6:11])
-                except:
+                if bad_serial_numbers and bad_serial_numbers[k]:
                     serial_number = 0
-                resseq = int(line[22:26].split()[0])  # sequence identifier
+                else:
+                    serial_number = serial_numbers[k]
+                if bad_resseqs and bad_resseqs[k]:
+                    resseq = int(line[22:26].split()[0])  # sequence identifier
+                else:
+                    resseq = resseqs[k]
                 icode = line[26]  # insertion code
                 if record_type == "HETATM":  # hetero atom flag
                     if resname == "HOH" or resname == "WAT":
@@ -179,36 +354,38 @@ class PDBParser(object):
                     hetero_flag = " "
                 residue_id = (hetero_flag, resseq, icode)
                 # atomic coordinates
-                try:
-                    x = float(line[30:38])
-                    y = float(line[38:46])
-                    z = float(line[46:54])
-                except:
+                if bad_coords and bad_coords[k]:
                     # Should we allow parsing to continue in permissive mode?
                     # If so, what coordinates should we default to?  Easier to abort!
                     raise PDBConstructionException("Invalid or missing coordinate(s) at line %i."
                                                    % global_line_counter)
-                coord = numpy.array((x, y, z), "f")
+                coord = coords[k]
                 # occupancy & B factor
-                try:
-                    occupancy = float(line[54:60])
-                except:
+                if bad_occupancies and bad_occupancies[k]:
+                    self._add_atoms(pending, global_line_counter)
                     self._handle_PDB_exception("Invalid or missing occupancy",
                                                global_line_counter)
                     occupancy = None # Rather than arbitrary zero or one
-                try:
-                    bfactor = float(line[60:66])
-                except:
+                else:
+                    occupancy = occupancies[k]
+                if bad_bfactors and bad_bfactors[k]:
+                    self._add_atoms(pending, global_line_counter)
                     self._handle_PDB_exception("Invalid or missing B factor",
                                                global_line_counter)
                     bfactor = 0.0  # The PDB use a default of zero if the data is missing
+                else:
+                    bfactor = bfactors[k]
                 segid = line[72:76]
                 element = line[76:78].strip()
                 if current_segid != segid:
+                    self._add_atoms(pending, global_line_counter)
                     current_segid = segid
+                    structure_builder.set_line_counter(global_line_counter)
                     structure_builder.init_seg(current_segid)
                 if current_chain_id != chainid:
+                    self._add_atoms(pending, global_line_counter)
                     current_chain_id = chainid
+                    structure_builder.set_line_counter(global_line_counter)
                     structure_builder.init_chain(current_chain_id)
                     current_residue_id = residue_id
                     current_resname = resname
@@ -217,62 +394,172 @@ class PDBParser(object):
                     except PDBConstructionException as message:
                         self._handle_PDB_exception(message, global_line_counter)
                 elif current_residue_id != residue_id or current_resname != resname:
+                    self._add_atoms(pending, global_line_counter)
                     current_residue_id = residue_id
                     current_resname = resname
+                    structure_builder.set_line_counter(global_line_counter)
                     try:
                         structure_builder.init_residue(resname, hetero_flag, resseq, icode)
                     except PDBConstructionException as message:
                         self._handle_PDB_exception(message, global_line_counter)
-                # init atom
-                try:
-                    structure_builder.init_atom(name, coord, bfactor, occupancy, altloc,
-                                                fullname, serial_number, element)
-                except PDBConstructionException as message:
-                    self._handle_PDB_exception(message, global_line_counter)
+                # init atom (once the residue is complete)
+                pending[0].append((name, coord, bfactor, occupancy, altloc,
+                                   fullname, serial_number, element))
+                pending[1].append(global_line_counter)
             elif record_type == "ANISOU":
-                anisou = map(float, (line[28:35], line[35:42], line[43:49],
+                if anisous is not None:
+                    anisou_array = anisous[anisou_index]
+                    anisou_index += 1
+                else:
+                    anisou = map(float, (line[28:35], line[35:42], line[43:49],
+                                         line[49:56], line[56:63], line[63:70]))
+                    # U's are scaled by 10^4
+                    anisou_array = (numpy.array(anisou, "f") / 10000.0).astype("f")
+                self._set_atom_data(pending, "set_anisou", anisou_array,
+                                    global_line_counter)
+            elif record_type == "SIGUIJ":
+                # standard deviation of anisotropic B factor
+                siguij = map(float, (line[28:35], line[35:42], line[42:49],
                                      line[49:56], line[56:63], line[63:70]))
-                # U's are scaled by 10^4
-                anisou_array = (numpy.array(anisou, "f") / 10000.0).astype("f")
-                structure_builder.set_anisou(anisou_array)
+                # U sigma's are scaled by 10^4
+                siguij_array = (numpy.array(siguij, "f") / 10000.0).astype("f")
+                self._set_atom_data(pending, "set_siguij", siguij_array,
+                                    global_line_counter)
+            elif record_type == "SIGATM":
+                # standard deviation of atomic positions
+                sigatm = map(float, (line[30:38], line[38:45], line[46:54],
+                                     line[54:60], line[60:66]))
+                sigatm_array = numpy.array(sigatm, "f")
+                self._set_atom_data(pending, "set_sigatm", sigatm_array,
+                                    global_line_counter)
             elif record_type == "MODEL ":
+                self._add_atoms(pending, global_line_counter)
+                structure_builder.set_line_counter(global_line_counter)
                 try:
                     serial_num = int(line[10:14])
                 except:
                     self._handle_PDB_exception("Invalid or missing model serial number",
                                                global_line_counter)
                     serial_num = 0
-                structure_builder.init_model(current_model_id, serial_num)
+                if self.models is None or current_model_id in self.models:
+                    structure_builder.init_model(current_model_id, serial_num)
                 current_model_id += 1
                 model_open = 1
                 current_chain_id = None
                 current_residue_id = None
-            elif record_type == "END   " or record_type == "CONECT":
-                # End of atomic data, return the trailer
-                self.line_counter += local_line_counter
-                return coords_trailer[local_line_counter:]
             elif record_type == "ENDMDL":
+                self._add_atoms(pending, global_line_counter)
                 model_open = 0
                 current_chain_id = None
                 current_residue_id = None
-            elif record_type == "SIGUIJ":
-                # standard deviation of anisotropic B factor
-                siguij = map(float, (line[28:35], line[35:42], line[42:49],
-                                     line[49:56], line[56:63], line[63:70]))
-                # U sigma's are scaled by 10^4
-                siguij_array = (numpy.array(siguij, "f") / 10000.0).astype("f")
-                structure_builder.set_siguij(siguij_array)
-            elif record_type == "SIGATM":
-                # standard deviation of atomic positions
-                sigatm = map(float, (line[30:38], line[38:45], line[46:54],
-                                     line[54:60], line[60:66]))
-                sigatm_array = numpy.array(sigatm, "f")
-                structure_builder.set_sigatm(sigatm_array)
             local_line_counter += 1
+        self._add_atoms(pending, self.line_counter + local_line_counter)
+        if end < len(coords_trailer):
+            # End of atomic data, return the trailer
+            self.line_counter += local_line_counter
+            return coords_trailer[local_line_counter:]
         # EOF (does not end in END or CONECT)
         self.line_counter = self.line_counter + local_line_counter
         return []
 
+    def _filter_lines(self, coords_trailer):
+        """Flag the lines of the atoms passing the filters (PRIVATE).
+
+        Returns a list with a flag for each line, which is false for the
+        ATOM and HETATM records left out, and for the ANISOU, SIGUIJ and
+        SIGATM records following them.
+        """
+        models = self.models
+        atom_filter = self._atom_filter
+        keep = []
+        current_model_id = 0
+        model_open = 0
+        keep_model = True
+        keep_atom = True
+        for line in coords_trailer:
+            record_type = line[0:6]
+            if record_type == "ATOM  " or record_type == "HETATM":
+                if not model_open:
+                    keep_model = models is None or current_model_id in models
+                    current_model_id += 1
+                    model_open = 1
+                keep_atom = keep_model
+                if keep_atom and atom_filter is not None:
+                    fullname = line[12:16]
+                    split_list = fullname.split()
+                    if len(split_list) != 1:
+                        name = fullname
+                    else:
+                        name = split_list[0]
+                    if record_type == "HETATM":
+                        if line[17:20] == "HOH" or line[17:20] == "WAT":
+                            hetero_flag = "W"
+                        else:
+                            hetero_flag = "H"
+                    else:
+                        hetero_flag = " "
+                    keep_atom = atom_filter(line[21], name, hetero_flag)
+                keep.append(keep_atom)
+            elif record_type == "ANISOU" or record_type == "SIGUIJ" \
+                    or record_type == "SIGATM":
+                keep.append(keep_atom)
+            else:
+                if record_type == "MODEL ":
+                    keep_model = models is None or current_model_id in models
+                    current_model_id += 1
+                    model_open = 1
+                elif record_type == "ENDMDL":
+                    model_open = 0
+                elif record_type == "END   " or record_type == "CONECT":
+                    break
+                keep.append(True)
+        return keep
+
+    def _set_atom_data(self, pending, method, array, line_counter):
+        """Set the ANISOU, SIGUIJ or SIGATM data of the last atom (PRIVATE)."""
+        if pending[0]:
+            pending[2].append((len(pending[0]) - 1, method, array,
+                               line_counter))
+        else:
+            self.structure_builder.set_line_counter(line_counter)
+            getattr(self.structure_builder, method)(array)
+
+    def _add_atoms(self, pending, line_counter):
+        """Add the pending atoms of the current residue (PRIVATE).
+
+        The StructureBuilder adds them in one go if it can, otherwise they
+        are added one at a time. The line counter is then set back to the
+        line being parsed.
+        """
+        atom_args, atom_line_counters, atom_data = pending
+        if not atom_args:
+            return
+        structure_builder = self.structure_builder
+        atoms = None
+        if hasattr(structure_builder, "init_atoms"):
+            atoms = structure_builder.init_atoms(atom_args)
+        if atoms is not None:
+            for index, method, array, data_line_counter in atom_data:
+                getattr(atoms[index], method)(array)
+        else:
+            data = {}
+            for index, method, array, data_line_counter in atom_data:
+                data.setdefault(index, []).append((method, array,
+                                                   data_line_counter))
+            for index, args in enumerate(atom_args):
+                atom_line_counter = atom_line_counters[index]
+                structure_builder.set_line_counter(atom_line_counter)
+                try:
+                    structure_builder.init_atom(*args)
+                except PDBConstructionException as message:
+                    self._handle_PDB_exception(message, atom_line_counter)
+                for method, array, data_line_counter in data.get(index, ()):
+                    structure_builder.set_line_counter(data_line_counter)
+                    getattr(structure_builder, method)(array)
+        structure_builder.set_line_counter(line_counter)
+        for values in pending:
+            del values[:]
+
     def _handle_PDB_exception(self, message, line_counter):
         """
         This method catches an exception that occurs in the StructureBuilder
@@ -52,11 +52,14 @@ from __future__ import print_function
 
 import warnings
 
+import numpy
+
 from Bio.Alphabet import generic_protein
 from Bio.Data import SCOPData
 from Bio.Seq import Seq
+from Bio.PDB.AtomArray import atom_coords
 from Bio.PDB.PDBExceptions import PDBException
-from Bio.PDB.Vector import calc_dihedral, calc_angle
+from Bio.PDB.Vector import calc_dihedrals, calc_angles
 
 
 standard_aa_names=["ALA", "CYS", "ASP", "GLU", "PHE", "GLY", "HIS", "ILE", "LYS",
@@ -186,6 +189,77 @@ def is_aa(residue, standard=False):
         return residue in SCOPData.protein_letters_3to1
 
 
+def calc_phi_psi(n, ca, c):
+    """Return arrays of the phi and psi angles of a backbone.
+
+    The arguments are arrays of the N, CA and C coordinates of consecutive
+    residues, with NaN for missing atoms (see get_backbone_coords). These
+    can be Lx3 arrays for one polypeptide, or have extra leading dimensions,
+    e.g. MxLx3 arrays for the same polypeptide in M models, to do all of
+    them at once. The angles are NaN where they cannot be calculated, like
+    phi of the first and psi of the last residue.
+    """
+    n=numpy.asarray(n, "d")
+    ca=numpy.asarray(ca, "d")
+    c=numpy.asarray(c, "d")
+    phi=numpy.empty(n.shape[:-1])
+    psi=numpy.empty(n.shape[:-1])
+    phi[..., :1]=numpy.nan
+    psi[..., -1:]=numpy.nan
+    phi[..., 1:]=calc_dihedrals(c[..., :-1, :], n[..., 1:, :], ca[..., 1:, :],
+                                c[..., 1:, :])
+    psi[..., :-1]=calc_dihedrals(n[..., :-1, :], ca[..., :-1, :],
+                                 c[..., :-1, :], n[..., 1:, :])
+    return phi, psi
+
+
+def calc_tau(ca):
+    """Return an array of the tau torsion angles of 4 consecutive CA atoms.
+
+    The argument is an array of CA coordinates as for calc_phi_psi, and
+    there is one angle less than in get_tau_list for each three CA atoms.
+    """
+    ca=numpy.asarray(ca, "d")
+    return calc_dihedrals(ca[..., :-3, :], ca[..., 1:-2, :], ca[..., 2:-1, :],
+                          ca[..., 3:, :])
+
+
+def calc_theta(ca):
+    """Return an array of the theta angles of 3 consecutive CA atoms.
+
+    The argument is an array of CA coordinates as for calc_phi_psi.
+    """
+    ca=numpy.asarray(ca, "d")
+    return calc_angles(ca[..., :-2, :], ca[..., 1:-1, :], ca[..., 2:, :])
+
+
+def _residue_coords(residues, name):
+    """Return an array of the coordinates of an atom of residues (PRIVATE).
+
+    Residues without the atom get NaN coordinates.
+    """
+    atoms=[_get_atom(res, name) for res in residues]
+    present=numpy.array([atom is not None for atom in atoms], bool)
+    coords=numpy.empty((len(atoms), 3))
+    coords.fill(numpy.nan)
+    if present.any():
+        coords[present]=atom_coords([atom for atom in atoms
+                                     if atom is not None])
+    return coords
+
+
+def _get_atom(residue, name):
+    """Return the named atom of a residue, or None if missing (PRIVATE)."""
+    if residue.has_id(name):
+        return residue[name]
+    return None
+
+
+def _as_list(angles):
+    """Return a list of the angles, with None for NaN (PRIVATE)."""
+    return [None if angle!=angle else float(angle) for angle in angles]
+
+
 class Polypeptide(list):
     """A polypeptide is simply a list of L{Residue} objects."""
     def get_ca_list(self):
@@ -200,46 +274,24 @@ class Polypeptide(list):
             ca_list.append(ca)
         return ca_list
 
+    def get_backbone_coords(self):
+        """Return the coordinates of the backbone N, CA and C atoms.
+
+        Returns three Lx3 arrays for the L residues, with NaN coordinates
+        for missing atoms, as used by calc_phi_psi.
+        """
+        return (_residue_coords(self, "N"), _residue_coords(self, "CA"),
+                _residue_coords(self, "C"))
+
     def get_phi_psi_list(self):
-        """Return the list of phi/psi dihedral angles."""
-        ppl=[]
-        lng=len(self)
-        for i in range(0, lng):
-            res=self[i]
-            try:
-                n=res['N'].get_vector()
-                ca=res['CA'].get_vector()
-                c=res['C'].get_vector()
-            except:
-                # Some atoms are missing
-                # Phi/Psi cannot be calculated for this residue
-                ppl.append((None, None))
-                res.xtra["PHI"]=None
-                res.xtra["PSI"]=None
-                continue
-            # Phi
-            if i>0:
-                rp=self[i-1]
-                try:
-                    cp=rp['C'].get_vector()
-                    phi=calc_dihedral(cp, n, ca, c)
-                except:
-                    phi=None
-            else:
-                # No phi for residue 0!
-                phi=None
-            # Psi
-            if i<(lng-1):
-                rn=self[i+1]
-                try:
-                    nn=rn['N'].get_vector()
-                    psi=calc_dihedral(n, ca, c, nn)
-                except:
-                    psi=None
-            else:
-                # No psi for last residue!
-                psi=None
-            ppl.append((phi, psi))
+        """Return the list of phi/psi dihedral angles.
+
+        Angles which cannot be calculated, e.g. because atoms are missing,
+        are None. Use calc_phi_psi with get_backbone_coords to get arrays.
+        """
+        phi, psi=calc_phi_psi(*self.get_backbone_coords())
+        ppl=list(zip(_as_list(phi), _as_list(psi)))
+        for res, (phi, psi) in zip(self, ppl):
             # Add Phi/Psi to xtra dict of residue
             res.xtra["PHI"]=phi
             res.xtra["PSI"]=psi
@@ -248,29 +300,19 @@ class Polypeptide(list):
     def get_tau_list(self):
         """List of tau torsions angles for all 4 consecutive Calpha atoms."""
         ca_list=self.get_ca_list()
-        tau_list=[]
-        for i in range(0, len(ca_list)-3):
-            atom_list = (ca_list[i], ca_list[i+1], ca_list[i+2], ca_list[i+3])
-            v1, v2, v3, v4 = [a.get_vector() for a in atom_list]
-            tau=calc_dihedral(v1, v2, v3, v4)
-            tau_list.append(tau)
+        tau_list=_as_list(calc_tau(atom_coords(ca_list)))
+        for ca, tau in zip(ca_list[2:], tau_list):
             # Put tau in xtra dict of residue
-            res=ca_list[i+2].get_parent()
-            res.xtra["TAU"]=tau
+            ca.get_parent().xtra["TAU"]=tau
         return tau_list
 
     def get_theta_list(self):
         """List of theta angles for all 3 consecutive Calpha atoms."""
-        theta_list=[]
         ca_list=self.get_ca_list()
-        for i in range(0, len(ca_list)-2):
-            atom_list = (ca_list[i], ca_list[i+1], ca_list[i+2])
-            v1, v2, v3 = [a.get_vector() for a in atom_list]
-            theta=calc_angle(v1, v2, v3)
-            theta_list.append(theta)
-            # Put tau in xtra dict of residue
-            res=ca_list[i+1].get_parent()
-            res.xtra["THETA"]=theta
+        theta_list=_as_list(calc_theta(atom_coords(ca_list)))
+        for ca, theta in zip(ca_list[1:], theta_list):
+            # Put theta in xtra dict of residue
+            ca.get_parent().xtra["THETA"]=theta
         return theta_list
 
     def get_sequence(self):
@@ -327,6 +369,48 @@ class _PPBuilder:
             # not a standard AA so skip
             return False
 
+    def _connected_pairs(self, pairs):
+        """Check which pairs of consecutive residues are connected (PRIVATE).
+
+        Returns a list of booleans. Subclasses can test all the pairs at
+        once here, instead of one pair at a time in _is_connected.
+        """
+        is_connected=self._is_connected
+        return [is_connected(prev_res, next_res) for prev_res, next_res in pairs]
+
+    def _close_pairs(self, pairs, prev_name, next_name, builder_class, methods):
+        """Test the distance between two atoms of many residue pairs (PRIVATE).
+
+        The distances between the ordered atoms are calculated in one go,
+        and the pairs with a disordered atom are left to _is_connected.
+        This is skipped if a subclass has overridden one of the methods
+        used to test a single pair.
+        """
+        for name in methods:
+            if getattr(self.__class__, name)!=getattr(builder_class, name):
+                return _PPBuilder._connected_pairs(self, pairs)
+        connected=[False]*len(pairs)
+        index=[]
+        prev_atoms=[]
+        next_atoms=[]
+        for i, (prev_res, next_res) in enumerate(pairs):
+            p=_get_atom(prev_res, prev_name)
+            n=_get_atom(next_res, next_name)
+            if p is None or n is None:
+                continue
+            if p.is_disordered() or n.is_disordered():
+                connected[i]=self._is_connected(prev_res, next_res)
+            else:
+                index.append(i)
+                prev_atoms.append(p)
+                next_atoms.append(n)
+        if index:
+            diff=atom_coords(prev_atoms)-atom_coords(next_atoms)
+            close=numpy.sqrt((diff*diff).sum(axis=1))<self.radius
+            for i, value in zip(index, close):
+                connected[i]=bool(value)
+        return connected
+
     def build_peptides(self, entity, aa_only=1):
         """Build and return a list of Polypeptide objects.
 
@@ -336,7 +420,6 @@ class _PPBuilder:
         @param aa_only: if 1, the residue needs to be a standard AA
         @type aa_only: int
         """
-        is_connected=self._is_connected
         accept=self._accept
         level=entity.get_level()
         # Decide which entity we are dealing with
@@ -351,29 +434,27 @@ class _PPBuilder:
             raise PDBException("Entity should be Structure, Model or Chain.")
         pp_list=[]
         for chain in chain_list:
-            chain_it=iter(chain)
-            try:
-                prev_res = next(chain_it)
-                while not accept(prev_res, aa_only):
-                    prev_res = next(chain_it)
-            except StopIteration:
-                #No interesting residues at all in this chain
-                continue
+            residues=chain.get_list()
+            accepted=[accept(res, aa_only) for res in residues]
+            # Test the connectivity of all the candidate pairs at once
+            index=[i for i in range(len(residues)-1)
+                   if accepted[i] and accepted[i+1]]
+            connected=[False]*len(residues)
+            pairs=[(residues[i], residues[i+1]) for i in index]
+            for i, value in zip(index, self._connected_pairs(pairs)):
+                connected[i]=value
             pp=None
-            for next_res in chain_it:
-                if accept(prev_res, aa_only) \
-                and accept(next_res, aa_only) \
-                and is_connected(prev_res, next_res):
+            for i in range(len(residues)-1):
+                if connected[i]:
                     if pp is None:
                         pp=Polypeptide()
-                        pp.append(prev_res)
+                        pp.append(residues[i])
                         pp_list.append(pp)
-                    pp.append(next_res)
+                    pp.append(residues[i+1])
                 else:
                     #Either too far apart, or one of the residues is unwanted.
                     #End the current peptide
                     pp=None
-                prev_res=next_res
         return pp_list
 
 
@@ -382,6 +463,10 @@ class CaPPBuilder(_PPBuilder):
     def __init__(self, radius=4.3):
         _PPBuilder.__init__(self, radius)
 
+    def _connected_pairs(self, pairs):
+        return self._close_pairs(pairs, "CA", "CA", CaPPBuilder,
+                                 ["_is_connected"])
+
     def _is_connected(self, prev_res, next_res):
         for r in [prev_res, next_res]:
             if not r.has_id("CA"):
@@ -409,6 +494,10 @@ class PPBuilder(_PPBuilder):
     def __init__(self, radius=1.8):
         _PPBuilder.__init__(self, radius)
 
+    def _connected_pairs(self, pairs):
+        return self._close_pairs(pairs, "C", "N", PPBuilder,
+                                 ["_is_connected", "_test_dist"])
+
     def _is_connected(self, prev_res, next_res):
         if not prev_res.has_id("C"):
             return False
@@ -48,6 +48,7 @@ import numpy
 
 from Bio.PDB import Selection
 from Bio.PDB.AbstractPropertyMap import AbstractPropertyMap
+from Bio.PDB.AtomArray import atom_coords
 from Bio.PDB.Polypeptide import is_aa
 
 
@@ -116,13 +117,11 @@ def residue_depth(residue, surface):
     Return average distance to surface for all
     atoms in a residue, ie. the residue depth.
     """
-    atom_list=residue.get_unpacked_list()
-    length=len(atom_list)
-    d=0
-    for atom in atom_list:
-        coord=atom.get_coord()
-        d=d+min_dist(coord, surface)
-    return d/length
+    coords=atom_coords(residue.get_unpacked_list())
+    # squared distances of all atoms to all surface points at once
+    d=surface[numpy.newaxis, :, :]-coords[:, numpy.newaxis, :]
+    d2=numpy.sum(d*d, 2)
+    return numpy.sqrt(d2.min(1)).sum()/len(coords)
 
 
 def ca_depth(residue, surface):
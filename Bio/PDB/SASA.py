@@ -0,0 +1,298 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Solvent accessible surface area calculation (Shrake-Rupley method).
+
+Unlike NACCESS, DSSP and MSMS (see NACCESS.py, DSSP.py and
+ResidueDepth.py) this needs no external program. Each atom is represented
+by a sphere of its van der Waals radius plus the probe radius, and a set of
+points evenly spread over the sphere. The accessible surface area of an
+atom is the area of its sphere times the fraction of the points not inside
+the sphere of another atom:
+
+Shrake A, Rupley JA. Environment and exposure to solvent of protein atoms.
+Lysozyme and insulin. J Mol Biol 1973; 79: 351-371.
+
+The atoms whose spheres overlap are found with the KD tree, and the points
+of all the atoms are tested against their neighbors with array operations.
+
+ShrakeRupley and ShrakeRupley_atomic map the residues and atoms of a model
+to their accessible surface areas (in square Angstrom), like NACCESS and
+NACCESS_atomic:
+
+>>> from Bio.PDB import PDBParser
+>>> from Bio.PDB.SASA import ShrakeRupley
+>>> structure = PDBParser().get_structure("1A8O", "PDB/1A8O.pdb")
+>>> sasa = ShrakeRupley(structure[0])
+>>> print("%0.1f" % sasa[("A", 152)])
+140.8
+>>> residue, area = list(sasa)[0]
+>>> print("%s %0.1f" % (residue.get_resname(), area))
+MSE 73.2
+
+The calc_sasa function works on arrays of coordinates and radii, and
+calc_sasa_many does many structures at once, optionally shared out over
+several processes.
+"""
+
+from __future__ import print_function
+
+from math import pi
+
+import numpy
+
+from Bio.KDTree import KDTree
+
+from Bio.PDB.AbstractPropertyMap import AbstractResiduePropertyMap
+from Bio.PDB.AbstractPropertyMap import AbstractAtomPropertyMap
+from Bio.PDB.AtomArray import atom_coords
+from Bio.PDB.PDBExceptions import PDBException
+
+
+# Van der Waals radii (in Angstrom) of the elements, from
+# Bondi A. van der Waals volumes and radii. J Phys Chem 1964; 68: 441-451,
+# for the metal ions as used by FreeSASA.
+ATOMIC_RADII = {"H": 1.20, "HE": 1.40, "C": 1.70, "N": 1.55, "O": 1.52,
+                "F": 1.47, "NA": 1.39, "MG": 1.73, "P": 1.80, "S": 1.80,
+                "CL": 1.75, "K": 2.75, "CA": 2.31, "NI": 1.63, "CU": 1.40,
+                "ZN": 1.39, "SE": 1.90, "BR": 1.85, "CD": 1.58, "I": 1.98,
+                "HG": 1.55}
+
+# Radius of the elements missing from ATOMIC_RADII
+DEFAULT_RADIUS = 2.0
+
+# Maximum number of (atom pair, sphere point) tests done at once
+_BLOCK_SIZE = 2 ** 21
+
+
+def _sphere_points(n_points):
+    """Returns n_points unit vectors evenly spread over a sphere (PRIVATE).
+
+    The points are placed on a golden section spiral.
+    """
+    k = numpy.arange(n_points) + 0.5
+    z = 1 - 2 * k / n_points
+    r = numpy.sqrt(1 - z * z)
+    phi = pi * (3 - numpy.sqrt(5)) * k
+    return numpy.column_stack((r * numpy.cos(phi), r * numpy.sin(phi), z))
+
+
+def _overlapping_pairs(coords, radii):
+    """Returns the pairs of atoms whose spheres overlap (PRIVATE).
+
+    Each pair is given in both orders, as two index arrays sorted by the
+    first atom.
+    """
+    empty = numpy.zeros(0, int)
+    if len(coords) < 2:
+        return empty, empty
+    kdt = KDTree(3, 10)
+    kdt.set_coords(coords.astype("f"))
+    # a little extra, as the KD tree works in single precision
+    kdt.all_search(2 * radii.max() + 0.01)
+    pairs = numpy.asarray(kdt.all_get_indices(), int).reshape((-1, 2))
+    if not len(pairs):
+        return empty, empty
+    first = numpy.append(pairs[:, 0], pairs[:, 1])
+    second = numpy.append(pairs[:, 1], pairs[:, 0])
+    diff = coords[first] - coords[second]
+    reach = radii[first] + radii[second]
+    overlap = (diff * diff).sum(axis=1) < reach * reach
+    first = first[overlap]
+    second = second[overlap]
+    order = numpy.argsort(first, kind="mergesort")
+    return first[order], second[order]
+
+
+def calc_sasa(coords, radii, probe_radius=1.4, n_points=100):
+    """Returns an array of the solvent accessible surface areas of atoms.
+
+    Arguments:
+     - coords - Nx3 array of the atom coordinates.
+     - radii - Array of the N van der Waals radii (see atom_radii).
+     - probe_radius - Radius of the solvent molecule (default 1.4
+       Angstrom, for water).
+     - n_points - Number of points on the sphere of each atom (default
+       100). More points give more precise areas, but take longer.
+    """
+    coords = numpy.asarray(coords, "d")
+    radii = numpy.asarray(radii, "d") + probe_radius
+    n = len(coords)
+    if coords.shape != (n, 3) or radii.shape != (n,):
+        raise PDBException("Expected an Nx3 array of coordinates and "
+                           "N radii.")
+    if n_points < 1:
+        raise ValueError("The number of points must be positive, not %r"
+                         % n_points)
+    points = _sphere_points(n_points)
+    first, second = _overlapping_pairs(coords, radii)
+    offsets = numpy.zeros(n + 1, int)
+    offsets[1:] = numpy.cumsum(numpy.bincount(first, minlength=n))
+    exposed = numpy.zeros(n, int) + n_points
+    # Test the points of blocks of atoms against their neighbors, keeping
+    # each block's (pair, point) table to about _BLOCK_SIZE entries
+    limit = max(1, _BLOCK_SIZE // n_points)
+    start = 0
+    while start < n:
+        end = numpy.searchsorted(offsets, offsets[start] + limit, "right") - 1
+        end = min(max(end, start + 1), n)
+        begin, stop = offsets[start], offsets[end]
+        if begin < stop:
+            i = first[begin:stop]
+            j = second[begin:stop]
+            diff = coords[i] - coords[j]
+            # squared distances of the points of atom i to the center of j
+            distances = 2 * radii[i][:, None] * numpy.dot(diff, points.T)
+            distances += (radii[i] * radii[i]
+                          + (diff * diff).sum(axis=1))[:, None]
+            buried = distances < (radii[j] * radii[j])[:, None]
+            # combine the pairs of each atom
+            atoms = numpy.arange(start, end)
+            atoms = atoms[offsets[atoms + 1] > offsets[atoms]]
+            buried = numpy.logical_or.reduceat(buried, offsets[atoms] - begin,
+                                               axis=0)
+            exposed[atoms] = n_points - buried.sum(axis=1)
+        start = end
+    return 4 * pi * radii * radii * exposed / n_points
+
+
+def atom_radii(atoms, radii=None):
+    """Returns an array of the van der Waals radii of a list of atoms.
+
+    The radii are looked up by element in the radii dictionary, or in
+    ATOMIC_RADII if not given. Elements not in the dictionary get the
+    DEFAULT_RADIUS.
+    """
+    if radii is None:
+        radii = ATOMIC_RADII
+    return numpy.array([radii.get(atom.element, DEFAULT_RADIUS)
+                        for atom in atoms], "d")
+
+
+def _sasa_job(job):
+    """Runs calc_sasa for a job of calc_sasa_many (PRIVATE)."""
+    coords, radii, probe_radius, n_points = job
+    return calc_sasa(coords, radii, probe_radius, n_points)
+
+
+def calc_sasa_many(atom_sets, probe_radius=1.4, n_points=100, workers=1):
+    """Returns the solvent accessible surface areas for many sets of atoms.
+
+    Arguments:
+     - atom_sets - Iterable of (coords, radii) tuples as taken by
+       calc_sasa, e.g. one for each structure of a data set.
+     - probe_radius, n_points - As for calc_sasa.
+     - workers - Number of processes to use (default one, meaning
+       everything is done in this process). The sets of atoms are
+       shared out using the multiprocessing module.
+
+    Returns a list of the arrays of the atom areas, in the same order.
+    """
+    jobs = [(coords, radii, probe_radius, n_points)
+            for coords, radii in atom_sets]
+    if workers is None or workers <= 1:
+        return [_sasa_job(job) for job in jobs]
+    import multiprocessing
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(_sasa_job, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _model_sasa(model, probe_radius, n_points, radii, include_water):
+    """Returns the atoms of a model and their surface areas (PRIVATE)."""
+    atoms = [atom for atom in model.get_atoms()
+             if include_water or atom.get_parent().get_id()[0] != "W"]
+    areas = calc_sasa(atom_coords(atoms), atom_radii(atoms, radii),
+                      probe_radius, n_points)
+    return atoms, areas
+
+
+class ShrakeRupley(AbstractResiduePropertyMap):
+    """Solvent accessible surface area of the residues of a model.
+
+    Maps (chain id, residue id) to the area in square Angstrom, summed over
+    the residue's atoms, and iterates over (residue, area) tuples. The area
+    is also stored as EXP_SASA in the xtra dictionary of the residues.
+
+    Arguments:
+     - model - The Model (or any other entity) to calculate the areas of.
+     - probe_radius, n_points - As for calc_sasa.
+     - radii - Dictionary of van der Waals radii by element, see atom_radii.
+     - include_water - Whether water molecules count as part of the
+       model (default False).
+    """
+
+    def __init__(self, model, probe_radius=1.4, n_points=100, radii=None,
+                 include_water=False):
+        atoms, areas = _model_sasa(model, probe_radius, n_points, radii,
+                                   include_water)
+        totals = {}
+        residue_list = []
+        for atom, area in zip(atoms, areas):
+            residue = atom.get_parent()
+            if id(residue) not in totals:
+                totals[id(residue)] = 0.0
+                residue_list.append(residue)
+            totals[id(residue)] += float(area)
+        property_dict = {}
+        property_keys = []
+        property_list = []
+        for residue in residue_list:
+            area = totals[id(residue)]
+            key = (residue.get_parent().get_id(), residue.get_id())
+            property_dict[key] = area
+            property_keys.append(key)
+            property_list.append((residue, area))
+            residue.xtra["EXP_SASA"] = area
+        AbstractResiduePropertyMap.__init__(self, property_dict,
+                                            property_keys, property_list)
+
+
+class ShrakeRupley_atomic(AbstractAtomPropertyMap):
+    """Solvent accessible surface area of the atoms of a model.
+
+    Maps (chain id, residue id, atom id) to the area in square Angstrom,
+    and iterates over (atom, area) tuples. The area is also stored as
+    EXP_SASA in the xtra dictionary of the atoms. The arguments are as for
+    ShrakeRupley.
+    """
+
+    def __init__(self, model, probe_radius=1.4, n_points=100, radii=None,
+                 include_water=False):
+        atoms, areas = _model_sasa(model, probe_radius, n_points, radii,
+                                   include_water)
+        property_dict = {}
+        property_keys = []
+        property_list = []
+        for atom, area in zip(atoms, areas):
+            area = float(area)
+            residue = atom.get_parent()
+            key = (residue.get_parent().get_id(), residue.get_id(),
+                   atom.get_id())
+            property_dict[key] = area
+            property_keys.append(key)
+            property_list.append((atom, area))
+            atom.xtra["EXP_SASA"] = area
+        AbstractAtomPropertyMap.__init__(self, property_dict, property_keys,
+                                         property_list)
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import os
+    import doctest
+    from Bio._utils import find_test_dir
+    cur_dir = os.path.abspath(os.curdir)
+    os.chdir(find_test_dir(os.curdir))
+    print("Running doctests...")
+    doctest.testmod()
+    os.chdir(cur_dir)
+    print("Done")
+
+
+if __name__ == "__main__":
+    _test()
@@ -51,3 +51,40 @@ class Structure(Entity):
         for r in self.get_residues():
             for a in r:
                 yield a
+
+    def copy(self):
+        shallow=Entity.copy(self)
+        if hasattr(self, "atom_array"):
+            # The copied atoms get their own AtomArray
+            shallow.pack_atoms()
+        return shallow
+
+    def pack_atoms(self):
+        """Pack the atomic data of all atoms into one AtomArray.
+
+        The AtomArray holds the coordinates, B factors, occupancies and
+        elements of all atoms (including all altlocs of disordered atoms
+        and residues) as contiguous arrays, and is kept as the atom_array
+        attribute. The parsers call this once the structure is built;
+        call it again after adding atoms by hand.
+        """
+        from Bio.PDB.AtomArray import AtomArray
+        atoms=[]
+        for model in self:
+            for residue in model.get_residues():
+                if residue.is_disordered()==2:
+                    residues=residue.disordered_get_list()
+                else:
+                    residues=[residue]
+                for r in residues:
+                    for atom in r.child_list:
+                        if atom.is_disordered()==2:
+                            atoms.extend(atom.disordered_get_list())
+                        else:
+                            atoms.append(atom)
+        if len(set(map(id, atoms)))!=len(atoms):
+            # Atoms added to the structure more than once are packed once
+            seen=set()
+            atoms=[a for a in atoms if not (id(a) in seen or seen.add(id(a)))]
+        self.atom_array=AtomArray(atoms)
+        return self.atom_array
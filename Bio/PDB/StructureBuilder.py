@@ -61,6 +61,12 @@ class StructureBuilder(object):
         o id - string
         """
         self.structure=Structure(structure_id)
+        # Atoms can only be added in bulk if subclasses did not change
+        # the way they are added
+        cls=type(self)
+        self._bulk=all(getattr(cls, name)==getattr(StructureBuilder, name)
+                       for name in ("init_atom", "set_anisou", "set_siguij",
+                                    "set_sigatm"))
 
     def init_model(self, model_id, serial_num = None):
         """Initiate a new Model object with given id.
@@ -231,6 +237,43 @@ class StructureBuilder(object):
             # The atom is not disordered
             residue.add(atom)
 
+    def init_atoms(self, atoms):
+        """
+        Initiate the Atom objects of the current residue in one go.
+
+        This is a faster alternative to calling init_atom for each atom,
+        used by the PDBParser when there is nothing to check.
+
+        Arguments:
+        o atoms - list of tuples with the arguments of init_atom
+
+        Returns the list of new Atom objects, whose anisotropic B factors
+        and standard deviations can then be set directly. If any of the
+        atoms needs the checks done by init_atom (because it has an altloc,
+        its name is already used, or the residue is disordered or missing),
+        nothing is added and None is returned, so the atoms should be added
+        using init_atom. Subclasses which override init_atom or the set_...
+        methods also get None.
+        """
+        residue=self.residue
+        if not getattr(self, "_bulk", False) or residue is None \
+                or residue.is_disordered()==2:
+            return None
+        names=[atom[0] for atom in atoms]
+        child_dict=residue.child_dict
+        if len(set(names))!=len(names) \
+                or any(atom[4]!=" " for atom in atoms) \
+                or (child_dict and any(name in child_dict for name in names)):
+            return None
+        new_atoms=[Atom(*atom) for atom in atoms]
+        for atom in new_atoms:
+            atom.parent=residue
+        residue.child_list.extend(new_atoms)
+        child_dict.update(zip(names, new_atoms))
+        if new_atoms:
+            self.atom=new_atoms[-1]
+        return new_atoms
+
     def set_anisou(self, anisou_array):
         "Set anisotropic B factor of current Atom."
         self.atom.set_anisou(anisou_array)
@@ -249,6 +292,8 @@ class StructureBuilder(object):
         # self.structure.sort()
         # Add the header dict
         self.structure.header=self.header
+        # Keep the atomic data in contiguous arrays
+        self.structure.pack_atoms()
         return self.structure
 
     def set_symmetry(self, spacegroup, cell):
@@ -0,0 +1,546 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Save parsed structures in a compact binary file, and load them again.
+
+Parsing a PDB or mmCIF file takes much longer than reading back the
+numbers in it, and pickling a Structure is slow and bulky because of the
+many small objects. save_structure writes a Structure as flat tables of
+its models, chains, residues and atoms (including all disordered atoms
+and residues) followed by the atomic data as raw arrays, and
+load_structure rebuilds the Structure from these tables. No pickling is
+used, so loading a file cannot run arbitrary code. Loading only makes the
+models and chains; the residues and atoms of a chain are made the first
+time it is used.
+
+The arrays are memory mapped copy on write: the coordinates, B factors
+and occupancies of the loaded structure are its AtomArray (see
+Bio.PDB.AtomArray), which is read from disk only as it is used, and
+changing it does not change the file.
+
+The StructureCache class keeps such files in a directory, keyed by the
+contents of the PDB or mmCIF file they were parsed from:
+
+    from Bio.PDB.StructureCache import StructureCache
+    cache = StructureCache("structures")
+    # parses the file the first time, later loads the saved structure
+    structure = cache.get_structure("1FAT", "pdb1fat.ent")
+
+Only what the parsers store is saved: the ids, names, numbers and flags
+of the entities, the atomic data (including anisotropic B factors and
+standard deviations), which atoms and residues are selected, and the
+header dictionary. The xtra dictionaries are not saved.
+"""
+
+import ast
+import gc
+import hashlib
+import os
+import tempfile
+import warnings
+
+import numpy
+
+from Bio._py3k import _as_bytes, _as_string
+from Bio.PDB.Atom import Atom, DisorderedAtom
+from Bio.PDB.AtomArray import AtomArray, atom_coords, _attach
+from Bio.PDB.Chain import Chain
+from Bio.PDB.Model import Model
+from Bio.PDB.PDBExceptions import PDBConstructionWarning
+from Bio.PDB.Residue import Residue, DisorderedResidue
+from Bio.PDB.Structure import Structure
+
+
+_MAGIC = _as_bytes("BIOPYTHON-STRUCTURE 1\n")
+
+# Arrays are aligned to this many bytes in the file
+_ALIGN = 64
+
+# Values of the disorder columns in the residue and atom tables
+_ORDERED = 0
+_FIRST = 1      # first child of a DisorderedResidue or DisorderedAtom
+_NEXT = 2       # further children of the same one
+
+
+def _column(values, dtype):
+    """Returns a list of values as an array for the file (PRIVATE)."""
+    if dtype == "S":
+        return numpy.array([_as_bytes(value) for value in values], "S")
+    return numpy.array(values, dtype)
+
+
+def _strings(array):
+    """Returns an array of the file as a list of strings (PRIVATE)."""
+    return list(map(_as_string, array.tolist()))
+
+
+def _optional(atoms, method, width):
+    """Returns the optional per atom arrays as one table, or None (PRIVATE)."""
+    table = None
+    for index, atom in enumerate(atoms):
+        values = getattr(atom, method)()
+        if values is not None:
+            if table is None:
+                table = numpy.empty((len(atoms), width), "<f4")
+                table[:] = numpy.nan
+            table[index] = values
+    return table
+
+
+def _serial(value):
+    """Returns a serial number for the file, with -1 for None (PRIVATE)."""
+    if value is None:
+        return -1
+    return value
+
+
+def _number(value):
+    """Returns a number for the file, with NaN for None (PRIVATE)."""
+    if value is None:
+        return numpy.nan
+    return value
+
+
+def save_structure(structure, filename):
+    """Writes a Structure to a binary file.
+
+    Arguments:
+    o structure - Structure object
+    o filename - name of the file to write
+    """
+    models = []
+    chains = []
+    residues = []
+    atoms = []
+    for model in structure:
+        models.append((model.id, model.serial_num, len(chains)))
+        for chain in model:
+            chains.append((chain.id, len(residues)))
+            for residue in chain:
+                if residue.is_disordered() == 2:
+                    selected = residue.disordered_get()
+                    members = residue.disordered_get_list()
+                    disorder = [_FIRST] + [_NEXT] * (len(members) - 1)
+                else:
+                    selected = residue
+                    members = [residue]
+                    disorder = [_ORDERED]
+                for member, flag in zip(members, disorder):
+                    residues.append((member, flag, member is selected,
+                                     len(atoms)))
+                    for atom in member:
+                        if atom.is_disordered() == 2:
+                            selected_atom = atom.disordered_get()
+                            children = atom.disordered_get_list()
+                            flags = [_FIRST] + [_NEXT] * (len(children) - 1)
+                        else:
+                            selected_atom = atom
+                            children = [atom]
+                            flags = [_ORDERED]
+                        for child, atom_flag in zip(children, flags):
+                            atoms.append((child, atom_flag,
+                                          child is selected_atom))
+    atom_list = [atom for atom, flag, selected in atoms]
+    coord = atom_coords(atom_list)
+    # single precision coordinates (as parsed) are saved as they are
+    if coord.dtype != numpy.float32:
+        coord = coord.astype("d")
+    arrays = [
+        ("model_id", _column([m[0] for m in models], "<i8")),
+        ("model_serial", _column([m[1] for m in models], "<i8")),
+        ("model_start", _column([m[2] for m in models], "<i8")),
+        ("chain_id", _column([c[0] for c in chains], "S")),
+        ("chain_start", _column([c[1] for c in chains], "<i8")),
+        ("residue_het", _column([r[0].id[0] for r in residues], "S")),
+        ("residue_seq", _column([r[0].id[1] for r in residues], "<i8")),
+        ("residue_icode", _column([r[0].id[2] for r in residues], "S")),
+        ("residue_name", _column([r[0].resname for r in residues], "S")),
+        ("residue_segid", _column([r[0].segid for r in residues], "S")),
+        ("residue_flag", _column([r[0].disordered for r in residues], "i1")),
+        ("residue_disorder", _column([r[1] for r in residues], "i1")),
+        ("residue_selected", _column([r[2] for r in residues], "?")),
+        ("residue_start", _column([r[3] for r in residues], "<i8")),
+        ("atom_name", _column([a.name for a in atom_list], "S")),
+        ("atom_fullname", _column([a.fullname for a in atom_list], "S")),
+        ("atom_altloc", _column([a.altloc for a in atom_list], "S")),
+        ("atom_serial", _column([_serial(a.serial_number)
+                                 for a in atom_list], "<i8")),
+        ("atom_element", _column([a.element for a in atom_list], "S")),
+        ("atom_disorder", _column([a[1] for a in atoms], "i1")),
+        ("atom_selected", _column([a[2] for a in atoms], "?")),
+        ("coord", coord.astype(coord.dtype.newbyteorder("<"))),
+        ("bfactor", _column([_number(a.bfactor) for a in atom_list], "<f8")),
+        ("occupancy", _column([_number(a.occupancy) for a in atom_list],
+                              "<f8")),
+    ]
+    for name, method, width in [("anisou", "get_anisou", 6),
+                                ("siguij", "get_siguij", 6),
+                                ("sigatm", "get_sigatm", 3)]:
+        table = _optional(atom_list, method, width)
+        if table is not None:
+            arrays.append((name, table))
+    # Work out where the arrays go, after the description
+    layout = []
+    offset = 0
+    for name, array in arrays:
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    description = {"id": structure.id,
+                   "header": getattr(structure, "header", None),
+                   "arrays": layout}
+    description = _as_bytes(repr(description))
+    start = len(_MAGIC) + 16 + len(description)
+    start = -(-start // _ALIGN) * _ALIGN
+    with open(filename, "wb") as handle:
+        handle.write(_MAGIC)
+        handle.write(_as_bytes("%015i\n" % len(description)))
+        handle.write(description)
+        for (name, array), (name, dtype, shape, offset) in zip(arrays, layout):
+            handle.seek(start + offset)
+            handle.write(array.tostring())
+
+
+def _read_description(filename):
+    """Returns the description of a binary file, and the data offset (PRIVATE)."""
+    with open(filename, "rb") as handle:
+        if handle.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("%s is not a saved structure" % filename)
+        try:
+            length = int(handle.read(16))
+            description = ast.literal_eval(_as_string(handle.read(length)))
+        except (ValueError, SyntaxError):
+            raise ValueError("%s is not a valid saved structure" % filename)
+    start = len(_MAGIC) + 16 + length
+    start = -(-start // _ALIGN) * _ALIGN
+    return description, start
+
+
+class _Tables(object):
+    """The saved tables of a structure, making its chains on demand (PRIVATE).
+
+    Only the models and chains are made when a structure is loaded. The
+    residues and atoms of a chain are made from the tables the first time
+    the chain is used (see _LazyChain), and those of all the chains when
+    the atoms of the AtomArray are asked for.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.residue_start = arrays["residue_start"].tolist() + \
+            [len(arrays["atom_name"])]
+        self.chain_start = arrays["chain_start"].tolist() + \
+            [len(arrays["residue_name"])]
+        self.atoms = [None] * len(arrays["atom_name"])
+        self.chains = []
+        self.store = None
+
+    def build_all(self):
+        """Makes the residues and atoms of all the chains."""
+        for chain in self.chains:
+            chain._load()
+
+    def _make_atoms(self, start, end):
+        """Returns the atoms of a range of rows, attached to the store."""
+        arrays = self.arrays
+        rows = slice(start, end)
+        names = _strings(arrays["atom_name"][rows])
+        fullnames = _strings(arrays["atom_fullname"][rows])
+        altlocs = _strings(arrays["atom_altloc"][rows])
+        elements = _strings(arrays["atom_element"][rows])
+        serials = arrays["atom_serial"][rows].tolist()
+        atoms = []
+        with warnings.catch_warnings():
+            # The elements were checked when the atoms were parsed
+            warnings.simplefilter("ignore", PDBConstructionWarning)
+            for index, (name, fullname, altloc, serial, element) in \
+                    enumerate(zip(names, fullnames, altlocs, serials,
+                                  elements), start):
+                if serial == -1:
+                    serial = None
+                atom = Atom(name, None, None, None, altloc, fullname, serial,
+                            element)
+                _attach(atom, self.store, index)
+                atoms.append(atom)
+        self.atoms[rows] = atoms
+        for name, method in [("anisou", "set_anisou"),
+                             ("siguij", "set_siguij"),
+                             ("sigatm", "set_sigatm")]:
+            if name in arrays:
+                table = arrays[name][rows]
+                for index in numpy.flatnonzero(~numpy.isnan(table[:, 0])):
+                    getattr(atoms[index], method)(table[index])
+        return atoms
+
+    def build_chain(self, chain, index):
+        """Adds the residues and atoms of a chain from the tables."""
+        # All the objects made stay alive, so the garbage collector would
+        # only search them for cycles again and again
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._build_chain(chain, index)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _build_chain(self, chain, index):
+        arrays = self.arrays
+        first, last = self.chain_start[index], self.chain_start[index + 1]
+        offset = self.residue_start[first]
+        # Make the atoms first, so that the disordered atoms can select
+        # their children by occupancy once the atoms are attached
+        atoms = self._make_atoms(offset, self.residue_start[last])
+        rows = slice(offset, self.residue_start[last])
+        atom_disorder = arrays["atom_disorder"][rows].tolist()
+        atom_selected = arrays["atom_selected"][rows].tolist()
+        # Then build the residues around them
+        rows = slice(first, last)
+        het = _strings(arrays["residue_het"][rows])
+        resseq = arrays["residue_seq"][rows].tolist()
+        icode = _strings(arrays["residue_icode"][rows])
+        resname = _strings(arrays["residue_name"][rows])
+        segid = _strings(arrays["residue_segid"][rows])
+        residue_flag = arrays["residue_flag"][rows].tolist()
+        residue_disorder = arrays["residue_disorder"][rows].tolist()
+        residue_selected = arrays["residue_selected"][rows].tolist()
+        residue_start = [start - offset
+                         for start in self.residue_start[first:last + 1]]
+        residues = []
+        for i in range(len(resname)):
+            residue = Residue((het[i], resseq[i], icode[i]), resname[i],
+                              segid[i])
+            if residue_flag[i]:
+                residue.flag_disordered()
+            selected = None
+            for j in range(residue_start[i], residue_start[i + 1]):
+                atom = atoms[j]
+                if atom_disorder[j] == _ORDERED:
+                    # the saved atom names are known to be unique
+                    atom.parent = residue
+                    residue.child_list.append(atom)
+                    residue.child_dict[atom.id] = atom
+                    continue
+                if atom_disorder[j] == _FIRST:
+                    if selected is not None:
+                        disordered_atom.disordered_select(selected)
+                    disordered_atom = DisorderedAtom(atom.name)
+                    residue.add(disordered_atom)
+                    selected = None
+                disordered_atom.disordered_add(atom)
+                if atom_selected[j]:
+                    selected = atom.altloc
+            if selected is not None:
+                disordered_atom.disordered_select(selected)
+            residues.append(residue)
+        selected = None
+        for j, residue in enumerate(residues):
+            if residue_disorder[j] == _ORDERED:
+                chain.add(residue)
+                continue
+            if residue_disorder[j] == _FIRST:
+                if selected is not None:
+                    wrapper.disordered_select(selected)
+                wrapper = DisorderedResidue(residue.id)
+                chain.add(wrapper)
+                selected = None
+            wrapper.disordered_add(residue)
+            if residue_selected[j]:
+                selected = residue.resname
+        if selected is not None:
+            wrapper.disordered_select(selected)
+
+
+class _LazyChain(Chain):
+    """Chain of a loaded structure, built on first use (PRIVATE).
+
+    The residues are made by the _Tables the first time the children of
+    the chain are looked at.
+    """
+
+    def __init__(self, id, tables, index):
+        Chain.__init__(self, id)
+        self._tables = tables
+        self._table_index = index
+
+    def _load(self):
+        tables = self._tables
+        if tables is not None:
+            self._tables = None
+            tables.build_chain(self, self._table_index)
+
+    def _get_child_list(self):
+        self._load()
+        return self._child_list
+
+    def _set_child_list(self, child_list):
+        # replacing the children (e.g. in Entity.copy) drops the saved ones
+        self._tables = None
+        self._child_list = child_list
+
+    def _get_child_dict(self):
+        self._load()
+        return self._child_dict
+
+    def _set_child_dict(self, child_dict):
+        self._tables = None
+        self._child_dict = child_dict
+
+    child_list = property(_get_child_list, _set_child_list)
+    child_dict = property(_get_child_dict, _set_child_dict)
+
+
+class _LazyAtomArray(AtomArray):
+    """AtomArray of a loaded structure, whose atoms are made on demand (PRIVATE).
+
+    The arrays are used as they are. Asking for the list of atoms builds
+    all the chains of the structure.
+    """
+
+    def __init__(self, tables, coord, bfactor, occupancy, element):
+        self._tables = tables
+        self.coord = coord
+        self.bfactor = bfactor
+        self.occupancy = occupancy
+        self.element = numpy.empty(len(element), object)
+        self.element[:] = element
+
+    def __len__(self):
+        return len(self.coord)
+
+    @property
+    def atoms(self):
+        self._tables.build_all()
+        return self._tables.atoms
+
+
+def load_structure(filename):
+    """Reads a Structure written by save_structure.
+
+    The coordinates, B factors and occupancies of the atoms are memory
+    mapped from the file, copy on write. Only the models and chains are
+    made straight away: the residues and atoms of each chain are made from
+    the saved tables the first time the chain is used, so loading a
+    structure to look at one chain (or only at the atom_array) is quick.
+
+    Arguments:
+    o filename - name of the file to read
+    """
+    description, start = _read_description(filename)
+    arrays = {}
+    for name, dtype, shape, offset in description["arrays"]:
+        if numpy.prod(shape) == 0:
+            arrays[name] = numpy.zeros(shape, dtype)
+        else:
+            # plain arrays are faster to index than memmap objects
+            arrays[name] = numpy.memmap(filename, dtype, "c", start + offset,
+                                        tuple(shape)).view(numpy.ndarray)
+    tables = _Tables(arrays)
+    tables.store = _LazyAtomArray(tables, arrays["coord"], arrays["bfactor"],
+                                  arrays["occupancy"],
+                                  _strings(arrays["atom_element"]))
+    chain_id = _strings(arrays["chain_id"])
+    model_id = arrays["model_id"].tolist()
+    model_serial = arrays["model_serial"].tolist()
+    model_start = arrays["model_start"].tolist() + [len(chain_id)]
+    structure = Structure(description["id"])
+    for i in range(len(model_id)):
+        model = Model(model_id[i], model_serial[i])
+        for j in range(model_start[i], model_start[i + 1]):
+            chain = _LazyChain(chain_id[j], tables, j)
+            tables.chains.append(chain)
+            model.add(chain)
+        structure.add(model)
+    if description["header"] is not None:
+        structure.header = description["header"]
+    structure.atom_array = tables.store
+    return structure
+
+
+class StructureCache(object):
+    """A directory of structures saved by save_structure.
+
+    The saved structures are keyed by the contents of the files they were
+    parsed from, so a changed file is parsed again. Use a separate
+    directory for each parser configuration (e.g. when parsing only some
+    of the atoms), as the key does not include the parser arguments.
+
+    Several processes may share the directory: each file is written under
+    a temporary name and then renamed.
+    """
+
+    def __init__(self, directory, parser=None):
+        """Create a structure cache.
+
+        Arguments:
+        o directory - the directory to keep the structures in, created if
+        needed
+        o parser - the parser to use for files not in the cache, by
+        default a PDBParser for PDB files and an MMCIFParser for files
+        ending in .cif
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, filename):
+        """Returns the name of the saved file for a source file (PRIVATE)."""
+        digest = hashlib.sha1()
+        if self.parser is not None:
+            digest.update(_as_bytes(self.parser.__class__.__name__))
+        with open(filename, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), _as_bytes("")):
+                digest.update(block)
+        return os.path.join(self.directory, digest.hexdigest() + ".struct")
+
+    def _parse(self, structure_id, filename):
+        """Parses a file with the parser (PRIVATE)."""
+        parser = self.parser
+        if parser is None:
+            if filename.lower().endswith(".cif"):
+                from Bio.PDB.MMCIFParser import MMCIFParser
+                parser = MMCIFParser()
+            else:
+                from Bio.PDB.PDBParser import PDBParser
+                parser = PDBParser()
+        return parser.get_structure(structure_id, filename)
+
+    def get_structure(self, structure_id, filename):
+        """Returns the structure in a file, parsing it only if not saved.
+
+        Arguments:
+        o structure_id - string, the id that will be used for the structure
+        o filename - name of the PDB or mmCIF file
+        """
+        path = self._path(filename)
+        if os.path.exists(path):
+            try:
+                structure = load_structure(path)
+            except ValueError:
+                # e.g. truncated by a full disk; parse the file again
+                pass
+            else:
+                self.hits += 1
+                structure.id = structure_id
+                return structure
+        self.misses += 1
+        structure = self._parse(structure_id, filename)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory,
+                                                 prefix=".tmp")
+        os.close(descriptor)
+        try:
+            save_structure(structure, temp_path)
+            if os.name == "nt" and os.path.exists(path):
+                # rename does not replace files on Windows
+                os.remove(path)
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            # most likely another process saved the same structure
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return structure
@@ -3,13 +3,29 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 
-"""Superimpose two structures."""
+"""Superimpose two structures.
+
+The Superimposer class superimposes two lists of atoms. For many
+superpositions at once, e.g. to cluster a set of models, qcp_rmsd and
+qcp_rmsd_matrix take stacked coordinate arrays (see atom_coords in
+Bio.PDB.AtomArray) and compute the RMSDs after optimal superposition
+with the quaternion characteristic polynomial (QCP) method, which needs
+no SVD:
+
+Theobald DL. Rapid calculation of RMSDs using a quaternion-based
+characteristic polynomial. Acta Crystallogr A 2005; 61: 478-480.
+
+Liu P, Agrafiotis DK, Theobald DL. Fast determination of the optimal
+rotational matrix for macromolecular superpositions. J Comput Chem 2010;
+31: 1561-1563.
+"""
 
 from __future__ import print_function
 
 import numpy
 
 from Bio.SVDSuperimposer import SVDSuperimposer
+from Bio.PDB.AtomArray import atom_coords, transform_atoms
 from Bio.PDB.PDBExceptions import PDBException
 
 
@@ -33,12 +49,8 @@ class Superimposer(object):
         """
         if not (len(fixed)==len(moving)):
             raise PDBException("Fixed and moving atom lists differ in size")
-        l=len(fixed)
-        fixed_coord=numpy.zeros((l, 3))
-        moving_coord=numpy.zeros((l, 3))
-        for i in range(0, len(fixed)):
-            fixed_coord[i]=fixed[i].get_coord()
-            moving_coord[i]=moving[i].get_coord()
+        fixed_coord=atom_coords(fixed).astype('d')
+        moving_coord=atom_coords(moving).astype('d')
         sup=SVDSuperimposer()
         sup.set(fixed_coord, moving_coord)
         sup.run()
@@ -54,8 +66,248 @@ class Superimposer(object):
         rot, tran=self.rotran
         rot=rot.astype('f')
         tran=tran.astype('f')
-        for atom in atom_list:
-            atom.transform(rot, tran)
+        transform_atoms(atom_list, rot, tran)
+
+
+def _center(coords):
+    """Returns the centered coordinate sets and their centroids (PRIVATE)."""
+    centroids=coords.mean(axis=-2)
+    return coords-centroids[..., numpy.newaxis, :], centroids
+
+
+def _transpose(coords):
+    """Returns MxNx3 coordinate sets as a contiguous Mx3xN array (PRIVATE)."""
+    return numpy.ascontiguousarray(coords.transpose(0, 2, 1))
+
+
+def _largest_eigenvalues(correlations, inner_products):
+    """Returns the largest eigenvalue of each QCP key matrix (PRIVATE).
+
+    The key matrix of a superposition is the symmetric traceless 4x4
+    matrix made from the 3x3 correlation matrix, and its largest
+    eigenvalue is found by Newton's method on its characteristic
+    polynomial, starting from the upper bound (G_a + G_b) / 2.
+    """
+    keys=_key_matrices(correlations)
+    squares=numpy.einsum("...ij,...jk->...ik", keys, keys)
+    # power sums of the eigenvalues, giving the coefficients of
+    # the characteristic polynomial x^4 + c2 x^2 + c1 x + c0
+    p2=(keys*keys).sum(axis=-1).sum(axis=-1)
+    p3=(squares*keys).sum(axis=-1).sum(axis=-1)
+    p4=(squares*squares).sum(axis=-1).sum(axis=-1)
+    c2=-p2/2
+    c1=-p3/3
+    c0=(p2*p2/2-p4)/4
+    eigenvalues=inner_products/2
+    for iteration in range(50):
+        squared=eigenvalues*eigenvalues
+        value=(squared+c2)*squared+c1*eigenvalues+c0
+        slope=4*squared*eigenvalues+2*c2*eigenvalues+c1
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            step=numpy.where(slope!=0, value/slope, 0)
+        eigenvalues=eigenvalues-step
+        if (numpy.abs(step)<=1e-11*numpy.abs(eigenvalues)).all():
+            break
+    return eigenvalues, keys
+
+
+def _key_matrices(correlations):
+    """Returns the 4x4 QCP key matrices of 3x3 correlation matrices (PRIVATE)."""
+    s=correlations
+    sxx, sxy, sxz=s[..., 0, 0], s[..., 0, 1], s[..., 0, 2]
+    syx, syy, syz=s[..., 1, 0], s[..., 1, 1], s[..., 1, 2]
+    szx, szy, szz=s[..., 2, 0], s[..., 2, 1], s[..., 2, 2]
+    keys=numpy.empty(s.shape[:-2]+(4, 4))
+    keys[..., 0, 0]=sxx+syy+szz
+    keys[..., 1, 1]=sxx-syy-szz
+    keys[..., 2, 2]=-sxx+syy-szz
+    keys[..., 3, 3]=-sxx-syy+szz
+    for i, j, value in [(0, 1, syz-szy), (0, 2, szx-sxz), (0, 3, sxy-syx),
+                        (1, 2, sxy+syx), (1, 3, szx+sxz), (2, 3, syz+szy)]:
+        keys[..., i, j]=value
+        keys[..., j, i]=value
+    return keys
+
+
+def _determinants(matrices):
+    """Returns the determinants of a stack of 3x3 matrices (PRIVATE)."""
+    m=matrices
+    return (m[..., 0, 0]*(m[..., 1, 1]*m[..., 2, 2]-m[..., 1, 2]*m[..., 2, 1])
+            - m[..., 0, 1]*(m[..., 1, 0]*m[..., 2, 2]-m[..., 1, 2]*m[..., 2, 0])
+            + m[..., 0, 2]*(m[..., 1, 0]*m[..., 2, 1]-m[..., 1, 1]*m[..., 2, 0]))
+
+
+def _rotations(keys, eigenvalues):
+    """Returns the right multiplying rotation matrices (PRIVATE).
+
+    The quaternion of each rotation is the eigenvector of the key matrix
+    for its largest eigenvalue, taken as the largest column of the
+    adjugate of (key matrix - eigenvalue * identity).
+    """
+    shifted=keys-eigenvalues[:, numpy.newaxis, numpy.newaxis]*numpy.identity(4)
+    adjugate=numpy.empty(shifted.shape)
+    rows=numpy.arange(4)
+    for i in range(4):
+        for j in range(4):
+            minor=shifted[..., rows!=i, :][..., rows!=j]
+            adjugate[..., i, j]=(-1)**(i+j)*_determinants(minor)
+    norms=(adjugate*adjugate).sum(axis=1)
+    quaternions=adjugate[numpy.arange(len(keys)), :, norms.argmax(axis=1)]
+    lengths=numpy.sqrt(norms.max(axis=1))
+    degenerate=lengths<=1e-6*numpy.maximum(numpy.abs(eigenvalues), 1)**3
+    for index in numpy.flatnonzero(degenerate):
+        # the largest eigenvalue is (nearly) degenerate; any vector
+        # of its eigenspace will do
+        values, vectors=numpy.linalg.eigh(keys[index])
+        quaternions[index]=vectors[:, values.argmax()]
+        lengths[index]=1.0
+    q=quaternions/lengths[:, numpy.newaxis]
+    q0, qx, qy, qz=q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    rot=numpy.empty((len(q), 3, 3))
+    # the transpose of the usual rotation matrix, as the coordinates
+    # are row vectors
+    rot[:, 0, 0]=q0*q0+qx*qx-qy*qy-qz*qz
+    rot[:, 1, 0]=2*(qx*qy-q0*qz)
+    rot[:, 2, 0]=2*(qx*qz+q0*qy)
+    rot[:, 0, 1]=2*(qx*qy+q0*qz)
+    rot[:, 1, 1]=q0*q0-qx*qx+qy*qy-qz*qz
+    rot[:, 2, 1]=2*(qy*qz-q0*qx)
+    rot[:, 0, 2]=2*(qx*qz-q0*qy)
+    rot[:, 1, 2]=2*(qy*qz+q0*qx)
+    rot[:, 2, 2]=q0*q0-qx*qx-qy*qy+qz*qz
+    return rot
+
+
+def _rmsd(transposed, inner_products, reference, reference_inner_product):
+    """Returns the RMSDs of centered sets to a centered reference (PRIVATE).
+
+    The M coordinate sets are given transposed, as an Mx3xN array, so that
+    their correlation matrices are found with one matrix product.
+    """
+    m, n=len(transposed), reference.shape[0]
+    correlations=numpy.dot(transposed.reshape((3*m, n)),
+                           reference).reshape((m, 3, 3))
+    inner_products=inner_products+reference_inner_product
+    eigenvalues, keys=_largest_eigenvalues(correlations, inner_products)
+    squared=(inner_products-2*eigenvalues)/reference.shape[0]
+    return numpy.sqrt(numpy.maximum(squared, 0)), eigenvalues, keys
+
+
+def qcp_rmsd(reference, coords, rotations=False):
+    """Returns the RMSDs of coordinate sets to a reference after superposition.
+
+    Arguments:
+    o reference - Nx3 array
+    o coords - MxNx3 array of M coordinate sets, or an Nx3 array
+    o rotations - Boolean, whether to return the transformations
+
+    Returns an array of the M RMSDs (or a single RMSD for an Nx3 array).
+    If rotations is true, a tuple is returned of the RMSDs, the rotation
+    matrices and the translations. As for SVDSuperimposer, the rotation
+    matrices are right multiplying, so numpy.dot(coords[i], rot[i]) +
+    tran[i] puts coordinate set i on the reference.
+    """
+    reference=numpy.asarray(reference, "d")
+    coords=numpy.asarray(coords, "d")
+    single=(coords.ndim==2)
+    if single:
+        coords=coords[numpy.newaxis]
+    if reference.ndim!=2 or reference.shape[1]!=3 \
+            or coords.shape[1:]!=reference.shape:
+        raise PDBException("Coordinate number/dimension mismatch.")
+    reference, reference_centroid=_center(reference)
+    centered, centroids=_center(coords)
+    rms, eigenvalues, keys=_rmsd(_transpose(centered),
+                                 (centered*centered).sum(axis=-1).sum(axis=-1),
+                                 reference, (reference*reference).sum())
+    if rotations:
+        rot=_rotations(keys, eigenvalues)
+        tran=reference_centroid-numpy.einsum("mi,mij->mj", centroids, rot)
+        if single:
+            return rms[0], rot[0], tran[0]
+        return rms, rot, tran
+    if single:
+        return rms[0]
+    return rms
+
+
+# The centered coordinate sets and their inner products in the worker
+# processes of qcp_rmsd_matrix
+_worker_data=None
+
+
+def _init_worker(data):
+    """Store the shared data in a worker process (PRIVATE)."""
+    global _worker_data
+    _worker_data=data
+
+
+def _worker_rows(rows):
+    """Compute the RMSDs for a range of rows in a worker process (PRIVATE)."""
+    start, stop=rows
+    return [_row_rmsd(_worker_data, i) for i in range(start, stop)]
+
+
+def _row_rmsd(data, i):
+    """Returns the RMSDs of set i to the sets after it (PRIVATE)."""
+    transposed, inner_products=data
+    return _rmsd(transposed[i+1:], inner_products[i+1:], transposed[i].T,
+                 inner_products[i])[0]
+
+
+def _split_rows(n, count):
+    """Split rows 0 to n-2 into ranges holding similar numbers of pairs (PRIVATE)."""
+    total=n*(n-1)//2
+    target=max(1, -(-total//count))
+    ranges=[]
+    start=0
+    pairs=0
+    for i in range(n-1):
+        pairs+=n-i-1
+        if pairs>=target:
+            ranges.append((start, i+1))
+            start=i+1
+            pairs=0
+    if start<n-1:
+        ranges.append((start, n-1))
+    return ranges
+
+
+def qcp_rmsd_matrix(coords, workers=1):
+    """Returns the RMSDs after superposition between all coordinate sets.
+
+    Arguments:
+    o coords - MxNx3 array of M coordinate sets
+    o workers - number of processes to use (default one, meaning
+    everything is done in this process). The rows are divided into
+    blocks of roughly equal numbers of pairs, and shared out using the
+    multiprocessing module.
+
+    Returns the condensed distance matrix, i.e. an array of the
+    M*(M-1)/2 RMSDs of the pairs (0, 1), (0, 2), ..., (0, M-1), (1, 2),
+    ..., (M-2, M-1), as used by scipy.cluster.hierarchy. Use
+    scipy.spatial.distance.squareform to get the MxM matrix.
+    """
+    coords=numpy.asarray(coords, "d")
+    if coords.ndim!=3 or coords.shape[2]!=3:
+        raise PDBException("Expected an MxNx3 array of coordinate sets.")
+    n=len(coords)
+    centered=_center(coords)[0]
+    data=(_transpose(centered), (centered*centered).sum(axis=-1).sum(axis=-1))
+    if n<2:
+        return numpy.zeros(0)
+    if workers is None or workers<=1:
+        rows=[_row_rmsd(data, i) for i in range(n-1)]
+    else:
+        import multiprocessing
+        pool=multiprocessing.Pool(workers, _init_worker, (data,))
+        try:
+            blocks=pool.map(_worker_rows, _split_rows(n, 4*workers))
+        finally:
+            pool.close()
+            pool.join()
+        rows=[row for block in blocks for row in block]
+    return numpy.concatenate(rows)
 
 
 if __name__=="__main__":
@@ -204,6 +204,53 @@ def calc_dihedral(v1, v2, v3, v4):
     return angle
 
 
+def calc_angles(p1, p2, p3):
+    """
+    Calculate the angles of many triples of connected points at once.
+
+    This is the array version of calc_angle: the arguments are arrays
+    of points (e.g. Nx3, but any number of leading dimensions is fine)
+    and an array of the angles is returned. Points with NaN coordinates
+    (e.g. missing atoms) give NaN angles.
+
+    @param p1, p2, p3: the points that define the angles
+    @type p1, p2, p3: Nx3 arrays
+    """
+    p1=numpy.asarray(p1, "d")-p2
+    p3=numpy.asarray(p3, "d")-p2
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        c=(p1*p3).sum(axis=-1)/numpy.sqrt((p1*p1).sum(axis=-1)
+                                          *(p3*p3).sum(axis=-1))
+        # Take care of roundoff errors
+        return numpy.arccos(numpy.clip(c, -1, 1))
+
+
+def calc_dihedrals(p1, p2, p3, p4):
+    """
+    Calculate the dihedral angles of many quadruples of connected points.
+
+    This is the array version of calc_dihedral, for arrays of points
+    (e.g. Nx3, but any number of leading dimensions is fine). The angles
+    are in ]-pi, pi], and points with NaN coordinates give NaN angles.
+
+    @param p1, p2, p3, p4: the points that define the dihedral angles
+    @type p1, p2, p3, p4: Nx3 arrays
+    """
+    p2=numpy.asarray(p2, "d")
+    ab=p1-p2
+    cb=p3-p2
+    db=p4-numpy.asarray(p3, "d")
+    u=numpy.cross(ab, cb)
+    v=numpy.cross(db, cb)
+    w=numpy.cross(u, v)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        # |u||v| sin(angle) and |u||v| cos(angle), with the sign given by
+        # the direction of w along cb
+        y=(w*cb).sum(axis=-1)/numpy.sqrt((cb*cb).sum(axis=-1))
+        x=(u*v).sum(axis=-1)
+        return numpy.arctan2(y, x)
+
+
 class Vector(object):
     "3D vector"
 
@@ -44,6 +44,7 @@ from Superimposer import Superimposer
 
 # 3D vector class
 from Vector import Vector, calc_angle, calc_dihedral, refmat, rotmat, rotaxis
+from Vector import calc_angles, calc_dihedrals
 from Vector import vector_to_axis, m2rotaxis, rotaxis2m
 
 # Alignment module
@@ -72,3 +73,10 @@ try:
     from NeighborSearch import NeighborSearch
 except ImportError:
     pass
+
+# Solvent accessible surface area (Shrake-Rupley)
+# Depends on KDTree C++ module
+try:
+    from SASA import ShrakeRupley, ShrakeRupley_atomic
+except ImportError:
+    pass
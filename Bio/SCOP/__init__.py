@@ -888,15 +888,16 @@ def _open(cgi, params={}, get=1):
     """
     import urllib
     import urllib2
+    from Bio import webcache
     # Open a handle to SCOP.
     options = urllib.urlencode(params)
     try:
         if get:  # do a GET
             if options:
                 cgi += "?" + options
-            handle = urllib2.urlopen(cgi)
+            handle = webcache._urlopen(cgi)
         else:    # do a POST
-            handle = urllib2.urlopen(cgi, data=options)
+            handle = webcache._urlopen(cgi, options)
     except urllib2.HTTPError as exception:
         raise exception
     return handle
@@ -162,6 +162,26 @@ with their descriptions and use the BLAST-generated IDs. This enables you to
 write BLAST XML files using SearchIO as if they were written by a real BLAST
 program.
 
+If you only need some of the HSP values, for example to make a hit table from
+a large BLAST XML file with alignments, use the 'fields' keyword argument to
+list the attributes you want. Any other Hit and Hsp elements (in particular
+the aligned sequences) are discarded as soon as they are read, and the HSP
+fragments are created without sequences:
+
+    >>> from Bio import SearchIO
+    >>> fields = ['evalue', 'bitscore', 'query_start', 'query_end']
+    >>> qresult = next(SearchIO.parse('Blast/mirna.xml', 'blast-xml',
+    ...                               fields=fields))
+    >>> hsp = qresult[0][0]
+    >>> print("%s %s %i %i" % (hsp.evalue, hsp.bitscore, hsp.query_start,
+    ...                        hsp.query_end))
+    4.91151e-23 111.292 0 61
+    >>> print(hsp.query)
+    None
+
+The query and hit IDs and descriptions are always available. The field names
+are the attribute names in the table above.
+
 
 blast-tab
 =========
@@ -10,9 +10,11 @@ import re
 from Bio._py3k import _as_bytes, _bytes_to_string
 from Bio.SearchIO._index import SearchIndexer
 from Bio.SearchIO._model import QueryResult, Hit, HSP, HSPFragment
+from Bio.SearchIO._table import _BaseTableReader
 
 
-__all__ = ['BlastTabIndexer', 'BlastTabParser', 'BlastTabWriter']
+__all__ = ['BlastTabIndexer', 'BlastTabParser', 'BlastTabTableReader',
+        'BlastTabWriter']
 
 
 # longname-shortname map
@@ -219,7 +221,8 @@ class BlastTabParser(object):
         for qresult in iterfunc():
             yield qresult
 
-    def _prep_fields(self, fields):
+    @staticmethod
+    def _prep_fields(fields):
         """Validates and formats the given fields for use by the parser."""
         # cast into list if fields is a space-separated string
         if isinstance(fields, basestring):
@@ -493,6 +496,62 @@ class BlastTabParser(object):
             # else implicit None return
 
 
+class BlastTabTableReader(_BaseTableReader):
+
+    """Columnar reader for the BLAST tabular format, see SearchIO.read_table.
+
+    The columns are named by the BLAST+ short names (e.g. 'qseqid', 'evalue'
+    or 'sstart'), taken from the fields argument or, for commented files,
+    from the file itself. The rows of each query are grouped by its
+    qseqid, qacc or qaccver column (whichever comes first in the fields).
+    """
+
+    def __init__(self, handle, comments=False, fields=_DEFAULT_FIELDS,
+                 columns=None, chunk_size=100000):
+        _BaseTableReader.__init__(self, handle, columns, chunk_size)
+        self.has_comments = comments
+        if comments:
+            # the column order is given in the file
+            self.fields = None
+        else:
+            self.fields = BlastTabParser._prep_fields(fields)
+
+    def _iter_rows(self):
+        comment_mark = '#'
+        fields_mark = '# Fields: '
+        for line in self.handle:
+            if line.startswith(comment_mark):
+                if self.has_comments and line.startswith(fields_mark):
+                    long_fields = line[len(fields_mark):].strip().split(', ')
+                    fields = BlastTabParser._prep_fields([_LONG_SHORT_MAP[
+                        long_name] for long_name in long_fields])
+                    if self.fields is None:
+                        self.fields = fields
+                    elif fields != self.fields:
+                        raise ValueError("The columns must be the same for "
+                                "all queries, found %r and %r" %
+                                (self.fields, fields))
+                continue
+            line = line.rstrip('\n')
+            if line:
+                yield line.split('\t')
+
+    def _layout(self):
+        if self.fields is None:
+            raise ValueError("Result row found before any 'Fields' comment.")
+        layout = []
+        for field in self.fields:
+            kind = str
+            for mapping in (_COLUMN_QRESULT, _COLUMN_HIT, _COLUMN_HSP,
+                            _COLUMN_FRAG):
+                if field in mapping and mapping[field][1] in (int, float):
+                    kind = mapping[field][1]
+            layout.append((field, kind))
+        query_field = [field for field in self.fields
+                       if field in _MIN_QUERY_FIELDS][0]
+        return layout, query_field
+
+
 class BlastTabIndexer(SearchIndexer):
 
     """Indexer class for BLAST+ tab output."""
@@ -178,6 +178,18 @@ _DTD_OPT = (
     'Hsp_midline',
 )
 
+# Hit and Hsp elements which may be skipped when only some fields are wanted
+# (the IDs and descriptions are always parsed)
+_ELEM_SKIPPABLE = set(list(_ELEM_HIT) + list(_ELEM_HSP) + list(_ELEM_FRAG) +
+        ['Hit_num', 'Hsp_num', 'Hsp_midline'])
+# the coordinate elements needed for each fragment coordinate attribute,
+# since the start and end values must be compared
+_COORD_ELEMS = {
+    'query': ('Hsp_query-from', 'Hsp_query-to'),
+    'hit': ('Hsp_hit-from', 'Hsp_hit-to'),
+    'pattern': ('Hsp_pattern-from', 'Hsp_pattern-to'),
+}
+
 # compile RE patterns
 _RE_VERSION = re.compile(r'\d+\.\d+\.\d+\+?')
 
@@ -185,10 +197,44 @@ _RE_VERSION = re.compile(r'\d+\.\d+\.\d+\+?')
 class BlastXmlParser(object):
     """Parser for the BLAST XML format"""
 
-    def __init__(self, handle):
+    def __init__(self, handle, fields=None):
         self.xml_iter = iter(ElementTree.iterparse(handle, events=('start', 'end')))
+        self._elem_hit, self._elem_hsp, self._elem_frag, self._skip = \
+                self._prep_fields(fields)
         self._meta, self._fallback = self._parse_preamble()
 
+    def _prep_fields(self, fields):
+        """Returns the element maps to use for the given wanted fields.
+
+        Returns the Hit, HSP and HSPFragment element-attribute maps, and the
+        set of Hit and Hsp elements to clear as soon as they are read (empty
+        if all fields are wanted).
+        """
+        if fields is None:
+            return _ELEM_HIT, _ELEM_HSP, _ELEM_FRAG, set()
+        if isinstance(fields, basestring):
+            fields = fields.split()
+        wanted = set(fields)
+        # attribute names of each element, coordinates need both elements
+        attr_elems = {'aln_annotation': ['Hsp_midline']}
+        for mapping in (_ELEM_HIT, _ELEM_HSP, _ELEM_FRAG):
+            for elem, (attr_name, caster) in mapping.items():
+                attr_elems.setdefault(attr_name, []).append(elem)
+        for coord_type, elems in _COORD_ELEMS.items():
+            for suffix in ('_start', '_end'):
+                attr_elems[coord_type + suffix] = list(elems)
+        keep = set()
+        for field in wanted:
+            try:
+                keep.update(attr_elems[field])
+            except KeyError:
+                raise ValueError("Unknown field %r, expected some of: %s" %
+                        (field, ', '.join(sorted(attr_elems))))
+        elem_hit, elem_hsp, elem_frag = [dict((elem, value) for elem, value
+                in mapping.items() if elem in keep)
+                for mapping in (_ELEM_HIT, _ELEM_HSP, _ELEM_FRAG)]
+        return elem_hit, elem_hsp, elem_frag, _ELEM_SKIPPABLE - keep
+
     def __iter__(self):
         for qresult in self._parse_qresult():
             yield qresult
@@ -240,8 +286,15 @@ class BlastXmlParser(object):
 
     def _parse_qresult(self):
         """Parses query results."""
+        skip = self._skip
         # parse the queries
         for event, qresult_elem in self.xml_iter:
+            # drop unwanted hit and hsp values (e.g. the aligned sequences)
+            # as soon as they are read, rather than keep them in the tree
+            # until the end of the query
+            if skip and event == 'end' and qresult_elem.tag in skip:
+                qresult_elem.clear()
+                continue
             # </Iteration> marks the end of a single query
             # which means we can process it
             if event == 'end' and qresult_elem.tag == 'Iteration':
@@ -387,7 +440,7 @@ class BlastXmlParser(object):
             # blast_hit_id is only set if the hit ID is Blast-generated
             hit._blast_id = blast_hit_id
 
-            for key, val_info in _ELEM_HIT.items():
+            for key, val_info in self._elem_hit.items():
                 value = hit_elem.findtext(key)
                 if value is not None:
                     caster = val_info[1]
@@ -439,7 +492,7 @@ class BlastXmlParser(object):
         for hsp_frag_elem in root_hsp_frag_elem:
             coords = {}  # temporary container for coordinates
             frag = HSPFragment(hit_id, query_id)
-            for key, val_info in _ELEM_FRAG.items():
+            for key, val_info in self._elem_frag.items():
                 value = hsp_frag_elem.findtext(key)
                 caster = val_info[1]
 
@@ -455,8 +508,9 @@ class BlastXmlParser(object):
                     setattr(frag, val_info[0], value)
 
             # set the homology characters into aln_annotation dict
-            frag.aln_annotation['homology'] = \
-                    hsp_frag_elem.findtext('Hsp_midline')
+            if 'Hsp_midline' not in self._skip:
+                frag.aln_annotation['homology'] = \
+                        hsp_frag_elem.findtext('Hsp_midline')
 
             # process coordinates
             # since 'x-from' could be bigger than 'x-to', we need to figure
@@ -483,7 +537,7 @@ class BlastXmlParser(object):
                 frag.alphabet = generic_protein
 
             hsp = HSP([frag])
-            for key, val_info in _ELEM_HSP.items():
+            for key, val_info in self._elem_hsp.items():
                 value = hsp_frag_elem.findtext(key)
                 caster = val_info[1]
                 if value is not None:
@@ -503,10 +557,10 @@ class BlastXmlIndexer(SearchIndexer):
     qend_mark = _as_bytes('</Iteration>')
     block_size = 16384
 
-    def __init__(self, filename):
-        SearchIndexer.__init__(self, filename)
+    def __init__(self, filename, **kwargs):
+        SearchIndexer.__init__(self, filename, **kwargs)
         # TODO: better way to do this?
-        iter_obj = self._parser(self._handle)
+        iter_obj = self._parser(self._handle, **kwargs)
         self._meta, self._fallback = iter_obj._meta, iter_obj._fallback
 
     def __iter__(self):
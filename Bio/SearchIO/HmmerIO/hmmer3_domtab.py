@@ -10,7 +10,8 @@ from itertools import chain
 from Bio.Alphabet import generic_protein
 from Bio.SearchIO._model import QueryResult, Hit, HSP, HSPFragment
 
-from hmmer3_tab import Hmmer3TabParser, Hmmer3TabIndexer
+from hmmer3_tab import Hmmer3TabParser, Hmmer3TabIndexer, \
+        Hmmer3TabTableReader
 
 
 class Hmmer3DomtabParser(Hmmer3TabParser):
@@ -167,6 +168,33 @@ class Hmmer3DomtabHmmqueryParser(Hmmer3DomtabParser):
     hmm_as_hit = False
 
 
+class Hmmer3DomtabTableReader(Hmmer3TabTableReader):
+
+    """Columnar reader for the HMMER domain table format, see
+    SearchIO.read_table.
+
+    The columns are named after the matching SearchIO attributes where
+    possible. Unlike the object parsers, the HMM and alignment coordinates
+    are kept as the 'hmm_from', 'hmm_to', 'ali_from' and 'ali_to' columns,
+    so the same reader serves hmmscan, hmmsearch and phmmer output.
+    """
+
+    # column names and types, in file order
+    _columns = [
+        ('target_name', str), ('target_accession', str),
+        ('target_len', int),
+        ('query_name', str), ('query_accession', str), ('query_len', int),
+        ('evalue', float), ('bitscore', float), ('bias', float),
+        ('domain_index', int), ('domain_num', int),
+        ('domain_evalue_cond', float), ('domain_evalue', float),
+        ('domain_bitscore', float), ('domain_bias', float),
+        ('hmm_from', int), ('hmm_to', int),
+        ('ali_from', int), ('ali_to', int),
+        ('env_from', int), ('env_to', int),
+        ('acc_avg', float), ('description', str),
+    ]
+
+
 class Hmmer3DomtabHmmhitIndexer(Hmmer3TabIndexer):
 
     """Indexer class for HMMER domain table output that assumes HMM profile
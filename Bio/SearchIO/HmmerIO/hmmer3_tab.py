@@ -11,9 +11,11 @@ from Bio._py3k import _as_bytes, _bytes_to_string
 from Bio.Alphabet import generic_protein
 from Bio.SearchIO._index import SearchIndexer
 from Bio.SearchIO._model import QueryResult, Hit, HSP, HSPFragment
+from Bio.SearchIO._table import _BaseTableReader
 
 
-__all__ = ['Hmmer3TabParser', 'Hmmer3TabIndexer', 'Hmmer3TabWriter']
+__all__ = ['Hmmer3TabParser', 'Hmmer3TabIndexer', 'Hmmer3TabTableReader',
+        'Hmmer3TabWriter']
 
 
 class Hmmer3TabParser(object):
@@ -143,6 +145,48 @@ class Hmmer3TabParser(object):
             self.line = self.handle.readline()
 
 
+class Hmmer3TabTableReader(_BaseTableReader):
+
+    """Columnar reader for the HMMER table format, see SearchIO.read_table.
+
+    The columns are named after the matching SearchIO attributes where
+    possible, with the 'best 1 domain' columns prefixed by 'best_domain_'.
+    """
+
+    # column names and types, in file order
+    _columns = [
+        ('target_name', str), ('target_accession', str),
+        ('query_name', str), ('query_accession', str),
+        ('evalue', float), ('bitscore', float), ('bias', float),
+        ('best_domain_evalue', float), ('best_domain_bitscore', float),
+        ('best_domain_bias', float),
+        ('domain_exp_num', float), ('region_num', int),
+        ('cluster_num', int), ('overlap_num', int), ('env_num', int),
+        ('domain_obs_num', int), ('domain_reported_num', int),
+        ('domain_included_num', int), ('description', str),
+    ]
+
+    def _iter_rows(self):
+        comment_mark = '#'
+        # the last column (description) may contain spaces
+        max_split = len(self._columns) - 1
+        for line in self.handle:
+            if line.startswith(comment_mark):
+                continue
+            row = line.split(None, max_split)
+            if len(row) == max_split:
+                # no description
+                row.append('')
+            elif len(row) > max_split:
+                row[-1] = row[-1].rstrip()
+            elif not row:
+                continue
+            yield row
+
+    def _layout(self):
+        return self._columns, 'query_name'
+
+
 class Hmmer3TabIndexer(SearchIndexer):
 
     """Indexer class for HMMER table output."""
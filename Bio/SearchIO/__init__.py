@@ -212,7 +212,8 @@ warnings.warn('Bio.SearchIO is an experimental submodule which may undergo '
         BiopythonExperimentalWarning)
 
 
-__all__ = ['read', 'parse', 'to_dict', 'index', 'index_db', 'write', 'convert']
+__all__ = ['read', 'parse', 'read_table', 'best_hits', 'to_dict', 'index',
+        'index_db', 'write', 'convert']
 
 
 # dictionary of supported formats for parse() and read()
@@ -263,14 +264,25 @@ _WRITER_MAP = {
         'phmmer3-domtab': ('HmmerIO', 'Hmmer3DomtabHmmqueryWriter'),
 }
 
+# dictionary of supported formats for read_table()
+_TABLE_MAP = {
+        'blast-tab': ('BlastIO', 'BlastTabTableReader'),
+        'hmmer3-tab': ('HmmerIO', 'Hmmer3TabTableReader'),
+        'hmmscan3-domtab': ('HmmerIO', 'Hmmer3DomtabTableReader'),
+        'hmmsearch3-domtab': ('HmmerIO', 'Hmmer3DomtabTableReader'),
+        'phmmer3-domtab': ('HmmerIO', 'Hmmer3DomtabTableReader'),
+}
+
 
-def parse(handle, format=None, **kwargs):
+def parse(handle, format=None, workers=None, **kwargs):
     """Turns a search output file into a generator that yields QueryResult
     objects.
 
-     - handle - Handle to the file, or the filename as a string.
-     - format - Lower case string denoting one of the supported formats.
-     - kwargs - Format-specific keyword arguments.
+     - handle  - Handle to the file, or the filename as a string.
+     - format  - Lower case string denoting one of the supported formats.
+     - workers - Optional number of processes to parse the file with (see
+                 below).
+     - kwargs  - Format-specific keyword arguments.
 
     This function is used to iterate over each query in a given search output
     file:
@@ -299,7 +311,31 @@ def parse(handle, format=None, **kwargs):
     Search 33212 has 44 hits
     Search 33213 has 95 hits
 
+    Since the queries in a search output file are independent, large files
+    can be parsed using several processes with the `workers` argument. The
+    file is split at query boundaries using the same scanning as `index`
+    (so the file name is required, and the format must support indexing),
+    and the QueryResult objects are still returned in file order:
+
+    >>> from Bio import SearchIO
+    >>> for qresult in SearchIO.parse('Blast/mirna.xml', 'blast-xml', workers=2):
+    ...     print("Search %s has %i hits" % (qresult.id, len(qresult)))
+    ... 
+    Search 33211 has 100 hits
+    Search 33212 has 44 hits
+    Search 33213 has 95 hits
+
     """
+    if workers is not None and workers > 1:
+        if not isinstance(handle, basestring):
+            raise TypeError("Need a filename (not a handle) to parse with "
+                    "several workers")
+        from Bio.SearchIO._index import parallel_parse
+        indexer = get_processor(format, _INDEXER_MAP)
+        for qresult in parallel_parse(indexer, handle, workers, kwargs):
+            yield qresult
+        return
+
     # get the iterator object and do error checking
     iterator = get_processor(format, _ITERATOR_MAP)
 
@@ -370,6 +406,115 @@ def read(handle, format=None, **kwargs):
     return first
 
 
+def read_table(handle, format=None, columns=None, chunk_size=100000,
+               **kwargs):
+    """Turns a tabular search output file into a generator of column tables.
+
+     - handle     - Handle to the file, or the filename as a string.
+     - format     - Lower case string denoting one of the supported tabular
+                    formats (blast-tab, hmmer3-tab, and the hmmer3-domtab
+                    variants).
+     - columns    - Optional list of the column names to return (default all).
+     - chunk_size - Approximate number of rows in each table (default 100000).
+     - kwargs     - Format-specific keyword arguments, as for `parse`.
+
+    Unlike `parse`, this does not build QueryResult, Hit, HSP and HSPFragment
+    objects. Instead each table returned holds the selected columns as typed
+    arrays (NumPy arrays if available), for several complete queries. This
+    is much faster for very large tables, and allows vectorised filtering:
+
+    >>> from Bio import SearchIO
+    >>> for table in SearchIO.read_table('Blast/tab_2226_tblastn_001.txt',
+    ...                                  'blast-tab', columns=['evalue']):
+    ...     for qid, start, end in table.iter_queries():
+    ...         best = min(table['evalue'][start:end])
+    ...         print("%s has %i hits, best evalue %s" % (qid, end - start, best))
+    ... 
+    gi|16080617|ref|NP_391444.1| has 3 hits, best evalue 1e-05
+    gi|11464971:4-101 has 9 hits, best evalue 2e-67
+
+    For BLAST tables, the columns are named as in the BLAST+ -outfmt
+    option, and the same comments and fields arguments as `parse` describe
+    the file. See the table reader classes of each format for their column
+    names. Note the values are as given in the file, coordinates are not
+    converted to the zero-based convention used by the SearchIO objects.
+
+    """
+    reader = get_processor(format, _TABLE_MAP)
+
+    with as_handle(handle, 'rU') as source_file:
+        tables = reader(source_file, columns=columns, chunk_size=chunk_size,
+                        **kwargs)
+
+        for table in tables:
+            yield table
+
+
+def best_hits(qresults, n=1, key=None, reverse=False, hsps=False):
+    """Generator reducing each QueryResult to its best Hit or HSP objects.
+
+     - qresults - Iterable returning QueryResult objects, or a list of these
+                  (for example one per search output file) to be merged.
+     - n        - Number of Hit (or HSP) objects to keep for each query.
+     - key      - Function used to rank the Hit (or HSP) objects, as in the
+                  QueryResult `sort` method. The default keeps the first ones.
+     - reverse  - Boolean, whether to keep those with the largest key values
+                  rather than the smallest ones.
+     - hsps     - Boolean, whether to keep the best HSP objects (inside copies
+                  of their Hit objects) instead of the best Hit objects.
+
+    This is a streaming alternative to sorting or filtering each QueryResult
+    yourself: only a heap of the best n objects is kept while ranking each
+    query, and the new QueryResult holds just those, so memory use stays low
+    however many hits the search found. For example, to keep the two hits of
+    each query with the lowest E-value of their first HSP:
+
+    >>> from Bio import SearchIO
+    >>> qresults = SearchIO.parse('Blast/mirna.xml', 'blast-xml')
+    >>> for qresult in SearchIO.best_hits(qresults, 2,
+    ...                                   key=lambda hit: hit.hsps[0].evalue):
+    ...     print("%s %s" % (qresult.id, [hit.id for hit in qresult]))
+    ... 
+    33211 ['gi|262205317|ref|NR_030195.1|', 'gi|301171311|ref|NR_035856.1|']
+    33212 ['gi|296923684|ref|NR_031821.1|', 'gi|270133209|ref|NR_033077.1|']
+    33213 ['gi|262206031|ref|NR_029826.1|', 'gi|269847012|ref|NR_031083.1|']
+
+    Or, to keep the single HSP with the highest bitscore:
+
+    >>> qresults = SearchIO.parse('Blast/mirna.xml', 'blast-xml')
+    >>> for qresult in SearchIO.best_hits(qresults, hsps=True, reverse=True,
+    ...                                   key=lambda hsp: hsp.bitscore):
+    ...     print("%s %s" % (qresult.id, qresult.hsps[0].bitscore))
+    ... 
+    33211 111.292
+    33212 102.275
+    33213 120.309
+
+    Given a list of QueryResult iterables, for example from searching the
+    same queries against several databases, the results for each query are
+    merged before ranking. This is done as a k-way merge, so each of them
+    must return its queries sorted by ID (a ValueError is raised otherwise).
+    The new QueryResult takes its attributes from the first input with that
+    query, and if the same hit is in more than one input, its HSPs are pooled
+    (hsps=True) or only its best ranked Hit kept.
+
+    """
+    from Bio.SearchIO._reduce import merge_by_id, top_hits, top_hsps
+
+    if hsps:
+        reduce_func = top_hsps
+    else:
+        reduce_func = top_hits
+
+    if isinstance(qresults, (list, tuple)) and qresults and \
+            not isinstance(qresults[0], QueryResult):
+        for group in merge_by_id(qresults):
+            yield reduce_func(group, n, key, reverse)
+    else:
+        for qresult in qresults:
+            yield reduce_func([qresult], n, key, reverse)
+
+
 def to_dict(qresults, key_function=lambda rec: rec.id):
     """Turns a QueryResult iterator or list into a dictionary.
 
@@ -420,13 +565,16 @@ def to_dict(qresults, key_function=lambda rec: rec.id):
     return qdict
 
 
-def index(filename, format=None, key_function=None, **kwargs):
+def index(filename, format=None, key_function=None, offsets_filename=None,
+        **kwargs):
     """Indexes a search output file and returns a dictionary-like object.
 
      - filename     - string giving name of file to be indexed
      - format       - Lower case string denoting one of the supported formats.
      - key_function - Optional callback function which when given a
                       QueryResult should return a unique key for the dictionary.
+     - offsets_filename - Optional name of a file in which to save the query
+                      offsets, so they can be reused by later sessions.
      - kwargs       - Format-specific keyword arguments.
 
     Index returns a pseudo-dictionary object with QueryResult objects as its
@@ -478,6 +626,19 @@ def index(filename, format=None, key_function=None, **kwargs):
     Note that the callback function does not change the QueryResult's ID value.
     It only changes the key value used to retrieve the associated QueryResult.
 
+    Scanning a large file for the query offsets can take a while, so these can
+    be saved to a small offsets file given as offsets_filename. The next time
+    the same search output file is indexed, the saved offsets are used as long
+    as the file has not changed. If the file has grown since (for example as
+    a search is still running), only the new queries are scanned for. The
+    offsets file is updated as needed, and remembers the format and format
+    arguments it was made with; unlike index_db, it is a plain text file and
+    covers only one search output file::
+
+        from Bio import SearchIO
+        search_idx = SearchIO.index('results.xml', 'blast-xml',
+                                    offsets_filename='results.xml.offsets')
+
     """
     if not isinstance(filename, basestring):
         raise TypeError("Need a filename (not a handle)")
@@ -486,8 +647,16 @@ def index(filename, format=None, key_function=None, **kwargs):
     proxy_class = get_processor(format, _INDEXER_MAP)
     repr = "SearchIO.index(%r, %r, key_function=%r)" \
         % (filename, format, key_function)
-    return _IndexedSeqFileDict(proxy_class(filename, **kwargs),
-                               key_function, repr, "QueryResult")
+    proxy = proxy_class(filename, **kwargs)
+    if offsets_filename is not None:
+        from Bio.SearchIO._index import saved_offsets
+        try:
+            proxy = saved_offsets(proxy, filename, format, kwargs,
+                                  offsets_filename)
+        except (IOError, OSError, ValueError):
+            proxy._handle.close()
+            raise
+    return _IndexedSeqFileDict(proxy, key_function, repr, "QueryResult")
 
 
 def index_db(index_filename, filenames=None, format=None,
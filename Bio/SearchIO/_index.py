@@ -6,8 +6,12 @@
 
 """Custom indexing for Bio.SearchIO objects."""
 
+import os
+import tempfile
+import zlib
+
 from Bio._py3k import StringIO
-from Bio._py3k import _bytes_to_string
+from Bio._py3k import _as_bytes, _bytes_to_string
 from Bio import bgzf
 from Bio.File import _IndexedSeqFileProxy, _open_for_random_access
 
@@ -28,3 +32,263 @@ class SearchIndexer(_IndexedSeqFileProxy):
 
     def get(self, offset):
         return self._parse(StringIO(_bytes_to_string(self.get_raw(offset))))
+
+
+# approximate size of each block of queries given to a worker process when
+# parsing with several workers, in bytes and (for indexers which do not
+# report lengths) number of queries
+_BLOCK_SIZE = 1 << 20
+_BLOCK_QUERIES = 1000
+
+# the indexer used in each worker process, see _init_worker
+_worker_indexer = None
+
+
+def _init_worker(indexer_class, filename, kwargs):
+    """Creates the indexer in a worker process (PRIVATE)."""
+    global _worker_indexer
+    _worker_indexer = indexer_class(filename, **kwargs)
+
+
+def _parse_block(offsets):
+    """Parses the queries at the given offsets in a worker process (PRIVATE)."""
+    return [_worker_indexer.get(offset) for offset in offsets]
+
+
+def _iter_blocks(indexer):
+    """Splits the indexed queries into lists of offsets (PRIVATE)."""
+    offsets = []
+    size = 0
+    for key, offset, length in indexer:
+        offsets.append(offset)
+        size += length
+        if size >= _BLOCK_SIZE or len(offsets) >= _BLOCK_QUERIES:
+            yield offsets
+            offsets = []
+            size = 0
+    if offsets:
+        yield offsets
+
+
+def parallel_parse(indexer_class, filename, workers, kwargs):
+    """Parses a search output file using several processes (PRIVATE).
+
+    The query offsets found by the indexer are split into blocks at query
+    boundaries, and each block is parsed in a pool of worker processes.
+    The QueryResult objects are yielded in file order. Only a few blocks
+    per worker are in progress at a time, to limit memory use.
+    """
+    import multiprocessing
+    from collections import deque
+
+    indexer = indexer_class(filename, **kwargs)
+    pool = multiprocessing.Pool(workers, _init_worker,
+                                (indexer_class, filename, kwargs))
+    pending = deque()
+    try:
+        for offsets in _iter_blocks(indexer):
+            pending.append(pool.apply_async(_parse_block, (offsets,)))
+            if len(pending) > 2 * workers:
+                for qresult in pending.popleft().get():
+                    yield qresult
+        while pending:
+            for qresult in pending.popleft().get():
+                yield qresult
+    finally:
+        # let any outstanding blocks finish, as Pool.terminate can deadlock
+        # on older Pythons if a worker is busy
+        pool.close()
+        pool.join()
+        indexer._handle.close()
+
+
+class _OffsetHandle(object):
+    """Handle wrapper which makes part of a file look like a whole (PRIVATE).
+
+    Used to run an indexer over only the end of a file, as offset zero of
+    this handle is offset start of the underlying handle.
+    """
+
+    def __init__(self, handle, start):
+        self._handle = handle
+        self._start = start
+        handle.seek(start)
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            offset += self._start
+        return self._handle.seek(offset, whence)
+
+    def tell(self):
+        return self._handle.tell() - self._start
+
+    def __iter__(self):
+        return iter(self._handle.readline, _as_bytes(""))
+
+    def __getattr__(self, attr):
+        return getattr(self._handle, attr)
+
+
+class _SavedOffsetsProxy(object):
+    """Random access proxy giving previously found offsets (PRIVATE).
+
+    This wraps a SearchIndexer, but iterating over it gives the query keys
+    and offsets loaded from an offsets file instead of scanning the file.
+    """
+
+    def __init__(self, indexer, offsets):
+        self._indexer = indexer
+        self._handle = indexer._handle
+        self._offsets = offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def get(self, offset):
+        return self._indexer.get(offset)
+
+    def get_raw(self, offset):
+        return self._indexer.get_raw(offset)
+
+
+# first line of an offsets file, followed by the format details
+_OFFSETS_MAGIC = "#SearchIO.index offsets v3"
+
+# Number of bytes at the start of the file, and before the last query,
+# compared (by checksum) to tell an appended file from a rewritten one
+_CHECKED_SIZE = 64 * 1024
+
+
+def _scan_offsets(indexer, start=0):
+    """Returns the (key, offset, length) of each query from start (PRIVATE)."""
+    if not start:
+        return list(indexer)
+    handle = indexer._handle
+    indexer._handle = _OffsetHandle(handle, start)
+    try:
+        return [(key, offset + start, length)
+                for key, offset, length in indexer]
+    finally:
+        indexer._handle = handle
+
+
+def _prefix_checksum(filename, end):
+    """Returns a CRC32 checking the first end bytes of a file (PRIVATE).
+
+    Only the first and last _CHECKED_SIZE bytes before end are read, so
+    that checking a large file stays quick. This catches a file rewritten
+    with different queries, which will almost always differ at its start
+    or just before where the rescan of a grown file starts.
+    """
+    handle = open(filename, "rb")
+    try:
+        head = min(end, _CHECKED_SIZE)
+        checksum = zlib.crc32(handle.read(head))
+        tail = max(head, end - _CHECKED_SIZE)
+        handle.seek(tail)
+        checksum = zlib.crc32(handle.read(end - tail), checksum)
+    finally:
+        handle.close()
+    return "%08x" % (checksum & 0xffffffff)
+
+
+def _read_offsets_file(offsets_filename, details):
+    """Loads an offsets file, returns size, mtime, checksum, offsets (PRIVATE).
+
+    Returns None if the file is missing, unreadable, or was made for a
+    different format or format arguments.
+    """
+    try:
+        handle = open(offsets_filename, "rb")
+    except IOError:
+        return None
+    try:
+        lines = _bytes_to_string(handle.read()).split("\n")
+    finally:
+        handle.close()
+    try:
+        magic, file_details, size, mtime, checksum = lines[0].split("\t")
+        if magic != _OFFSETS_MAGIC or file_details != details:
+            return None
+        offsets = []
+        for line in lines[1:]:
+            if line:
+                offset, length, key = line.split("\t", 2)
+                offsets.append((key, int(offset), int(length)))
+        return int(size), float(mtime), checksum, offsets
+    except ValueError:
+        # corrupt or truncated, start again
+        return None
+
+
+def _write_offsets_file(offsets_filename, details, size, mtime, checksum,
+                        offsets):
+    """Saves an offsets file, via a temporary file (PRIVATE).
+
+    The temporary file has a unique name, so that several processes can
+    index the same file at once.
+    """
+    folder = os.path.dirname(os.path.abspath(offsets_filename))
+    descriptor, temp_filename = tempfile.mkstemp(dir=folder, prefix=".tmp")
+    try:
+        handle = os.fdopen(descriptor, "wb")
+        try:
+            handle.write(_as_bytes("%s\t%s\t%i\t%r\t%s\n"
+                                   % (_OFFSETS_MAGIC, details, size, mtime,
+                                      checksum)))
+            for key, offset, length in offsets:
+                if "\n" in key:
+                    raise ValueError("Cannot save query ID %r" % key)
+                handle.write(_as_bytes("%i\t%i\t%s\n"
+                                       % (offset, length, key)))
+        finally:
+            handle.close()
+        if os.name == "nt" and os.path.exists(offsets_filename):
+            # rename does not replace files on Windows
+            os.remove(offsets_filename)
+        os.rename(temp_filename, offsets_filename)
+    except (IOError, OSError, ValueError):
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+
+def saved_offsets(indexer, filename, format, kwargs, offsets_filename):
+    """Returns a proxy using query offsets saved between sessions (PRIVATE).
+
+    The offsets from the given offsets file are reused if the size and
+    modification time of the search output file have not changed. If the
+    file has grown (e.g. a search still running) and the bytes at its
+    start and before the last query previously found are the same (checked
+    with a CRC32 checksum, see _prefix_checksum), only the new part of the
+    file is scanned, starting from that query in case it was incomplete.
+    Otherwise the whole file is scanned. Any new offsets are written back
+    to the offsets file.
+    """
+    details = "%s %r" % (format, sorted(kwargs.items()))
+    stat = os.stat(filename)
+    size, mtime = stat.st_size, stat.st_mtime
+    # BGZF virtual offsets cannot be shifted, so those files are rescanned
+    appendable = not isinstance(indexer._handle, bgzf.BgzfReader)
+    saved = _read_offsets_file(offsets_filename, details)
+    if saved is not None and saved[:2] == (size, mtime):
+        return _SavedOffsetsProxy(indexer, saved[3])
+    checked = None
+    if saved is not None and saved[3] and saved[0] < size and appendable \
+            and saved[2] == _prefix_checksum(filename, saved[3][-1][1]):
+        # the file has been appended to, rescan from the last query
+        checked = saved[3][-1][1], saved[2]
+        offsets = saved[3][:-1]
+        offsets.extend(_scan_offsets(indexer, checked[0]))
+    else:
+        offsets = _scan_offsets(indexer)
+    if not offsets or not appendable:
+        checksum = "-"
+    elif checked is not None and checked[0] == offsets[-1][1]:
+        # still the same last query, whose checksum was just verified
+        checksum = checked[1]
+    else:
+        checksum = _prefix_checksum(filename, offsets[-1][1])
+    _write_offsets_file(offsets_filename, details, size, mtime, checksum,
+                        offsets)
+    return _SavedOffsetsProxy(indexer, offsets)
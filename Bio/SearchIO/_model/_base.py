@@ -11,10 +11,39 @@ from Bio._utils import getattr_str, trim_str
 
 class _BaseSearchObject(object):
 
-    """Abstract class for SearchIO objects."""
+    """Abstract class for SearchIO objects.
+
+    Subclasses holding many instances (Hit, HSP and HSPFragment) declare the
+    attributes they always have in `__slots__`, which saves memory and speeds
+    up attribute access. They also list `__dict__` there, so that the format
+    specific attributes set by the parsers (or by users) are still allowed,
+    and `__weakref__`, so that they can still be weakly referenced.
+
+    """
+
+    __slots__ = ()
 
     _NON_STICKY_ATTRS = ()
 
+    def _attr_names(self):
+        """Returns the names of the instance attributes that are set."""
+        names = []
+        for cls in self.__class__.__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name not in ('__dict__', '__weakref__') and \
+                        name not in names and hasattr(self, name):
+                    names.append(name)
+        names.extend(getattr(self, '__dict__', {}))
+        return names
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name))
+                    for name in self._attr_names())
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def _transfer_attrs(self, obj):
         """Transfer instance attributes to the given object.
 
@@ -30,15 +59,17 @@ class _BaseSearchObject(object):
 
         """
         # list of attribute names we don't want to transfer
-        for attr in self.__dict__.keys():
+        for attr in self._attr_names():
             if attr not in self._NON_STICKY_ATTRS:
-                setattr(obj, attr, self.__dict__[attr])
+                setattr(obj, attr, getattr(self, attr))
 
 
 class _BaseHSP(_BaseSearchObject):
 
     """Abstract base class for HSP objects."""
 
+    __slots__ = ()
+
     def _str_hsp_header(self):
         """Prints the alignment header info."""
         lines = []
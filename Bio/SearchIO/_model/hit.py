@@ -102,6 +102,10 @@ class Hit(_BaseSearchObject):
     # from this one
     _NON_STICKY_ATTRS = ('_items', )
 
+    # format specific attributes go in __dict__
+    __slots__ = ('_id', '_query_id', '_description', '_query_description',
+            '_items', '__dict__', '__weakref__')
+
     def __init__(self, hsps=[], id=None, query_id=None):
         """Initializes a Hit object.
 
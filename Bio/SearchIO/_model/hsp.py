@@ -247,6 +247,9 @@ class HSP(_BaseHSP):
     # from this one
     _NON_STICKY_ATTRS = ('_items', )
 
+    # format specific attributes go in __dict__
+    __slots__ = ('_items', '__dict__', '__weakref__')
+
     def __init__(self, fragments=[]):
         """Initializes an HSP object.
 
@@ -670,8 +673,19 @@ class HSPFragment(_BaseHSP):
     CCCTCTACAGGGAAGCGCTTTCTGTTGTCTGAAAGAAAAGAAAG...GGG 33211
     CCCTCTACAGGGAAGCGCTTTCTGTTGTCTGAAAGAAAAGAAAG...GGG gi|262205317|ref|NR_030195.1|
 
+    The query and hit sequences may be given as plain strings, in which case
+    their SeqRecord objects are only created when first used.
+
     """
 
+    # format specific attributes go in __dict__
+    __slots__ = ('_alphabet', 'aln_annotation', '_aln_span',
+            '_hit', '_hit_id', '_hit_description', '_hit_features',
+            '_hit_strand', '_hit_frame', '_hit_start', '_hit_end',
+            '_query', '_query_id', '_query_description', '_query_features',
+            '_query_strand', '_query_frame', '_query_start', '_query_end',
+            '__dict__', '__weakref__')
+
     def __init__(self, hit_id='<unknown id>', query_id='<unknown id>',
             hit=None, query=None, alphabet=single_letter_alphabet):
 
@@ -790,6 +804,9 @@ class HSPFragment(_BaseHSP):
         seq -- String or SeqRecord to check
         seq_type -- String of sequence type, must be 'hit' or 'query'
 
+        Strings are returned as they are, to be turned into SeqRecord objects
+        by `_make_seq` when first accessed.
+
         """
         assert seq_type in ('hit', 'query')
         if seq is None:
@@ -807,6 +824,19 @@ class HSPFragment(_BaseHSP):
                         "%r (%s); found: %r (%s)." % (len(opp_seq), opp_type,
                         len(seq), seq_type))
 
+        if isinstance(seq, SeqRecord):
+            seq = self._make_seq(seq, seq_type)
+
+        return seq
+
+    def _make_seq(self, seq, seq_type):
+        """Returns the sequence as a SeqRecord with the current attributes
+
+        Arguments:
+        seq -- String or SeqRecord of the sequence
+        seq_type -- String of sequence type, must be 'hit' or 'query'
+
+        """
         seq_id = getattr(self, '%s_id' % seq_type)
         seq_desc = getattr(self, '%s_description' % seq_type)
         seq_feats = getattr(self, '%s_features' % seq_type)
@@ -825,6 +855,8 @@ class HSPFragment(_BaseHSP):
         return seq
 
     def _hit_get(self):
+        if isinstance(self._hit, basestring):
+            self._hit = self._make_seq(self._hit, 'hit')
         return self._hit
 
     def _hit_set(self, value):
@@ -834,6 +866,8 @@ class HSPFragment(_BaseHSP):
             doc="""Hit sequence as a SeqRecord object, defaults to None""")
 
     def _query_get(self):
+        if isinstance(self._query, basestring):
+            self._query = self._make_seq(self._query, 'query')
         return self._query
 
     def _query_set(self, value):
@@ -861,12 +895,13 @@ class HSPFragment(_BaseHSP):
 
     def _alphabet_set(self, value):
         self._alphabet = value
+        # sequences still held as strings get the alphabet when first used
         try:
-            self.query.seq.alphabet = value
+            self._query.seq.alphabet = value
         except AttributeError:
             pass
         try:
-            self.hit.seq.alphabet = value
+            self._hit.seq.alphabet = value
         except AttributeError:
             pass
 
@@ -879,10 +914,10 @@ class HSPFragment(_BaseHSP):
         # alignment span can be its own attribute, or computed from
         # query / hit length
         if not hasattr(self, '_aln_span'):
-            if self.query is not None:
-                self._aln_span = len(self.query)
-            elif self.hit is not None:
-                self._aln_span = len(self.hit)
+            if self._query is not None:
+                self._aln_span = len(self._query)
+            elif self._hit is not None:
+                self._aln_span = len(self._hit)
 
         return self._aln_span
 
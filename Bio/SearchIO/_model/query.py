@@ -18,6 +18,15 @@ from _base import _BaseSearchObject
 from hit import Hit
 
 
+def _hit_id(hit):
+    """Returns the ID of a Hit, the default key function (PRIVATE).
+
+    This is a module level function rather than a lambda so that
+    QueryResult objects can be pickled (e.g. to pass between processes).
+    """
+    return hit.id
+
+
 class QueryResult(_BaseSearchObject):
 
     """Class representing search results from a single query.
@@ -182,8 +191,7 @@ class QueryResult(_BaseSearchObject):
     # from this one
     _NON_STICKY_ATTRS = ('_items',)
 
-    def __init__(self, hits=[], id=None,
-            hit_key_function=lambda hit: hit.id):
+    def __init__(self, hits=[], id=None, hit_key_function=_hit_id):
         """Initializes a QueryResult object.
 
         Arguments:
@@ -0,0 +1,106 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Streaming reduction of search results to the best hits (PRIVATE).
+
+This holds the code behind Bio.SearchIO.best_hits, which keeps only a
+bounded number of the best hits or HSPs for each query, and can merge the
+results for the same queries from several search output files.
+"""
+
+import heapq
+from itertools import chain, groupby, islice
+
+from Bio._py3k import OrderedDict
+from Bio.SearchIO._model import QueryResult, Hit
+
+
+def _check_sorted(qresults, source):
+    """Yields (query ID, source, QueryResult), checking ID order (PRIVATE)."""
+    prev_id = None
+    for qresult in qresults:
+        if prev_id is not None and qresult.id <= prev_id:
+            raise ValueError("Queries of input %i are not sorted by ID: "
+                    "%r after %r" % (source, qresult.id, prev_id))
+        prev_id = qresult.id
+        yield qresult.id, source, qresult
+
+
+def merge_by_id(sources):
+    """Yields lists of the QueryResult objects for each query ID (PRIVATE).
+
+    This is a k-way merge, so each source must give its queries sorted by
+    ID. Only one QueryResult from each source is held at a time.
+    """
+    merged = heapq.merge(*[_check_sorted(qresults, idx)
+                           for idx, qresults in enumerate(sources)])
+    for query_id, group in groupby(merged, lambda item: item[0]):
+        yield [qresult for query_id, source, qresult in group]
+
+
+def _top(items, n, key, reverse):
+    """Returns the first n items ranked by key, using a bounded heap (PRIVATE)."""
+    if key is None:
+        if reverse:
+            return list(items)[:-n - 1:-1]
+        return list(islice(items, n))
+    if reverse:
+        return heapq.nlargest(n, items, key=key)
+    return heapq.nsmallest(n, items, key=key)
+
+
+def top_hits(qresults, n, key, reverse):
+    """Returns a QueryResult with the best n Hit objects (PRIVATE).
+
+    The qresults should be a list of QueryResult objects for the same query,
+    where the first one provides the attributes of the new QueryResult. If
+    the same hit is found in more than one, only its best ranking is kept.
+    """
+    first = qresults[0]
+    hits = chain.from_iterable(qresult.hits for qresult in qresults)
+    if len(qresults) == 1:
+        best = _top(hits, n, key, reverse)
+    else:
+        # allow for duplicates when keeping the top hits
+        best = []
+        seen = set()
+        for hit in _top(hits, n * len(qresults), key, reverse):
+            hit_key = first._hit_key_function(hit)
+            if hit_key not in seen:
+                seen.add(hit_key)
+                best.append(hit)
+        best = best[:n]
+    obj = QueryResult(best, first.id, first._hit_key_function)
+    first._transfer_attrs(obj)
+    return obj
+
+
+def top_hsps(qresults, n, key, reverse):
+    """Returns a QueryResult with the best n HSP objects (PRIVATE).
+
+    The selected HSPs are kept within copies of their Hit objects, in the
+    order of each Hit's best HSP. HSPs of the same hit from several of the
+    qresults are combined into one Hit.
+    """
+    first = qresults[0]
+    hit_key_function = first._hit_key_function
+    pairs = ((hsp, hit) for qresult in qresults
+             for hit in qresult.hits for hsp in hit.hsps)
+    if key is not None:
+        hsp_key = key
+        key = lambda pair: hsp_key(pair[0])
+    grouped = OrderedDict()
+    for hsp, parent in _top(pairs, n, key, reverse):
+        hit_key = hit_key_function(parent)
+        if hit_key not in grouped:
+            grouped[hit_key] = (parent, [])
+        grouped[hit_key][1].append(hsp)
+    hits = []
+    for parent, hsps in grouped.values():
+        hit = Hit(hsps)
+        parent._transfer_attrs(hit)
+        hits.append(hit)
+    obj = QueryResult(hits, first.id, hit_key_function)
+    first._transfer_attrs(obj)
+    return obj
@@ -0,0 +1,179 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Columnar reading of tabular search output formats (PRIVATE).
+
+This holds the common code behind Bio.SearchIO.read_table, which skips the
+QueryResult, Hit, HSP and HSPFragment object model and instead returns each
+column of a tabular file as a typed array. The format specific readers live
+alongside the other parsers for each format.
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _convert_column(values, kind):
+    """Turn a list of column strings into a typed array (PRIVATE).
+
+    Numeric columns become NumPy arrays (float or 64-bit integer) if NumPy is
+    installed, otherwise an array from the standard library array module.
+    Any other column is left as a list of strings.
+    """
+    if kind is float:
+        if numpy is not None:
+            return numpy.array(values, dtype=float)
+        return array('d', map(float, values))
+    elif kind is int:
+        if numpy is not None:
+            return numpy.array(values, dtype=numpy.int64)
+        return array('l', map(int, values))
+    return values
+
+
+class SearchTable(object):
+
+    """Columns of search results for a run of complete queries.
+
+    The rows (one per hit, HSP or domain depending on the format) are kept
+    in file order, so all the rows for a query are adjacent. The columns are
+    accessed by name, e.g. table['evalue'], and the boundaries between the
+    queries are given by the query_ids and query_starts attributes; the rows
+    of query_ids[i] run from query_starts[i] up to query_starts[i + 1].
+
+    Numeric columns are NumPy arrays when NumPy is available (otherwise
+    arrays from the standard library array module), so that filtering and
+    best hit selection can be vectorised. For example, the best bitscore per
+    query is numpy.maximum.reduceat(table['bitscore'], table.query_starts[:-1]).
+    Other columns are lists of strings.
+
+    Values are as given in the file; in particular coordinates have not been
+    converted to the zero-based convention used elsewhere in SearchIO.
+    """
+
+    def __init__(self, fields, columns, query_ids, query_starts):
+        self.fields = fields
+        self.columns = columns
+        self.query_ids = query_ids
+        self.query_starts = query_starts
+
+    def __len__(self):
+        return int(self.query_starts[-1])
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __contains__(self, field):
+        return field in self.columns
+
+    def __repr__(self):
+        return "<%s with %i rows for %i queries, fields %s>" % \
+                (self.__class__.__name__, len(self), len(self.query_ids),
+                 ', '.join(self.fields))
+
+    def iter_queries(self):
+        """Iterate over the queries, yielding ID, start row and end row."""
+        starts = self.query_starts
+        for idx, query_id in enumerate(self.query_ids):
+            yield query_id, int(starts[idx]), int(starts[idx + 1])
+
+
+class _BaseTableReader(object):
+
+    """Base class for the columnar tabular readers (PRIVATE).
+
+    Subclasses must provide the _iter_rows method, which yields each result
+    row as a list of strings, and the _layout method, which returns the
+    (name, type) pairs for the columns and the name of the query ID column.
+    The layout is only requested once the first row has been read, as some
+    formats (commented BLAST tables) define it in the file itself.
+    """
+
+    def __init__(self, handle, columns=None, chunk_size=100000):
+        if chunk_size < 1:
+            raise ValueError("The chunk_size must be at least one row.")
+        self.handle = handle
+        self.wanted = columns
+        self.chunk_size = chunk_size
+
+    def _iter_rows(self):
+        raise NotImplementedError
+
+    def _layout(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        chunk_size = self.chunk_size
+        rows = []
+        query_idx = None
+        prev_qid = None
+        for row in self._iter_rows():
+            if query_idx is None:
+                query_idx = self._prepare()
+                width = self._width
+            if len(row) != width:
+                raise ValueError("Expected %i columns, found: %i" %
+                        (width, len(row)))
+            qid = row[query_idx]
+            if qid != prev_qid:
+                # only ever start a new chunk at a new query
+                if len(rows) >= chunk_size:
+                    yield self._make_table(rows)
+                    rows = []
+                prev_qid = qid
+            rows.append(row)
+        if rows:
+            yield self._make_table(rows)
+
+    def _prepare(self):
+        """Work out which columns to extract, returns the query column index."""
+        layout, query_field = self._layout()
+        names = [name for name, kind in layout]
+        if self.wanted is None:
+            wanted = names
+        else:
+            wanted = self.wanted
+            if isinstance(wanted, basestring):
+                wanted = wanted.split()
+            for name in wanted:
+                if name not in names:
+                    raise ValueError("Field %r not available, expected one "
+                            "of: %s" % (name, ', '.join(names)))
+        kinds = dict(layout)
+        self._extract = [(name, names.index(name), kinds[name])
+                         for name in wanted]
+        self._fields = list(wanted)
+        self._width = len(layout)
+        self._query_idx = names.index(query_field)
+        return self._query_idx
+
+    def _make_table(self, rows):
+        """Returns a SearchTable from the given split rows."""
+        query_column = [row[self._query_idx] for row in rows]
+        query_ids = []
+        starts = []
+        prev = None
+        for idx, qid in enumerate(query_column):
+            if qid != prev:
+                query_ids.append(qid)
+                starts.append(idx)
+                prev = qid
+        starts.append(len(rows))
+        columns = {}
+        for name, idx, kind in self._extract:
+            if idx == self._query_idx:
+                values = query_column
+            else:
+                values = [row[idx] for row in rows]
+            columns[name] = _convert_column(values, kind)
+        if numpy is not None:
+            starts = numpy.array(starts, dtype=numpy.int64)
+        else:
+            starts = array('l', starts)
+        return SearchTable(self._fields, columns, query_ids, starts)
+
@@ -123,8 +123,9 @@ def fragcascade(attr, seq_type, doc=''):
 
     def setter(self, value):
         setattr(self, attr_name, value)
-        seq = getattr(self, seq_type)
-        if seq is not None:
+        # sequences still held as strings pick up the value when first used
+        seq = getattr(self, '_%s' % seq_type, None)
+        if seq is not None and not isinstance(seq, basestring):
             setattr(seq, attr, value)
 
     return property(fget=getter, fset=setter, doc=doc)
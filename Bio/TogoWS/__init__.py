@@ -36,6 +36,7 @@ import urllib
 import urllib2
 import time
 from Bio._py3k import _binary_to_string_handle, _as_bytes
+from Bio import webcache
 
 #Constant
 _BASE_URL = "http://togows.dbcls.jp"
@@ -307,21 +308,13 @@ def _open(url, post=None):
     In the absense of clear guidelines, this function enforces a limit of
     "up to three queries per second" to avoid abusing the TogoWS servers.
     """
-    delay = 0.333333333  # one third of a second
-    current = time.time()
-    wait = _open.previous + delay - current
-    if wait > 0:
-        time.sleep(wait)
-        _open.previous = current + wait
-    else:
-        _open.previous = current
-
     #print(url)
     try:
         if post:
-            handle = urllib2.urlopen(url, _as_bytes(urllib.urlencode(post)))
+            handle = webcache._urlopen(url, _as_bytes(urllib.urlencode(post)),
+                                       _wait)
         else:
-            handle = urllib2.urlopen(url)
+            handle = webcache._urlopen(url, wait=_wait)
     except urllib2.HTTPError as exception:
         raise exception
 
@@ -330,4 +323,16 @@ def _open(url, post=None):
     #examine the start of the data returned back.
     return _binary_to_string_handle(handle)
 
-_open.previous = 0
+
+def _wait():
+    """Waits to keep to three queries per second (PRIVATE)."""
+    delay = 0.333333333  # one third of a second
+    current = time.time()
+    wait = _wait.previous + delay - current
+    if wait > 0:
+        time.sleep(wait)
+        _wait.previous = current + wait
+    else:
+        _wait.previous = current
+
+_wait.previous = 0
@@ -0,0 +1,284 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Optional on-disk cache of the responses from online databases.
+
+Bio.Entrez, Bio.ExPASy, Bio.TogoWS and Bio.SCOP normally go to the network
+for every request. By setting this module's cache variable to a ResponseCache,
+the responses are saved to a local directory, and an identical request made
+later (for instance when rerunning a pipeline) is answered from the disk
+without contacting the server, or waiting for the rate limits:
+
+>>> from Bio import webcache
+>>> webcache.cache = webcache.ResponseCache("web_cache", ttl=7 * 24 * 3600)
+
+Requests are identified by their URL and parameters (whether sent by GET or
+POST), with the parameters sorted so that their order does not matter. Only
+successful responses are saved. Bio.Entrez does not use the cache for
+requests involving the history server (EPost, and searches or links with
+usehistory or a WebEnv), as their results expire on the server, and does
+not save responses holding an ERROR element.
+
+The cache directory can be shared by several processes: each response is
+written to a temporary file and then renamed into place, so readers never
+see a partly written response. Setting the cache back to None turns caching
+off again:
+
+>>> webcache.cache.hits, webcache.cache.misses
+(0, 0)
+>>> webcache.cache.clear()
+>>> webcache.cache = None
+
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import urllib
+import urllib2
+import urlparse
+from io import BytesIO
+
+from Bio._py3k import _as_bytes, _as_string
+
+
+# The ResponseCache used by the online modules, or None for no caching
+cache = None
+
+
+def _request_key(url, data=None):
+    """Returns a hash identifying a request by its URL and parameters (PRIVATE).
+
+    The scheme and host are case insensitive, and the order of the
+    parameters does not matter (except for repeated parameters):
+
+    >>> _request_key("HTTP://Example.org/cgi?b=2&a=1") == _request_key(
+    ...     "http://example.org/cgi", "a=1&b=2")
+    True
+    >>> _request_key("http://example.org/cgi?id=1&id=2") == _request_key(
+    ...     "http://example.org/cgi?id=2&id=1")
+    False
+
+    """
+    scheme, netloc, path, query, fragment = urlparse.urlsplit(url)
+    params = urlparse.parse_qsl(query, keep_blank_values=True)
+    if data:
+        params += urlparse.parse_qsl(_as_string(data), keep_blank_values=True)
+    params.sort(key=lambda param: param[0])
+    normalised = "%s://%s%s?%s" % (scheme.lower(), netloc.lower(),
+                                   path or "/", urllib.urlencode(params))
+    return hashlib.sha1(_as_bytes(normalised)).hexdigest()
+
+
+class ResponseCache(object):
+    """Directory of saved responses, with size and age limits.
+
+    Arguments:
+     - directory - Where to keep the responses; it is created if needed.
+     - max_size - Maximum total size of the responses in bytes, after
+       which the least recently used ones are removed (default 100MB).
+       Use None for no limit.
+     - ttl - Time in seconds after which a saved response is stale, and
+       fetched again. The default of None keeps responses indefinitely.
+
+    The hits and misses attributes count the requests answered from and
+    not found in the cache by this object.
+    """
+
+    def __init__(self, directory, max_size=100 * 1024 * 1024, ttl=None):
+        if max_size is not None and max_size < 0:
+            raise ValueError("The maximum size must not be negative, not %r"
+                             % max_size)
+        if ttl is not None and ttl < 0:
+            raise ValueError("The TTL must not be negative, not %r" % ttl)
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # estimated total size, found by the first eviction scan
+        self._size = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # another process may have created it
+                if not os.path.isdir(self.directory):
+                    raise
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, url, data=None):
+        """Returns the saved response body for a request, or None."""
+        path = self._path(_request_key(url, data))
+        try:
+            modified = os.path.getmtime(path)
+            now = time.time()
+            if self.ttl is not None and now - modified > self.ttl:
+                os.remove(path)
+                self._count(False)
+                return None
+            with open(path, "rb") as handle:
+                body = handle.read()
+            # the access time orders the least recently used responses,
+            # while the modification time gives their age
+            os.utime(path, (now, modified))
+        except (IOError, OSError):
+            # not saved, or removed by another process in the meantime
+            self._count(False)
+            return None
+        self._count(True)
+        return body
+
+    def put(self, url, data, body):
+        """Saves the response body for a request."""
+        path = self._path(_request_key(url, data))
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            try:
+                os.mkdir(folder)
+            except OSError:
+                if not os.path.isdir(folder):
+                    raise
+        descriptor, temp_path = tempfile.mkstemp(dir=folder, prefix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                handle.write(body)
+            if os.name == "nt" and os.path.exists(path):
+                # rename does not replace files on Windows
+                os.remove(path)
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            # most likely another process saved the same response
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body)
+        if self.max_size is not None and \
+                (self._size is None or self._size > self.max_size):
+            self._evict()
+
+    def _entries(self):
+        """Returns (access time, size, path) for each saved response (PRIVATE)."""
+        entries = []
+        for folder in os.listdir(self.directory):
+            folder = os.path.join(self.directory, folder)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if name.startswith(".tmp"):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_atime, info.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Removes the least recently used responses over the size limit (PRIVATE)."""
+        with self._lock:
+            entries = self._entries()
+            size = sum(entry[1] for entry in entries)
+            entries.sort()
+            for atime, entry_size, path in entries:
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                size -= entry_size
+            self._size = size
+
+    def clear(self):
+        """Removes all the saved responses."""
+        with self._lock:
+            for atime, size, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+
+def _urlopen(url, data=None, wait=None, opener=urllib2.urlopen,
+             cacheable=True, valid=None):
+    """Opens a URL, or a saved copy of its response (PRIVATE).
+
+    Arguments:
+     - url - The URL to open, including any GET parameters.
+     - data - The POST data, if any.
+     - wait - Optional function called before going to the network,
+       e.g. to enforce a rate limit.
+     - opener - Function used to open the URL.
+     - cacheable - Whether the cache may be used for this request, e.g.
+       False for responses only valid for a limited time.
+     - valid - Optional function given a successful response body,
+       returning whether it may be saved (e.g. False for error messages
+       sent with a success status).
+
+    Without a cache this just returns opener(url, data). Otherwise the
+    whole response is read and returned as a binary handle.
+    """
+    current = cache
+    if not cacheable:
+        current = None
+    if current is not None:
+        body = current.get(url, data)
+        if body is not None:
+            return BytesIO(body)
+    if wait is not None:
+        wait()
+    if data is None:
+        handle = opener(url)
+    else:
+        handle = opener(url, data)
+    if current is None:
+        return handle
+    body = handle.read()
+    try:
+        status = handle.getcode()
+    except AttributeError:
+        status = None
+    handle.close()
+    if (status is None or status == 200) and (valid is None or valid(body)):
+        current.put(url, data, body)
+    return BytesIO(body)
+
+
+def _test():
+    """Run the module's doctests (PRIVATE)."""
+    import doctest
+    import shutil
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        print("Running doctests...")
+        doctest.testmod()
+        print("Done")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Small script to test timing of loading structures saved by Bio.PDB.
+
+Usage: pdb_cache_performance.py [file or directory ...]
+
+Parses each PDB file (plain or gzipped), saves it with
+Bio.PDB.StructureCache.save_structure, and then times parsing the file,
+loading the saved structure, loading it and using one chain, and loading
+it and making all its atoms. Without arguments the files in Tests/PDB are
+used, as for pdb_parser_performance.py.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+from Bio._py3k import StringIO
+from Bio.PDB import PDBParser
+from Bio.PDB.PDBExceptions import PDBConstructionWarning
+from Bio.PDB.StructureCache import save_structure, load_structure
+
+from pdb_parser_performance import REPEATS, count_atoms, find_files, \
+    read_text, report
+
+
+def time_function(function, corpus):
+    start_time = time.time()
+    for i in range(REPEATS):
+        for name, data in corpus:
+            function(name, data)
+    return time.time() - start_time
+
+
+def parse(name, text):
+    PDBParser().get_structure(name, StringIO(text))
+
+
+def load(name, filename):
+    load_structure(filename)
+
+
+def load_chain(name, filename):
+    structure = load_structure(filename)
+    for model in structure:
+        for chain in model:
+            len(chain)
+            break
+        break
+
+
+def load_atoms(name, filename):
+    load_structure(filename).atom_array.atoms
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                          "..", "..", "Tests", "PDB")]
+    warnings.simplefilter("ignore", PDBConstructionWarning)
+    corpus = [(os.path.basename(f), read_text(f)) for f in find_files(paths)]
+    directory = tempfile.mkdtemp()
+    try:
+        saved = []
+        for index, (name, text) in enumerate(corpus):
+            filename = os.path.join(directory, "%i.struct" % index)
+            save_structure(PDBParser().get_structure(name, StringIO(text)),
+                           filename)
+            saved.append((name, filename))
+        atoms = REPEATS * sum(count_atoms(text) for name, text in corpus)
+        print("Reading %i files %i times" % (len(corpus), REPEATS))
+        parse_time = time_function(parse, corpus)
+        report("Parsing", atoms, parse_time)
+        for label, function in [("Loading", load),
+                                ("Loading and using the first chain",
+                                 load_chain),
+                                ("Loading and making all the atoms",
+                                 load_atoms)]:
+            elapsed_time = time_function(function, saved)
+            report(label, atoms, elapsed_time)
+            print("\t%0.1f times as fast as parsing"
+                  % (parse_time / elapsed_time))
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""Small script to test timing of parsing PDB files with Bio.PDB.
+
+Usage: pdb_parser_performance.py [--baseline DIR] [file or directory ...]
+
+Parses each PDB file (plain or gzipped) several times, both with the
+default StructureBuilder (which adds the atoms of each residue in one go)
+and with a StructureBuilder adding the atoms one at a time, and reports
+the atoms parsed per second. Without arguments the files in Tests/PDB are
+used; for meaningful numbers point it at a larger corpus, e.g. a local
+mirror of the PDB made with Bio.PDB.PDBList.
+
+With --baseline the same files are also parsed by the Biopython found in
+DIR (run in a separate Python process with DIR first on the path), so the
+parser can be compared against an older version, e.g. one extracted with
+
+    git archive biopython-162 Bio | tar -x -C DIR
+
+and built in place. On a single core machine, parsing 2XHE.pdb took
+0.111 seconds with the parser of Biopython 1.62 and 0.091 seconds with
+this one (the best of 40 runs each, alternating between the two).
+"""
+from __future__ import print_function
+
+import gzip
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+from Bio._py3k import StringIO
+from Bio.PDB import PDBParser
+from Bio.PDB.PDBExceptions import PDBConstructionWarning
+from Bio.PDB.StructureBuilder import StructureBuilder
+
+REPEATS = 3
+
+
+class OneAtATimeBuilder(StructureBuilder):
+    """StructureBuilder which does not use the bulk insertion."""
+
+    def init_atom(self, *args):
+        StructureBuilder.init_atom(self, *args)
+
+
+def find_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith((".pdb", ".ent", ".ent.gz", ".pdb.gz")):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def read_text(filename):
+    if filename.endswith(".gz"):
+        handle = gzip.open(filename)
+    else:
+        handle = open(filename)
+    try:
+        return handle.read()
+    finally:
+        handle.close()
+
+
+def count_atoms(text):
+    """Counts the ATOM and HETATM records, as any version would parse."""
+    return sum(1 for line in text.splitlines()
+               if line.startswith(("ATOM  ", "HETATM")))
+
+
+def time_parser(corpus, builder_class):
+    start_time = time.time()
+    for i in range(REPEATS):
+        for name, text in corpus:
+            parser = PDBParser(structure_builder=builder_class())
+            parser.get_structure(name, StringIO(text))
+    return time.time() - start_time
+
+
+def time_baseline(baseline, paths):
+    """Times the default parser of the Biopython in the baseline directory."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.abspath(baseline)] +
+                                        env.get("PYTHONPATH", "").split(
+                                            os.pathsep))
+    output = subprocess.check_output([sys.executable,
+                                      os.path.abspath(__file__),
+                                      "--time-only"] + paths, env=env)
+    return float(output)
+
+
+def report(label, atoms, elapsed_time):
+    print(label)
+    print("\tDid %i atoms in %0.2f seconds for\n\t%f atoms per second"
+          % (atoms, elapsed_time, atoms / elapsed_time))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    time_only = "--time-only" in args
+    if time_only:
+        args.remove("--time-only")
+    baseline = None
+    if "--baseline" in args:
+        index = args.index("--baseline")
+        baseline = args[index + 1]
+        del args[index:index + 2]
+    paths = args or [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "..", "..", "Tests", "PDB")]
+    # read the files up front, so only the parsing is timed
+    corpus = [(os.path.basename(f), read_text(f)) for f in find_files(paths)]
+    warnings.simplefilter("ignore", PDBConstructionWarning)
+    if time_only:
+        # the baseline run, which may be an older Biopython
+        print(time_parser(corpus, StructureBuilder))
+        sys.exit(0)
+    atoms = REPEATS * sum(count_atoms(text) for name, text in corpus)
+    print("Parsing %i files %i times" % (len(corpus), REPEATS))
+    report("Adding one atom at a time", atoms,
+           time_parser(corpus, OneAtATimeBuilder))
+    elapsed_time = time_parser(corpus, StructureBuilder)
+    report("Adding whole residues", atoms, elapsed_time)
+    if baseline:
+        baseline_time = time_baseline(baseline, paths)
+        report("Baseline parser in %s" % baseline, atoms, baseline_time)
+        print("\tThis parser takes %0.2f times as long"
+              % (elapsed_time / baseline_time))
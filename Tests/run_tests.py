@@ -92,6 +92,7 @@ DOCTEST_MODULES = [
                    "Bio.Application",
                    "Bio.bgzf",
                    "Bio.Blast.Applications",
+                   "Bio.Blast.NCBIXML",
                    "Bio.Emboss.Applications",
                    "Bio.GenBank",
                    "Bio.KEGG.Compound",
@@ -132,10 +133,19 @@ DOCTEST_MODULES = [
                   ]
 #Silently ignore any doctests for modules requiring numpy!
 if is_numpy():
-    DOCTEST_MODULES.extend(["Bio.Statistics.lowess",
+    DOCTEST_MODULES.extend(["Bio.Align.Distance",
+                            "Bio.Statistics.lowess",
+                            "Bio.PDB.AtomArray",
                             "Bio.PDB.Polypeptide",
                             "Bio.PDB.Selection"
                             ])
+    #Bio.PDB.SASA uses the C code of Bio.KDTree, like NeighborSearch
+    try:
+        from Bio.KDTree import _CKDTree
+        del _CKDTree
+        DOCTEST_MODULES.append("Bio.PDB.SASA")
+    except ImportError:
+        pass
 
 
 try:
@@ -95,8 +95,8 @@ class CheckIndex(unittest.TestCase):
 
 def _num_difference(obj_a, obj_b):
     """Returns the number of instance attributes presence only in one object."""
-    attrs_a = obj_a.__dict__.keys()
-    attrs_b = obj_b.__dict__.keys()
+    attrs_a = obj_a._attr_names()
+    attrs_b = obj_b._attr_names()
     diff = set(attrs_a).symmetric_difference(set(attrs_b))
     privates = len([x for x in diff if x.startswith('_')])
     return len(diff) - privates
@@ -110,7 +110,7 @@ def compare_search_obj(obj_a, obj_b):
 
     # compare qresult attributes
     # if the above assertion pass, doesn't matter if we use a or be here
-    compare_attrs(obj_a, obj_b, obj_a.__dict__.keys())
+    compare_attrs(obj_a, obj_b, obj_a._attr_names())
 
     # compare objects recursively if it's not an HSPFragment
     if not isinstance(obj_a, SearchIO.HSPFragment):
@@ -138,6 +138,11 @@ def compare_attrs(obj_a, obj_b, attrs):
         # comparing using compare_record is too slow
         if attr in ('_hit', '_query') and (val_a is not None and val_b is
                 not None):
+            # sequences not yet used may still be strings
+            if isinstance(val_a, basestring):
+                val_a = getattr(obj_a, attr[1:])
+            if isinstance(val_b, basestring):
+                val_b = getattr(obj_b, attr[1:])
             # compare seq directly if it's a contiguous hsp
             if isinstance(val_a, SeqRecord) and isinstance(val_b, SeqRecord):
                 assert str(val_a.seq) == str(val_b.seq), \
@@ -0,0 +1,109 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.AlignIO.iter_columns (windowed alignment reading)."""
+
+import unittest
+
+from Bio._py3k import StringIO
+from Bio import AlignIO
+from Bio.Alphabet import generic_protein
+
+# Single alignment files in each format supported by iter_columns
+test_files = [
+    ("clustal", "Clustalw/cw02.aln"),
+    ("clustal", "Clustalw/opuntia.aln"),
+    ("clustal", "Clustalw/odd_consensus.aln"),
+    ("clustal", "Clustalw/protein.aln"),
+    ("fasta", "GFF/multi.fna"),
+    ("stockholm", "Stockholm/simple.sth"),
+    ("stockholm", "Stockholm/funny.sth"),
+    ("phylip", "Phylip/reference_dna.phy"),
+    ("phylip", "Phylip/hennigian.phy"),
+    ("phylip", "Phylip/interlaced.phy"),
+    ("phylip", "Phylip/interlaced2.phy"),
+    ("phylip-relaxed", "ExtendedPhylip/primates.phyx"),
+    ("phylip-sequential", "Phylip/sequential.phy"),
+    ("phylip-sequential", "Phylip/sequential2.phy"),
+    ]
+
+
+class WindowTests(unittest.TestCase):
+    """Compare the windows with the full alignment from AlignIO.read."""
+
+    def check_windows(self, format, filename, window):
+        full = AlignIO.read(filename, format)
+        length = full.get_alignment_length()
+        blocks = list(AlignIO.iter_columns(filename, format, window))
+        self.assertEqual(len(blocks), (length + window - 1) // window)
+        for i, block in enumerate(blocks):
+            self.assertEqual(len(block), len(full))
+            expected = full[:, i * window:(i + 1) * window]
+            self.assertEqual(block.get_alignment_length(),
+                             expected.get_alignment_length())
+            for new, old in zip(block, expected):
+                self.assertEqual(new.id, old.id)
+                self.assertEqual(new.name, old.name)
+                self.assertEqual(new.description, old.description)
+                self.assertEqual(str(new.seq), str(old.seq))
+
+    def test_windows(self):
+        """Check windows of various sizes match the full alignment."""
+        for format, filename in test_files:
+            for window in (1, 7, 50, 60, 61, 10000):
+                self.check_windows(format, filename, window)
+
+    def test_handle(self):
+        """Check reading from an open handle."""
+        with open("Phylip/sequential2.phy", "rb") as handle:
+            blocks = list(AlignIO.iter_columns(handle, "phylip-sequential",
+                                               window=100))
+        self.assertEqual([b.get_alignment_length() for b in blocks], [100, 31])
+        self.assertEqual(blocks[1][3].id, "IXI_237")
+        self.assertEqual(str(blocks[1][3].seq)[-5:], "DRSHE")
+
+    def test_alphabet(self):
+        """Check the alphabet argument is applied."""
+        for block in AlignIO.iter_columns("Clustalw/protein.aln", "clustal",
+                                          100, generic_protein):
+            self.assertTrue(block._alphabet is generic_protein)
+            self.assertTrue(block[0].seq.alphabet is generic_protein)
+
+
+class ErrorTests(unittest.TestCase):
+    """Check bad input is rejected."""
+
+    def test_bad_arguments(self):
+        """Check invalid window and format arguments."""
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns("GFF/multi.fna", "fasta", 0))
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns("GFF/multi.fna", "FASTA"))
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns("Emboss/water.txt", "emboss"))
+
+    def test_unequal_lengths(self):
+        """Check sequences of different lengths are rejected."""
+        handle = StringIO(">a\nACGT\n>b\nACG\n")
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns(handle, "fasta", 2))
+        handle = StringIO("CLUSTAL W\n\na ACGT\nb ACG\n")
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns(handle, "clustal", 2))
+
+    def test_multiple_alignments(self):
+        """Check files with more than one alignment are rejected."""
+        data = open("Phylip/interlaced.phy").read()
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns(StringIO(data + data),
+                                               "phylip"))
+        data = open("Stockholm/simple.sth").read()
+        self.assertRaises(ValueError, list,
+                          AlignIO.iter_columns(StringIO(data + data),
+                                               "stockholm"))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity = 2)
+    unittest.main(testRunner=runner)
@@ -0,0 +1,137 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.Align.Distance (pairwise alignment distances)."""
+
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.Align.Distance.")
+
+from Bio import AlignIO
+from Bio.Seq import Seq, MutableSeq
+from Bio.SeqRecord import SeqRecord
+from Bio.Align import MultipleSeqAlignment
+from Bio.Align.Distance import DistanceCalculator, DistanceMatrix
+from Bio.SubsMat import MatrixInfo
+
+
+def simple_distance(model, seq1, seq2):
+    """Straightforward pure Python version of each model, for comparison."""
+    seq1 = seq1.upper()
+    seq2 = seq2.upper()
+    if model == "identity":
+        return sum(a != b for a, b in zip(seq1, seq2)) / float(len(seq1))
+    pairs = [(a, b) for a, b in zip(seq1, seq2) if a not in "-." and b not in "-."]
+    if model in MatrixInfo.available_matrices:
+        matrix = getattr(MatrixInfo, model)
+
+        def score(a, b):
+            return matrix.get((a, b), matrix.get((b, a), 0))
+        pair = sum(score(a, b) for a, b in pairs)
+        best = max(sum(score(a, a) for a, b in pairs),
+                   sum(score(b, b) for a, b in pairs))
+        return 1 - pair / float(best)
+    p = sum(a != b for a, b in pairs) / float(len(pairs))
+    if model == "p-distance":
+        return p
+    elif model == "jukes-cantor":
+        return -0.75 * math.log(1 - 4 * p / 3.0)
+    assert model == "kimura"
+    kinds = {"A": "R", "G": "R", "C": "Y", "T": "Y", "U": "Y"}
+    transitions = sum(a != b and kinds.get(a, a) == kinds.get(b, b)
+                      for a, b in pairs) / float(len(pairs))
+    transversions = p - transitions
+    return (-0.5 * math.log(1 - 2 * transitions - transversions)
+            - 0.25 * math.log(1 - 2 * transversions))
+
+
+class ModelTests(unittest.TestCase):
+    """Compare each model with a simple pure Python implementation."""
+
+    def check(self, model, alignment, workers=1):
+        dm = DistanceCalculator(model).get_distance(alignment, workers)
+        self.assertEqual(dm.names, [r.id for r in alignment])
+        self.assertEqual(len(dm.distances),
+                         len(alignment) * (len(alignment) - 1) // 2)
+        square = dm.to_square()
+        for i, a in enumerate(alignment):
+            for j, b in enumerate(alignment):
+                if i == j:
+                    self.assertEqual(dm[i, j], 0.0)
+                    continue
+                expected = simple_distance(model, str(a.seq), str(b.seq))
+                self.assertAlmostEqual(dm[i, j], expected)
+                self.assertAlmostEqual(dm[a.id, b.id], expected)
+                self.assertAlmostEqual(square[i, j], expected)
+
+    def test_nucleotide(self):
+        """Nucleotide models on a Clustal alignment."""
+        alignment = AlignIO.read("Clustalw/opuntia.aln", "clustal")
+        for model in ["identity", "p-distance", "jukes-cantor", "kimura"]:
+            self.check(model, alignment)
+
+    def test_protein(self):
+        """Substitution matrix models on a protein alignment."""
+        alignment = AlignIO.read("Clustalw/hedgehog.aln", "clustal")
+        for model in ["identity", "p-distance", "blosum62", "pam250"]:
+            self.check(model, alignment)
+
+    def test_workers(self):
+        """Using worker processes gives the same answers."""
+        alignment = AlignIO.read("Clustalw/protein.aln", "clustal")
+        calculator = DistanceCalculator("blosum62")
+        single = calculator.get_distance(alignment)
+        for workers in (2, 3):
+            multi = calculator.get_distance(alignment, workers)
+            self.assertEqual(single.names, multi.names)
+            #Some of these sequences do not overlap, giving NaN
+            numpy.testing.assert_array_almost_equal(single.distances,
+                                                    multi.distances)
+
+    def test_mixed_case(self):
+        """Lower case letters match upper case, even with a MutableSeq."""
+        alignment = MultipleSeqAlignment([
+            SeqRecord(Seq("ACGTAC"), id="a"),
+            SeqRecord(MutableSeq("acgtac"), id="b"),
+            SeqRecord(Seq("ACGTAT"), id="c")])
+        dm = DistanceCalculator("p-distance").get_distance(alignment)
+        self.assertEqual(list(dm.distances), [0.0, 1 / 6.0, 1 / 6.0])
+
+
+class MatrixTests(unittest.TestCase):
+    """Check the DistanceMatrix object."""
+
+    def test_small(self):
+        """Alignments with fewer than two rows."""
+        alignment = MultipleSeqAlignment([SeqRecord(Seq("ACGT"), id="a")])
+        dm = DistanceCalculator().get_distance(alignment)
+        self.assertEqual(len(dm), 1)
+        self.assertEqual(len(dm.distances), 0)
+        self.assertEqual(dm["a", "a"], 0.0)
+
+    def test_lookup(self):
+        """Looking up distances by index and name."""
+        dm = DistanceMatrix(["a", "b", "c"], numpy.array([1.0, 2.0, 3.0]))
+        self.assertEqual(dm[0, 2], 2.0)
+        self.assertEqual(dm["c", "b"], 3.0)
+        self.assertEqual(dm[-1, 0], 2.0)
+        self.assertRaises(KeyError, dm.__getitem__, ("a", "x"))
+        self.assertRaises(IndexError, dm.__getitem__, (0, 3))
+        self.assertRaises(ValueError, DistanceMatrix, ["a", "b"],
+                          numpy.array([1.0, 2.0]))
+
+    def test_bad_model(self):
+        """Unknown models are rejected."""
+        self.assertRaises(ValueError, DistanceCalculator, "nonsense")
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity = 2)
+    unittest.main(testRunner=runner)
@@ -10,15 +10,49 @@ stdin/stdout/stderr handling.
 """
 
 import os
+import sys
+import time
+import tempfile
 import unittest
 
-from Bio.Application import AbstractCommandline, _Argument
+from Bio.Application import AbstractCommandline, _Argument, _escape_filename
+from Bio.Application import ApplicationJob, ApplicationError, run_batch
+from Bio.Application import _find_setsid
 
 class EchoApp(AbstractCommandline):
     def __init__(self, cmd="echo", **kwargs):
         self.parameters = [_Argument(["text"], "Text to echo")]
         AbstractCommandline.__init__(self, cmd, **kwargs)
 
+#Stand-in tool for the batch tests, which sleeps then echoes its stdin
+#(upper cased), or fails with the given exit code until a counter file
+#records enough attempts.
+STAND_IN = """import sys, time
+sleep, code, counter = float(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+if counter != "-":
+    attempts = 1
+    try:
+        attempts += int(open(counter).read())
+    except IOError:
+        pass
+    open(counter, "w").write(str(attempts))
+    if attempts > 1:
+        code = 0
+time.sleep(sleep)
+data = sys.stdin.read()
+sys.stdout.write(data.upper())
+sys.stderr.write("slept %s\\n" % sleep)
+sys.exit(code)
+"""
+
+class StandInApp(AbstractCommandline):
+    def __init__(self, cmd=_escape_filename(sys.executable), **kwargs):
+        self.parameters = [_Argument(["script"], "Script", filename=True),
+                           _Argument(["sleep"], "Seconds to sleep"),
+                           _Argument(["code"], "Exit code"),
+                           _Argument(["counter"], "Attempt counter file")]
+        AbstractCommandline.__init__(self, cmd, **kwargs)
+
 class TestApp(unittest.TestCase):
     def test_echo(self):
         cline = EchoApp(text="Hello World")
@@ -115,6 +149,126 @@ class TestApp(unittest.TestCase):
         os.remove(tmp2)
 
 
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        handle, self.script = tempfile.mkstemp(suffix=".py")
+        os.write(handle, STAND_IN.encode())
+        os.close(handle)
+        self.temp_files = [self.script]
+
+    def tearDown(self):
+        for filename in self.temp_files:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def temp_name(self):
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)
+        os.remove(filename)
+        self.temp_files.append(filename)
+        return filename
+
+    def cline(self, sleep=0, code=0, counter="-"):
+        return StandInApp(script=self.script, sleep=sleep, code=code,
+                          counter=counter)
+
+    def test_order_and_output(self):
+        """Results in job order, with stdout to files and functions."""
+        out = self.temp_name()
+        jobs = [ApplicationJob(self.cline(0.2), stdin="first",
+                               stdout=out),
+                ApplicationJob(self.cline(), stdin="second\nline\n",
+                               stdout=lambda handle: handle.readlines(),
+                               name="two"),
+                self.cline()]
+        results = run_batch(jobs, workers=3)
+        self.assertEqual([r.job for r in results[:2]], jobs[:2])
+        self.assertEqual(results[1].job.name, "two")
+        for result in results:
+            self.assertEqual(result.returncode, 0)
+            self.assertEqual(result.error, None)
+            self.assertEqual(result.attempts, 1)
+            self.assertFalse(result.timed_out)
+            self.assertTrue(result.wall_time >= 0)
+            if hasattr(os, "wait4"):
+                self.assertTrue(result.max_rss > 0)
+        with open(out) as handle:
+            self.assertEqual(handle.read(), "FIRST")
+        self.assertEqual(results[0].stderr.strip(), "slept 0.2")
+        self.assertEqual(results[1].output, ["SECOND\n", "LINE\n"])
+        self.assertEqual(results[2].output, None)
+
+    def test_concurrent(self):
+        """Jobs run concurrently, limited by the number of workers."""
+        start = time.time()
+        results = run_batch([self.cline(0.5) for i in range(4)], workers=4)
+        self.assertTrue(time.time() - start < 1.8)
+        self.assertEqual([r.returncode for r in results], [0, 0, 0, 0])
+        start = time.time()
+        run_batch([self.cline(0.3) for i in range(4)], workers=2)
+        self.assertTrue(time.time() - start >= 0.6)
+
+    def test_failure(self):
+        """A non-zero exit status is recorded, not raised."""
+        result = run_batch([self.cline(code=3)])[0]
+        self.assertEqual(result.returncode, 3)
+        self.assertTrue(isinstance(result.error, ApplicationError))
+        self.assertEqual(result.error.returncode, 3)
+        self.assertEqual(result.error.stderr.strip(), "slept 0.0")
+        self.assertEqual(result.attempts, 1)
+
+    def test_retries(self):
+        """Failed jobs are run again, up to the number of retries."""
+        counter = self.temp_name()
+        result = run_batch([self.cline(code=1, counter=counter)],
+                           retries=2)[0]
+        self.assertEqual(result.error, None)
+        self.assertEqual(result.attempts, 2)
+        with open(counter) as handle:
+            self.assertEqual(handle.read(), "2")
+        result = run_batch([self.cline(code=1)], retries=2)[0]
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.attempts, 3)
+
+    def test_timeout(self):
+        """Tools running too long are killed."""
+        start = time.time()
+        results = run_batch([self.cline(10), self.cline(0)],
+                            timeout=0.5, retries=1)
+        self.assertTrue(time.time() - start < 5)
+        self.assertTrue(results[0].timed_out)
+        self.assertTrue(results[0].returncode)
+        self.assertTrue(isinstance(results[0].error, ApplicationError))
+        self.assertEqual(results[0].attempts, 2)
+        self.assertFalse(results[1].timed_out)
+        self.assertEqual(results[1].error, None)
+
+    def test_process_group(self):
+        """Tools run in their own process group when setsid is available."""
+        if _find_setsid() is None:
+            return
+        cmd = "%s -c \"import os; print(os.getpgrp())\"" \
+              % _escape_filename(sys.executable)
+        result = run_batch([ApplicationJob(cmd, stdout=lambda h: h.read())],
+                           timeout=10)[0]
+        self.assertEqual(result.error, None)
+        self.assertNotEqual(int(result.output), os.getpgrp())
+
+    def test_bad_function(self):
+        """Errors from the stdout function are recorded, not retried."""
+        def parse(handle):
+            raise KeyError("Oops")
+        result = run_batch([ApplicationJob(self.cline(), stdout=parse)],
+                           retries=3)[0]
+        self.assertTrue(isinstance(result.error, KeyError))
+        self.assertEqual(result.attempts, 1)
+
+    def test_bad_arguments(self):
+        self.assertRaises(ValueError, run_batch, [self.cline()], workers=0)
+        self.assertRaises(ValueError, run_batch, [self.cline()], retries=-1)
+        self.assertEqual(run_batch([]), [])
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -9,6 +9,9 @@
 import unittest
 
 import os
+import shutil
+import tempfile
+from io import BytesIO
 if os.name == 'java':
     try:
         from xml.parsers.expat import XML_PARAM_ENTITY_PARSING_ALWAYS
@@ -40,6 +43,7 @@ del p
 del expat
 
 
+from Bio._py3k import _as_bytes
 from Bio import Entrez
 
 
@@ -4786,6 +4790,122 @@ class EFetchTest(unittest.TestCase):
         handle.close()
 
 
+class StreamingTest(unittest.TestCase):
+    '''Tests for parsing records one by one with Entrez.parse'''
+
+    class CountingHandle(object):
+        def __init__(self, data):
+            self.handle = BytesIO(data)
+            self.count = 0
+
+        def read(self, size=-1):
+            data = self.handle.read(size)
+            self.count += len(data)
+            return data
+
+    def test_records_released(self):
+        '''Test records are yielded and released as soon as they end
+        '''
+        from Bio.Entrez import Parser
+        handle = open('Entrez/pubmed2.xml', "rb")
+        data = handle.read()
+        handle.close()
+        start = data.index(_as_bytes("<PubmedArticle>"))
+        end = data.index(_as_bytes("</PubmedArticleSet>"))
+        data = data[:start] + data[start:end] * 250 + data[end:]
+        handle = self.CountingHandle(data)
+        handler = Parser.DataHandler(validate=True)
+        count = 0
+        for record in handler.parse(handle):
+            if count == 0:
+                first = record
+                # the first record is available long before the end
+                self.assertTrue(handle.count < len(data) / 100)
+            count += 1
+            # and the outer list does not keep the records
+            if handler.stack:
+                self.assertTrue(len(handler.stack[0]) <= 1)
+        self.assertEqual(500, count)
+        handle = open('Entrez/pubmed2.xml', "rb")
+        expected = Entrez.read(handle)
+        handle.close()
+        self.assertEqual(expected[0], first)
+        self.assertEqual(expected[1], record)
+
+
+class DTDCacheTest(unittest.TestCase):
+    '''Tests for reusing the DTDs loaded by earlier parsers'''
+
+    outer = '''<!ENTITY % inner SYSTEM "test_inner.mod.dtd">
+%inner;
+<!ENTITY greeting "Hello &amp; &#34;welcome&#34; &#37;">
+<!ELEMENT TestSet (Test*)>
+<!ELEMENT Test (Name, Count, %extra;)>
+'''
+    inner = '''<!ENTITY % text "(#PCDATA)">
+<!ENTITY % extra "Note?">
+<!ENTITY uuml "&#252;">
+<!ELEMENT Name %text;>
+<!ELEMENT Count %text;>
+<!ELEMENT Note %text;>
+'''
+    xml = '''<?xml version="1.0"?>
+<!DOCTYPE TestSet PUBLIC "-//TEST//EN" "http://www.example.org/dtd/test_outer.dtd">
+<TestSet>
+<Test><Name>&greeting; &uuml;</Name><Count>1</Count></Test>
+<Test><Name>B</Name><Count>2</Count><Note>x</Note></Test>
+</TestSet>
+'''
+
+    def setUp(self):
+        from Bio.Entrez import Parser
+        self.local_dtd_dir = Parser.DataHandler.local_dtd_dir
+        self.directory = tempfile.mkdtemp()
+        for name, text in (("test_outer.dtd", self.outer),
+                           ("test_inner.mod.dtd", self.inner)):
+            handle = open(os.path.join(self.directory, name), "w")
+            handle.write(text)
+            handle.close()
+        Parser.DataHandler.local_dtd_dir = self.directory
+
+    def tearDown(self):
+        from Bio.Entrez import Parser
+        Parser.DataHandler.local_dtd_dir = self.local_dtd_dir
+        for key in list(Parser.DataHandler.dtd_cache):
+            if key.startswith("http://www.example.org/"):
+                del Parser.DataHandler.dtd_cache[key]
+        shutil.rmtree(self.directory)
+
+    def test_cached(self):
+        '''Test DTDs are only loaded once, keeping their entities
+        '''
+        from Bio.Entrez import Parser
+        records = []
+        for i in range(3):
+            handler = Parser.DataHandler(validate=True)
+            records.append(handler.read(BytesIO(_as_bytes(self.xml))))
+            if i == 0:
+                # the DTD files are not needed any more
+                shutil.rmtree(self.directory)
+        for record in records:
+            self.assertEqual(2, len(record))
+            self.assertEqual(u'Hello & "welcome" % \xfc', record[0]["Name"])
+            self.assertEqual("1", record[0]["Count"])
+            self.assertEqual("x", record[1]["Note"])
+            self.assertTrue(isinstance(record[0], dict))
+        self.assertTrue("http://www.example.org/dtd/test_inner.mod.dtd"
+                        in Parser.DataHandler.dtd_cache)
+        # and the inner DTD on its own is reused by another outer DTD
+        del Parser.DataHandler.dtd_cache[
+            "http://www.example.org/dtd/test_outer.dtd"]
+        os.mkdir(self.directory)
+        handle = open(os.path.join(self.directory, "test_outer.dtd"), "w")
+        handle.write(self.outer)
+        handle.close()
+        handler = Parser.DataHandler(validate=True)
+        self.assertEqual(records[0], handler.read(BytesIO(_as_bytes(self.xml))))
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -0,0 +1,295 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.Entrez.Client using a local stand-in for the NCBI server."""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib2
+import urlparse
+import BaseHTTPServer
+import SocketServer
+
+from Bio._py3k import _as_bytes
+from Bio import Entrez
+from Bio.Entrez import RateLimiter
+
+
+EPOST = """<?xml version="1.0"?>
+<!DOCTYPE ePostResult PUBLIC "-//NLM//DTD ePostResult, 11 May 2002//EN" \
+"http://www.ncbi.nlm.nih.gov/entrez/query/DTD/ePost_020511.dtd">
+<ePostResult>
+	<QueryKey>%i</QueryKey>
+	<WebEnv>%s</WebEnv>
+</ePostResult>
+"""
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers epost and efetch requests with the IDs as plain text."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, text):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(text)))
+        self.end_headers()
+        self.wfile.write(_as_bytes(text))
+
+    def do_GET(self, query=None):
+        path, _, options = self.path.partition("?")
+        if query is None:
+            query = options
+        params = dict(urlparse.parse_qsl(query))
+        self.server.requests.append((path, params))
+        utility = path.rsplit("/", 1)[-1]
+        if params.get("db") != "nucleotide":
+            self.reply(400, "Unknown database")
+        elif utility == "epost.fcgi":
+            webenv = params.get("WebEnv", "WEBENV%i" % len(self.server.posts))
+            self.server.posts.append(params["id"].split(","))
+            self.reply(200, EPOST % (len(self.server.posts), webenv))
+        elif utility == "efetch.fcgi" and params.get("id") == "error":
+            # NCBI reports some errors with a success status
+            self.reply(200, "<eFetchResult><ERROR>Bad ID</ERROR>"
+                            "</eFetchResult>\n")
+        elif utility == "efetch.fcgi" and "id" in params:
+            self.reply(200, "\n".join(params["id"].split(",")) + "\n")
+        elif utility == "efetch.fcgi":
+            ids = self.server.posts[int(params["query_key"]) - 1]
+            start = int(params["retstart"])
+            # answer later pages sooner, to mix up the order
+            time.sleep(0.05 / (1 + start))
+            ids = ids[start:start + int(params["retmax"])]
+            self.reply(200, "\n".join(ids) + "\n")
+        else:
+            self.reply(404, "Not found")
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.do_GET(self.rfile.read(length))
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0),
+                                           StandInHandler)
+        self.connections = 0
+        self.requests = []
+        self.posts = []
+
+
+class RateLimiterCases(unittest.TestCase):
+
+    def test_rate(self):
+        "Test the rate limiter spaces out requests"
+        limiter = RateLimiter(rate=20)
+        start = time.time()
+        for i in range(5):
+            limiter.acquire()
+        self.assertTrue(time.time() - start >= 0.19)
+
+    def test_burst(self):
+        "Test the rate limiter allows bursts after a pause"
+        limiter = RateLimiter(rate=20, burst=3)
+        time.sleep(0.15)
+        start = time.time()
+        for i in range(3):
+            limiter.acquire()
+        self.assertTrue(time.time() - start < 0.05)
+        limiter.acquire()
+        self.assertTrue(time.time() - start >= 0.04)
+
+    def test_threads(self):
+        "Test the rate limiter is shared between threads"
+        limiter = RateLimiter(rate=50)
+        times = []
+
+        def work():
+            for i in range(4):
+                limiter.acquire()
+                times.append(time.time())
+
+        threads = [threading.Thread(target=work) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        times.sort()
+        self.assertEqual(12, len(times))
+        self.assertTrue(times[-1] - times[0] >= 0.2)
+
+    def test_errors(self):
+        "Test the rate limiter arguments are checked"
+        self.assertRaises(ValueError, RateLimiter, 0)
+        self.assertRaises(ValueError, RateLimiter, 3, 0)
+
+
+class ClientCases(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        host, port = self.server.server_address
+        self.base_url = "http://%s:%i/entrez/eutils/" % (host, port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("limiter", RateLimiter(rate=1000))
+        return Entrez.Client(email="A.N.Other@example.com",
+                             base_url=self.base_url, **kwargs)
+
+    def test_keep_alive(self):
+        "Test the client reuses its connection"
+        with self.client(connections=1) as client:
+            for i in range(5):
+                handle = client.efetch(db="nucleotide", id=str(i))
+                self.assertEqual("%i\n" % i, handle.read())
+        self.assertEqual(5, len(self.server.requests))
+        self.assertEqual(1, self.server.connections)
+
+    def test_params(self):
+        "Test the client sends the email and tool"
+        with self.client(tool="standin") as client:
+            client.efetch(db="nucleotide", id=["1", "2"], retmode=None)
+        path, params = self.server.requests[0]
+        self.assertEqual("/entrez/eutils/efetch.fcgi", path)
+        self.assertEqual({"db": "nucleotide", "id": "1,2",
+                          "email": "A.N.Other@example.com",
+                          "tool": "standin"}, params)
+
+    def test_http_error(self):
+        "Test the client raises HTTPError on an error status"
+        with self.client() as client:
+            self.assertRaises(urllib2.HTTPError, client.efetch, db="bad",
+                              id="1")
+            # and the connection is still usable
+            self.assertEqual("1\n", client.efetch(db="nucleotide",
+                                                  id="1").read())
+
+    def test_cache(self):
+        "Test the client uses the response cache"
+        from Bio import webcache
+        directory = tempfile.mkdtemp()
+        webcache.cache = webcache.ResponseCache(directory)
+        try:
+            with self.client() as client:
+                for i in range(3):
+                    handle = client.efetch(db="nucleotide", id=["1", "2"])
+                    self.assertEqual("1\n2\n", handle.read())
+                self.assertRaises(urllib2.HTTPError, client.efetch, db="bad",
+                                  id="1")
+                self.assertRaises(urllib2.HTTPError, client.efetch, db="bad",
+                                  id="1")
+            self.assertEqual(3, len(self.server.requests))
+            self.assertEqual(2, webcache.cache.hits)
+            # error messages and the history server are not cached
+            with self.client() as client:
+                for i in range(2):
+                    client.efetch(db="nucleotide", id="error").read()
+                    client.epost(db="nucleotide", id="1,2").read()
+                    client.efetch(db="nucleotide", query_key="1",
+                                  WebEnv="WEBENV0", retstart=0,
+                                  retmax=2).read()
+            self.assertEqual(9, len(self.server.requests))
+            self.assertEqual(2, webcache.cache.hits)
+        finally:
+            webcache.cache = None
+            shutil.rmtree(directory)
+
+    def test_rate_limit(self):
+        "Test the client waits for its rate limiter"
+        with self.client(limiter=RateLimiter(rate=20)) as client:
+            start = time.time()
+            for i in range(5):
+                client.efetch(db="nucleotide", id="1")
+        self.assertTrue(time.time() - start >= 0.19)
+
+    def test_small_batch(self):
+        "Test fetching a short list of IDs with a single request"
+        with self.client(batch_size=10) as client:
+            handles = list(client.fetch_batches("nucleotide", range(10)))
+        self.assertEqual(1, len(handles))
+        self.assertEqual([str(i) for i in range(10)],
+                         handles[0].read().split())
+        self.assertEqual(["/entrez/eutils/efetch.fcgi"],
+                         [path for path, params in self.server.requests])
+
+    def test_batches(self):
+        "Test fetching a long list of IDs via epost in ordered pages"
+        from Bio.Entrez import _client
+        ids = [str(i) for i in range(55)]
+        post_size = _client._POST_SIZE
+        _client._POST_SIZE = 30
+        try:
+            with self.client(batch_size=7, connections=3) as client:
+                pages = [handle.read().split() for handle
+                         in client.fetch_batches("nucleotide", ids,
+                                                 rettype="acc")]
+        finally:
+            _client._POST_SIZE = post_size
+        self.assertEqual([7, 7, 7, 7, 2, 7, 7, 7, 4], [len(p) for p in pages])
+        self.assertEqual(ids, sum(pages, []))
+        self.assertTrue(self.server.connections <= 3)
+        posts = [params for path, params in self.server.requests
+                 if path.endswith("epost.fcgi")]
+        self.assertEqual(2, len(posts))
+        self.assertFalse("WebEnv" in posts[0])
+        self.assertEqual("WEBENV0", posts[1]["WebEnv"])
+        fetches = [params for path, params in self.server.requests
+                   if path.endswith("efetch.fcgi")]
+        self.assertEqual(9, len(fetches))
+        for params in fetches:
+            self.assertEqual("WEBENV0", params["WebEnv"])
+            self.assertEqual("acc", params["rettype"])
+            self.assertEqual("7", params["retmax"])
+
+    def test_early_exit(self):
+        "Test stopping part way through fetching batches"
+        with self.client(batch_size=5, connections=2) as client:
+            pages = client.fetch_batches("nucleotide", range(100))
+            self.assertEqual("0 1 2 3 4".split(), next(pages).read().split())
+            pages.close()
+            # the client can still be used
+            self.assertEqual("1\n", client.efetch(db="nucleotide",
+                                                  id="1").read())
+
+    def test_batch_errors(self):
+        "Test fetching batches with bad arguments"
+        with self.client() as client:
+            self.assertRaises(ValueError, list,
+                              client.fetch_batches("nucleotide", [1],
+                                                   utility="esearch"))
+            self.assertRaises(ValueError, list,
+                              client.fetch_batches("nucleotide", [1],
+                                                   batch_size=0))
+            self.assertEqual([], list(client.fetch_batches("nucleotide", [])))
+        self.assertRaises(ValueError, Entrez.Client, connections=0)
+        self.assertRaises(ValueError, Entrez.Client,
+                          base_url="https://eutils.ncbi.nlm.nih.gov/")
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
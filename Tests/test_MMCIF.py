@@ -9,6 +9,8 @@
 
 """Unit tests for the MMCIF portion of the Bio.PDB module."""
 
+import os
+import tempfile
 import unittest
 
 try:
@@ -28,6 +30,7 @@ from Bio.PDB.PDBExceptions import PDBConstructionException, PDBConstructionWarni
 
 from Bio.PDB import PPBuilder, CaPPBuilder
 from Bio.PDB.MMCIFParser import MMCIFParser
+from Bio.PDB.MMCIF2Dict import MMCIF2Dict
 
 
 class ParseReal(unittest.TestCase):
@@ -127,6 +130,83 @@ class ParseReal(unittest.TestCase):
                 self.assertEqual("MKPVTLYDVAEYAGVSYQTVSRVVNQASHVSAKTREKVEAAMAELNYIPNR",
                                  str(s))
 
+    def testFilters(self):
+        """Test parsing only some of the atoms"""
+        parser = MMCIFParser(models=[0, 2], chains=["C", "E"],
+                             atom_names=["CA"])
+        structure = parser.get_structure("example", "PDB/1LCD.cif")
+        self.assertEqual([0, 2], [model.id for model in structure])
+        self.assertEqual([1, 3], [model.serial_num for model in structure])
+        for model in structure:
+            self.assertEqual(["C"], [chain.id for chain in model])
+        full = MMCIFParser().get_structure("example", "PDB/1LCD.cif")
+        for model in structure:
+            self.assertEqual([a.get_full_id() for a in full[model.id]["C"].get_atoms()
+                              if a.get_name() == "CA"],
+                             [a.get_full_id() for a in model.get_atoms()])
+        parser = MMCIFParser(water=False)
+        structure = parser.get_structure("example", "PDB/1A8O.cif")
+        self.assertEqual(["A"], [chain.id for chain in structure[0]])
+        parser = MMCIFParser(models=[1])
+        structure = parser.get_structure("example", "PDB/1A8O.cif")
+        self.assertEqual(0, len(structure))
+
+
+class ParseTokens(unittest.TestCase):
+    """Testing the tokenizer of MMCIF2Dict."""
+
+    def parse(self, text):
+        handle, filename = tempfile.mkstemp(suffix=".cif")
+        try:
+            os.write(handle, text.encode("ascii"))
+            os.close(handle)
+            return MMCIF2Dict(filename)
+        finally:
+            os.remove(filename)
+
+    def test_values(self):
+        """Test quoted and unquoted values"""
+        mmcif_dict = self.parse(
+            "data_TEST\n"
+            "# a comment\n"
+            "_entry.id TEST\n"
+            "_struct.title 'It's a \"title\"' # another comment\n"
+            "_struct.pdbx_descriptor\n"
+            ";A text field\n"
+            " over two lines\n"
+            ";\n"
+            "_struct.empty ''\n"
+            "_struct.hash C#N\n")
+        self.assertEqual("TEST", mmcif_dict["data_"])
+        self.assertEqual("TEST", mmcif_dict["_entry.id"])
+        self.assertEqual('It\'s a "title"', mmcif_dict["_struct.title"])
+        self.assertEqual("A text fieldover two lines",
+                         mmcif_dict["_struct.pdbx_descriptor"])
+        self.assertEqual("", mmcif_dict["_struct.empty"])
+        self.assertEqual("C#N", mmcif_dict["_struct.hash"])
+
+    def test_loops(self):
+        """Test loops are split into columns"""
+        mmcif_dict = self.parse(
+            "data_TEST\n"
+            "loop_\n"
+            "_atom.id\n"
+            "_atom.name\n"
+            "1 N 2 CA\n"
+            "3 \"O5'\"\n"
+            "4\n"
+            ";C\n"
+            ";\n"
+            "loop_\n"
+            "_other.id\n"
+            "a\n"
+            "b\n"
+            "_after.loop value\n")
+        self.assertEqual(["1", "2", "3", "4"], mmcif_dict["_atom.id"])
+        self.assertEqual(["N", "CA", "O5'", "C"], mmcif_dict["_atom.name"])
+        self.assertEqual(["a", "b"], mmcif_dict["_other.id"])
+        self.assertEqual("value", mmcif_dict["_after.loop"])
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity=2)
     unittest.main(testRunner=runner)
@@ -14959,6 +14959,53 @@ class TestNCBITextParser(unittest.TestCase):
         handle.close()
 
 
+class TestNCBITextIndex(unittest.TestCase):
+
+    def test_index(self):
+        "Indexing plain text BLAST files, with one or more queries"
+        for filename in ['text_2202L_blastp_001.txt', 'text_2220L_blastx_002.txt',
+                         'text_2222_blastx_001.txt', 'text_2226_blastp_004.txt',
+                         'text_2226_tblastx_004.txt']:
+            filename = os.path.join("Blast", filename)
+            parser = NCBIStandalone.BlastParser()
+            records = list(NCBIStandalone.Iterator(open(filename), parser))
+            index = NCBIStandalone.index(filename)
+            self.assertEqual(len(records), len(index))
+            for record in records:
+                other = index[record.query.split()[0]]
+                self.assertEqual(record.query, other.query)
+                self.assertEqual(record.application, other.application)
+                self.assertEqual(record.database_letters,
+                                 other.database_letters)
+                self.assertEqual([a.title for a in record.alignments],
+                                 [a.title for a in other.alignments])
+                self.assertEqual([h.score for a in record.alignments
+                                  for h in a.hsps],
+                                 [h.score for a in other.alignments
+                                  for h in a.hsps])
+            index.close()
+
+    def test_index_rescan(self):
+        "Scanning a plain text BLAST file again for the query offsets"
+        filename = os.path.join("Blast", "text_2226_blastp_004.txt")
+        index = NCBIStandalone.index(filename)
+        proxy = index._proxy
+        self.assertEqual(list(proxy), list(proxy))
+        self.assertEqual(1, len(proxy._report_starts))
+        for key, offset, length in proxy:
+            self.assertTrue(proxy.get(offset).query.startswith(key))
+        index.close()
+
+    def test_index_psiblast(self):
+        "Indexing plain text PSI-BLAST output"
+        filename = os.path.join("Blast", "text_2208L_psiblast_001.txt")
+        index = NCBIStandalone.index(filename, NCBIStandalone.PSIBlastParser())
+        self.assertEqual(["gi|16130963|ref|NP_417539.1|"], list(index))
+        record = index["gi|16130963|ref|NP_417539.1|"]
+        self.assertEqual(2, len(record.rounds))
+        index.close()
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -1867,6 +1867,88 @@ class TestNCBIXML(unittest.TestCase):
         handle.close()
 
 
+class TestNCBIXMLIndex(unittest.TestCase):
+
+    def compare(self, filename):
+        records = list(NCBIXML.parse(open(filename)))
+        index = NCBIXML.index(filename)
+        self.assertEqual(len(records), len(index))
+        for record in records:
+            key = record.query.split()[0]
+            if not (record.query_id.startswith("Query_")
+                    or record.query_id.startswith("lcl|")):
+                key = record.query_id
+            other = index[key]
+            self.assertEqual(record.query, other.query)
+            self.assertEqual(record.query_letters, other.query_letters)
+            self.assertEqual(record.application, other.application)
+            self.assertEqual(record.ka_params, other.ka_params)
+            self.assertEqual([a.title for a in record.alignments],
+                             [a.title for a in other.alignments])
+            self.assertEqual([h.expect for a in record.alignments
+                              for h in a.hsps],
+                             [h.expect for a in other.alignments
+                              for h in a.hsps])
+        index.close()
+
+    def test_index(self):
+        "Indexing BLAST XML files from several versions of BLAST"
+        for filename in ['xml_2212L_blastx_001.xml', 'xml_2218_blastp_002.xml',
+                         'xml_2222_blastx_001.xml', 'xml_2226_blastn_005.xml',
+                         'mirna.xml', 'wnts.xml']:
+            self.compare(os.path.join("Blast", filename))
+
+    def test_index_concatenated(self):
+        "Indexing several old style BLAST XML files joined together"
+        import shutil
+        import tempfile
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(temp_dir, "joined.xml")
+            handle = open(filename, "w")
+            for name in ['xml_2212L_blastp_001.xml', 'xml_2212L_blastn_001.xml']:
+                handle.write(open(os.path.join("Blast", name)).read().rstrip())
+                handle.write("\n")
+            handle.close()
+            self.compare(filename)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_index_rescan(self):
+        "Scanning a BLAST XML file again for the query offsets"
+        filename = os.path.join("Blast", "xml_2212L_blastp_001.xml")
+        index = NCBIXML.index(filename)
+        proxy = index._proxy
+        self.assertEqual(list(proxy), list(proxy))
+        self.assertEqual(1, len(proxy._doc_starts))
+        index.close()
+        self.compare(filename)
+
+    def test_index_not_xml(self):
+        "Indexing BLAST XML without the <?xml line"
+        import shutil
+        import tempfile
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(temp_dir, "no_header.xml")
+            lines = open(os.path.join("Blast", "wnts.xml")).readlines()
+            handle = open(filename, "w")
+            handle.writelines(lines[1:])
+            handle.close()
+            self.assertRaises(ValueError, NCBIXML.index, filename)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_index_bgzf(self):
+        "Indexing a BGZF compressed BLAST XML file"
+        index = NCBIXML.index(os.path.join("Blast", "wnts.xml.bgz"))
+        self.assertEqual(5, len(index))
+        record = index["gi|53729353:216-1313"]
+        self.assertEqual(5, len(record.alignments))
+        self.assertTrue(record.query.startswith("gi|53729353:216-1313 "))
+        index.close()
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
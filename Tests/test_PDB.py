@@ -33,9 +33,24 @@ from Bio.Alphabet import generic_protein
 from Bio.PDB import PDBParser, PPBuilder, CaPPBuilder, PDBIO, Select
 from Bio.PDB import HSExposureCA, HSExposureCB, ExposureCN
 from Bio.PDB.PDBExceptions import PDBConstructionException, PDBConstructionWarning
+from Bio.PDB.PDBExceptions import PDBException
 from Bio.PDB import rotmat, Vector
 from Bio.PDB import Residue, Atom
 from Bio.PDB import make_dssp_dict
+from Bio.PDB import calc_angle, calc_dihedral, calc_angles, calc_dihedrals
+from Bio.PDB.AtomArray import atom_coords, transform_atoms
+from Bio.PDB.Polypeptide import calc_phi_psi, calc_tau
+from Bio.PDB.StructureBuilder import StructureBuilder
+from Bio.PDB.StructureCache import StructureCache, save_structure, load_structure
+from Bio.PDB.Superimposer import qcp_rmsd, qcp_rmsd_matrix
+from Bio.SVDSuperimposer import SVDSuperimposer
+
+
+def parse_quietly(filename, structure_id="X", **kwargs):
+    """Parses a PDB file, ignoring the PDBConstructionWarnings."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", PDBConstructionWarning)
+        return PDBParser(**kwargs).get_structure(structure_id, filename)
 
 
 # NB: the 'A_' prefix ensures this test case is run first
@@ -1052,6 +1067,525 @@ class CopyTests(unittest.TestCase):
             self.assertFalse(e.get_list()[0] is ee.get_list()[0])
 
 
+class AtomArrayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.s = parse_quietly("PDB/a_structure.pdb")
+        self.atoms = self.s.atom_array.atoms
+
+    def test_packed(self):
+        """All atoms, including all altlocs, are packed."""
+        atom_array = self.s.atom_array
+        unpacked = []
+        for chain in self.s.get_chains():
+            for residue in chain.get_list():
+                if residue.is_disordered() == 2:
+                    for r in residue.disordered_get_list():
+                        unpacked.extend(r.get_unpacked_list())
+                else:
+                    unpacked.extend(residue.get_unpacked_list())
+        self.assertEqual(len(unpacked), len(atom_array))
+        self.assertEqual(set(map(id, unpacked)), set(map(id, self.atoms)))
+        self.assertEqual((len(unpacked), 3), atom_array.coord.shape)
+        for i, atom in enumerate(self.atoms):
+            self.assertTrue(numpy.all(atom.get_coord() == atom_array.coord[i]))
+            self.assertEqual(atom.get_bfactor(), atom_array.bfactor[i])
+            self.assertEqual(atom.element, atom_array.element[i])
+
+    def test_write_through(self):
+        """Changing an atom changes the arrays, and the other way round."""
+        atom_array = self.s.atom_array
+        atom = self.atoms[5]
+        atom.set_coord(numpy.array((1, 2, 3), 'f'))
+        self.assertEqual([1, 2, 3], list(atom_array.coord[5]))
+        atom_array.coord[5] += 1
+        self.assertEqual([2, 3, 4], list(atom.get_coord()))
+        atom.set_bfactor(12.5)
+        self.assertEqual(12.5, atom_array.bfactor[5])
+        atom.set_occupancy(None)
+        self.assertTrue(numpy.isnan(atom_array.occupancy[5]))
+        self.assertEqual(None, atom.get_occupancy())
+        # values which do not fit the arrays are kept by the atom
+        atom.set_bfactor("unknown")
+        self.assertEqual("unknown", atom.get_bfactor())
+        self.assertEqual(None, atom._store)
+        self.assertEqual([2, 3, 4], list(atom.get_coord()))
+
+    def test_coord_views(self):
+        """Coordinates taken from atoms are views of the arrays."""
+        atom = self.atoms[0]
+        # single precision as read from the file, double once moved
+        self.assertEqual("f", self.s.atom_array.coord.dtype.char)
+        coord = atom.get_coord()
+        self.assertEqual("f", coord.dtype.char)
+        before = coord.copy()
+        # changing the array in place changes the atom
+        coord += 1
+        atom.coord[0] = 99
+        self.assertEqual([99, before[1] + 1, before[2] + 1],
+                         list(self.s.atom_array.coord[0]))
+        self.assertEqual(list(self.s.atom_array.coord[0]),
+                         list(atom.get_coord()))
+        self.s.transform(numpy.identity(3), numpy.array((1, 0, 0), 'f'))
+        self.assertEqual("d", atom.get_coord().dtype.char)
+        self.assertEqual([100, before[1] + 1, before[2] + 1],
+                         list(atom.get_coord()))
+        coord = atom.coord
+        saved = coord.copy()
+        atom.transform(numpy.identity(3), numpy.array((1, 0, 0)))
+        self.assertEqual([1, 0, 0], list(coord - saved))
+        self.assertFalse(atom._store is None)
+        # packed atoms do not keep values of their own
+        self.assertFalse(hasattr(atom, "_coord"))
+        # detached atoms get their own copy
+        copied = atom.copy()
+        copied.coord[0] = 0
+        self.assertEqual(101, atom.coord[0])
+
+    def test_copy(self):
+        """Copies do not share the arrays."""
+        atom = self.atoms[0]
+        copied = atom.copy()
+        copied.set_coord(numpy.array((1, 2, 3), 'f'))
+        self.assertFalse(numpy.all(atom.get_coord() == copied.get_coord()))
+        before = self.s.atom_array.coord.copy()
+        structure = self.s.copy()
+        self.assertFalse(structure.atom_array is self.s.atom_array)
+        structure.transform(numpy.identity(3), numpy.array((1, 1, 1), 'f'))
+        self.assertTrue(numpy.all(before == self.s.atom_array.coord))
+
+    def test_transform_selected(self):
+        """Only the selected altlocs are transformed."""
+        before = self.s.atom_array.coord.copy()
+        selected = set(id(getattr(atom, "selected_child", atom))
+                       for atom in self.s._get_selected_atoms())
+        self.assertTrue(len(selected) < len(self.atoms))
+        self.s.transform(numpy.identity(3), numpy.array((1, 0, 0), 'f'))
+        moved = self.s.atom_array.coord - before
+        for i, atom in enumerate(self.atoms):
+            if id(atom) in selected:
+                self.assertEqual([1, 0, 0], list(moved[i]))
+            else:
+                self.assertEqual([0, 0, 0], list(moved[i]))
+
+    def test_unpacked_atoms(self):
+        """Atoms not packed together are handled one by one."""
+        atoms = [self.atoms[0].copy(), self.atoms[1]]
+        coords = atom_coords(atoms)
+        self.assertEqual((2, 3), coords.shape)
+        transform_atoms(atoms, numpy.identity(3), numpy.array((1, 1, 1)))
+        self.assertTrue(numpy.all(atom_coords(atoms) == coords + 1))
+        self.assertEqual((0, 3), atom_coords([]).shape)
+
+
+class BulkParseTests(unittest.TestCase):
+    """The parser gives the same results when adding atoms in bulk."""
+
+    def parse(self, filename, structure_builder):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", PDBConstructionWarning)
+            parser = PDBParser(structure_builder=structure_builder)
+            structure = parser.get_structure("X", filename)
+        atoms = []
+        for atom in structure.atom_array.atoms:
+            anisou = atom.get_anisou()
+            if anisou is not None:
+                anisou = list(anisou)
+            atoms.append((atom.get_full_id(), list(atom.get_coord()),
+                          atom.get_bfactor(), atom.get_occupancy(),
+                          atom.get_serial_number(), atom.element, anisou,
+                          atom.get_parent().get_full_id()))
+        return atoms, [str(w.message) for w in caught]
+
+    def compare(self, filename):
+        class OneAtATime(StructureBuilder):
+            def init_atom(self, *args):
+                StructureBuilder.init_atom(self, *args)
+
+        atoms, caught = self.parse(filename, StructureBuilder())
+        other_atoms, other_caught = self.parse(filename, OneAtATime())
+        self.assertEqual(caught, other_caught)
+        self.assertEqual(len(atoms), len(other_atoms))
+        for atom, other in zip(atoms, other_atoms):
+            self.assertEqual(atom, other)
+        return atoms
+
+    def test_anisou(self):
+        """ANISOU records go with the right atoms."""
+        atoms = self.compare("PDB/2XHE.pdb")
+        # the file has 6267 ANISOU records
+        self.assertEqual(6267, len([a for a in atoms if a[6] is not None]))
+
+    def test_disordered(self):
+        """Disordered atoms and residues are built as before."""
+        self.compare("PDB/a_structure.pdb")
+
+    def test_bad_numbers(self):
+        """Invalid numbers are reported at the right lines."""
+        # the header lines make the messages differ from other tests, which
+        # would otherwise hide them in the warnings registry on Python 2
+        handle = StringIO(
+            "HEADER    BULK PARSING TEST\n"
+            "REMARK   1\n"
+            "ATOM      1  N   GLY A   1      -2.607   4.673  13.504  1.00 20.57           N\n"
+            "ATOM  xxxxx  CA  GLY A   1      -1.524   4.021  12.790  1.00 19.93           C\n"
+            "ATOM      3  C   GLY A   1      -0.256   4.812  12.947       19.67           C\n"
+            "ATOM      4  O   GLY A   1       0.846   4.278  12.930  1.00\n")
+        atoms, caught = self.parse(handle, StructureBuilder())
+        self.assertEqual([0, None, 0.0], [atoms[1][4], atoms[2][3], atoms[3][2]])
+        caught = [message for message in caught if "at line" in message]
+        self.assertEqual(2, len(caught))
+        self.assertTrue("occupancy at line 5." in caught[0])
+        self.assertTrue("B factor at line 6." in caught[1])
+        handle = StringIO(
+            "ATOM      1  N   GLY A   1      -2.607   4.673  13.504  1.00 20.57           N\n"
+            "ATOM      2  CA  GLY A   1      -1.524   4.0x1  12.790  1.00 19.93           C\n")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", PDBConstructionWarning)
+            self.assertRaises(PDBConstructionException, PDBParser().get_structure,
+                              "X", handle)
+
+
+class FilterTests(unittest.TestCase):
+    """Parse only some of the atoms."""
+
+    def test_atom_names(self):
+        """Parse only the C-alpha atoms."""
+        structure = parse_quietly("PDB/2XHE.pdb", atom_names=["CA"])
+        full = parse_quietly("PDB/2XHE.pdb")
+        expected = [a.get_full_id() for a in full.get_atoms()
+                    if a.get_name() == "CA"]
+        self.assertEqual(expected,
+                         [a.get_full_id() for a in structure.get_atoms()])
+        self.assertEqual(len(expected), len(structure.atom_array))
+        # the ANISOU records still go with the right atoms
+        full_atoms = dict((a.get_full_id(), a) for a in full.get_atoms())
+        for atom in structure.get_atoms():
+            other = full_atoms[atom.get_full_id()]
+            self.assertEqual(list(other.get_coord()), list(atom.get_coord()))
+            self.assertEqual(list(other.get_anisou()),
+                             list(atom.get_anisou()))
+
+    def test_chains(self):
+        """Parse only some of the chains."""
+        structure = parse_quietly("PDB/2XHE.pdb", chains="B")
+        self.assertEqual(["B"], [chain.id for chain in structure[0]])
+        full = parse_quietly("PDB/2XHE.pdb")
+        self.assertEqual(len(list(full[0]["B"].get_atoms())),
+                         len(list(structure.get_atoms())))
+
+    def test_hetatm_water(self):
+        """Parse without waters or other hetero residues."""
+        structure = parse_quietly("PDB/1A8O.pdb", water=False)
+        self.assertEqual(set([" ", "H_MSE"]),
+                         set(r.id[0] for r in structure.get_residues()))
+        structure = parse_quietly("PDB/1A8O.pdb", hetatm=False)
+        self.assertEqual(set([" ", "W"]),
+                         set(r.id[0] for r in structure.get_residues()))
+        structure = parse_quietly("PDB/1A8O.pdb", hetatm=False, water=False)
+        full = parse_quietly("PDB/1A8O.pdb")
+        self.assertEqual(len([a for a in full.get_atoms()
+                              if a.get_parent().id[0] == " "]),
+                         len(structure.atom_array))
+
+    def test_models(self):
+        """Parse only some of the models."""
+        structure = parse_quietly("PDB/1MOT.pdb", models=[1, 19])
+        self.assertEqual([1, 19], [model.id for model in structure])
+        full = parse_quietly("PDB/1MOT.pdb")
+        self.assertEqual([a.get_full_id() for a in full[1].get_atoms()] +
+                         [a.get_full_id() for a in full[19].get_atoms()],
+                         [a.get_full_id() for a in structure.get_atoms()])
+        # a file without MODEL records has a single model 0
+        self.assertEqual(0, len(parse_quietly("PDB/1A8O.pdb", models=[1])))
+        self.assertEqual(1, len(parse_quietly("PDB/1A8O.pdb", models=[0])))
+
+    def test_disordered(self):
+        """Parse some of the atoms of disordered residues."""
+        structure = parse_quietly("PDB/a_structure.pdb", atom_names=["CA"],
+                               hetatm=False, water=False)
+        for atom in structure.get_atoms():
+            self.assertEqual("CA", atom.get_name())
+            self.assertEqual(" ", atom.get_parent().id[0])
+        full = parse_quietly("PDB/a_structure.pdb")
+        for model in full:
+            for residue in model.get_residues():
+                if residue.id[0] == " " and "CA" in residue:
+                    chain_id = residue.get_parent().id
+                    other = structure[model.id][chain_id][residue.id]
+                    self.assertEqual(residue["CA"].is_disordered(),
+                                     other["CA"].is_disordered())
+                    self.assertEqual(residue.is_disordered() == 2,
+                                     other.is_disordered() == 2)
+
+
+class StructureCacheTests(unittest.TestCase):
+    """Save structures in binary files and load them again."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def dump(self, structure):
+        """Everything the parser stores about the atoms, in order."""
+        atoms = []
+        for atom in structure.atom_array.atoms:
+            anisou = atom.get_anisou()
+            if anisou is not None:
+                anisou = list(anisou)
+            residue = atom.get_parent()
+            wrapper = residue.get_parent()[residue.id]
+            atoms.append((atom.get_full_id()[1:], atom.get_fullname(),
+                          atom.get_altloc(), list(atom.get_coord()),
+                          atom.get_bfactor(), atom.get_occupancy(),
+                          atom.get_serial_number(), atom.element, anisou,
+                          residue.get_resname(), residue.get_segid(),
+                          residue.is_disordered(), wrapper.is_disordered(),
+                          wrapper.get_resname(), atom.is_disordered(),
+                          residue[atom.get_id()].get_altloc()))
+        return atoms
+
+    def save_and_load(self, structure):
+        filename = os.path.join(self.directory, "saved")
+        save_structure(structure, filename)
+        return load_structure(filename)
+
+    def test_round_trip(self):
+        """Loaded structures are the same as the saved ones."""
+        for filename in ["PDB/2XHE.pdb", "PDB/a_structure.pdb",
+                         "PDB/1A8O.pdb"]:
+            structure = parse_quietly(filename)
+            loaded = self.save_and_load(structure)
+            self.assertEqual(self.dump(structure), self.dump(loaded))
+            self.assertEqual(structure.header, loaded.header)
+            self.assertEqual([(m.id, m.serial_num) for m in structure],
+                             [(m.id, m.serial_num) for m in loaded])
+
+    def test_disordered(self):
+        """The selected atoms and residues are kept."""
+        structure = parse_quietly("PDB/a_structure.pdb")
+        residue = structure[1]["A"][(" ", 10, " ")]
+        self.assertEqual(2, residue.is_disordered())
+        self.assertEqual("SER", residue.get_resname())
+        residue.disordered_select("GLY")
+        for atom in structure.get_atoms():
+            if atom.is_disordered() == 2:
+                altlocs = atom.disordered_get_id_list()
+                altlocs.remove(atom.get_altloc())
+                atom.disordered_select(altlocs[0])
+                break
+        loaded = self.save_and_load(structure)
+        self.assertEqual("GLY",
+                         loaded[1]["A"][(" ", 10, " ")].get_resname())
+        self.assertEqual(self.dump(structure), self.dump(loaded))
+
+    def test_lazy(self):
+        """The chains of a loaded structure are built when first used."""
+        structure = parse_quietly("PDB/2XHE.pdb")
+        loaded = self.save_and_load(structure)
+        first, second = loaded[0].get_list()
+        self.assertEqual(["A", "B"], [first.id, second.id])
+        self.assertTrue(first._tables is not None)
+        self.assertTrue(second._tables is not None)
+        for atom, other in zip(structure[0]["B"].get_atoms(),
+                               second.get_atoms()):
+            self.assertEqual(atom.get_full_id()[1:], other.get_full_id()[1:])
+            self.assertEqual(list(atom.get_coord()), list(other.get_coord()))
+        self.assertTrue(first._tables is not None)
+        self.assertTrue(second._tables is None)
+        # asking for all the atoms builds the other chain
+        self.assertEqual(len(loaded.atom_array), len(loaded.atom_array.atoms))
+        self.assertTrue(first._tables is None)
+        self.assertEqual(self.dump(structure), self.dump(loaded))
+
+    def test_copy_on_write(self):
+        """Changing a loaded structure does not change the file."""
+        structure = parse_quietly("PDB/2BEG.pdb")
+        filename = os.path.join(self.directory, "saved")
+        save_structure(structure, filename)
+        loaded = load_structure(filename)
+        loaded.transform(numpy.identity(3), numpy.array((1.0, 0.0, 0.0)))
+        loaded = load_structure(filename)
+        for atom, other in zip(structure.get_atoms(), loaded.get_atoms()):
+            self.assertEqual(list(atom.get_coord()), list(other.get_coord()))
+        # and the loaded structure can be copied
+        copied = loaded.copy()
+        self.assertEqual(self.dump(loaded), self.dump(copied))
+
+    def test_empty(self):
+        """An empty structure can be saved."""
+        structure = parse_quietly(StringIO("END\n"))
+        loaded = self.save_and_load(structure)
+        self.assertEqual(0, len(loaded))
+        self.assertEqual(0, len(loaded.atom_array))
+
+    def test_cache(self):
+        """The cache parses each file only once."""
+        cache = StructureCache(self.directory)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", PDBConstructionWarning)
+            first = cache.get_structure("first", "PDB/a_structure.pdb")
+        second = cache.get_structure("second", "PDB/a_structure.pdb")
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+        self.assertEqual("second", second.id)
+        self.assertEqual(self.dump(first), self.dump(second))
+        second = cache.get_structure("second", "PDB/1A8O.cif")
+        self.assertEqual((2, 1), (cache.misses, cache.hits))
+        self.assertEqual(2, len(os.listdir(self.directory)))
+
+    def test_bad_file(self):
+        """Other files are not loaded."""
+        self.assertRaises(ValueError, load_structure, "PDB/2BEG.pdb")
+
+
+class QCPTests(unittest.TestCase):
+    """Tests for the batch superposition with QCP."""
+
+    def setUp(self):
+        structure = parse_quietly("PDB/1MOT.pdb", "1mot")
+        self.models = list(structure)
+        self.coords = numpy.array([atom_coords(a for a in model.get_atoms()
+                                               if a.get_id() == "CA")
+                                   for model in self.models])
+
+    def test_rmsd(self):
+        """QCP agrees with the SVD superposition."""
+        reference = self.coords[0]
+        rms, rot, tran = qcp_rmsd(reference, self.coords[1:], rotations=True)
+        self.assertEqual((19,), rms.shape)
+        self.assertEqual((19, 3, 3), rot.shape)
+        self.assertEqual((19, 3), tran.shape)
+        sup = SVDSuperimposer()
+        for i, coords in enumerate(self.coords[1:]):
+            sup.set(reference, coords)
+            sup.run()
+            self.assertAlmostEqual(sup.get_rms(), rms[i], places=5)
+            svd_rot, svd_tran = sup.get_rotran()
+            self.assertTrue(numpy.allclose(svd_rot, rot[i], atol=1e-5))
+            self.assertTrue(numpy.allclose(svd_tran, tran[i], atol=1e-4))
+        # without the rotations, and for a single coordinate set
+        self.assertTrue(numpy.allclose(rms, qcp_rmsd(reference,
+                                                     self.coords[1:])))
+        self.assertAlmostEqual(rms[3], qcp_rmsd(reference, self.coords[4]))
+        self.assertAlmostEqual(0, qcp_rmsd(reference, reference), places=5)
+        self.assertRaises(PDBException, qcp_rmsd, reference,
+                          self.coords[1:, 1:])
+
+    def test_moved(self):
+        """QCP finds the transformation of a moved coordinate set."""
+        rot = rotmat(Vector(1, 0, 0), Vector(0, 1, 1).normalized())
+        moved = numpy.dot(self.coords[0], rot) + numpy.array([3, -1, 2])
+        rms, back, tran = qcp_rmsd(self.coords[0], moved, rotations=True)
+        self.assertAlmostEqual(0, rms, places=4)
+        self.assertTrue(numpy.allclose(self.coords[0],
+                                       numpy.dot(moved, back) + tran,
+                                       atol=1e-4))
+        # points on a line have no unique rotation
+        line = numpy.outer(numpy.arange(5), [1.0, 2.0, 3.0])
+        rms, back, tran = qcp_rmsd(line, line, rotations=True)
+        self.assertAlmostEqual(0, rms)
+        self.assertTrue(numpy.allclose(line, numpy.dot(line, back) + tran))
+
+    def test_matrix(self):
+        """The RMSD matrix lists all the pairs in order."""
+        matrix = qcp_rmsd_matrix(self.coords)
+        self.assertEqual((190,), matrix.shape)
+        expected = numpy.concatenate([qcp_rmsd(self.coords[i],
+                                               self.coords[i + 1:])
+                                      for i in range(19)])
+        self.assertTrue(numpy.allclose(expected, matrix))
+        self.assertTrue(numpy.allclose(matrix,
+                                       qcp_rmsd_matrix(self.coords,
+                                                       workers=2)))
+        self.assertEqual((0,), qcp_rmsd_matrix(self.coords[:1]).shape)
+        self.assertRaises(PDBException, qcp_rmsd_matrix, self.coords[0])
+
+
+class BackboneGeometryTests(unittest.TestCase):
+    """Tests for the array calculation of backbone angles."""
+
+    def setUp(self):
+        self.structure = parse_quietly("PDB/1MOT.pdb", "1mot")
+
+    def test_arrays(self):
+        """The array functions agree with calc_angle and calc_dihedral."""
+        points = numpy.random.RandomState(7).normal(size=(4, 50, 3))
+        angles = calc_angles(*points[:3])
+        dihedrals = calc_dihedrals(*points)
+        for i in range(50):
+            vectors = [Vector(p[i]) for p in points]
+            self.assertAlmostEqual(calc_angle(*vectors[:3]), angles[i])
+            self.assertAlmostEqual(calc_dihedral(*vectors), dihedrals[i])
+        # missing points give NaN
+        points[1, 3] = numpy.nan
+        self.assertTrue(numpy.isnan(calc_dihedrals(*points)[3]))
+        self.assertTrue(numpy.isnan(calc_angles(*points[:3])[3]))
+
+    def test_phi_psi(self):
+        """Phi and psi are calculated for each residue."""
+        pp = PPBuilder().build_peptides(self.structure[0])[0]
+        phi_psi = pp.get_phi_psi_list()
+        self.assertEqual(len(pp), len(phi_psi))
+        self.assertEqual(None, phi_psi[0][0])
+        self.assertEqual(None, phi_psi[-1][1])
+        for i in 1, 10, len(pp) - 2:
+            n, ca, c = [pp[i][name].get_vector() for name in ("N", "CA", "C")]
+            phi = calc_dihedral(pp[i - 1]["C"].get_vector(), n, ca, c)
+            psi = calc_dihedral(n, ca, c, pp[i + 1]["N"].get_vector())
+            self.assertAlmostEqual(phi, phi_psi[i][0])
+            self.assertAlmostEqual(psi, phi_psi[i][1])
+            self.assertEqual(phi_psi[i], (pp[i].xtra["PHI"], pp[i].xtra["PSI"]))
+        tau = pp.get_tau_list()
+        theta = pp.get_theta_list()
+        self.assertEqual((len(pp) - 3, len(pp) - 2), (len(tau), len(theta)))
+        self.assertEqual(tau[0], pp[2].xtra["TAU"])
+        self.assertEqual(theta[0], pp[1].xtra["THETA"])
+
+    def test_models(self):
+        """The angles of all the models are calculated at once."""
+        polypeptides = [PPBuilder().build_peptides(model)[0]
+                        for model in self.structure]
+        backbones = [pp.get_backbone_coords() for pp in polypeptides]
+        phi, psi = calc_phi_psi(*[numpy.array(coords)
+                                  for coords in zip(*backbones)])
+        tau = calc_tau(numpy.array([backbone[1] for backbone in backbones]))
+        self.assertEqual((20, len(polypeptides[0])), phi.shape)
+        for i, pp in enumerate(polypeptides):
+            phi_psi = numpy.array(pp.get_phi_psi_list()[1:-1], float)
+            self.assertTrue(numpy.allclose(phi_psi[:, 0], phi[i, 1:-1]))
+            self.assertTrue(numpy.allclose(phi_psi[:, 1], psi[i, 1:-1]))
+            self.assertTrue(numpy.allclose(pp.get_tau_list(), tau[i]))
+        self.assertTrue(numpy.isnan(phi[:, 0]).all())
+        self.assertTrue(numpy.isnan(psi[:, -1]).all())
+
+    def test_missing_atoms(self):
+        """Residues with missing atoms have no phi or psi."""
+        pp = PPBuilder().build_peptides(self.structure[0])[0]
+        pp[5].detach_child("C")
+        phi_psi = pp.get_phi_psi_list()
+        self.assertEqual((None, None), phi_psi[5])
+        self.assertEqual(None, phi_psi[6][0])
+        self.assertNotEqual(None, phi_psi[4][1])
+        n, ca, c = pp.get_backbone_coords()
+        self.assertTrue(numpy.isnan(c[5]).all())
+
+    def test_custom_builder(self):
+        """A builder overriding the distance test is still used."""
+
+        class AnyPPBuilder(PPBuilder):
+            def _test_dist(self, c, n):
+                return 1
+
+        # the residues of a chain are all connected
+        polypeptides = AnyPPBuilder().build_peptides(self.structure[0])
+        self.assertEqual(len(list(self.structure[0].get_residues())),
+                         sum(len(pp) for pp in polypeptides))
+
+
 class DsspTests(unittest.TestCase):
     """Tests for DSSP parsing etc which don't need the binary tool.
 
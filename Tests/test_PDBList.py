@@ -0,0 +1,305 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.PDB.PDBList using a local stand-in for the PDB server."""
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import SocketServer
+from io import BytesIO
+
+from Bio._py3k import StringIO, _as_bytes
+from Bio.PDB.PDBList import PDBList, MANIFEST_NAME
+
+# The module, as Bio.PDB.PDBList is the class once Bio.PDB is imported
+PDBList_module = sys.modules[PDBList.__module__]
+
+
+MODIFIED = "Fri, 11 Oct 2013 00:00:00 GMT"
+
+
+def compress(text):
+    data = BytesIO()
+    handle = gzip.GzipFile(fileobj=data, mode="wb")
+    handle.write(_as_bytes(text))
+    handle.close()
+    return data.getvalue()
+
+
+def structure_path(code):
+    return "/pub/pdb/data/structures/divided/pdb/%s/pdb%s.ent.gz" \
+        % (code[1:3], code)
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves the files of the server, with ranges and conditions."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get("Range"),
+                                self.headers.get("If-Modified-Since")))
+        server.if_ranges.append(self.headers.get("If-Range"))
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        body, modified = server.files[self.path]
+        if self.headers.get("If-Modified-Since") == modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        request_range = self.headers.get("Range")
+        if self.headers.get("If-Range") not in (None, modified):
+            # changed since, so send the whole file
+            request_range = None
+        if request_range and server.ranges:
+            start = int(request_range.split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %i-%i/%i"
+                             % (start, len(body) - 1, len(body)))
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Last-Modified", modified)
+        self.end_headers()
+        if self.path in server.truncate:
+            # break off in the middle of the file
+            server.truncate.remove(self.path)
+            body = body[:len(body) // 2]
+        self.wfile.write(body)
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0),
+                                           StandInHandler)
+        self.files = {}
+        self.requests = []
+        self.if_ranges = []
+        self.truncate = set()
+        self.ranges = True
+
+    def add_structure(self, code, text, modified=MODIFIED):
+        self.files[structure_path(code)] = (compress(text), modified)
+
+    def add_status(self, release, added=(), modified=(), obsolete=()):
+        folder = "/pub/pdb/data/status/"
+        self.files[folder] = ("drwxrwxr-x 2 1002 sysadmin 512 Oct 6 %s\n"
+                              "-rw-r--r-- 1 1002 sysadmin 1327 README\n"
+                              % release, MODIFIED)
+        for name, codes in [("added", added), ("modified", modified),
+                            ("obsolete", obsolete)]:
+            self.files["%s%s/%s.pdb" % (folder, release, name)] = \
+                ("".join(code + "\n" for code in codes), MODIFIED)
+
+    def structure_requests(self):
+        return [request for request in self.requests
+                if request[0].startswith("/pub/pdb/data/structures/")]
+
+
+class PDBListCases(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        host, port = self.server.server_address
+        self.directory = tempfile.mkdtemp()
+        self.pdbl = PDBList(server="http://%s:%i" % (host, port),
+                            pdb=self.directory, workers=3)
+        # PDBList reports its progress with print
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def local_file(self, code):
+        return os.path.join(self.directory, code[1:3], "pdb%s.ent" % code)
+
+    def read(self, code):
+        with open(self.local_file(code)) as handle:
+            return handle.read()
+
+    def manifest(self):
+        with open(os.path.join(self.directory, MANIFEST_NAME)) as handle:
+            return dict((line.split("\t")[0], line.rstrip("\n").split("\t"))
+                        for line in handle)
+
+    def test_download(self):
+        "Test downloading several entries at once"
+        codes = ["1ab%i" % i for i in range(6)]
+        for code in codes:
+            self.server.add_structure(code, "HEADER %s\n" % code)
+        filenames = self.pdbl.download_pdb_files(codes + ["9zzz"])
+        self.assertEqual([self.local_file(code) for code in codes] + [None],
+                         filenames)
+        for code in codes:
+            self.assertEqual("HEADER %s\n" % code, self.read(code))
+        self.assertEqual(["pdb1ab%i.ent" % i for i in range(6)],
+                         sorted(os.listdir(os.path.join(self.directory,
+                                                        "ab"))))
+        manifest = self.manifest()
+        self.assertEqual(sorted(codes), sorted(manifest))
+        self.assertEqual(["1ab0", "0", self.local_file("1ab0"), "12",
+                          MODIFIED, ""], manifest["1ab0"])
+        # existing files are not downloaded again
+        count = len(self.server.requests)
+        self.assertEqual(self.local_file("1ab0"),
+                         self.pdbl.retrieve_pdb_file("1AB0"))
+        self.assertEqual(count, len(self.server.requests))
+
+    def test_single(self):
+        "Test retrieve_pdb_file and downloads elsewhere leave no manifest"
+        self.server.add_structure("1abc", "HEADER 1abc\n")
+        self.assertEqual(self.local_file("1abc"),
+                         self.pdbl.retrieve_pdb_file("1abc"))
+        self.assertEqual("HEADER 1abc\n", self.read("1abc"))
+        other = os.path.join(self.directory, "other")
+        self.assertEqual([os.path.join(other, "pdb1abc.ent")],
+                         self.pdbl.download_pdb_files(["1abc"], pdir=other))
+        self.assertFalse(os.path.exists(os.path.join(self.directory,
+                                                     MANIFEST_NAME)))
+
+    def test_save_interval(self):
+        "Test the manifest is saved during a long download"
+        codes = ["1ab%i" % i for i in range(5)]
+        for code in codes:
+            self.server.add_structure(code, "HEADER %s\n" % code)
+        sizes = []
+        original = PDBList_module._Manifest.save
+
+        def save(manifest, min_changes=1):
+            original(manifest, min_changes)
+            if os.path.exists(manifest.filename):
+                size = len(self.manifest())
+                if not sizes or sizes[-1] != size:
+                    sizes.append(size)
+        PDBList_module._Manifest.save = save
+        interval = PDBList_module._SAVE_INTERVAL
+        PDBList_module._SAVE_INTERVAL = 2
+        self.pdbl.workers = 1
+        try:
+            self.pdbl.download_pdb_files(codes)
+        finally:
+            PDBList_module._Manifest.save = original
+            PDBList_module._SAVE_INTERVAL = interval
+        self.assertEqual([2, 4, 5], sizes)
+
+    def test_resume(self):
+        "Test resuming an interrupted download"
+        text = "".join("ATOM  %5i\n" % i for i in range(1000))
+        self.server.add_structure("1abc", text)
+        self.server.truncate.add(structure_path("1abc"))
+        self.assertEqual([None], self.pdbl.download_pdb_files(["1abc"]))
+        part = self.local_file("1abc") + ".gz.part"
+        size = len(self.server.files[structure_path("1abc")][0])
+        self.assertEqual(size // 2, os.path.getsize(part))
+        with open(part + ".modified") as handle:
+            self.assertEqual(MODIFIED, handle.read())
+        self.assertFalse(os.path.exists(self.local_file("1abc")))
+        self.pdbl.retrieve_pdb_file("1abc")
+        self.assertEqual(text, self.read("1abc"))
+        self.assertFalse(os.path.exists(part))
+        self.assertFalse(os.path.exists(part + ".modified"))
+        self.assertEqual("bytes=%i-" % (size // 2),
+                         self.server.requests[-1][1])
+        self.assertEqual(MODIFIED, self.server.if_ranges[-1])
+        # a server ignoring the range sends the whole file again
+        self.server.ranges = False
+        self.server.truncate.add(structure_path("1abc"))
+        self.pdbl.overwrite = 1
+        self.assertRaises(IOError, self.pdbl.retrieve_pdb_file, "1abc")
+        self.pdbl.retrieve_pdb_file("1abc")
+        self.assertEqual(text, self.read("1abc"))
+
+    def test_resume_changed(self):
+        "Test an interrupted download is not resumed if the file changed"
+        self.server.add_structure("1abc", "HEADER old\n" * 100)
+        self.server.truncate.add(structure_path("1abc"))
+        self.assertRaises(IOError, self.pdbl.retrieve_pdb_file, "1abc")
+        part = self.local_file("1abc") + ".gz.part"
+        self.assertTrue(os.path.exists(part))
+        text = "HEADER new\n" * 100
+        self.server.add_structure("1abc", text,
+                                  "Sat, 12 Oct 2013 00:00:00 GMT")
+        self.pdbl.retrieve_pdb_file("1abc")
+        self.assertEqual(text, self.read("1abc"))
+        self.assertEqual(MODIFIED, self.server.if_ranges[-1])
+        # without the date of the first attempt, the download starts again
+        self.server.truncate.add(structure_path("1abc"))
+        self.pdbl.overwrite = 1
+        self.assertRaises(IOError, self.pdbl.retrieve_pdb_file, "1abc")
+        os.remove(part + ".modified")
+        self.pdbl.retrieve_pdb_file("1abc")
+        self.assertEqual(text, self.read("1abc"))
+        self.assertEqual(None, self.server.requests[-1][1])
+        self.assertEqual([], [name for name in os.listdir(
+            os.path.dirname(part)) if name.startswith("pdb1abc.ent.gz")])
+
+    def test_corrupt(self):
+        "Test a download with a bad checksum is rejected"
+        body = bytearray(compress("HEADER 1abc\n"))
+        # change the CRC32 at the end of the gzip file
+        body[-8] ^= 1
+        self.server.files[structure_path("1abc")] = (bytes(body), MODIFIED)
+        self.assertRaises(IOError, self.pdbl.retrieve_pdb_file, "1abc")
+        self.assertEqual([], os.listdir(os.path.join(self.directory, "ab")))
+        self.assertFalse(os.path.exists(os.path.join(self.directory,
+                                                     MANIFEST_NAME)))
+
+    def test_update(self):
+        "Test updating the local copy with the weekly lists"
+        self.server.add_structure("1new", "HEADER new\n")
+        self.server.add_structure("1mod", "HEADER modified\n")
+        self.server.add_structure("1old", "HEADER old\n")
+        self.pdbl.download_pdb_files(["1mod", "1old"])
+        self.server.add_status("20131011", ["1new"], ["1mod"], ["1old"])
+        self.server.requests = []
+        self.pdbl.update_pdb()
+        self.assertEqual("HEADER new\n", self.read("1new"))
+        self.assertFalse(os.path.exists(self.local_file("1old")))
+        self.assertTrue(os.path.exists(os.path.join(self.directory,
+                                                    "obsolete", "ol",
+                                                    "pdb1old.ent")))
+        # 1mod was asked for only if modified since it was downloaded
+        requests = sorted(self.server.structure_requests())
+        self.assertEqual([(structure_path("1mod"), None, MODIFIED),
+                          (structure_path("1new"), None, None)], requests)
+        manifest = self.manifest()
+        self.assertEqual("20131011", manifest["1new"][5])
+        self.assertEqual("20131011", manifest["1mod"][5])
+        # running the update again does not go to the server for the files
+        self.server.requests = []
+        PDBList(server=self.pdbl.pdb_server, pdb=self.directory).update_pdb()
+        self.assertEqual([], self.server.structure_requests())
+        # a later change of 1mod is downloaded
+        later = "Fri, 18 Oct 2013 00:00:00 GMT"
+        self.server.add_structure("1mod", "HEADER changed\n", later)
+        self.server.add_status("20131018", [], ["1mod"], [])
+        self.pdbl.update_pdb()
+        self.assertEqual("HEADER changed\n", self.read("1mod"))
+        self.assertEqual(later, self.manifest()["1mod"][4])
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
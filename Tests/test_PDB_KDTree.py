@@ -26,7 +26,25 @@ except ImportError:
     raise MissingExternalDependencyError(
         "C module in Bio.KDTree not compiled")
 
-from Bio.PDB.NeighborSearch import NeighborSearch
+import gc
+import warnings
+import weakref
+from math import pi
+
+import numpy
+
+from Bio.PDB import PDBParser, ShrakeRupley, ShrakeRupley_atomic
+from Bio.PDB.AtomArray import atom_coords
+from Bio.PDB.NeighborSearch import NeighborSearch, neighbor_search
+from Bio.PDB.PDBExceptions import PDBConstructionWarning, PDBException
+from Bio.PDB.SASA import calc_sasa, calc_sasa_many, atom_radii, _sphere_points
+
+
+def parse_quietly(filename, structure_id="X"):
+    """Parses a PDB file, ignoring the PDBConstructionWarnings."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", PDBConstructionWarning)
+        return PDBParser().get_structure(structure_id, filename)
 
 
 class NeighborTest(unittest.TestCase):
@@ -55,6 +73,160 @@ class NeighborTest(unittest.TestCase):
         self.assertEqual([], ns.search(x, 5.0, "M"))
         self.assertEqual([], ns.search(x, 5.0, "S"))
 
+    def test_search_many(self):
+        """NeighborSearch: Search around many positions at once."""
+        class RandomAtom:
+            def __init__(self):
+                self.coord = 20 * random(3)
+
+            def get_coord(self):
+                return self.coord
+
+        atoms = [RandomAtom() for j in range(300)]
+        centers = 20 * random((50, 3))
+        for cell_size in [None, 2.0, 5.0]:
+            ns = NeighborSearch(atoms, cell_size=cell_size)
+            offsets, indices = ns.search_many(centers, 4.0)
+            self.assertEqual(51, len(offsets))
+            self.assertEqual(len(indices), offsets[-1])
+            for k, center in enumerate(centers):
+                expected = sorted(atoms.index(a) for a in ns.search(center, 4.0))
+                self.assertEqual(expected,
+                                 list(indices[offsets[k]:offsets[k + 1]]))
+            offsets, indices = ns.search_many(array([[250, 250, 250]]), 5.0)
+            self.assertEqual([0, 0], list(offsets))
+            self.assertEqual(0, len(indices))
+
+    def test_cells(self):
+        """NeighborSearch: Use a grid of cells instead of the KD tree."""
+        structure = parse_quietly("PDB/a_structure.pdb")
+        atoms = list(structure.get_atoms())
+        kd_search = NeighborSearch(atoms)
+        for cell_size in [2.0, 4.0, 9.0]:
+            cell_search = NeighborSearch(atoms, cell_size=cell_size)
+            for radius in [3.0, 6.0]:
+                pairs = cell_search.search_all_indices(radius)
+                self.assertTrue((pairs[:, 0] < pairs[:, 1]).all())
+                self.assertEqual(
+                    sorted(map(tuple, kd_search.search_all_indices(radius))),
+                    sorted(map(tuple, pairs)))
+                for level in "ARCMS":
+                    expected = set(frozenset(map(id, pair)) for pair
+                                   in kd_search.search_all(radius, level))
+                    found = cell_search.search_all(radius, level)
+                    self.assertEqual(len(expected), len(found))
+                    self.assertEqual(expected,
+                                     set(frozenset(map(id, pair)) for pair
+                                         in found))
+        self.assertRaises(ValueError, NeighborSearch, atoms, cell_size=0)
+
+    def test_cells_empty(self):
+        """NeighborSearch: A grid of cells without any atoms."""
+        ns = NeighborSearch([], cell_size=4.0)
+        offsets, indices = ns.search_many(array([[0, 0, 0], [1, 2, 3]]), 5.0)
+        self.assertEqual([0, 0, 0], list(offsets))
+        self.assertEqual(0, len(indices))
+        self.assertEqual([], ns.search(array([0, 0, 0], "f"), 5.0))
+        self.assertEqual((0, 2), ns.search_all_indices(5.0).shape)
+        self.assertEqual([], ns.search_all(5.0))
+
+    def test_cache(self):
+        """NeighborSearch: Reuse the search of a structure."""
+        structure = parse_quietly("PDB/1A8O.pdb")
+        ns = neighbor_search(structure)
+        again = neighbor_search(structure)
+        self.assertTrue(ns.kdt is again.kdt)
+        self.assertEqual(ns.atom_list, again.atom_list)
+        self.assertEqual(ns.search_all(5.0), again.search_all(5.0))
+        self.assertFalse(ns.kdt is neighbor_search(structure,
+                                                   cell_size=5.0).kdt)
+        self.assertFalse(ns.kdt is neighbor_search(structure[0]).kdt)
+        residue = structure[0]["A"].child_list[0]
+        residue.detach_child(residue.child_list[0].get_id())
+        moved = neighbor_search(structure)
+        self.assertFalse(ns.kdt is moved.kdt)
+        self.assertEqual(len(ns.atom_list) - 1, len(moved.atom_list))
+        structure.transform(array([[1, 0, 0], [0, 1, 0], [0, 0, 1]]),
+                            array([1.0, 0.0, 0.0]))
+        self.assertFalse(moved.kdt is neighbor_search(structure).kdt)
+        # the kept searches do not keep the structure alive
+        structure_ref = weakref.ref(structure)
+        del structure, residue, ns, again, moved
+        gc.collect()
+        self.assertTrue(structure_ref() is None)
+
+
+class SASATest(unittest.TestCase):
+    """Tests for the Shrake-Rupley accessible surface areas."""
+
+    def test_spheres(self):
+        """SASA: Areas of single and overlapping spheres."""
+        areas = calc_sasa([[0, 0, 0], [20, 0, 0]], [1.6, 1.0], 1.4)
+        self.assertAlmostEqual(4 * pi * 9, areas[0])
+        self.assertAlmostEqual(4 * pi * 5.76, areas[1])
+        # the caps of two overlapping spheres are buried
+        r1, r2, d = 3.0, 2.5, 4.0
+        a1 = (d * d + r1 * r1 - r2 * r2) / (2 * d)
+        a2 = d - a1
+        expected = 2 * pi * r1 * (r1 + a1) + 2 * pi * r2 * (r2 + a2)
+        areas = calc_sasa([[0, 0, 0], [0, 0, d]], [r1, r2], 0, 2000)
+        self.assertTrue(abs(areas.sum() - expected) < 0.001 * expected)
+        self.assertEqual((0,), calc_sasa(array([]).reshape((0, 3)), []).shape)
+        self.assertRaises(PDBException, calc_sasa, [[0, 0, 0]], [1.0, 2.0])
+        self.assertRaises(ValueError, calc_sasa, [[0, 0, 0]], [1.0], 1.4, 0)
+
+    def test_structure(self):
+        """SASA: Areas of the atoms and residues of a model."""
+        structure = parse_quietly("PDB/1A8O.pdb")
+        model = structure[0]
+        residues = ShrakeRupley(model)
+        atoms = ShrakeRupley_atomic(model)
+        self.assertAlmostEqual(140.8, residues[("A", 152)], places=1)
+        self.assertEqual(residues[("A", 152)],
+                         model["A"][152].xtra["EXP_SASA"])
+        for residue, area in residues:
+            self.assertAlmostEqual(area, sum(atoms[(residue.get_parent().id,
+                                                    residue.id, atom.id)]
+                                             for atom in residue))
+        self.assertFalse([res for res, area in residues if res.id[0] == "W"])
+        self.assertTrue(all(atom.xtra["EXP_SASA"] == area
+                            for atom, area in atoms))
+        # the areas agree with checking each sphere point one at a time
+        atom_list = [atom for atom in model.get_atoms()
+                     if atom.get_parent().id[0] != "W"]
+        coords = atom_coords(atom_list)
+        radii = atom_radii(atom_list) + 1.4
+        points = _sphere_points(30)
+        found = [area for atom, area in ShrakeRupley_atomic(model,
+                                                             n_points=30)]
+        for k in range(0, len(atom_list), 25):
+            exposed = 0
+            for point in coords[k] + radii[k] * points:
+                distances = ((coords - point) ** 2).sum(axis=1)
+                distances[k] = numpy.inf
+                exposed += (distances >= radii * radii).all()
+            self.assertAlmostEqual(4 * pi * radii[k] ** 2 * exposed / 30,
+                                   found[k])
+        # water molecules cover some of the surface
+        wet = ShrakeRupley(model, include_water=True)
+        self.assertTrue(len(wet) > len(residues))
+        self.assertTrue(sum(wet[key] for key in residues.keys())
+                        < sum(area for residue, area in residues))
+
+    def test_many(self):
+        """SASA: Areas of several structures at once."""
+        sets = []
+        for name in ("1A8O", "2BEG"):
+            structure = parse_quietly("PDB/%s.pdb" % name, name)
+            atom_list = list(structure[0].get_atoms())
+            sets.append((atom_coords(atom_list), atom_radii(atom_list)))
+        expected = [calc_sasa(coords, radii) for coords, radii in sets]
+        for workers in (1, 2):
+            found = calc_sasa_many(sets, workers=workers)
+            self.assertEqual(2, len(found))
+            for areas, expected_areas in zip(found, expected):
+                self.assertTrue((areas == expected_areas).all())
+
 
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity=2)
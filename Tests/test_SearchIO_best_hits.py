@@ -0,0 +1,143 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for SearchIO best_hits, the streaming top hit reducer."""
+
+import os
+import unittest
+import warnings
+
+from Bio import BiopythonExperimentalWarning
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', BiopythonExperimentalWarning)
+    from Bio import SearchIO
+
+
+def hit_evalue(hit):
+    return min(hsp.evalue for hsp in hit)
+
+
+def hsp_bitscore(hsp):
+    return hsp.bitscore
+
+
+def hsp_summary(hsp):
+    return hsp.hit_id, hsp.bitscore, hsp.query_start, hsp.hit_start
+
+
+def parse(*path):
+    return SearchIO.parse(os.path.join(*path), 'blast-xml')
+
+
+def split_hits(qresults, source, count):
+    """Yields copies of the QueryResults with every count-th hit."""
+    for qresult in qresults:
+        yield qresult[source::count]
+
+
+class SingleInputCases(unittest.TestCase):
+
+    def test_hits(self):
+        "Test best_hits keeps the best hits as sort would"
+        expected = [qresult.sort(key=hit_evalue, in_place=False)[:3]
+                    for qresult in parse('Blast', 'wnts.xml')]
+        reduced = list(SearchIO.best_hits(parse('Blast', 'wnts.xml'), 3,
+                                          key=hit_evalue))
+        self.assertEqual(len(expected), len(reduced))
+        for qresult, other in zip(expected, reduced):
+            self.assertEqual(qresult.id, other.id)
+            self.assertEqual(qresult.hit_keys, other.hit_keys)
+            self.assertEqual(qresult.program, other.program)
+            self.assertEqual(qresult.description, other.description)
+
+    def test_hits_default(self):
+        "Test best_hits without a key keeps the first hits"
+        for qresult, other in zip(parse('Blast', 'mirna.xml'),
+                SearchIO.best_hits(parse('Blast', 'mirna.xml'), 5)):
+            self.assertEqual(qresult.hit_keys[:5], other.hit_keys)
+        for qresult, other in zip(parse('Blast', 'mirna.xml'),
+                SearchIO.best_hits(parse('Blast', 'mirna.xml'), 5,
+                                   reverse=True)):
+            self.assertEqual(qresult.hit_keys[::-1][:5], other.hit_keys)
+
+    def test_hsps(self):
+        "Test best_hits keeps the best HSPs inside their hits"
+        for qresult, other in zip(parse('Blast', 'wnts.xml'),
+                SearchIO.best_hits(parse('Blast', 'wnts.xml'), 4,
+                                   key=hsp_bitscore, reverse=True,
+                                   hsps=True)):
+            expected = sorted(qresult.hsps, key=hsp_bitscore,
+                              reverse=True)[:4]
+            self.assertEqual(len(expected), len(other.hsps))
+            self.assertEqual(set(map(hsp_summary, expected)),
+                             set(map(hsp_summary, other.hsps)))
+            # each hit is placed by its best HSP
+            best_hits = []
+            for hsp in expected:
+                if hsp.hit_id not in best_hits:
+                    best_hits.append(hsp.hit_id)
+            self.assertEqual(best_hits, other.hit_keys)
+            for hit in other:
+                self.assertEqual(qresult[hit.id].description, hit.description)
+                self.assertTrue(len(hit) <= len(qresult[hit.id]))
+
+    def test_empty(self):
+        "Test best_hits on queries without any hits"
+        filename = os.path.join('Blast', 'tab_2226_tblastn_004.txt')
+        qresults = list(SearchIO.parse(filename, 'blast-tab'))
+        reduced = list(SearchIO.best_hits(qresults, 1, key=hit_evalue))
+        self.assertEqual([q.id for q in qresults], [q.id for q in reduced])
+        self.assertEqual([1] * len(reduced), [len(q) for q in reduced])
+
+
+class MergeCases(unittest.TestCase):
+
+    def sources(self, count):
+        return [split_hits(sorted(parse('Blast', 'wnts.xml'),
+                                  key=lambda qresult: qresult.id),
+                           idx, count)
+                for idx in range(count)]
+
+    def test_merge_hits(self):
+        "Test best_hits merging several inputs by query"
+        expected = [qresult.sort(key=hit_evalue, in_place=False)[:3]
+                    for qresult in sorted(parse('Blast', 'wnts.xml'),
+                                          key=lambda qresult: qresult.id)]
+        for count in (2, 3):
+            reduced = list(SearchIO.best_hits(self.sources(count), 3,
+                                              key=hit_evalue))
+            self.assertEqual([q.id for q in expected],
+                             [q.id for q in reduced])
+            for qresult, other in zip(expected, reduced):
+                self.assertEqual([hit_evalue(hit) for hit in qresult],
+                                 [hit_evalue(hit) for hit in other])
+
+    def test_merge_hsps(self):
+        "Test best_hits merging the HSPs of a hit from several inputs"
+        qresults = list(parse('Blast', 'mirna.xml'))
+        sources = [qresults, [qresult[:5] for qresult in qresults]]
+        for qresult, other in zip(qresults, SearchIO.best_hits(sources, 6,
+                                  key=hsp_bitscore, reverse=True, hsps=True)):
+            # the first five hits come twice, the duplicates are combined
+            doubled = qresult.hsps + qresult[:5].hsps
+            expected = sorted((hsp.bitscore for hsp in doubled),
+                              reverse=True)[:6]
+            self.assertEqual(expected,
+                             sorted((hsp.bitscore for hsp in other.hsps),
+                                    reverse=True))
+            self.assertEqual(len(set(other.hit_keys)), len(other))
+        # while hits are only kept once
+        for qresult, other in zip(qresults, SearchIO.best_hits(sources, 6)):
+            self.assertEqual(qresult.hit_keys[:6], other.hit_keys)
+
+    def test_unsorted(self):
+        "Test best_hits refuses to merge inputs not sorted by query ID"
+        sources = [parse('Blast', 'wnts.xml'), parse('Blast', 'wnts.xml')]
+        self.assertRaises(ValueError, list, SearchIO.best_hits(sources))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -3130,6 +3130,55 @@ class BlastXmlSpecialCases(unittest.TestCase):
         self.assertEqual('gi|347972582|ref|XM_309352.4| Anopheles gambiae str. PEST AGAP011294-PA (DEFI_ANOGA) mRNA, complete cds', hit2.description)
 
 
+class BlastXmlFieldsCases(unittest.TestCase):
+
+    def test_fields(self):
+        "Test parsing blast-xml with only some fields (mirna.xml)"
+        xml_file = get_file('mirna.xml')
+        fields = ['evalue', 'bitscore', 'query_start', 'hit_end', 'seq_len']
+        full = list(parse(xml_file, FMT))
+        selected = list(parse(xml_file, FMT, fields=fields))
+        self.assertEqual(3, len(selected))
+        for qresult, full_qresult in zip(selected, full):
+            self.assertEqual(full_qresult.id, qresult.id)
+            self.assertEqual(full_qresult.description, qresult.description)
+            self.assertEqual(full_qresult.seq_len, qresult.seq_len)
+            self.assertEqual(full_qresult.hit_keys, qresult.hit_keys)
+            for hit, full_hit in zip(qresult, full_qresult):
+                self.assertEqual(full_hit.description, hit.description)
+                self.assertEqual(full_hit.seq_len, hit.seq_len)
+                self.assertFalse(hasattr(hit, 'accession'))
+                self.assertEqual(len(full_hit), len(hit))
+                for hsp, full_hsp in zip(hit, full_hit):
+                    self.assertEqual(full_hsp.evalue, hsp.evalue)
+                    self.assertEqual(full_hsp.bitscore, hsp.bitscore)
+                    self.assertEqual(full_hsp.query_start, hsp.query_start)
+                    self.assertEqual(full_hsp.query_end, hsp.query_end)
+                    self.assertEqual(full_hsp.hit_start, hsp.hit_start)
+                    self.assertEqual(full_hsp.hit_end, hsp.hit_end)
+                    self.assertFalse(hasattr(hsp, 'ident_num'))
+                    self.assertEqual(None, hsp.query)
+                    self.assertEqual(None, hsp.hit)
+                    self.assertEqual({}, hsp.aln_annotation)
+
+    def test_fields_sequences(self):
+        "Test parsing blast-xml with only the aligned sequences"
+        xml_file = get_file('xml_2226_blastp_004.xml')
+        fields = 'query hit aln_annotation'
+        full_hsp = next(parse(xml_file, FMT))[0][0]
+        hsp = next(parse(xml_file, FMT, fields=fields))[0][0]
+        self.assertEqual(str(full_hsp.query.seq), str(hsp.query.seq))
+        self.assertEqual(str(full_hsp.hit.seq), str(hsp.hit.seq))
+        self.assertEqual(full_hsp.aln_annotation, hsp.aln_annotation)
+        self.assertFalse(hasattr(hsp, 'evalue'))
+
+    def test_fields_unknown(self):
+        "Test parsing blast-xml with an unknown field"
+        xml_file = get_file('mirna.xml')
+        self.assertRaises(ValueError, list, parse(xml_file, FMT,
+                          fields=['evalue', 'e-value']))
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -0,0 +1,252 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for SearchIO index with the query offsets saved to a file."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from Bio import BiopythonExperimentalWarning
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', BiopythonExperimentalWarning)
+    from Bio import SearchIO
+    from Bio.SearchIO import _index
+
+from search_tests_common import compare_search_obj
+
+
+STD_FIELDS = ['qseqid', 'sseqid', 'pident', 'length', 'mismatch', 'gapopen',
+              'qstart', 'qend', 'sstart', 'send', 'evalue', 'bitscore']
+
+# (format, filename, keyword arguments)
+TEST_FILES = [
+    ('blast-tab', os.path.join('Blast', 'tab_2226_tblastn_001.txt'), {}),
+    ('blast-tab', os.path.join('Blast', 'tab_2226_tblastn_005.txt'),
+     {'comments': True}),
+    ('blast-xml', os.path.join('Blast', 'wnts.xml'), {}),
+    ('blat-psl', os.path.join('Blat', 'psl_34_001.psl'), {}),
+    ('exonerate-text', os.path.join('Exonerate', 'exn_22_q_multiple.exn'),
+     {}),
+    ('fasta-m10', os.path.join('Fasta', 'output002.m10'), {}),
+    ('hmmer3-text', os.path.join('Hmmer', 'text_30_hmmscan_001.out'), {}),
+    ('hmmer3-tab', os.path.join('Hmmer', 'tab_30_hmmscan_001.out'), {}),
+    ('hmmscan3-domtab', os.path.join('Hmmer', 'domtab_30_hmmscan_001.out'),
+     {}),
+]
+
+
+class SavedOffsetsCases(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'search.out')
+        self.offsets = os.path.join(self.temp_dir, 'search.out.offsets')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, data, mode='wb'):
+        handle = open(self.filename, mode)
+        handle.write(data)
+        handle.close()
+
+    def check_index(self, format, expected, **kwargs):
+        """Checks an index using the offsets file matches the expected one."""
+        idx = SearchIO.index(self.filename, format,
+                             offsets_filename=self.offsets, **kwargs)
+        try:
+            self.assertEqual(list(expected), list(idx))
+            for key in expected:
+                self.assertEqual(expected._offsets[key], idx._offsets[key])
+                self.assertTrue(compare_search_obj(expected[key], idx[key]))
+        finally:
+            idx.close()
+
+    def test_reuse(self):
+        "Test index reuses the saved offsets for an unchanged file"
+        for format, filename, kwargs in TEST_FILES:
+            shutil.copyfile(filename, self.filename)
+            if os.path.isfile(self.offsets):
+                os.remove(self.offsets)
+            expected = SearchIO.index(filename, format, **kwargs)
+            self.check_index(format, expected, **kwargs)
+            self.assertTrue(os.path.isfile(self.offsets))
+            # now make sure the file is not scanned again
+            indexer_class = SearchIO.get_processor(format,
+                                                   SearchIO._INDEXER_MAP)
+            original = indexer_class.__iter__
+
+            def no_scan(indexer):
+                raise AssertionError("File scanned again")
+            indexer_class.__iter__ = no_scan
+            try:
+                self.check_index(format, expected, **kwargs)
+            finally:
+                indexer_class.__iter__ = original
+            expected.close()
+
+    def test_appended(self):
+        "Test index only scans the new queries of a file that has grown"
+        for format, filename, kwargs in TEST_FILES:
+            expected = SearchIO.index(filename, format, **kwargs)
+            offsets = sorted(expected._offsets.values())
+            if len(offsets) < 2 or format == 'blast-xml':
+                # cutting XML part way through would give invalid XML
+                expected.close()
+                continue
+            handle = open(filename, 'rb')
+            data = handle.read()
+            handle.close()
+            # cut the file at a line break part way through the last query
+            cut = data.index(b'\n', (offsets[-1] + len(data)) // 2) + 1
+            self.write(data[:cut])
+            if os.path.isfile(self.offsets):
+                os.remove(self.offsets)
+            idx = SearchIO.index(self.filename, format,
+                                 offsets_filename=self.offsets, **kwargs)
+            # the rescan starts from the last query found, which depending
+            # on the format may or may not be the incomplete one
+            last = max(idx._offsets.values())
+            idx.close()
+            self.write(data[cut:], 'ab')
+            scanned = []
+            original = _index._scan_offsets
+
+            def record_scan(indexer, start=0):
+                scanned.append(start)
+                return original(indexer, start)
+            _index._scan_offsets = record_scan
+            try:
+                self.check_index(format, expected, **kwargs)
+            finally:
+                _index._scan_offsets = original
+            self.assertEqual([last], scanned, filename)
+            expected.close()
+
+    def test_changed(self):
+        "Test index rescans if the file, format or arguments are different"
+        scanned = []
+        original = _index._scan_offsets
+
+        def record_scan(indexer, start=0):
+            scanned.append(start)
+            return original(indexer, start)
+        _index._scan_offsets = record_scan
+        try:
+            filename = os.path.join('Hmmer', 'domtab_30_hmmscan_001.out')
+            shutil.copyfile(filename, self.filename)
+            for format in ('hmmscan3-domtab', 'hmmscan3-domtab',
+                           'hmmsearch3-domtab'):
+                expected = SearchIO.index(filename, format)
+                self.check_index(format, expected)
+                expected.close()
+            self.assertEqual([0, 0], scanned)
+            filename = os.path.join('Blast', 'tab_2226_tblastn_001.txt')
+            shutil.copyfile(filename, self.filename)
+            std_acc = ['qacc'] + STD_FIELDS[1:]
+            for fields in (STD_FIELDS, STD_FIELDS, std_acc):
+                expected = SearchIO.index(filename, 'blast-tab', fields=fields)
+                self.check_index('blast-tab', expected, fields=fields)
+                expected.close()
+            self.assertEqual([0, 0, 0, 0], scanned)
+            # a shorter file, which must be scanned from the start
+            filename = os.path.join('Blast', 'tab_2226_tblastn_002.txt')
+            shutil.copyfile(filename, self.filename)
+            expected = SearchIO.index(filename, 'blast-tab', fields=std_acc)
+            self.check_index('blast-tab', expected, fields=std_acc)
+            expected.close()
+            self.assertEqual([0, 0, 0, 0, 0], scanned)
+        finally:
+            _index._scan_offsets = original
+
+    def test_rewritten(self):
+        "Test index rescans a larger file which is not an appended one"
+        scanned = []
+        original = _index._scan_offsets
+
+        def record_scan(indexer, start=0):
+            scanned.append(start)
+            return original(indexer, start)
+        _index._scan_offsets = record_scan
+        try:
+            filename = os.path.join('Hmmer', 'tab_30_hmmscan_001.out')
+            shutil.copyfile(filename, self.filename)
+            expected = SearchIO.index(filename, 'hmmer3-tab')
+            self.check_index('hmmer3-tab', expected)
+            expected.close()
+            # a longer file, but with a different first query
+            handle = open(filename, 'rb')
+            data = handle.read()
+            handle.close()
+            self.write(data.replace(b'gi|4885477|ref|NP_005359.1|',
+                                    b'gi|4885477|ref|NP_005359.12|'))
+            expected = SearchIO.index(self.filename, 'hmmer3-tab')
+            self.check_index('hmmer3-tab', expected)
+            expected.close()
+            self.assertEqual([0, 0], scanned)
+        finally:
+            _index._scan_offsets = original
+
+    def test_checked_bytes(self):
+        "Test only the start and the bytes before the last query are checked"
+        filename = os.path.join('Hmmer', 'tab_30_hmmscan_001.out')
+        handle = open(filename, 'rb')
+        data = bytearray(handle.read())
+        handle.close()
+        expected = SearchIO.index(filename, 'hmmer3-tab')
+        last = max(expected._offsets.values())
+        scanned = []
+        original = _index._scan_offsets
+        checked_size = _index._CHECKED_SIZE
+
+        def record_scan(indexer, start=0):
+            scanned.append(start)
+            return original(indexer, start)
+        _index._scan_offsets = record_scan
+        _index._CHECKED_SIZE = 100
+        try:
+            # change a digit in the middle of the file, and then just
+            # before the last query, each time with more data appended
+            for position, rescan in [(last // 2, last), (last - 50, 0)]:
+                self.write(bytes(data[:data.index(b'\n', last) + 1]))
+                if os.path.isfile(self.offsets):
+                    os.remove(self.offsets)
+                SearchIO.index(self.filename, 'hmmer3-tab',
+                               offsets_filename=self.offsets).close()
+                while not chr(data[position]).isdigit():
+                    position += 1
+                changed = bytearray(data)
+                changed[position] = ord('0') + (changed[position] + 1) % 10
+                self.write(bytes(changed))
+                del scanned[:]
+                SearchIO.index(self.filename, 'hmmer3-tab',
+                               offsets_filename=self.offsets).close()
+                self.assertEqual([rescan], scanned)
+        finally:
+            _index._scan_offsets = original
+            _index._CHECKED_SIZE = checked_size
+            expected.close()
+        # no temporary files are left behind
+        self.assertEqual(['search.out', 'search.out.offsets'],
+                         sorted(os.listdir(self.temp_dir)))
+
+    def test_corrupt(self):
+        "Test index ignores an unreadable offsets file"
+        filename = os.path.join('Hmmer', 'tab_30_hmmscan_001.out')
+        shutil.copyfile(filename, self.filename)
+        handle = open(self.offsets, 'wb')
+        handle.write(b'#SearchIO.index offsets v1\tjunk\n')
+        handle.close()
+        expected = SearchIO.index(filename, 'hmmer3-tab')
+        self.check_index('hmmer3-tab', expected)
+        expected.close()
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -11,7 +11,9 @@ to all formats.
 
 """
 
+import pickle
 import unittest
+import weakref
 from copy import deepcopy
 
 from search_tests_common import compare_search_obj
@@ -1217,6 +1219,43 @@ class HSPFragmentCases(unittest.TestCase):
         self.assertTrue(self.fragment.hit.seq.alphabet is generic_dna)
         self.assertTrue(self.fragment.query.seq.alphabet is generic_dna)
 
+    def test_seq_deferred(self):
+        """Test HSPFragment sequences given as strings are built when used"""
+        fragment = HSPFragment('hit_id', 'query_id', 'ATGCTAGCTACA',
+                'ATG--AGCTAGG')
+        self.assertEqual('ATG--AGCTAGG', fragment._query)
+        self.assertEqual(12, fragment.aln_span)
+        # attributes set before the SeqRecord is built are used for it
+        fragment.query_id = 'new_query_id'
+        fragment.query_description = 'new description'
+        fragment.alphabet = generic_dna
+        self.assertEqual('ATG--AGCTAGG', fragment._query)
+        self.assertEqual('new_query_id', fragment.query.id)
+        self.assertEqual('new description', fragment.query.description)
+        self.assertTrue(fragment.query.seq.alphabet is generic_dna)
+        self.assertTrue(isinstance(fragment._query, SeqRecord))
+        # and after it is built, they are applied to it
+        fragment.query_id = 'newer_query_id'
+        self.assertEqual('newer_query_id', fragment.query.id)
+
+    def test_slots(self):
+        """Test HSPFragment attributes with __slots__"""
+        self.assertFalse(self.fragment.__dict__)
+        # format specific attributes are still allowed
+        self.fragment.evalue = 1e-5
+        self.assertEqual({'evalue': 1e-5}, self.fragment.__dict__)
+        self.assertTrue('_hit_id' in self.fragment._attr_names())
+        self.assertTrue('evalue' in self.fragment._attr_names())
+        self.assertTrue(compare_search_obj(self.fragment,
+                pickle.loads(pickle.dumps(self.fragment))))
+        self.assertTrue(compare_search_obj(self.fragment,
+                deepcopy(self.fragment)))
+        # and weak references too
+        hsp = HSP([self.fragment])
+        hit = Hit([hsp])
+        for obj in (self.fragment, hsp, hit):
+            self.assertTrue(weakref.ref(obj)() is obj)
+
     def test_seq_unequal_hit_query_len(self):
         """Test HSPFragment sequence setter with unequal hit and query lengths"""
         for seq_type in ('hit', 'query'):
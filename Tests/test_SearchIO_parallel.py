@@ -0,0 +1,100 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for SearchIO parse using several worker processes."""
+
+import os
+import unittest
+import warnings
+
+from Bio import BiopythonExperimentalWarning
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', BiopythonExperimentalWarning)
+    from Bio import SearchIO
+    from Bio.SearchIO import _index
+
+from search_tests_common import compare_search_obj
+
+
+# (format, filename, keyword arguments)
+TEST_FILES = [
+    ('blast-tab', os.path.join('Blast', 'tab_2226_tblastn_001.txt'), {}),
+    ('blast-tab', os.path.join('Blast', 'tab_2226_tblastn_005.txt'),
+     {'comments': True}),
+    ('blast-tab', os.path.join('Blast', 'tab_2226_tblastn_009.txt'),
+     {'fields': ['qseqid', 'sseqid']}),
+    ('blast-xml', os.path.join('Blast', 'wnts.xml'), {}),
+    ('blast-xml', os.path.join('Blast', 'wnts.xml.bgz'), {}),
+    ('blast-xml', os.path.join('Blast', 'xml_2212L_blastp_001.xml'), {}),
+    ('blat-psl', os.path.join('Blat', 'psl_34_004.psl'), {}),
+    ('blat-psl', os.path.join('Blat', 'pslx_34_004.pslx'), {'pslx': True}),
+    ('exonerate-text', os.path.join('Exonerate', 'exn_22_q_multiple.exn'),
+     {}),
+    ('exonerate-vulgar',
+     os.path.join('Exonerate', 'exn_22_q_multiple_vulgar.exn'), {}),
+    ('fasta-m10', os.path.join('Fasta', 'output002.m10'), {}),
+    ('hmmer2-text', os.path.join('Hmmer', 'text_22_hmmpfam_001.out'), {}),
+    ('hmmer3-text', os.path.join('Hmmer', 'text_30_hmmscan_001.out'), {}),
+    ('hmmer3-tab', os.path.join('Hmmer', 'tab_30_hmmscan_001.out'), {}),
+    ('hmmscan3-domtab', os.path.join('Hmmer', 'domtab_30_hmmscan_001.out'),
+     {}),
+]
+
+
+class ParallelCases(unittest.TestCase):
+
+    def setUp(self):
+        # use one query per block, so that there are several blocks
+        self.block_queries = _index._BLOCK_QUERIES
+        _index._BLOCK_QUERIES = 1
+
+    def tearDown(self):
+        _index._BLOCK_QUERIES = self.block_queries
+
+    def test_parallel(self):
+        "Test parsing with several workers gives the same results in order"
+        for format, filename, kwargs in TEST_FILES:
+            if filename.endswith('.bgz'):
+                parsed = list(SearchIO.parse(filename[:-4], format, **kwargs))
+            else:
+                parsed = list(SearchIO.parse(filename, format, **kwargs))
+            for workers in (2, 3):
+                in_parallel = list(SearchIO.parse(filename, format,
+                                                  workers=workers, **kwargs))
+                self.assertEqual([q.id for q in parsed],
+                                 [q.id for q in in_parallel], filename)
+                for qresult, other in zip(parsed, in_parallel):
+                    self.assertTrue(compare_search_obj(qresult, other))
+
+    def test_one_worker(self):
+        "Test parsing with a single worker parses a handle as normal"
+        filename = os.path.join('Blast', 'mirna.xml')
+        with open(filename) as handle:
+            ids = [q.id for q in SearchIO.parse(handle, 'blast-xml',
+                                                workers=1)]
+        self.assertEqual(['33211', '33212', '33213'], ids)
+
+    def test_errors(self):
+        "Test parsing with several workers requires a file name and indexer"
+        filename = os.path.join('Blast', 'mirna.xml')
+        with open(filename) as handle:
+            self.assertRaises(TypeError, list,
+                              SearchIO.parse(handle, 'blast-xml', workers=2))
+        filename = os.path.join('Blast', 'text_2226_blastp_004.txt')
+        self.assertRaises(ValueError, list,
+                          SearchIO.parse(filename, 'blast-text', workers=2))
+
+    def test_early_exit(self):
+        "Test stopping part way through parsing with several workers"
+        filename = os.path.join('Blast', 'wnts.xml')
+        qresults = SearchIO.parse(filename, 'blast-xml', workers=2)
+        first = next(qresults)
+        qresults.close()
+        self.assertEqual('gi|195230749:301-1383', first.id)
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
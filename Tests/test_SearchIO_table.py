@@ -0,0 +1,177 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for SearchIO read_table, the columnar tabular reader."""
+
+import os
+import unittest
+import warnings
+
+from Bio._py3k import StringIO
+from Bio import BiopythonExperimentalWarning
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', BiopythonExperimentalWarning)
+    from Bio.SearchIO import parse, read_table
+
+
+def get_file(*path):
+    """Returns the path of a test file."""
+    return os.path.join(*path)
+
+
+# (filename, keyword arguments for parse and read_table)
+BLAST_FILES = [
+    (get_file('Blast', 'tab_2226_tblastn_001.txt'), {}),
+    (get_file('Blast', 'tab_2226_tblastn_003.txt'), {}),
+    (get_file('Blast', 'tab_2226_tblastn_004.txt'), {}),
+    (get_file('Blast', 'tab_2226_tblastn_005.txt'), {'comments': True}),
+    (get_file('Blast', 'tab_2226_tblastn_007.txt'), {'comments': True}),
+    (get_file('Blast', 'tab_2226_tblastn_008.txt'), {'comments': True}),
+    (get_file('Blast', 'tab_2226_tblastn_010.txt'), {'comments': True}),
+    (get_file('Blast', 'tab_2226_tblastn_013.txt'),
+     {'fields': 'qseq std sseq'}),
+    (get_file('Blast', 'mirna.tab'), {'comments': True}),
+]
+
+HMMER_TAB_FILES = ['tab_30_hmmscan_001.out', 'tab_30_hmmscan_002.out',
+                   'tab_30_hmmscan_003.out', 'tab_30_hmmscan_004.out']
+
+HMMER_DOMTAB_FILES = [('domtab_30_hmmscan_001.out', 'hmmscan3-domtab'),
+                      ('domtab_30_hmmscan_002.out', 'hmmscan3-domtab'),
+                      ('domtab_30_hmmscan_003.out', 'hmmscan3-domtab'),
+                      ('domtab_30_hmmscan_004.out', 'hmmscan3-domtab'),
+                      ('domtab_30_hmmsearch_001.out', 'hmmsearch3-domtab')]
+
+
+def flatten(tables):
+    """Joins the tables into one list of (query id, row dict)."""
+    rows = []
+    for table in tables:
+        for qid, start, end in table.iter_queries():
+            for idx in range(start, end):
+                rows.append((qid, dict((field, table[field][idx])
+                                       for field in table.fields)))
+    return rows
+
+
+class CompareCases(unittest.TestCase):
+
+    """Compare the tables with the objects from SearchIO.parse."""
+
+    def check_chunks(self, filename, format, **kwargs):
+        expected = flatten(read_table(filename, format, **kwargs))
+        for chunk_size in (1, 2, 5):
+            tables = list(read_table(filename, format,
+                                     chunk_size=chunk_size, **kwargs))
+            for table in tables[:-1]:
+                self.assertTrue(len(table) >= chunk_size)
+            self.assertEqual(flatten(tables), expected)
+        return expected
+
+    def test_blast_tab(self):
+        "Test read_table on blast-tab files"
+        for filename, kwargs in BLAST_FILES:
+            rows = self.check_chunks(filename, 'blast-tab', **kwargs)
+            hsps = [(qresult.id, hsp) for qresult in parse(filename,
+                    'blast-tab', **kwargs) for hit in qresult for hsp in hit]
+            self.assertEqual(len(rows), len(hsps))
+            for (qid, row), (hsp_qid, hsp) in zip(rows, hsps):
+                self.assertEqual(qid, hsp_qid)
+                self.assertEqual(row['sseqid'], hsp.hit_id)
+                self.assertEqual(row['evalue'], hsp.evalue)
+                self.assertEqual(row['bitscore'], hsp.bitscore)
+                if 'length' not in row:
+                    continue
+                self.assertEqual(row['length'], hsp.aln_span)
+                self.assertEqual(min(row['qstart'], row['qend']) - 1,
+                                 hsp.query_start)
+                self.assertEqual(max(row['sstart'], row['send']),
+                                 hsp.hit_end)
+                if 'qseq' in row:
+                    self.assertEqual(row['qseq'], str(hsp.query.seq))
+
+    def test_hmmer3_tab(self):
+        "Test read_table on hmmer3-tab files"
+        for filename in HMMER_TAB_FILES:
+            filename = get_file('Hmmer', filename)
+            rows = self.check_chunks(filename, 'hmmer3-tab')
+            hits = [hit for qresult in parse(filename, 'hmmer3-tab')
+                    for hit in qresult]
+            self.assertEqual(len(rows), len(hits))
+            for (qid, row), hit in zip(rows, hits):
+                self.assertEqual(qid, hit.query_id)
+                self.assertEqual(row['target_name'], hit.id)
+                self.assertEqual(row['evalue'], hit.evalue)
+                self.assertEqual(row['best_domain_bitscore'],
+                                 hit.hsps[0].bitscore)
+                self.assertEqual(row['domain_included_num'],
+                                 hit.domain_included_num)
+                self.assertEqual(row['description'], hit.description)
+
+    def test_hmmer3_domtab(self):
+        "Test read_table on hmmer3-domtab files"
+        for filename, format in HMMER_DOMTAB_FILES:
+            filename = get_file('Hmmer', filename)
+            rows = self.check_chunks(filename, format)
+            hsps = [hsp for qresult in parse(filename, format)
+                    for hit in qresult for hsp in hit]
+            self.assertEqual(len(rows), len(hsps))
+            for (qid, row), hsp in zip(rows, hsps):
+                self.assertEqual(qid, hsp.query_id)
+                self.assertEqual(row['domain_index'], hsp.domain_index)
+                self.assertEqual(row['domain_evalue'], hsp.evalue)
+                self.assertEqual(row['env_from'] - 1, hsp.env_start)
+                self.assertEqual(row['acc_avg'], hsp.acc_avg)
+
+    def test_columns(self):
+        "Test read_table with a subset of columns"
+        filename = get_file('Hmmer', 'tab_30_hmmscan_001.out')
+        tables = list(read_table(filename, 'hmmer3-tab',
+                                 columns='evalue target_name'))
+        self.assertEqual(1, len(tables))
+        table = tables[0]
+        self.assertEqual(['evalue', 'target_name'], table.fields)
+        self.assertFalse('bitscore' in table)
+        self.assertEqual(10, len(table))
+        self.assertEqual(4, len(table.query_ids))
+        self.assertEqual('gi|4885477|ref|NP_005359.1|', table.query_ids[0])
+        self.assertEqual('Globin', table['target_name'][0])
+        self.assertEqual(6e-21, table['evalue'][0])
+        self.assertRaises(ValueError, list, read_table(filename,
+                          'hmmer3-tab', columns=['qseqid']))
+
+
+class ErrorCases(unittest.TestCase):
+
+    def test_bad_rows(self):
+        "Test read_table on rows with the wrong number of columns"
+        handle = StringIO("q1\th1\t1e-5\nq1\th2\n")
+        self.assertRaises(ValueError, list, read_table(handle, 'blast-tab',
+                          fields='qseqid sseqid evalue'))
+
+    def test_missing_fields(self):
+        "Test read_table on commented blast-tab without a fields line"
+        handle = StringIO("# BLASTP 2.2.26+\nq1\th1\t1e-5\n")
+        self.assertRaises(ValueError, list, read_table(handle, 'blast-tab',
+                          comments=True))
+
+    def test_empty(self):
+        "Test read_table on files without any result rows"
+        filename = get_file('Blast', 'tab_2226_tblastn_002.txt')
+        self.assertEqual([], list(read_table(filename, 'blast-tab')))
+        filename = get_file('Blast', 'tab_2226_tblastn_006.txt')
+        self.assertEqual([], list(read_table(filename, 'blast-tab',
+                                             comments=True)))
+
+    def test_format(self):
+        "Test read_table with formats that are not tabular"
+        self.assertRaises(ValueError, list,
+                          read_table(get_file('Blast', 'mirna.xml'),
+                                     'blast-xml'))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
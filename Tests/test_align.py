@@ -58,6 +58,25 @@ assert alignment[-1].id == "upper"
 assert isinstance(alignment[::-1], MultipleSeqAlignment)
 assert alignment[::-1][0].id == "upper"
 assert alignment[::-1][2].id == "mixed"
+#Check column extraction stays in sync as the rows change
+#(this uses the cached character matrix if NumPy is installed):
+assert alignment[:,0] == "AaA"
+assert alignment[::-1,0] == "AaA"[::-1]
+assert alignment[1:,1] == "bB"
+sub_alignment = alignment[:,1:4]
+assert sub_alignment[:,0] == "bbB"
+assert sub_alignment[::2,2] == "DD"
+alignment.append(SeqRecord(Seq("z" * 26), id="zzz"))
+assert alignment[:,0] == "AaAz"
+alignment.sort()
+assert [rec.id for rec in alignment] == ["lower", "mixed", "upper", "zzz"]
+assert alignment[:,0] == "aAAz"
+alignment.extend([SeqRecord(Seq("y" * 26), id="yyy")])
+assert alignment[:,25] == "zzZzy"
+combined = alignment + alignment[:,:2]
+assert combined[:,26] == "aAAzy"
+assert combined[1:3,27] == "bB"
+del sub_alignment, combined
 
 del alignment
 del letters
@@ -129,6 +148,25 @@ print('relative information: %0.2f' \
       % align_info.information_content(e_freq_table = e_freq_table,
                                        chars_to_ignore = ['N']))
 
+#The column counts are cached, but must follow changes to the alignment:
+gapped_dna = Alphabet.Gapped(IUPAC.unambiguous_dna)
+weighted = MultipleSeqAlignment([SeqRecord(Seq("GTATC", gapped_dna), id="a"),
+                                 SeqRecord(Seq("AT--C", gapped_dna), id="b"),
+                                 SeqRecord(Seq("CTGTC", gapped_dna), id="c")],
+                                gapped_dna)
+weighted_info = AlignInfo.SummaryInfo(weighted)
+assert str(weighted_info.dumb_consensus()) == "XTXTC"
+assert str(weighted_info.gap_consensus()) == "XTXXC"
+assert weighted_info.pos_specific_score_matrix()[3]['T'] == 2.0
+weighted[1].annotations['weight'] = 0.5
+assert weighted_info.pos_specific_score_matrix()[0]['A'] == 0.5
+assert weighted_info.pos_specific_score_matrix()[4]['C'] == 2.5
+assert str(weighted_info.dumb_consensus()) == "XTXTC"
+weighted.append(SeqRecord(Seq("CTGTA", gapped_dna), id="d"))
+assert str(weighted_info.dumb_consensus(threshold=0.5)) == "CTGTC"
+assert weighted_info.pos_specific_score_matrix()[4]['A'] == 1.0
+del weighted, weighted_info, gapped_dna
+
 print('Column 1: %s' % align_info.get_column(1))
 print('IC for column 1: %0.2f' % align_info.ic_vector[1])
 print('Column 7: %s' % align_info.get_column(7))
@@ -0,0 +1,196 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Tests for Bio.webcache, the on-disk cache of online database responses."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from Bio._py3k import _as_bytes
+from Bio import webcache
+from Bio.webcache import ResponseCache
+
+
+class FakeResponse(object):
+    """Handle returned by the counting opener."""
+
+    def __init__(self, body, status):
+        self.body = body
+        self.status = status
+        self.closed = False
+
+    def read(self):
+        return self.body
+
+    def getcode(self):
+        return self.status
+
+    def close(self):
+        self.closed = True
+
+
+class CacheCases(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        "Test saving and finding responses"
+        cache = ResponseCache(self.directory)
+        url = "http://example.org/cgi?db=protein&id=1"
+        self.assertEqual(None, cache.get(url))
+        cache.put(url, None, _as_bytes("response"))
+        self.assertEqual(_as_bytes("response"), cache.get(url))
+        # the parameters may be sent in another order, or by POST
+        self.assertEqual(_as_bytes("response"),
+                         cache.get("http://EXAMPLE.org/cgi?id=1&db=protein"))
+        self.assertEqual(_as_bytes("response"),
+                         cache.get("http://example.org/cgi", "id=1&db=protein"))
+        self.assertEqual(None, cache.get("http://example.org/cgi?id=2"))
+        self.assertEqual((3, 2), (cache.hits, cache.misses))
+        # the responses are kept on disk for other cache objects
+        other = ResponseCache(self.directory)
+        self.assertEqual(_as_bytes("response"), other.get(url))
+        other.clear()
+        self.assertEqual(None, cache.get(url))
+
+    def test_ttl(self):
+        "Test responses older than the TTL are fetched again"
+        cache = ResponseCache(self.directory, ttl=3600)
+        url = "http://example.org/cgi?id=1"
+        cache.put(url, None, _as_bytes("response"))
+        self.assertEqual(_as_bytes("response"), cache.get(url))
+        path = cache._path(webcache._request_key(url))
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+        self.assertEqual(None, cache.get(url))
+        self.assertFalse(os.path.exists(path))
+
+    def test_lru(self):
+        "Test the least recently used responses are removed"
+        cache = ResponseCache(self.directory, max_size=30)
+        urls = ["http://example.org/cgi?id=%i" % i for i in range(4)]
+        for age, url in zip([40, 30, 20, 10], urls[:3]):
+            cache.put(url, None, _as_bytes("x" * 10))
+            path = cache._path(webcache._request_key(url))
+            old = time.time() - age
+            os.utime(path, (old, old))
+        # reading the oldest makes it the most recently used
+        self.assertEqual(_as_bytes("x" * 10), cache.get(urls[0]))
+        cache.put(urls[3], None, _as_bytes("y" * 10))
+        self.assertEqual(None, cache.get(urls[1]))
+        for url in urls[0], urls[2], urls[3]:
+            self.assertTrue(cache.get(url) is not None, url)
+        self.assertEqual(30, cache._size)
+
+    def test_threads(self):
+        "Test several threads saving the same responses"
+        caches = [ResponseCache(self.directory, max_size=1000)
+                  for i in range(4)]
+
+        def work(cache):
+            for i in range(20):
+                cache.put("http://example.org/?id=%i" % i, None,
+                          _as_bytes("%02i" % i * 10))
+
+        threads = [threading.Thread(target=work, args=(cache,))
+                   for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(20):
+            self.assertEqual(_as_bytes("%02i" % i * 10),
+                             caches[0].get("http://example.org/?id=%i" % i))
+        names = [name for folder in os.listdir(self.directory)
+                 for name in os.listdir(os.path.join(self.directory, folder))]
+        self.assertEqual(20, len(names))
+
+    def test_errors(self):
+        "Test the cache arguments are checked"
+        self.assertRaises(ValueError, ResponseCache, self.directory, -1)
+        self.assertRaises(ValueError, ResponseCache, self.directory, None, -1)
+
+
+class UrlopenCases(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.calls = []
+        self.waits = []
+
+    def tearDown(self):
+        webcache.cache = None
+        shutil.rmtree(self.directory)
+
+    def opener(self, url, data=None):
+        self.calls.append((url, data))
+        if "missing" in url:
+            return FakeResponse(_as_bytes("not found"), 404)
+        return FakeResponse(_as_bytes("body of %s" % url), 200)
+
+    def test_without_cache(self):
+        "Test opening URLs with caching turned off"
+        webcache.cache = None
+        for i in range(2):
+            handle = webcache._urlopen("http://example.org/?id=1",
+                                       opener=self.opener,
+                                       wait=lambda: self.waits.append(1))
+        self.assertTrue(isinstance(handle, FakeResponse))
+        self.assertEqual(2, len(self.calls))
+        self.assertEqual(2, len(self.waits))
+
+    def test_with_cache(self):
+        "Test opening URLs with caching turned on"
+        webcache.cache = ResponseCache(self.directory)
+        for i in range(3):
+            handle = webcache._urlopen("http://example.org/?id=1",
+                                       opener=self.opener,
+                                       wait=lambda: self.waits.append(1))
+            self.assertEqual(_as_bytes("body of http://example.org/?id=1"),
+                             handle.read())
+        # only the first goes to the network, and waits for the rate limit
+        self.assertEqual([("http://example.org/?id=1", None)], self.calls)
+        self.assertEqual(1, len(self.waits))
+        self.assertEqual((2, 1), (webcache.cache.hits, webcache.cache.misses))
+        webcache._urlopen("http://example.org/", _as_bytes("id=2"),
+                          opener=self.opener)
+        webcache._urlopen("http://example.org/?id=2", opener=self.opener)
+        self.assertEqual(2, len(self.calls))
+
+    def test_not_saved(self):
+        "Test unsuccessful responses are not saved"
+        webcache.cache = ResponseCache(self.directory)
+        for i in range(2):
+            handle = webcache._urlopen("http://example.org/missing",
+                                       opener=self.opener)
+            self.assertEqual(_as_bytes("not found"), handle.read())
+        self.assertEqual(2, len(self.calls))
+
+    def test_not_cacheable(self):
+        "Test requests can bypass the cache, and bodies be rejected"
+        webcache.cache = ResponseCache(self.directory)
+        for i in range(2):
+            webcache._urlopen("http://example.org/?id=1", opener=self.opener,
+                              cacheable=False)
+            webcache._urlopen("http://example.org/?id=2", opener=self.opener,
+                              valid=lambda body: False)
+        self.assertEqual(4, len(self.calls))
+        self.assertEqual((0, 2), (webcache.cache.hits, webcache.cache.misses))
+        # a request which was not cached can still be cached later
+        webcache._urlopen("http://example.org/?id=1", opener=self.opener)
+        webcache._urlopen("http://example.org/?id=1", opener=self.opener)
+        self.assertEqual(5, len(self.calls))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)